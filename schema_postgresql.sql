@@ -43,6 +43,8 @@ CREATE TABLE IF NOT EXISTS edges (
     confidence REAL DEFAULT 1.0,
     source_id INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    event_day INTEGER,      -- days since 1970-01-01 of event_date (see src/event_time.py)
+    event_ts BIGINT,        -- Unix seconds of event_date
     FOREIGN KEY (subject_id) REFERENCES entities(entity_id),
     FOREIGN KEY (object_id) REFERENCES entities(entity_id),
     FOREIGN KEY (source_id) REFERENCES sources(source_id)
@@ -79,6 +81,8 @@ CREATE TABLE IF NOT EXISTS raw_data (
 CREATE INDEX IF NOT EXISTS idx_edges_subject ON edges(subject_id);
 CREATE INDEX IF NOT EXISTS idx_edges_object ON edges(object_id);
 CREATE INDEX IF NOT EXISTS idx_identifiers_entity ON identifiers(entity_id);
+CREATE INDEX IF NOT EXISTS idx_edges_relation_day ON edges(relation_type, event_day);
+CREATE INDEX IF NOT EXISTS idx_edges_event_day ON edges(event_day);
 
 -- Business contacts indexes
 CREATE INDEX IF NOT EXISTS idx_entities_status ON entities(status);
@@ -92,3 +96,160 @@ CREATE INDEX IF NOT EXISTS idx_edges_source ON edges(source_id);
 CREATE INDEX IF NOT EXISTS idx_raw_data_source ON raw_data(source_id);
 CREATE INDEX IF NOT EXISTS idx_raw_data_hash ON raw_data(content_hash);
 
+
+-- ============================================================
+-- DATA VERSION (result cache in web_ui.py, see src/query_cache.py)
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS graph_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version BIGINT NOT NULL
+);
+INSERT INTO graph_version (id, version) VALUES (1, 0) ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_graph_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE graph_version SET version = version + 1 WHERE id = 1;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_entities_version ON entities;
+CREATE TRIGGER trg_entities_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON entities
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_graph_version();
+
+DROP TRIGGER IF EXISTS trg_identifiers_version ON identifiers;
+CREATE TRIGGER trg_identifiers_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON identifiers
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_graph_version();
+
+DROP TRIGGER IF EXISTS trg_edges_version ON edges;
+CREATE TRIGGER trg_edges_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON edges
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_graph_version();
+
+-- ============================================================
+-- FULL-TEXT SEARCH (src/text_search.py): russian tsvector + GIN
+-- ============================================================
+
+ALTER TABLE entities ADD COLUMN IF NOT EXISTS search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('russian', coalesce(label, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce(tags, '')), 'B') ||
+    setweight(to_tsvector('russian', coalesce(notes, '')), 'C')
+) STORED;
+CREATE INDEX IF NOT EXISTS idx_entities_search ON entities USING GIN (search_vector);
+
+-- Raw payload texts (event summaries, fact contexts), filled on write
+CREATE TABLE IF NOT EXISTS context_search (
+    source_id INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    title TEXT,
+    body TEXT,
+    search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'B') ||
+        setweight(to_tsvector('russian', coalesce(body, '')), 'D')
+    ) STORED,
+    PRIMARY KEY (source_id, content_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_context_search ON context_search USING GIN (search_vector);
+
+-- ============================================================
+-- COMMUNITIES (src/communities.py): clustering runs and memberships
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS community_runs (
+    run_id SERIAL PRIMARY KEY,
+    method TEXT NOT NULL,
+    relations TEXT,
+    resolution REAL NOT NULL,
+    modularity REAL,
+    communities INTEGER NOT NULL,
+    nodes INTEGER NOT NULL,
+    edges INTEGER NOT NULL,
+    max_edge_id INTEGER,
+    parent_run_id INTEGER,
+    seconds REAL,
+    created_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS communities (
+    run_id INTEGER NOT NULL,
+    community_id INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (run_id, community_id)
+);
+
+CREATE TABLE IF NOT EXISTS entity_communities (
+    run_id INTEGER NOT NULL,
+    entity_id INTEGER NOT NULL,
+    community_id INTEGER NOT NULL,
+    PRIMARY KEY (run_id, entity_id)
+);
+CREATE INDEX IF NOT EXISTS idx_entity_communities_community
+    ON entity_communities(run_id, community_id, entity_id);
+
+-- ============================================================
+-- CENTRALITY (src/centrality.py): scores cached per data version
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS entity_centrality (
+    entity_id INTEGER PRIMARY KEY,
+    degree INTEGER NOT NULL,
+    weighted_degree REAL NOT NULL,
+    pagerank REAL NOT NULL,
+    eigenvector REAL NOT NULL,
+    betweenness REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entity_centrality_weighted_degree
+    ON entity_centrality(weighted_degree DESC, entity_id);
+CREATE INDEX IF NOT EXISTS idx_entity_centrality_pagerank
+    ON entity_centrality(pagerank DESC, entity_id);
+CREATE INDEX IF NOT EXISTS idx_entity_centrality_eigenvector
+    ON entity_centrality(eigenvector DESC, entity_id);
+CREATE INDEX IF NOT EXISTS idx_entity_centrality_betweenness
+    ON entity_centrality(betweenness DESC, entity_id);
+CREATE INDEX IF NOT EXISTS idx_entity_centrality_degree
+    ON entity_centrality(degree DESC, entity_id);
+
+CREATE TABLE IF NOT EXISTS centrality_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    data_version BIGINT,
+    edge_rows INTEGER,
+    max_edge_id INTEGER,
+    relations TEXT,
+    exclude_owner INTEGER NOT NULL,
+    samples INTEGER,
+    nodes INTEGER NOT NULL,
+    edges INTEGER NOT NULL,
+    seconds REAL,
+    computed_at TEXT
+);
+
+-- ============================================================
+-- RECOMMENDATIONS (src/recommendations.py): Q11 link prediction top-k
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS recommendations (
+    entity_id INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    candidate_id INTEGER NOT NULL,
+    adamic_adar REAL NOT NULL,
+    resource_allocation REAL NOT NULL,
+    common_neighbors INTEGER NOT NULL,
+    PRIMARY KEY (entity_id, rank)
+);
+
+CREATE TABLE IF NOT EXISTS recommendation_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    edge_rows INTEGER NOT NULL,
+    max_edge_id INTEGER,
+    relations TEXT,
+    exclude_owner INTEGER NOT NULL,
+    top_k INTEGER NOT NULL,
+    nodes INTEGER NOT NULL,
+    edges INTEGER NOT NULL,
+    seconds REAL,
+    computed_at TEXT
+);
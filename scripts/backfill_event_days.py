@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Backfill edges.event_day / event_ts (typed event dates) из event_date.
+
+Новые рёбра получают их при записи; скрипт нужен после импорта сырыми
+INSERT или миграции старой базы. Повторный запуск безопасен.
+
+    python scripts/backfill_event_days.py
+    python scripts/backfill_event_days.py --postgres-url postgresql://...
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Backfill typed event dates on edges')
+    parser.add_argument('--db', default='data/contacts_v2.db', help='Path to SQLite database')
+    parser.add_argument('--postgres-url', default=None, help='PostgreSQL URL (instead of --db)')
+
+    args = parser.parse_args()
+
+    if args.postgres_url:
+        from enhanced_graph_db_universal import EnhancedGraphDB
+        db = EnhancedGraphDB(postgres_url=args.postgres_url)
+        target = 'PostgreSQL'
+    else:
+        if not Path(args.db).exists():
+            print(f"❌ File not found: {args.db}")
+            return 1
+        from enhanced_graph_db import EnhancedGraphDB
+        db = EnhancedGraphDB(args.db)
+        target = args.db
+
+    print(f"📅 Backfill event_day / event_ts: {target}")
+    report = db.backfill_event_days()
+    db.close()
+
+    print(f"  ✓ Обновлено рёбер: {report['updated']}")
+    if report['unparsed']:
+        print(f"  ⚠️  event_date не распознан: {report['unparsed']} (event_day остаётся NULL)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: GraphDB.store_fact (per fact) vs GraphDB.store_facts (bulk)
+Синтетическая нагрузка: N фактов, ~N/50 документов-источников.
+"""
+
+import sys
+import time
+import random
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+from graph_db import GraphDB
+
+
+def generate_facts(count, people=5000, orgs=500, facts_per_source=50, seed=42):
+    """Generate synthetic facts, grouped by source document."""
+    rng = random.Random(seed)
+    relations = ['works_at', 'studied_at', 'co_attended', 'affiliated_with']
+
+    for i in range(count):
+        person = rng.randrange(people)
+        org = rng.randrange(orgs)
+        yield {
+            "source_url": f"https://example.org/doc/{i // facts_per_source}",
+            "authority": 1.0,
+            "fact_id": f"fact:{i}",
+            "relation_type": rng.choice(relations),
+            "subject_name": f"Person {person}",
+            "subject_type": "Person",
+            "subject_canonical_id": f"temp:Person {person}",
+            "object_name": f"Org {org}",
+            "object_type": "Organization",
+            "object_canonical_id": f"temp:Org {org}",
+            "start_date": f"{rng.randint(2015, 2025)}-01-01",
+            "end_date": None,
+            "confidence": 0.9,
+            "context": f"Synthetic relation #{i}"
+        }
+
+
+def run_single(db_path, count):
+    """Per-fact path: one commit per fact."""
+    db = GraphDB(db_path)
+    start = time.perf_counter()
+    for fact in generate_facts(count):
+        db.store_fact(fact)
+    elapsed = time.perf_counter() - start
+    stats = db.get_stats()
+    db.close()
+    return elapsed, stats
+
+
+def run_bulk(db_path, count, batch_size):
+    """Bulk path: one transaction per batch."""
+    db = GraphDB(db_path)
+    start = time.perf_counter()
+    db.store_facts(generate_facts(count), batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    stats = db.get_stats()
+    db.close()
+    return elapsed, stats
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark store_fact vs store_facts')
+    parser.add_argument('--facts', type=int, default=100_000, help='Number of synthetic facts')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Bulk batch size')
+    parser.add_argument('--skip-single', action='store_true',
+                        help='Skip the (slow) per-fact path')
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"BENCHMARK: store_fact vs store_facts ({args.facts:,} facts)")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bulk_time, bulk_stats = run_bulk(
+            str(Path(tmp) / "bulk.db"), args.facts, args.batch_size
+        )
+        print(f"\n  store_facts (batch={args.batch_size}): {bulk_time:8.2f}s "
+              f"({args.facts / bulk_time:,.0f} facts/s)")
+        print(f"    {bulk_stats}")
+
+        if args.skip_single:
+            return 0
+
+        single_time, single_stats = run_single(str(Path(tmp) / "single.db"), args.facts)
+        print(f"\n  store_fact  (per fact):   {single_time:8.2f}s "
+              f"({args.facts / single_time:,.0f} facts/s)")
+        print(f"    {single_stats}")
+
+        assert single_stats == bulk_stats, "Bulk and per-fact paths disagree"
+
+        print(f"\n  ⚡ Speedup: {single_time / bulk_time:.1f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
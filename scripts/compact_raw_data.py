@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Compact Context Zone: raw_data.content → compressed, content-addressed raw_blobs
+Одноразовая команда для существующих data/contacts_v2.db.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from compression import CODECS, DEFAULT_CODEC
+from enhanced_graph_db import EnhancedGraphDB
+
+
+def format_bytes(size):
+    """Human-readable byte count."""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compress and deduplicate raw_data payloads')
+    parser.add_argument('--db', default='data/contacts_v2.db', help='Path to SQLite database')
+    parser.add_argument('--codec', choices=sorted(CODECS), default=DEFAULT_CODEC,
+                        help='Compression codec')
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ File not found: {args.db}")
+        return 1
+
+    print(f"🗜️  Компактирование raw_data: {args.db} (codec: {args.codec})")
+    print()
+
+    db = EnhancedGraphDB(args.db, raw_codec=args.codec)
+    report = db.compact_raw_data(codec=args.codec)
+    db.close()
+
+    print(f"  ✓ Перенесено строк raw_data: {report['rows_compacted']}")
+    print(f"  ✓ Перекодировано blobs: {report['blobs_recoded']}")
+    print(f"  ✓ Удалено осиротевших blobs: {report['orphans_removed']}")
+    print(f"  ✓ Уникальных payload'ов: {report['blobs']}")
+    print()
+    print(f"📊 Размер БД: {format_bytes(report['bytes_before'])} → "
+          f"{format_bytes(report['bytes_after'])}")
+    if report['bytes_reclaimed'] > 0:
+        print(f"✅ Освобождено: {format_bytes(report['bytes_reclaimed'])}")
+    else:
+        print("ℹ️  Освобождать нечего: payload'ы короткие, база уже компактна")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Centrality scores for Q5 (stored in entity_centrality, see src/centrality.py).
+
+    python scripts/compute_centrality.py                        # if the data changed
+    python scripts/compute_centrality.py --force --samples 1000
+    python scripts/compute_centrality.py --relation co_attended --show pagerank
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from centrality import BETWEENNESS_SAMPLES, METRICS
+from enhanced_graph_db import EnhancedGraphDB
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compute centrality scores')
+    parser.add_argument('--db', default='data/contacts_v2.db', help='Path to SQLite database')
+    parser.add_argument('--relation', action='append', metavar='TYPE',
+                        help='Edge relation to use (repeatable; default: all)')
+    parser.add_argument('--samples', type=int, default=BETWEENNESS_SAMPLES,
+                        help='Betweenness source samples (0 → exact)')
+    parser.add_argument('--include-owner', action='store_true', help="Keep Olga in the graph")
+    parser.add_argument('--force', action='store_true', help='Recompute even if current')
+    parser.add_argument('--show', default='pagerank', choices=METRICS, help='Metric to print')
+    parser.add_argument('--top', type=int, default=10, help='Contacts to print')
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ File not found: {args.db}")
+        return 1
+
+    db = EnhancedGraphDB(args.db)
+    report = db.refresh_centrality(relations=args.relation,
+                                   exclude_owner=not args.include_owner,
+                                   samples=args.samples or None, force=args.force)
+
+    if report['recomputed']:
+        print(f"📊 Centrality: {report['seconds']:.2f}s "
+              f"(nodes={report['nodes']}, edges={report['edges']})")
+    else:
+        print(f"✅ Centrality is current (computed {report['computed_at'][:16]})")
+    print()
+    for i, row in enumerate(db.most_connected(args.show, args.top, refresh=False), 1):
+        print(f"  {i}. {row['label']}: {row['score']:.4g} ({row['degree']} связей)")
+    db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
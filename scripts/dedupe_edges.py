@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Dedupe edges in place: одна строка на уникальный факт
+(subject, object, relation_type, event_date) + счётчик occurrences.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from enhanced_graph_db import EnhancedGraphDB
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Merge duplicate edges in place')
+    parser.add_argument('--db', default='data/contacts_v2.db', help='Path to SQLite database')
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ File not found: {args.db}")
+        return 1
+
+    print(f"🧹 Дедупликация edges: {args.db}")
+    print()
+
+    db = EnhancedGraphDB(args.db)
+    report = db.dedupe_edges()
+
+    print(f"  Edges: {report['edges_before']} → {report['edges_after']}")
+    print(f"  ✓ Удалено дубликатов: {report['duplicates_removed']}")
+    print()
+
+    # Top merged facts
+    cursor = db.conn.execute("""
+        SELECT relation_type, SUM(occurrences), COUNT(*)
+        FROM edges
+        GROUP BY relation_type
+        ORDER BY COUNT(*) DESC
+    """)
+    print("📊 Факты по типу (occurrences / уникальных):")
+    for relation_type, occurrences, count in cursor.fetchall():
+        print(f"  • {relation_type}: {occurrences} / {count}")
+
+    db.close()
+
+    print()
+    print("✅ Уникальный ключ edges создан, add_fact теперь идемпотентен")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Community detection over the contact graph (stored as a run, see src/communities.py).
+
+    python scripts/detect_communities.py                        # full Louvain run
+    python scripts/detect_communities.py --incremental          # only around new edges
+    python scripts/detect_communities.py --method label_propagation
+    python scripts/detect_communities.py --relation co_attended --resolution 1.2
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from communities import METHODS
+from enhanced_graph_db import EnhancedGraphDB
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Detect contact communities')
+    parser.add_argument('--db', default='data/contacts_v2.db', help='Path to SQLite database')
+    parser.add_argument('--method', default='louvain', choices=METHODS, help='Algorithm')
+    parser.add_argument('--relation', action='append', metavar='TYPE',
+                        help='Edge relation to use (repeatable; default: all)')
+    parser.add_argument('--resolution', type=float, default=1.0,
+                        help='Louvain resolution (>1 → smaller communities)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Start from the latest run, move only nodes of new edges')
+    parser.add_argument('--top', type=int, default=10, help='Communities to print')
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ File not found: {args.db}")
+        return 1
+
+    db = EnhancedGraphDB(args.db)
+    report = db.detect_communities(method=args.method, relations=args.relation,
+                                   resolution=args.resolution, incremental=args.incremental)
+
+    print(f"🧩 Run #{report['run_id']} ({report['method']}): {report['seconds'] or 0:.2f}s")
+    print(f"   nodes={report['nodes']}  edges={report['edges']}  "
+          f"communities={report['communities']}  modularity={report['modularity']:.3f}")
+    if report.get('touched') == 0:
+        print("   incremental: no new edges, the run is current")
+    elif 'touched' in report:
+        print(f"   incremental: {report['touched']} nodes moved "
+              f"(parent run #{report['parent_run_id']})")
+    print()
+    for community in db.list_communities(report['run_id'], min_size=2, limit=args.top):
+        names = [m['label'] for m in db.community_members(community['community_id'],
+                                                          report['run_id'])]
+        more = f" +{len(names) - 5}" if len(names) > 5 else ""
+        print(f"  {community['community_id'] + 1:>3}. [{community['size']}] "
+              f"{', '.join(names[:5])}{more}")
+    db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
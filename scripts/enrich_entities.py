@@ -1,11 +1,13 @@
 """
 Enrich existing entities with business contact fields
 Calculates: primary_identifier, first_seen, last_interaction, relationship_strength, status
+
+Normal ingest keeps these current (entity_stats); this script is a full
+rebuild for databases filled by other tools.
 """
 
 import sys
 from pathlib import Path
-from datetime import datetime, timedelta
 
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
@@ -15,120 +17,32 @@ from enhanced_graph_db import EnhancedGraphDB
 def enrich_entities():
     """Enrich all entities with calculated fields."""
     
-    print("🔧 Обогащение 464 entities дополнительными полями...")
+    print("🔧 Обогащение entities дополнительными полями...")
     print()
     
     db = EnhancedGraphDB()
     
-    # Get all entities
-    cursor = db.conn.execute("SELECT entity_id, label, type FROM entities")
-    entities = cursor.fetchall()
+    cursor = db.conn.execute("SELECT COUNT(*) FROM entities")
+    total = cursor.fetchone()[0]
     
-    print(f"📊 Найдено entities: {len(entities)}")
+    print(f"📊 Найдено entities: {total}")
     print()
     
-    enriched = 0
-    now = datetime.now()
-    
-    for entity_id, label, entity_type in entities:
-        # 1. Get primary_identifier (first email identifier)
-        cursor = db.conn.execute("""
-            SELECT identifier FROM identifiers 
-            WHERE entity_id = ? AND identifier_type = 'email'
+    # primary_identifier: first email identifier (one statement)
+    db.conn.execute("""
+        UPDATE entities SET primary_identifier = (
+            SELECT identifier FROM identifiers i
+            WHERE i.entity_id = entities.entity_id AND i.identifier_type = 'email'
             LIMIT 1
-        """, (entity_id,))
-        
-        primary_id_result = cursor.fetchone()
-        primary_identifier = primary_id_result[0] if primary_id_result else None
-        
-        # 2. Get first_seen (MIN event_date)
-        cursor = db.conn.execute("""
-            SELECT MIN(event_date) FROM edges 
-            WHERE subject_id = ? OR object_id = ?
-        """, (entity_id, entity_id))
-        
-        first_seen_result = cursor.fetchone()
-        first_seen = first_seen_result[0] if first_seen_result and first_seen_result[0] else None
-        
-        # 3. Get last_interaction (MAX event_date)
-        cursor = db.conn.execute("""
-            SELECT MAX(event_date) FROM edges 
-            WHERE subject_id = ? OR object_id = ?
-        """, (entity_id, entity_id))
-        
-        last_interaction_result = cursor.fetchone()
-        last_interaction = last_interaction_result[0] if last_interaction_result and last_interaction_result[0] else None
-        
-        # 4. Calculate relationship_strength (degree centrality normalized)
-        cursor = db.conn.execute("""
-            SELECT COUNT(DISTINCT edge_id) FROM edges 
-            WHERE (subject_id = ? OR object_id = ?) AND relation_type = 'co_attended'
-        """, (entity_id, entity_id))
-        
-        degree = cursor.fetchone()[0]
-        
-        # Normalize: max degree in graph = 1.0
-        max_degree_cursor = db.conn.execute("""
-            SELECT MAX(cnt) FROM (
-                SELECT entity_id, COUNT(DISTINCT edge_id) as cnt
-                FROM (
-                    SELECT subject_id as entity_id, edge_id FROM edges
-                    UNION ALL
-                    SELECT object_id as entity_id, edge_id FROM edges
-                )
-                GROUP BY entity_id
-            )
-        """)
-        max_degree = max_degree_cursor.fetchone()[0] or 1
-        
-        relationship_strength = round(degree / max_degree, 3) if max_degree > 0 else 0.0
-        
-        # 5. Calculate status
-        status = 'unknown'
-        if last_interaction:
-            try:
-                last_date = datetime.fromisoformat(last_interaction)
-                days_since = (now - last_date).days
-                
-                if days_since <= 180:  # 6 months
-                    status = 'active'
-                elif days_since >= 730:  # 2 years
-                    status = 'cold'
-                else:
-                    status = 'unknown'
-            except:
-                status = 'unknown'
-        
-        # Update entity
-        db.conn.execute("""
-            UPDATE entities SET
-                primary_identifier = ?,
-                first_seen = ?,
-                last_interaction = ?,
-                relationship_strength = ?,
-                status = ?,
-                updated_at = ?
-            WHERE entity_id = ?
-        """, (
-            primary_identifier,
-            first_seen,
-            last_interaction,
-            relationship_strength,
-            status,
-            datetime.now().isoformat(),
-            entity_id
-        ))
-        
-        enriched += 1
-        
-        if enriched % 50 == 0:
-            db.conn.commit()
-            print(f"  ✓ Обогащено {enriched}/{len(entities)} entities...")
+        )
+    """)
     
-    db.conn.commit()
+    # first_seen / last_interaction / degree are kept by entity_stats triggers;
+    # rebuild them from edges and rescore status + relationship_strength
+    enriched = db.rebuild_entity_stats()['changed']
     
     print()
-    print(f"✅ Обогащение завершено: {enriched} entities")
+    print(f"✅ Обогащение завершено: обновлено {enriched} entities")
     print()
     
     # Statistics
@@ -166,14 +80,14 @@ def enrich_entities():
         SELECT COUNT(*) FROM entities WHERE primary_identifier IS NOT NULL
     """)
     with_identifier = cursor.fetchone()[0]
-    print(f"\n  С primary_identifier: {with_identifier}/{len(entities)}")
+    print(f"\n  С primary_identifier: {with_identifier}/{total}")
     
     # With temporal data
     cursor = db.conn.execute("""
         SELECT COUNT(*) FROM entities WHERE first_seen IS NOT NULL
     """)
     with_temporal = cursor.fetchone()[0]
-    print(f"  С temporal data: {with_temporal}/{len(entities)}")
+    print(f"  С temporal data: {with_temporal}/{total}")
     
     db.close()
 
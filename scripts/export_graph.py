@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Export the graph (data/contacts_v2.db) to GraphML / JSON / NDJSON.
+Экспорт потоковый: память не растёт с размером графа.
+
+Examples:
+    python scripts/export_graph.py --format graphml --output data/olga_contacts.graphml
+    python scripts/export_graph.py --format ndjson --since 2024-01-01 --gzip
+    python scripts/export_graph.py --ego anna@example.com --depth 2 --relation co_attended
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import neighborhood
+from enhanced_graph_db import EnhancedGraphDB
+
+EXTENSIONS = {'graphml': '.graphml', 'json': '.json', 'ndjson': '.ndjson'}
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Stream the contact graph to a file')
+    parser.add_argument('--db', default='data/contacts_v2.db', help='Path to SQLite database')
+    parser.add_argument('--format', choices=sorted(EXTENSIONS), default='json',
+                        help='Output format (json = D3 nodes/links document)')
+    parser.add_argument('--output', help='Output file (default: data/olga_contacts.<format>)')
+    parser.add_argument('--since', help='Only edges with event_date >= SINCE (YYYY-MM-DD)')
+    parser.add_argument('--gzip', action='store_true', help='Gzip the output')
+    parser.add_argument('--ego', metavar='ENTITY',
+                        help='Only the neighborhood of ENTITY (entity_id, identifier or label)')
+    parser.add_argument('--depth', type=int, default=neighborhood.DEPTH, help='Ego network hops')
+    parser.add_argument('--relation', action='append', help='Ego network relation type (repeatable)')
+    parser.add_argument('--min-confidence', type=float, help='Ego network minimum edge confidence')
+    parser.add_argument('--until', help='Ego network: only edges with event_date <= UNTIL')
+    parser.add_argument('--max-nodes', type=int, default=neighborhood.MAX_NODES,
+                        help='Ego network size cap')
+    parser.add_argument('--max-degree', type=int, default=neighborhood.HUB_DEGREE,
+                        help='Ego network: contacts above this degree are not expanded')
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ File not found: {args.db}")
+        return 1
+
+    output = args.output or f"data/olga_contacts{EXTENSIONS[args.format]}"
+    if args.gzip and not output.endswith('.gz'):
+        output += '.gz'
+
+    db = EnhancedGraphDB(args.db)
+    started = time.perf_counter()
+    if args.ego:
+        entity = int(args.ego) if args.ego.isdigit() else args.ego
+        try:
+            counts = db.export_ego_network(
+                entity, output, fmt=args.format, depth=args.depth, relation_types=args.relation,
+                min_confidence=args.min_confidence, date_range=(args.since, args.until),
+                max_nodes=args.max_nodes, max_degree=args.max_degree
+            )
+        except ValueError as e:
+            db.close()
+            print(f"❌ {e}")
+            return 1
+        print(f"🕸️  Ego network of {args.ego}: {counts['nodes']} nodes, {counts['edges']} edges")
+    elif args.format == 'graphml':
+        db.export_to_graphml(output, since=args.since)
+    else:
+        db.export_to_json(output, fmt=args.format, since=args.since)
+    elapsed = time.perf_counter() - started
+    db.close()
+
+    size = Path(output).stat().st_size
+    print(f"✅ {output} ({size / 1024:.1f} KB, {elapsed:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,11 +2,15 @@
 Fix critical issues in v2.1 schema based on Gemini feedback:
 - Q-G1: Add 'directory', 'cooling' status
 - Q-G2: Fix relationship_strength (exclude Olga, add recency)
+
+The status and relationship_strength rules now live in src/scoring.py
+(Scorer, formulas added with register_formula) over the per-entity
+aggregates of src/entity_stats.py, and are applied on every write; this
+script rescores an existing database in one pass.
 """
 
 import sys
 from pathlib import Path
-from datetime import datetime
 
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
@@ -33,99 +37,12 @@ def fix_critical_issues():
     print(f"  📌 Olga entity_id: {olga_id}")
     print()
     
-    # Get max_degree (excluding Olga)
-    cursor = db.conn.execute("""
-        SELECT MAX(cnt) FROM (
-            SELECT entity_id, COUNT(DISTINCT edge_id) as cnt
-            FROM (
-                SELECT subject_id as entity_id, edge_id FROM edges
-                UNION ALL
-                SELECT object_id as entity_id, edge_id FROM edges
-            )
-            WHERE entity_id != ?
-            GROUP BY entity_id
-        )
-    """, (olga_id,))
-    max_degree = cursor.fetchone()[0] or 1
-    
-    print(f"  📊 Max degree (excluding Olga): {max_degree}")
-    print()
-    
-    # Get all entities
-    cursor = db.conn.execute("SELECT entity_id FROM entities")
-    entities = [row[0] for row in cursor.fetchall()]
-    
-    print(f"  🔄 Обновление {len(entities)} entities...")
+    # max_degree (excluding Olga), status and recency-weighted strength are
+    # computed by EnhancedGraphDB.refresh_scores (scoring.Scorer over entity_stats)
+    print(f"  🔄 Пересчёт status / relationship_strength...")
     print()
     
-    now = datetime.now()
-    fixed = 0
-    
-    for entity_id in entities:
-        # Get degree
-        cursor = db.conn.execute("""
-            SELECT COUNT(DISTINCT edge_id) FROM edges 
-            WHERE (subject_id = ? OR object_id = ?)
-        """, (entity_id, entity_id))
-        degree = cursor.fetchone()[0]
-        
-        # Get last_interaction
-        cursor = db.conn.execute("""
-            SELECT MAX(event_date) FROM edges 
-            WHERE (subject_id = ? OR object_id = ?)
-        """, (entity_id, entity_id))
-        last_interaction = cursor.fetchone()[0]
-        
-        # Fix Q-G1: Status
-        if last_interaction:
-            try:
-                last_date = datetime.fromisoformat(last_interaction)
-                days_since = (now - last_date).days
-                
-                if days_since <= 180:  # 6 months
-                    status = 'active'
-                elif days_since <= 730:  # 6 months - 2 years
-                    status = 'cooling'
-                else:  # > 2 years
-                    status = 'cold'
-            except:
-                status = 'directory'
-        else:
-            # No interaction = from Contacts only
-            status = 'directory'
-        
-        # Fix Q-G2: relationship_strength (weighted with recency)
-        degree_norm = degree / max_degree if max_degree > 0 else 0.0
-        
-        if last_interaction:
-            try:
-                last_date = datetime.fromisoformat(last_interaction)
-                days_since = (now - last_date).days
-                # Recency: 0 days = 1.0, 365 days = 0.5, 730 days = 0.33
-                recency_norm = 365.0 / (365.0 + days_since)
-            except:
-                recency_norm = 0.0
-        else:
-            recency_norm = 0.0
-        
-        # Weighted formula: 50% degree + 50% recency
-        relationship_strength = round((0.5 * degree_norm) + (0.5 * recency_norm), 3)
-        
-        # Update
-        db.conn.execute("""
-            UPDATE entities SET
-                status = ?,
-                relationship_strength = ?,
-                updated_at = ?
-            WHERE entity_id = ?
-        """, (status, relationship_strength, datetime.now().isoformat(), entity_id))
-        
-        fixed += 1
-        if fixed % 50 == 0:
-            db.conn.commit()
-            print(f"  ✓ Исправлено {fixed}/{len(entities)}")
-    
-    db.conn.commit()
+    fixed = db.rebuild_entity_stats()['changed']
     
     print()
     print(f"✅ Исправлено: {fixed} entities")
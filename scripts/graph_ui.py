@@ -6,8 +6,7 @@ Graph Query UI: Web-интерфейс для исследования граф
 
 import sys
 from pathlib import Path
-import re
-from collections import defaultdict
+from datetime import date, timedelta
 
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
@@ -37,12 +36,12 @@ def get_top_contacts(db, year=None, limit=20):
             FROM facts f
             JOIN nodes n ON f.object_id = n.canonical_id
             WHERE f.relation_type = 'co_attended'
-              AND f.context LIKE ?
+              AND f.event_date >= ? AND f.event_date < ?
             GROUP BY n.name
             ORDER BY meetings DESC
             LIMIT ?
         """
-        cursor = db.conn.execute(query, (f'%{year}%', limit))
+        cursor = db.conn.execute(query, (str(year), str(int(year) + 1), limit))
     else:
         query = """
             SELECT n.name, COUNT(*) as meetings
@@ -60,41 +59,25 @@ def get_top_contacts(db, year=None, limit=20):
 
 def get_cold_contacts(db, months=12):
     """Получить контакты без встреч более N месяцев."""
+    cutoff = (date.today() - timedelta(days=months * 30)).isoformat()
     cursor = db.conn.execute("""
-        SELECT n.name, f.context
+        SELECT n.name, substr(MAX(f.event_date), 1, 10) as last_meeting
         FROM facts f
         JOIN nodes n ON f.object_id = n.canonical_id
         WHERE f.relation_type = 'co_attended'
+          AND f.event_date IS NOT NULL
         GROUP BY n.name
-        ORDER BY MAX(f.created_at) ASC
+        HAVING MAX(f.event_date) < ?
+        ORDER BY last_meeting ASC
         LIMIT 20
-    """)
-    
-    results = []
-    for name, context in cursor.fetchall():
-        # Extract year
-        year_match = re.search(r'20\d{2}', context or '')
-        year = year_match.group() if year_match else 'N/A'
-        results.append((name, year))
+    """, (cutoff,))
     
-    return results
+    return cursor.fetchall()
 
 
 def search_events(db, keyword):
-    """Поиск событий по ключевому слову."""
-    cursor = db.conn.execute("""
-        SELECT e.name, COUNT(*) as participants, f.context
-        FROM facts f
-        JOIN nodes e ON f.object_id = e.canonical_id
-        WHERE e.type = 'Event'
-          AND (e.name LIKE ? OR f.context LIKE ?)
-          AND f.relation_type = 'participated_in'
-        GROUP BY e.name
-        ORDER BY f.created_at DESC
-        LIMIT 20
-    """, (f'%{keyword}%', f'%{keyword}%'))
-    
-    return cursor.fetchall()
+    """Поиск событий по ключевому слову (полнотекстовый индекс, лучшие первыми)."""
+    return db.search_events(keyword, limit=20)
 
 
 def get_event_participants(db, event_name):
@@ -120,21 +103,24 @@ def get_stats(db):
     cursor = db.conn.execute("SELECT COUNT(*) FROM facts WHERE relation_type = 'co_attended'")
     co_attended = cursor.fetchone()[0]
     
-    # Years with data
-    cursor = db.conn.execute("SELECT context FROM facts WHERE relation_type = 'co_attended' LIMIT 1000")
-    years = set()
-    for (context,) in cursor.fetchall():
-        if context:
-            year_matches = re.findall(r'20\d{2}', context)
-            years.update(year_matches)
-    
     return {
         **stats,
         'co_attended': co_attended,
-        'years': sorted(years)
+        'years': sorted(get_year_counts(db))
     }
 
 
+def get_year_counts(db):
+    """Встречи (co_attended) по годам: {год: количество}."""
+    cursor = db.conn.execute("""
+        SELECT substr(event_date, 1, 4) as year, COUNT(*)
+        FROM facts
+        WHERE relation_type = 'co_attended' AND event_date IS NOT NULL
+        GROUP BY year
+    """)
+    return dict(cursor.fetchall())
+
+
 def main():
     st.set_page_config(page_title="Граф Контактов Ольги Розет", layout="wide")
     
@@ -203,7 +189,7 @@ def main():
             results = get_cold_contacts(db, months=months)
             
             if results:
-                df = pd.DataFrame(results, columns=['Контакт', 'Последняя встреча (год)'])
+                df = pd.DataFrame(results, columns=['Контакт', 'Последняя встреча'])
                 st.dataframe(df, use_container_width=True)
                 
                 st.info(f"💡 Рекомендация: Напишите этим людям или организуйте встречу")
@@ -221,14 +207,12 @@ def main():
             if results:
                 st.write(f"Найдено событий: **{len(results)}**")
                 
-                for event_name, participants, context in results:
+                for event in results:
+                    event_name, participants = event['name'], event['participants']
                     with st.expander(f"📅 {event_name} ({participants} участников)"):
-                        # Extract year
-                        year_match = re.search(r'20\d{2}', context or '')
-                        year = year_match.group() if year_match else 'N/A'
-                        
-                        st.write(f"**Год:** {year}")
+                        st.write(f"**Год:** {(event['event_date'] or 'N/A')[:4]}")
                         st.write(f"**Участников:** {participants}")
+                        st.caption(event['snippet'].replace('[', '**').replace(']', '**'))
                         
                         # Get participants
                         people = get_event_participants(db, event_name)
@@ -245,15 +229,7 @@ def main():
         st.header("Временная шкала")
         st.write("Распределение встреч по годам")
         
-        # Get year distribution
-        cursor = db.conn.execute("SELECT context FROM facts WHERE relation_type = 'co_attended'")
-        year_counts = defaultdict(int)
-        
-        for (context,) in cursor.fetchall():
-            if context:
-                year_matches = re.findall(r'20\d{2}', context)
-                for year in year_matches:
-                    year_counts[year] += 1
+        year_counts = get_year_counts(db)
         
         if year_counts:
             df = pd.DataFrame(
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Цепочки знакомств до контакта (path engine).
+
+    python scripts/intro_chain.py "Anna"                     # самая тёплая цепочка
+    python scripts/intro_chain.py "Anna" --k 3 --max-depth 4 # 3 варианта, до 4 рукопожатий
+    python scripts/intro_chain.py "Anna" --hops              # кратчайшая по числу рукопожатий
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from target_scenarios import GraphQueries
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Find introduction chains to a contact')
+    parser.add_argument('target', help='Target contact (label or identifier fragment)')
+    parser.add_argument('--db', default='data/contacts_v2.db', help='Path to SQLite database')
+    parser.add_argument('--from', dest='source', default=None,
+                        help='Start contact (default: Olga)')
+    parser.add_argument('--relation', action='append', default=None,
+                        help='Relation type to follow (repeatable; default: all)')
+    parser.add_argument('--max-depth', type=int, default=None, help='Max hops')
+    parser.add_argument('--k', type=int, default=1, help='Number of alternative chains')
+    parser.add_argument('--hops', action='store_true',
+                        help='Fewest hops instead of warmest (relationship_strength)')
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ File not found: {args.db}")
+        return 1
+
+    queries = GraphQueries(args.db)
+    try:
+        source_id = queries._find_entity(args.source) if args.source else queries._olga_id()
+        target_id = queries._find_entity(args.target)
+        if not source_id or not target_id:
+            print(f"❌ Контакт '{args.source if not source_id else args.target}' не найден")
+            return 1
+
+        started = time.perf_counter()
+        queries.db.path_finder()
+        loaded = time.perf_counter() - started
+
+        started = time.perf_counter()
+        chains = queries._q3_index(source_id, target_id, relations=args.relation,
+                                   max_depth=args.max_depth, k=args.k, warmest=not args.hops)
+        elapsed = time.perf_counter() - started
+    finally:
+        queries.db.close()
+
+    print(f"🧭 Цепочки до '{args.target}' (индекс {loaded * 1000:.0f} ms, "
+          f"поиск {elapsed * 1000:.1f} ms):\n")
+    for i, (cost, labels) in enumerate(chains, 1):
+        measure = f"{cost:.0f} рукопожатий" if args.hops else f"стоимость {cost:.1f}"
+        print(f"  {i}. {' → '.join(labels)} ({measure})")
+    if not chains:
+        print("  ❌ Путь не найден")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -81,6 +81,10 @@ def migrate():
             print(f"  ✗ Ошибка при миграции факта: {subject_name} {relation_type} {object_name}")
             print(f"    {str(e)}")
     
+    # One full rescore for the whole import (add_fact only rescored touched rows)
+    new_db.refresh_scores()
+    new_db.commit()
+    
     print()
     print(f"✅ Миграция завершена!")
     print()
@@ -106,13 +106,26 @@ def migrate_to_v2():
     print(f"  5️⃣  Edges: {len(edges)}")
     
     for edge in edges:
+        # Duplicate facts merge into one edge (occurrences counter)
         new_db.conn.execute("""
             INSERT INTO edges (edge_id, subject_id, object_id, relation_type, 
                              event_date, confidence, source_id, created_at)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (subject_id, object_id, relation_type, COALESCE(event_date, ''))
+            DO UPDATE SET
+                occurrences = occurrences + 1,
+                confidence = MAX(confidence, excluded.confidence)
         """, (edge['edge_id'], edge['subject_id'], edge['object_id'],
               edge['relation_type'], edge['event_date'], edge['confidence'],
               edge['source_id'], edge['created_at']))
+        new_db.conn.execute("""
+            INSERT OR IGNORE INTO edge_sources (edge_id, source_id)
+            SELECT edge_id, ? FROM edges
+            WHERE subject_id = ? AND object_id = ? AND relation_type = ?
+              AND COALESCE(event_date, '') = COALESCE(?, '')
+              AND ? IS NOT NULL
+        """, (edge['source_id'], edge['subject_id'], edge['object_id'],
+              edge['relation_type'], edge['event_date'], edge['source_id']))
     
     new_db.conn.commit()
     
@@ -133,96 +146,17 @@ def migrate_to_v2():
     
     new_db = EnhancedGraphDB(new_db_path)
     
-    cursor = new_db.conn.execute("SELECT entity_id FROM entities")
-    entity_ids = [row[0] for row in cursor.fetchall()]
-    
-    now = datetime.now()
-    enriched = 0
-    
-    for entity_id in entity_ids:
-        # 1. primary_identifier
-        cursor = new_db.conn.execute("""
-            SELECT identifier FROM identifiers 
-            WHERE entity_id = ? 
+    # primary_identifier: first identifier of the entity (one statement)
+    new_db.conn.execute("""
+        UPDATE entities SET primary_identifier = (
+            SELECT identifier FROM identifiers i
+            WHERE i.entity_id = entities.entity_id
             LIMIT 1
-        """, (entity_id,))
-        
-        result = cursor.fetchone()
-        primary_identifier = result[0] if result else None
-        
-        # 2. first_seen
-        cursor = new_db.conn.execute("""
-            SELECT MIN(event_date) FROM edges 
-            WHERE subject_id = ? OR object_id = ?
-        """, (entity_id, entity_id))
-        
-        first_seen = cursor.fetchone()[0]
-        
-        # 3. last_interaction
-        cursor = new_db.conn.execute("""
-            SELECT MAX(event_date) FROM edges 
-            WHERE subject_id = ? OR object_id = ?
-        """, (entity_id, entity_id))
-        
-        last_interaction = cursor.fetchone()[0]
-        
-        # 4. relationship_strength (degree / max_degree)
-        cursor = new_db.conn.execute("""
-            SELECT COUNT(DISTINCT edge_id) FROM edges 
-            WHERE (subject_id = ? OR object_id = ?)
-        """, (entity_id, entity_id))
-        
-        degree = cursor.fetchone()[0]
-        
-        # Get max degree
-        cursor = new_db.conn.execute("""
-            SELECT MAX(cnt) FROM (
-                SELECT COUNT(DISTINCT edge_id) as cnt
-                FROM edges
-                GROUP BY subject_id
-                UNION ALL
-                SELECT COUNT(DISTINCT edge_id) as cnt
-                FROM edges
-                GROUP BY object_id
-            )
-        """)
-        max_degree = cursor.fetchone()[0] or 1
-        
-        relationship_strength = round(degree / max_degree, 3) if max_degree > 0 else 0.0
-        
-        # 5. status
-        status = 'unknown'
-        if last_interaction:
-            try:
-                last_date = datetime.fromisoformat(last_interaction)
-                days_since = (now - last_date).days
-                
-                if days_since <= 180:
-                    status = 'active'
-                elif days_since >= 730:
-                    status = 'cold'
-            except:
-                pass
-        
-        # Update
-        new_db.conn.execute("""
-            UPDATE entities SET
-                primary_identifier = ?,
-                first_seen = ?,
-                last_interaction = ?,
-                relationship_strength = ?,
-                status = ?,
-                updated_at = ?
-            WHERE entity_id = ?
-        """, (primary_identifier, first_seen, last_interaction,
-              relationship_strength, status, datetime.now().isoformat(), entity_id))
-        
-        enriched += 1
-        if enriched % 50 == 0:
-            new_db.conn.commit()
-            print(f"  ✓ Обогащено {enriched}/{len(entity_ids)}")
+        )
+    """)
     
-    new_db.conn.commit()
+    # Edge inserts above already filled entity_stats (triggers); rescore all
+    enriched = new_db.rebuild_entity_stats()['changed']
     
     print()
     print(f"✅ Обогащено: {enriched} entities")
@@ -169,9 +169,10 @@ def process_calendar_events(events, db):
             
             db.conn.execute("""
                 INSERT OR IGNORE INTO facts 
-                (fact_id, relation_type, subject_id, object_id, confidence, context, created_at)
-                VALUES (?, 'participated_in', ?, ?, 0.95, ?, datetime())
-            """, (fact_id, person_id, event_node_id, f"Attended '{event_name}' on {start}"))
+                (fact_id, relation_type, subject_id, object_id, confidence, context, created_at,
+                 event_date)
+                VALUES (?, 'participated_in', ?, ?, 0.95, ?, datetime(), ?)
+            """, (fact_id, person_id, event_node_id, f"Attended '{event_name}' on {start}", start))
             
             total_relations += 1
         
@@ -185,9 +186,11 @@ def process_calendar_events(events, db):
                 
                 db.conn.execute("""
                     INSERT OR IGNORE INTO facts 
-                    (fact_id, relation_type, subject_id, object_id, confidence, context, created_at)
-                    VALUES (?, 'co_attended', ?, ?, 0.90, ?, datetime())
-                """, (fact_id, person1_id, person2_id, f"Both attended '{event_name}' on {start}"))
+                    (fact_id, relation_type, subject_id, object_id, confidence, context, created_at,
+                     event_date)
+                    VALUES (?, 'co_attended', ?, ?, 0.90, ?, datetime(), ?)
+                """, (fact_id, person1_id, person2_id, f"Both attended '{event_name}' on {start}",
+                      start))
                 
                 total_relations += 1
         
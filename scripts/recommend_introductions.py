@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Q11: whom to introduce to a contact (stored top-k, see src/recommendations.py).
+
+    python scripts/recommend_introductions.py                   # refresh only
+    python scripts/recommend_introductions.py "Анна Петрова"    # refresh + show
+    python scripts/recommend_introductions.py --force --top-k 50
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from enhanced_graph_db import EnhancedGraphDB
+from recommendations import TOP_K
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Link-prediction recommendations (Q11)')
+    parser.add_argument('contact', nargs='?', help='Contact label to show recommendations for')
+    parser.add_argument('--db', default='data/contacts_v2.db', help='Path to SQLite database')
+    parser.add_argument('--top-k', type=int, default=TOP_K, help='Candidates kept per contact')
+    parser.add_argument('--force', action='store_true', help='Full recompute')
+    parser.add_argument('--limit', type=int, default=10, help='Recommendations to print')
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ File not found: {args.db}")
+        return 1
+
+    db = EnhancedGraphDB(args.db)
+    report = db.refresh_recommendations(top_k=args.top_k, force=args.force)
+    if report['mode'] == 'current':
+        print(f"✅ Recommendations are current (computed {report['computed_at'][:16]})")
+    else:
+        print(f"🤝 Recommendations ({report['mode']}): {report['rescored']} contacts rescored "
+              f"in {report['seconds']:.2f}s (nodes={report['nodes']}, edges={report['edges']})")
+
+    if args.contact:
+        row = db.conn.execute("SELECT entity_id FROM entities WHERE label = ?",
+                              (args.contact,)).fetchone()
+        if row is None:
+            print(f"❌ Contact not found: {args.contact}")
+            db.close()
+            return 1
+        print()
+        for i, rec in enumerate(db.recommend_introductions(row[0], args.limit, refresh=False), 1):
+            print(f"  {i}. {rec['label']}: AA={rec['adamic_adar']:.2f} "
+                  f"RA={rec['resource_allocation']:.3f} ({rec['common_neighbors']} общих)")
+    db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Bulk re-scoring of relationship_strength and status (NumPy, one pass).
+
+    python scripts/rescore_entities.py                          # default formula
+    python scripts/rescore_entities.py --dry-run                # only show the diff
+    python scripts/rescore_entities.py --formula half_life --param half_life_days=90
+    python scripts/rescore_entities.py --active-days 90 --cooling-days 365
+    python scripts/rescore_entities.py --centrality pagerank     # normalize PageRank, not degree
+
+Formulas: see src/scoring.py (FORMULAS / register_formula).
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from centrality import METRICS
+from enhanced_graph_db import EnhancedGraphDB
+from scoring import FORMULAS, Scorer, format_report
+
+
+def parse_params(values):
+    """['degree_weight=0.6', ...] → {'degree_weight': 0.6}"""
+    params = {}
+    for value in values or []:
+        key, _, raw = value.partition('=')
+        params[key] = float(raw)
+    return params
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Rescore relationship_strength and status')
+    parser.add_argument('--db', default='data/contacts_v2.db', help='Path to SQLite database')
+    parser.add_argument('--formula', default='degree_recency', choices=sorted(FORMULAS),
+                        help='Strength formula')
+    parser.add_argument('--param', action='append', metavar='NAME=VALUE',
+                        help='Formula parameter (repeatable), e.g. degree_weight=0.6')
+    parser.add_argument('--active-days', type=int, default=180, help='active: last interaction ≤ N days')
+    parser.add_argument('--cooling-days', type=int, default=730, help='cooling: ≤ N days, older → cold')
+    parser.add_argument('--include-owner', action='store_true',
+                        help="Don't exclude Olga from max_degree")
+    parser.add_argument('--centrality', choices=METRICS,
+                        help='Score from this centrality metric instead of degree '
+                             '(recomputed first if the data changed)')
+    parser.add_argument('--dry-run', action='store_true', help='Show the diff without writing')
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ File not found: {args.db}")
+        return 1
+
+    try:
+        scorer = Scorer(args.formula, active_days=args.active_days,
+                        cooling_days=args.cooling_days,
+                        exclude_owner=not args.include_owner,
+                        centrality=args.centrality,
+                        **parse_params(args.param))
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    db = EnhancedGraphDB(args.db, scorer=scorer)
+
+    started = time.perf_counter()
+    if args.centrality:
+        db.refresh_centrality(exclude_owner=not args.include_owner)
+    report = scorer.rescore(db.conn, dry_run=args.dry_run)
+    if not args.dry_run:
+        db.commit()
+    elapsed = time.perf_counter() - started
+    db.close()
+
+    mode = " (dry run)" if args.dry_run else ""
+    print(f"📊 Rescoring '{args.formula}'{mode}: {elapsed:.2f}s")
+    print()
+    for line in format_report(report):
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Binary CSR snapshot of the graph for analytics.
+
+    python scripts/snapshot_graph.py                 # write data/graph_snapshot.bin
+    python scripts/snapshot_graph.py --check         # is the snapshot current?
+
+Load in any script:
+    snap = db.load_snapshot()          # np.memmap views, milliseconds
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from enhanced_graph_db import EnhancedGraphDB
+from graph_snapshot import GraphSnapshot
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Write a NumPy CSR snapshot of the graph')
+    parser.add_argument('--db', default='data/contacts_v2.db', help='Path to SQLite database')
+    parser.add_argument('--output', default='data/graph_snapshot.bin', help='Snapshot file')
+    parser.add_argument('--check', action='store_true',
+                        help='Only check whether the existing snapshot is current')
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"❌ File not found: {args.db}")
+        return 1
+
+    db = EnhancedGraphDB(args.db)
+
+    if args.check:
+        if not Path(args.output).exists():
+            print(f"❌ Snapshot not found: {args.output}")
+            db.close()
+            return 1
+        snap = GraphSnapshot(args.output)
+        version = db.data_version()
+        db.close()
+        if snap.data_version == version:
+            print(f"✅ Snapshot актуален (data version {version})")
+            return 0
+        print(f"⚠️  Snapshot устарел: data version {snap.data_version} → {version}")
+        return 2
+
+    started = time.perf_counter()
+    header = db.snapshot(args.output)
+    elapsed = time.perf_counter() - started
+    db.close()
+
+    print(f"📸 {args.output} (data version {header['data_version']}, {elapsed:.2f}s)")
+    print(f"  • Узлов: {header['nodes']}")
+    print(f"  • Рёбер: {header['edges']}")
+    print(f"  • Типов связей: {len(header['relations'])}")
+    if header['dropped_edges']:
+        print(f"  ⚠️  Пропущено рёбер без сущностей: {header['dropped_edges']}")
+
+    started = time.perf_counter()
+    GraphSnapshot(args.output)
+    print(f"  ⚡ Загрузка (mmap): {(time.perf_counter() - started) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
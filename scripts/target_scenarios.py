@@ -9,14 +9,56 @@ from pathlib import Path
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
+import event_time
 from enhanced_graph_db import EnhancedGraphDB
 
 
 class GraphQueries:
-    """10 target scenarios for the contact graph."""
+    """
+    10 target scenarios for the contact graph.
+
+    Q3, Q4 and Q5 run against the in-memory GraphIndex; the original
+    SQL versions (_qN_sql) are kept as a fallback (use_index=False).
+    Q5 with a metric reads precomputed centrality (src/centrality.py).
+    Q8 reads stored community detection runs (src/communities.py).
+    """
     
-    def __init__(self, db_path="data/contacts_enhanced.db"):
+    def __init__(self, db_path="data/contacts_enhanced.db", use_index: bool = True):
         self.db = EnhancedGraphDB(db_path)
+        self.use_index = use_index
+    
+    @property
+    def index(self):
+        return self.db.graph_index()
+    
+    def _olga_id(self):
+        cursor = self.db.conn.execute("""
+            SELECT entity_id FROM identifiers 
+            WHERE identifier LIKE '%olga%' OR identifier LIKE '%rozet%'
+            LIMIT 1
+        """)
+        result = cursor.fetchone()
+        return result[0] if result else None
+    
+    def _find_entity(self, name: str):
+        cursor = self.db.conn.execute("""
+            SELECT entity_id FROM entities 
+            WHERE label LIKE ? 
+            LIMIT 1
+        """, (f"%{name}%",))
+        result = cursor.fetchone()
+        return result[0] if result else None
+    
+    def _labels(self, entity_ids) -> dict:
+        entity_ids = list(entity_ids)
+        if not entity_ids:
+            return {}
+        placeholders = ','.join('?' * len(entity_ids))
+        cursor = self.db.conn.execute(
+            f"SELECT entity_id, label FROM entities WHERE entity_id IN ({placeholders})",
+            entity_ids
+        )
+        return dict(cursor.fetchall())
     
     def q1_most_frequent_contacts(self, year: int = 2024, top: int = 10):
         """Q1: С кем я встречался чаще всего в [год]?"""
@@ -24,23 +66,23 @@ class GraphQueries:
         query = """
             SELECT 
                 e.label,
-                COUNT(*) as meeting_count
-            FROM edges ed
-            JOIN entities e ON (ed.subject_id = e.entity_id OR ed.object_id = e.entity_id)
+                SUM(r.edges) as meeting_count
+            FROM entity_month_stats r
+            JOIN entities e ON e.entity_id = r.entity_id
             WHERE 
-                ed.relation_type = 'co_attended'
-                AND ed.event_date LIKE ?
-                AND e.entity_id != (
+                r.relation_type = 'co_attended'
+                AND r.year = ?
+                AND r.entity_id != (
                     SELECT entity_id FROM identifiers 
                     WHERE identifier LIKE '%olga%' OR identifier LIKE '%rozet%'
                     LIMIT 1
                 )
-            GROUP BY e.entity_id
-            ORDER BY meeting_count DESC
+            GROUP BY r.entity_id
+            ORDER BY meeting_count DESC, r.entity_id
             LIMIT ?
         """
         
-        cursor = self.db.conn.execute(query, (f"{year}%", top))
+        cursor = self.db.conn.execute(query, (year, top))
         
         print(f"📅 Q1: Топ-{top} контактов в {year} году:\n")
         
@@ -52,29 +94,29 @@ class GraphQueries:
     def q2_cold_contacts(self, years_threshold: int = 2):
         """Q2: Какие контакты 'остыли' (нет встреч > N лет)?"""
         
-        from datetime import datetime, timedelta
-        threshold_date = (datetime.now() - timedelta(days=years_threshold*365)).strftime("%Y-%m-%d")
+        # Integer bound on the typed event day (entity_edges.event_day, in its primary key rows)
+        threshold_day = event_time.days_ago(years_threshold * 365)
         
         query = """
-            SELECT DISTINCT
+            SELECT
                 e.label,
-                MAX(ed.event_date) as last_meeting
-            FROM entities e
-            JOIN edges ed ON (ed.subject_id = e.entity_id OR ed.object_id = e.entity_id)
+                MAX(ee.event_date) as last_meeting
+            FROM entity_edges ee
+            JOIN entities e ON e.entity_id = ee.entity_id
             WHERE 
-                ed.relation_type = 'co_attended'
-                AND e.entity_id != (
+                ee.relation_type = 'co_attended'
+                AND ee.entity_id != (
                     SELECT entity_id FROM identifiers 
                     WHERE identifier LIKE '%olga%' OR identifier LIKE '%rozet%'
                     LIMIT 1
                 )
-            GROUP BY e.entity_id
-            HAVING MAX(ed.event_date) < ?
-            ORDER BY last_meeting DESC
+            GROUP BY ee.entity_id
+            HAVING MAX(ee.event_day) < ?
+            ORDER BY MAX(ee.event_day) DESC
             LIMIT 20
         """
         
-        cursor = self.db.conn.execute(query, (threshold_date,))
+        cursor = self.db.conn.execute(query, (threshold_day,))
         
         print(f"❄️  Q2: 'Остывшие' контакты (нет встреч > {years_threshold} лет):\n")
         
@@ -83,38 +125,51 @@ class GraphQueries:
         
         print()
     
-    def q3_shortest_path(self, target_name: str):
-        """Q3: Какой 'путь' до [целевого контакта]? (BFS)"""
+    def q3_shortest_path(self, target_name: str, relations='co_attended',
+                         max_depth: int = None, k: int = 1, warmest: bool = True):
+        """Q3: Какой 'путь' до [целевого контакта]? (цепочка знакомств)"""
         
-        # Find target entity
-        cursor = self.db.conn.execute("""
-            SELECT entity_id FROM entities 
-            WHERE label LIKE ? 
-            LIMIT 1
-        """, (f"%{target_name}%",))
-        
-        result = cursor.fetchone()
-        if not result:
+        target_id = self._find_entity(target_name)
+        if not target_id:
             print(f"❌ Контакт '{target_name}' не найден\n")
             return
         
-        target_id = result[0]
-        
-        # Find Olga's entity
-        cursor = self.db.conn.execute("""
-            SELECT entity_id FROM identifiers 
-            WHERE identifier LIKE '%olga%' OR identifier LIKE '%rozet%'
-            LIMIT 1
-        """)
-        
-        olga_result = cursor.fetchone()
-        if not olga_result:
+        olga_id = self._olga_id()
+        if not olga_id:
             print("❌ Olga не найдена в базе\n")
             return
         
-        olga_id = olga_result[0]
+        print(f"🔍 Q3: Путь до '{target_name}':\n")
+        
+        if self.use_index:
+            chains = self._q3_index(olga_id, target_id, relations, max_depth, k, warmest)
+            for cost, labels in chains:
+                print(f"  → {' → '.join(labels)} (стоимость {cost:.1f})")
+            if not chains:
+                print(f"  ❌ Путь не найден")
+        else:
+            results = self._q3_sql(olga_id, target_id)
+            for label, path_type in results:
+                print(f"  → {label}")
+            if not results:
+                print(f"  ❌ Путь не найден")
         
-        # Simple BFS (depth 2 only for demo)
+        print()
+    
+    def _q3_index(self, olga_id: int, target_id: int, relations='co_attended',
+                  max_depth: int = None, k: int = 1, warmest: bool = True):
+        """
+        Intro chains of any length: [(cost, [labels])], best first.
+        warmest → cost is inverse relationship_strength, else hops.
+        """
+        finder = self.db.path_finder()
+        chains = finder.k_paths(olga_id, target_id, k=k, relations=relations,
+                                max_depth=max_depth, weighted=warmest)
+        labels = self._labels({node for _, path in chains for node in path})
+        return [(cost, [labels[node] for node in path]) for cost, path in chains]
+    
+    def _q3_sql(self, olga_id: int, target_id: int):
+        # Legacy: depth 2 over co_attended only, at most one row
         query = """
             WITH direct_connections AS (
                 SELECT DISTINCT
@@ -149,21 +204,53 @@ class GraphQueries:
         """
         
         cursor = self.db.conn.execute(query, (olga_id, olga_id, olga_id, target_id, target_id))
+        return cursor.fetchall()
+    
+    def q4_common_neighbors(self, person1: str, person2: str):
+        """Q4: Кто знает и [X], и [Y]?"""
         
-        print(f"🔍 Q3: Путь до '{target_name}':\n")
+        if self.use_index:
+            results = self._q4_index(person1, person2)
+        else:
+            results = self._q4_sql(person1, person2)
+        
+        print(f"🔗 Q4: Общие контакты '{person1}' и '{person2}':\n")
         
-        results = cursor.fetchall()
         if results:
-            for label, path_type in results:
-                print(f"  → {label}")
+            for label in results:
+                print(f"  • {label}")
         else:
-            print(f"  ❌ Путь не найден")
+            print(f"  ❌ Общих контактов не найдено")
         
         print()
     
-    def q4_common_neighbors(self, person1: str, person2: str):
-        """Q4: Кто знает и [X], и [Y]?"""
+    def _q4_index(self, person1: str, person2: str, limit: int = 20):
+        a, b = self._find_entity(person1), self._find_entity(person2)
+        if a is None or b is None:
+            return []
+        [result] = self.db.common_neighbors([(a, b)], 'co_attended', limit)
+        common = [neighbor['entity_id'] for neighbor in result['neighbors']]
+        labels = self._labels(common)
+        return [labels[entity_id] for entity_id in common]
+    
+    def q4_shared_circles(self, top: int = 10):
+        """Q4 (все пары): у каких активных контактов самый большой общий круг?"""
         
+        rows = self.db.shared_circles(('active',), top, limit=5)
+        
+        print(f"🔗 Q4: Топ-{top} пар активных контактов по общему кругу:\n")
+        
+        for i, row in enumerate(rows, 1):
+            names = ', '.join(neighbor['label'] for neighbor in row['neighbors'])
+            more = f" +{row['count'] - len(row['neighbors'])}" if row['count'] > len(row['neighbors']) else ""
+            print(f"  {i}. {row['x_label']} & {row['y_label']}: {row['count']} общих ({names}{more})")
+        
+        if not rows:
+            print(f"  ❌ Общих контактов не найдено")
+        
+        print()
+    
+    def _q4_sql(self, person1: str, person2: str, limit: int = 20):
         query = """
             WITH person1_connections AS (
                 SELECT DISTINCT
@@ -197,71 +284,86 @@ class GraphQueries:
             FROM person1_connections p1
             JOIN person2_connections p2 ON p1.connection_id = p2.connection_id
             JOIN entities e ON e.entity_id = p1.connection_id
-            LIMIT 20
+            ORDER BY e.entity_id
+            LIMIT ?
         """
         
         cursor = self.db.conn.execute(query, (
             f"%{person1}%", f"%{person1}%", f"%{person1}%",
-            f"%{person2}%", f"%{person2}%", f"%{person2}%"
+            f"%{person2}%", f"%{person2}%", f"%{person2}%",
+            limit
         ))
+        return [label for (label,) in cursor.fetchall()]
+    
+    def q5_most_connected(self, top: int = 10, metric: str = None):
+        """Q5: Кто самый 'связанный' контакт? (degree или metric из entity_centrality)"""
+        
+        if metric:
+            rows = self.db.most_connected(metric, top)
+            print(f"🌟 Q5: Топ-{top} по {metric}:\n")
+            for i, row in enumerate(rows, 1):
+                print(f"  {i}. {row['label']}: {row['score']:.4g} ({row['degree']} связей)")
+            print()
+            return
         
-        print(f"🔗 Q4: Общие контакты '{person1}' и '{person2}':\n")
-        
-        results = cursor.fetchall()
-        if results:
-            for (label,) in results:
-                print(f"  • {label}")
+        if self.use_index:
+            results = self._q5_index(top)
         else:
-            print(f"  ❌ Общих контактов не найдено")
+            results = self._q5_sql(top)
+        
+        print(f"🌟 Q5: Топ-{top} самых связанных контактов:\n")
+        
+        for i, (label, count) in enumerate(results, 1):
+            print(f"  {i}. {label}: {count} связей")
         
         print()
     
-    def q5_most_connected(self, top: int = 10):
-        """Q5: Кто самый 'связанный' контакт? (degree centrality)"""
-        
+    def _q5_index(self, top: int = 10):
+        olga_id = self._olga_id()
+        if olga_id is None:
+            # Same as the SQL: "!= NULL" filters everything out
+            return []
+        ranking = self.index.top_degree('co_attended', top, exclude=(olga_id,))
+        labels = self._labels(entity_id for entity_id, _ in ranking)
+        return [(labels[entity_id], degree) for entity_id, degree in ranking]
+    
+    def _q5_sql(self, top: int = 10):
         query = """
             SELECT 
                 e.label,
-                COUNT(DISTINCT ed.edge_id) as connection_count
-            FROM entities e
-            JOIN edges ed ON (ed.subject_id = e.entity_id OR ed.object_id = e.entity_id)
+                COUNT(*) as connection_count
+            FROM entity_edges ee
+            JOIN entities e ON e.entity_id = ee.entity_id
             WHERE 
-                ed.relation_type = 'co_attended'
-                AND e.entity_id != (
+                ee.relation_type = 'co_attended'
+                AND ee.entity_id != (
                     SELECT entity_id FROM identifiers 
                     WHERE identifier LIKE '%olga%' OR identifier LIKE '%rozet%'
                     LIMIT 1
                 )
-            GROUP BY e.entity_id
-            ORDER BY connection_count DESC
+            GROUP BY ee.entity_id
+            ORDER BY connection_count DESC, ee.entity_id
             LIMIT ?
         """
         
         cursor = self.db.conn.execute(query, (top,))
-        
-        print(f"🌟 Q5: Топ-{top} самых связанных контактов:\n")
-        
-        for i, (label, count) in enumerate(cursor.fetchall(), 1):
-            print(f"  {i}. {label}: {count} связей")
-        
-        print()
+        return [tuple(row) for row in cursor.fetchall()]
     
     def q6_activity_by_month(self, year: int = 2024):
         """Q6: Динамика активности по месяцам в [год]?"""
         
         query = """
             SELECT 
-                substr(event_date, 1, 7) as month,
-                COUNT(*) as event_count
-            FROM edges
+                printf('%04d-%02d', year, month) as month,
+                edges as event_count
+            FROM month_stats
             WHERE 
                 relation_type = 'co_attended'
-                AND event_date LIKE ?
-            GROUP BY month
+                AND year = ?
             ORDER BY month
         """
         
-        cursor = self.db.conn.execute(query, (f"{year}%",))
+        cursor = self.db.conn.execute(query, (year,))
         
         print(f"📈 Q6: Активность встреч в {year} году:\n")
         
@@ -298,58 +400,55 @@ class GraphQueries:
         
         print()
     
-    def q8_cluster_detection(self):
+    def q8_cluster_detection(self, top: int = 5):
         """Q8: Есть ли 'кластеры' (группы тесно связанных контактов)?"""
         
-        # Simplified: top groups by shared events
-        query = """
-            SELECT 
-                GROUP_CONCAT(DISTINCT e.label) as group_members,
-                COUNT(DISTINCT ed.source_id) as shared_events
-            FROM edges ed
-            JOIN entities e ON (ed.subject_id = e.entity_id OR ed.object_id = e.entity_id)
-            WHERE ed.relation_type = 'co_attended'
-            GROUP BY ed.source_id
-            HAVING COUNT(DISTINCT e.entity_id) >= 3
-            ORDER BY shared_events DESC
-            LIMIT 5
-        """
-        
-        cursor = self.db.conn.execute(query)
+        report, groups = self._q8_communities(top)
         
-        print(f"🎯 Q8: Кластеры (группы с общими встречами):\n")
+        print(f"🎯 Q8: Кластеры (сообщества Louvain, modularity {report['modularity']:.3f}):\n")
         
-        for group, count in cursor.fetchall():
-            members = group.split(',')[:5]  # Show first 5
-            print(f"  • {', '.join(members)}... ({count} общих встреч)")
+        labels = self._labels({m for _, members in groups for m in members[:5]})
+        for community_id, members in groups:
+            shown = [labels[m] for m in members[:5]]  # Show first 5
+            print(f"  • {', '.join(shown)}... ({len(members)} участников)")
         
         print()
     
+    def _q8_communities(self, top: int = 5, min_size: int = 3):
+        """
+        Largest communities of the latest run, brought up to date first
+        (incremental: only around edges added since; a full run the first time).
+        
+        Returns: (run report, [(community_id, entity_ids strongest first)])
+        """
+        report = self.db.detect_communities(incremental=True)
+        groups = [
+            (community['community_id'],
+             [member['entity_id']
+              for member in self.db.community_members(community['community_id'],
+                                                      report['run_id'])])
+            for community in self.db.list_communities(report['run_id'], min_size, top)
+        ]
+        return report, groups
+    
     def q9_new_vs_old(self, year: int = 2024):
         """Q9: Новые vs старые контакты в [год]?"""
         
+        # First meeting = entity_stats.first_date (one row per contact)
         query = """
-            WITH first_meetings AS (
-                SELECT 
-                    e.entity_id,
-                    e.label,
-                    MIN(ed.event_date) as first_meeting
-                FROM entities e
-                JOIN edges ed ON (ed.subject_id = e.entity_id OR ed.object_id = e.entity_id)
-                WHERE ed.relation_type = 'co_attended'
-                GROUP BY e.entity_id
-            )
             SELECT 
                 CASE 
-                    WHEN first_meeting LIKE ? THEN 'NEW'
+                    WHEN s.first_date >= ? AND s.first_date < ? THEN 'NEW'
                     ELSE 'OLD'
                 END as contact_type,
                 COUNT(*) as count
-            FROM first_meetings
+            FROM entity_stats s
+            JOIN entities e ON e.entity_id = s.entity_id
+            WHERE s.relation_type = 'co_attended'
             GROUP BY contact_type
         """
         
-        cursor = self.db.conn.execute(query, (f"{year}%",))
+        cursor = self.db.conn.execute(query, (str(year), str(year + 1)))
         
         print(f"🆕 Q9: Новые vs старые контакты в {year}:\n")
         
@@ -396,7 +495,9 @@ class GraphQueries:
         self.q2_cold_contacts(years_threshold=2)
         # self.q3_shortest_path("Наталья")  # Uncomment with real name
         # self.q4_common_neighbors("Olga", "Наталья")  # Uncomment with real names
+        self.q4_shared_circles(top=10)
         self.q5_most_connected(top=10)
+        self.q5_most_connected(top=10, metric='pagerank')
         self.q6_activity_by_month(year=2024)
         self.q7_organizations()
         self.q8_cluster_detection()
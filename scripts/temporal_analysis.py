@@ -9,8 +9,7 @@ Temporal Analysis: Анализ динамики связей во времен
 
 import sys
 from pathlib import Path
-from datetime import datetime, timedelta
-from collections import defaultdict
+from datetime import date, timedelta
 
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 from graph_db import GraphDB
@@ -21,16 +20,17 @@ def analyze_top_contacts_by_year(db, person_name="Ольга Розет", year=2
     """Топ контактов за год."""
     log(f"\n📊 Топ-{limit} контактов {person_name} в {year}:")
     
+    # '2024' <= '2024-03-05...' < '2025': range on idx_facts_type_date
     cursor = db.conn.execute("""
         SELECT n.name, COUNT(*) as meetings
         FROM facts f
         JOIN nodes n ON f.object_id = n.canonical_id
         WHERE f.relation_type = 'co_attended'
-          AND f.context LIKE ?
+          AND f.event_date >= ? AND f.event_date < ?
         GROUP BY n.name
         ORDER BY meetings DESC
         LIMIT ?
-    """, (f'%{year}%', limit))
+    """, (str(year), str(year + 1), limit))
     
     results = cursor.fetchall()
     
@@ -44,17 +44,19 @@ def analyze_cold_contacts(db, person_name="Ольга Розет", months_thresh
     """Контакты без встреч более N месяцев."""
     log(f"\n❄️  'Остывшие' контакты (> {months_threshold} месяцев без встреч):")
     
-    # Get all co_attended relations with dates
+    # Last meeting = latest event_date, not when the fact was imported
+    cutoff = (date.today() - timedelta(days=months_threshold * 30)).isoformat()
     cursor = db.conn.execute("""
-        SELECT n.name, MAX(f.created_at) as last_meeting, f.context
+        SELECT n.name, MAX(f.event_date) as last_meeting
         FROM facts f
         JOIN nodes n ON f.object_id = n.canonical_id
         WHERE f.relation_type = 'co_attended'
+          AND f.event_date IS NOT NULL
         GROUP BY n.name
-        HAVING julianday('now') - julianday(last_meeting) > ?
+        HAVING last_meeting < ?
         ORDER BY last_meeting DESC
         LIMIT 20
-    """, (months_threshold * 30,))
+    """, (cutoff,))
     
     results = cursor.fetchall()
     
@@ -62,16 +64,8 @@ def analyze_cold_contacts(db, person_name="Ольга Розет", months_thresh
         log("  (Нет остывших контактов)")
         return []
     
-    for name, last_meeting, context in results:
-        # Parse date from context
-        try:
-            # Try to extract year from context
-            import re
-            year_match = re.search(r'20\d{2}', context or '')
-            year = year_match.group() if year_match else 'N/A'
-            log(f"  {name}: последняя встреча в {year}")
-        except:
-            log(f"  {name}: последняя встреча {last_meeting}")
+    for name, last_meeting in results:
+        log(f"  {name}: последняя встреча {last_meeting[:10]}")
     
     return results
 
@@ -124,19 +118,7 @@ def analyze_project_dynamics(db, project_keyword):
     """Динамика проекта (частота встреч по событиям с ключевым словом)."""
     log(f"\n📈 Динамика проекта/темы: '{project_keyword}'")
     
-    cursor = db.conn.execute("""
-        SELECT e.name, f.context, COUNT(*) as participants
-        FROM facts f
-        JOIN nodes e ON f.object_id = e.canonical_id
-        WHERE e.type = 'Event'
-          AND (e.name LIKE ? OR f.context LIKE ?)
-          AND f.relation_type = 'participated_in'
-        GROUP BY e.name, f.context
-        ORDER BY f.created_at DESC
-        LIMIT 20
-    """, (f'%{project_keyword}%', f'%{project_keyword}%'))
-    
-    results = cursor.fetchall()
+    results = db.search_events(project_keyword, limit=20)
     
     if not results:
         log(f"  Событий не найдено")
@@ -144,12 +126,10 @@ def analyze_project_dynamics(db, project_keyword):
     
     log(f"  Найдено событий: {len(results)}")
     
-    for event_name, context, participants in results[:10]:
-        # Extract year from context
-        import re
-        year_match = re.search(r'20\d{2}', context or '')
-        year = year_match.group() if year_match else 'N/A'
-        log(f"    {year}: {event_name} ({participants} участников)")
+    # Best matches first; the ten best shown by date
+    for event in sorted(results[:10], key=lambda event: event['event_date'] or '', reverse=True):
+        year = (event['event_date'] or 'N/A')[:4]
+        log(f"    {year}: {event['name']} ({event['participants']} участников) — {event['snippet']}")
     
     return results
 
@@ -158,19 +138,15 @@ def analyze_meeting_frequency_by_year(db):
     """Частота встреч по годам."""
     log(f"\n📅 Частота встреч по годам:")
     
-    # Extract years from contexts
+    # One pass over idx_facts_type_date (covering: relation_type, event_date)
     cursor = db.conn.execute("""
-        SELECT context FROM facts WHERE relation_type = 'co_attended'
+        SELECT substr(event_date, 1, 4) as year, COUNT(*)
+        FROM facts
+        WHERE relation_type = 'co_attended' AND event_date IS NOT NULL
+        GROUP BY year
     """)
     
-    year_counts = defaultdict(int)
-    
-    import re
-    for (context,) in cursor.fetchall():
-        if context:
-            year_matches = re.findall(r'20\d{2}', context)
-            for year in year_matches:
-                year_counts[year] += 1
+    year_counts = dict(cursor.fetchall())
     
     for year in sorted(year_counts.keys()):
         log(f"  {year}: {year_counts[year]} встреч")
@@ -0,0 +1,310 @@
+"""
+Centrality scores of the contact graph, cached in entity_centrality.
+
+    report = refresh(conn, 'sqlite')             # recompute if the data changed
+    rows = top(execute, 'pagerank', 10)          # Q5 from precomputed scores
+
+Metrics (one column each):
+
+    degree              distinct neighbors
+    weighted_degree     sum of edge occurrences over all neighbors
+    pagerank            damping 0.85, power iteration over the CSR adjacency
+    eigenvector         power iteration on A + I (shift: no oscillation on
+                        bipartite parts), L2-normalized
+    betweenness         Brandes from a random sample of sources, scaled to
+                        the full estimate and normalized to [0, 1]; BFS of a
+                        batch of sources = sparse × dense products per level
+
+The graph is communities.load_graph: weights = summed occurrences, both
+directions merged, owner (linked to everyone) left out by default. A full
+recompute is O(edges × iterations) plus O(edges × depth × samples / batch)
+matrix products for betweenness — near-linear in edges.
+
+centrality_state remembers what the stored scores were computed from
+(edges version — see derived_state.py — relations, owner exclusion, samples);
+refresh() skips the work while those match, so entity edits (enrichment,
+rescoring) never trigger a recompute. is_current() is the same check
+without the work, for callers that must not block on it (web_ui Q5).
+"""
+
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+import derived_state
+import entity_stats
+from communities import WeightedGraph, load_graph
+
+METRICS = ('weighted_degree', 'pagerank', 'eigenvector', 'betweenness', 'degree')
+
+DAMPING = 0.85
+TOLERANCE = 1e-9        # per node, L1 change between iterations
+MAX_ITERATIONS = 200
+
+# Betweenness: sampled sources and BFS batch width (columns per product)
+BETWEENNESS_SAMPLES = 256
+BATCH = 64
+
+TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS entity_centrality (
+        entity_id INTEGER PRIMARY KEY,
+        degree INTEGER NOT NULL,
+        weighted_degree REAL NOT NULL,
+        pagerank REAL NOT NULL,
+        eigenvector REAL NOT NULL,
+        betweenness REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS centrality_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        edge_rows INTEGER,
+        max_edge_id INTEGER,
+        relations TEXT,
+        exclude_owner INTEGER NOT NULL,
+        samples INTEGER,
+        nodes INTEGER NOT NULL,
+        edges INTEGER NOT NULL,
+        seconds REAL,
+        computed_at TEXT
+    )
+    """,
+)
+
+# Top-k by any metric: walk its index, stop at LIMIT
+INDEX_SQL = tuple(
+    f"""CREATE INDEX IF NOT EXISTS idx_entity_centrality_{metric}
+        ON entity_centrality({metric} DESC, entity_id)"""
+    for metric in METRICS
+)
+
+STATE_COLUMNS = ('edge_rows', 'max_edge_id', 'relations', 'exclude_owner', 'samples',
+                 'nodes', 'edges', 'seconds', 'computed_at')
+
+# Neutral SQL (sql_dialect): '?' placeholders, IN (?) takes a list.
+# CROSS JOIN keeps SQLite on the metric index (scores first, entities by
+# rowid) instead of filtering entities by type and sorting them all
+_TOP_SQL = """
+    SELECT e.entity_id, e.label, e.status, e.relationship_strength, c.degree, c.{metric}
+    FROM entity_centrality c
+    CROSS JOIN entities e
+    WHERE e.entity_id = c.entity_id AND e.type = ?{statuses}
+    ORDER BY c.{metric} DESC, c.entity_id
+    LIMIT ?
+"""
+
+
+def top_sql(metric: str, statuses: bool = False) -> str:
+    """Ranking query for a metric: (type[, statuses list], limit)."""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown centrality metric '{metric}' (available: {', '.join(METRICS)})")
+    return _TOP_SQL.format(metric=metric, statuses=' AND e.status IN (?)' if statuses else '')
+
+
+def create_tables(execute: Callable, db_type: str = 'sqlite'):
+    """Score / state tables and one index per metric."""
+    for sql in TABLES_SQL + INDEX_SQL:
+        execute(sql, None)
+
+
+def pagerank(graph: WeightedGraph, damping: float = DAMPING) -> np.ndarray:
+    """Weighted PageRank (sums to 1); mass of dangling rows spread evenly."""
+    n = len(graph)
+    if not n:
+        return np.zeros(0)
+    inverse = np.divide(1.0, graph.degrees, out=np.zeros(n), where=graph.degrees > 0)
+    dangling = graph.degrees == 0
+    ranks = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        spread = (damping * ranks[dangling].sum() + 1.0 - damping) / n
+        updated = damping * (graph.matrix @ (ranks * inverse)) + spread
+        change = np.abs(updated - ranks).sum()
+        ranks = updated
+        if change < n * TOLERANCE:
+            break
+    return ranks
+
+
+def eigenvector(graph: WeightedGraph) -> np.ndarray:
+    """Principal eigenvector of the weighted adjacency (L2 norm 1, ≥ 0)."""
+    n = len(graph)
+    if not n or not graph.total:
+        return np.zeros(n)
+    vector = np.full(n, 1.0 / np.sqrt(n))
+    for _ in range(MAX_ITERATIONS):
+        updated = graph.matrix @ vector + vector
+        updated /= np.linalg.norm(updated)
+        change = np.abs(updated - vector).sum()
+        vector = updated
+        if change < n * TOLERANCE:
+            break
+    return vector
+
+
+def betweenness(graph: WeightedGraph, samples: Optional[int] = BETWEENNESS_SAMPLES,
+                seed: int = 0) -> np.ndarray:
+    """
+    Shortest-path (hop) betweenness, normalized by (n-1)(n-2).
+
+    samples=None (or ≥ nodes) is exact Brandes; otherwise sources are
+    sampled and the sum scaled by nodes / samples.
+    """
+    n = len(graph)
+    if n < 3:
+        return np.zeros(n)
+    hops = graph.matrix.copy()
+    hops.data = np.ones_like(hops.data, dtype=np.float64)
+    hops.setdiag(0)
+    hops.eliminate_zeros()
+
+    if samples is None or samples >= n:
+        sources = np.arange(n)
+    else:
+        sources = np.random.default_rng(seed).choice(n, samples, replace=False)
+
+    total = np.zeros(n)
+    for start in range(0, len(sources), BATCH):
+        batch = sources[start:start + BATCH]
+        columns = np.arange(len(batch))
+        # Forward: BFS levels and shortest-path counts, one column per source
+        sigma = np.zeros((n, len(batch)))
+        sigma[batch, columns] = 1.0
+        distance = np.full((n, len(batch)), -1, dtype=np.int32)
+        distance[batch, columns] = 0
+        frontier = sigma.copy()
+        depth = 0
+        while True:
+            reached = hops @ frontier
+            reached[distance >= 0] = 0.0
+            found = reached > 0
+            if not found.any():
+                break
+            depth += 1
+            distance[found] = depth
+            sigma[found] = reached[found]
+            frontier = reached
+        # Backward: dependencies, deepest level first
+        delta = np.zeros((n, len(batch)))
+        for level in range(depth, 0, -1):
+            on_level = distance == level
+            coefficient = np.zeros_like(delta)
+            coefficient[on_level] = (1.0 + delta[on_level]) / sigma[on_level]
+            spread = hops @ coefficient
+            previous = distance == level - 1
+            delta[previous] = sigma[previous] * spread[previous]
+        delta[batch, columns] = 0.0
+        total += delta.sum(axis=1)
+    return total * (n / len(sources)) / ((n - 1) * (n - 2))
+
+
+def compute(graph: WeightedGraph, samples: Optional[int] = BETWEENNESS_SAMPLES,
+            seed: int = 0) -> Dict[str, np.ndarray]:
+    """All METRICS for the rows of graph."""
+    return {
+        'degree': np.diff(graph.indptr),
+        'weighted_degree': graph.degrees,
+        'pagerank': pagerank(graph),
+        'eigenvector': eigenvector(graph),
+        'betweenness': betweenness(graph, samples, seed),
+    }
+
+
+def data_version(conn, db_type: str = 'sqlite') -> Dict:
+    """What the scores depend on (derived_state.edges_version)."""
+    return derived_state.edges_version(derived_state.connection_execute(conn, db_type))
+
+
+def state(conn, db_type: str = 'sqlite') -> Optional[Dict]:
+    """What the stored scores were computed from (None before the first run)."""
+    return derived_state.read_state(derived_state.connection_execute(conn, db_type),
+                                    'centrality_state', STATE_COLUMNS)
+
+
+def store(conn, db_type: str, graph: WeightedGraph, scores: Dict[str, np.ndarray],
+          stored: Dict):
+    """Replace entity_centrality and centrality_state. No commit."""
+    mark = '%s' if db_type == 'postgresql' else '?'
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM entity_centrality")
+    cursor.executemany(
+        f"""INSERT INTO entity_centrality (entity_id, {', '.join(METRICS)})
+            VALUES ({', '.join([mark] * (len(METRICS) + 1))})""",
+        zip(graph.nodes.tolist(), *(scores[metric].tolist() for metric in METRICS))
+    )
+    cursor.close()
+    derived_state.write_state(conn, db_type, 'centrality_state', STATE_COLUMNS, stored)
+
+
+def _wanted(conn, db_type: str, relations: Optional[Sequence[str]], exclude_owner: bool,
+            samples: Optional[int]) -> Dict:
+    return dict(data_version(conn, db_type), relations=list(relations) if relations else None,
+                exclude_owner=exclude_owner, samples=samples)
+
+
+def _matches(stored: Optional[Dict], wanted: Dict) -> bool:
+    return stored is not None and all(stored[key] == value for key, value in wanted.items())
+
+
+def is_current(conn, db_type: str = 'sqlite', relations: Optional[Sequence[str]] = None,
+               exclude_owner: bool = True,
+               samples: Optional[int] = BETWEENNESS_SAMPLES) -> bool:
+    """Stored scores match the edges and parameters (reads only, two queries)."""
+    return _matches(state(conn, db_type),
+                    _wanted(conn, db_type, relations, exclude_owner, samples))
+
+
+def refresh(conn, db_type: str = 'sqlite', relations: Optional[Sequence[str]] = None,
+            exclude_owner: bool = True, samples: Optional[int] = BETWEENNESS_SAMPLES,
+            seed: int = 0, force: bool = False) -> Dict:
+    """
+    Recompute all metrics unless the stored ones are current (same edges
+    and parameters). Does not commit.
+
+    Returns the state report plus recomputed (bool).
+    """
+    wanted = _wanted(conn, db_type, relations, exclude_owner, samples)
+    stored = state(conn, db_type)
+    if not force and _matches(stored, wanted):
+        return dict(stored, recomputed=False)
+
+    started = time.perf_counter()
+    execute = derived_state.connection_execute(conn, db_type)
+    owner = entity_stats.owner_id(execute) if exclude_owner else None
+    graph = load_graph(conn, db_type, wanted['relations'], () if owner is None else (owner,))
+    scores = compute(graph, samples, seed)
+    report = dict(wanted, nodes=len(graph), edges=graph.edges,
+                  seconds=round(time.perf_counter() - started, 3),
+                  computed_at=datetime.now().isoformat())
+    store(conn, db_type, graph, scores, report)
+    return dict(report, recomputed=True)
+
+
+def top(execute: Callable, metric: str = 'weighted_degree', limit: int = 10,
+        entity_type: str = 'Person', statuses: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Highest scores of a metric (execute: neutral SQL, e.g. the universal DB).
+
+    Returns [{entity_id, label, status, relationship_strength, degree, score}].
+    """
+    if statuses is not None:
+        cursor = execute(top_sql(metric, statuses=True), (entity_type, list(statuses), limit))
+    else:
+        cursor = execute(top_sql(metric), (entity_type, limit))
+    rows = cursor.fetchall()
+    cursor.close()
+    return [{'entity_id': row[0], 'label': row[1], 'status': row[2],
+             'relationship_strength': row[3], 'degree': row[4], 'score': row[5]}
+            for row in rows]
+
+
+def max_score(execute: Callable, metric: str) -> float:
+    """Largest stored score of a metric (index lookup); 0.0 when empty."""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown centrality metric '{metric}' (available: {', '.join(METRICS)})")
+    cursor = execute(f"SELECT MAX({metric}) FROM entity_centrality", ())
+    row = cursor.fetchone()
+    cursor.close()
+    return float(row[0]) if row and row[0] is not None else 0.0
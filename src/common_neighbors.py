@@ -0,0 +1,162 @@
+"""
+Batched "who knows both X and Y" (Q4) over a GraphIndex.
+
+    engine = CommonNeighbors(db.graph_index(), 'co_attended')
+    engine.counts([(x1, y1), (x2, y2), ...])       # one sparse product
+    engine.common([(x, y)])                         # neighbors + connecting relations
+    engine.strongest_pairs(active_ids, top=20)     # all-pairs shared circles
+
+The index is flattened into sorted neighbor arrays (CSR, entity ids in
+ascending order) with a relation bitmask per entry. Counts for many pairs
+are a row-wise product of two sliced adjacency matrices; neighbor lists
+intersect two sorted arrays; all pairs of a contact set are one A·Aᵀ.
+The arrays are rebuilt lazily when the index gets new edges (revision).
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix, triu
+
+from graph_index import GraphIndex
+
+Relations = Optional[Union[str, Iterable[str]]]
+
+
+class CommonNeighbors:
+    """
+    Shared-contact queries for many pairs at once.
+
+    Args:
+        index: GraphIndex (kept current by add_fact)
+        relations: Relation types that count as "knows" (None: all)
+        exclude: Entities never counted as a shared contact (e.g. the owner,
+            who knows everyone)
+    """
+
+    def __init__(self, index: GraphIndex, relations: Relations = None,
+                 exclude: Iterable[int] = ()):
+        self.index = index
+        self.relations = (relations,) if isinstance(relations, str) else \
+            (tuple(relations) if relations is not None else None)
+        self.exclude = frozenset(exclude)
+        self._revision = None
+
+    def _build(self):
+        if self._revision == self.index.revision:
+            return
+        adjacency = self.index._adj
+        names = sorted({relation for by_relation in adjacency.values() for relation in by_relation
+                        if self.relations is None or relation in self.relations})
+        bits = {name: 1 << i for i, name in enumerate(names)}
+        nodes = sorted(adjacency)
+        positions = {node: i for i, node in enumerate(nodes)}
+
+        degrees = np.zeros(len(nodes), dtype=np.int64)
+        columns: List[int] = []
+        masks: List[int] = []
+        for i, node in enumerate(nodes):
+            merged: Dict[int, int] = {}
+            for relation, neighbors in adjacency[node].items():
+                bit = bits.get(relation)
+                if bit is None:
+                    continue
+                for other in neighbors:
+                    if other != node and other not in self.exclude:
+                        merged[other] = merged.get(other, 0) | bit
+            ordered = sorted((positions[other], mask) for other, mask in merged.items())
+            degrees[i] = len(ordered)
+            columns.extend(position for position, _ in ordered)
+            masks.extend(mask for _, mask in ordered)
+
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(degrees, out=indptr[1:])
+        self.names = names
+        self.nodes = np.array(nodes, dtype=np.int64)
+        self.positions = positions
+        self.indptr = indptr
+        self.indices = np.array(columns, dtype=np.int64)
+        self.masks = np.array(masks, dtype=np.int64)
+        self.matrix = csr_matrix((np.ones(len(columns)), self.indices, indptr),
+                                 shape=(len(nodes), len(nodes)))
+        self._relation_names: Dict[int, Tuple[str, ...]] = {}
+        self._revision = self.index.revision
+
+    def _names(self, mask: int) -> Tuple[str, ...]:
+        names = self._relation_names.get(mask)
+        if names is None:
+            names = self._relation_names[mask] = tuple(
+                name for i, name in enumerate(self.names) if mask >> i & 1
+            )
+        return names
+
+    def _rows(self, entity_ids: Sequence[int]) -> np.ndarray:
+        """Row of each entity (-1: unknown or excluded)."""
+        return np.array([-1 if entity_id in self.exclude else self.positions.get(entity_id, -1)
+                         for entity_id in entity_ids], dtype=np.int64)
+
+    def counts(self, pairs: Sequence[Tuple[int, int]]) -> np.ndarray:
+        """Number of shared contacts for each (x, y) pair."""
+        self._build()
+        if not len(pairs):
+            return np.zeros(0, dtype=np.int64)
+        a = self._rows([x for x, _ in pairs])
+        b = self._rows([y for _, y in pairs])
+        known = (a >= 0) & (b >= 0)
+        result = np.zeros(len(pairs), dtype=np.int64)
+        if known.any():
+            shared = self.matrix[a[known]].multiply(self.matrix[b[known]])
+            result[known] = np.asarray(shared.sum(axis=1)).ravel().astype(np.int64)
+        return result
+
+    def common(self, pairs: Sequence[Tuple[int, int]], limit: Optional[int] = None) -> List[Dict]:
+        """
+        Shared contacts of each (x, y) pair, in entity_id order.
+
+        Returns [{x, y, count, neighbors: [{entity_id, relations_x, relations_y}]}],
+        relations_* being the relation types linking that contact to x / y.
+        """
+        self._build()
+        results = []
+        a = self._rows([x for x, _ in pairs])
+        b = self._rows([y for _, y in pairs])
+        for (x, y), row_x, row_y in zip(pairs, a.tolist(), b.tolist()):
+            if row_x < 0 or row_y < 0:
+                results.append({'x': x, 'y': y, 'count': 0, 'neighbors': []})
+                continue
+            span_x = slice(self.indptr[row_x], self.indptr[row_x + 1])
+            span_y = slice(self.indptr[row_y], self.indptr[row_y + 1])
+            shared, at_x, at_y = np.intersect1d(self.indices[span_x], self.indices[span_y],
+                                                assume_unique=True, return_indices=True)
+            masks_x = self.masks[span_x][at_x]
+            masks_y = self.masks[span_y][at_y]
+            neighbors = [
+                {'entity_id': entity_id, 'relations_x': self._names(mask_x),
+                 'relations_y': self._names(mask_y)}
+                for entity_id, mask_x, mask_y in zip(self.nodes[shared[:limit]].tolist(),
+                                                     masks_x[:limit].tolist(),
+                                                     masks_y[:limit].tolist())
+            ]
+            results.append({'x': x, 'y': y, 'count': len(shared), 'neighbors': neighbors})
+        return results
+
+    def strongest_pairs(self, entity_ids: Iterable[int], top: int = 20, min_common: int = 1,
+                        limit: Optional[int] = None) -> List[Dict]:
+        """
+        Pairs among entity_ids with the largest shared circles (all pairs,
+        one sparse A·Aᵀ), ties by entity ids. Same rows as common().
+        """
+        self._build()
+        entity_ids = np.unique(np.fromiter(entity_ids, dtype=np.int64))
+        rows = self._rows(entity_ids.tolist())
+        entity_ids, rows = entity_ids[rows >= 0], rows[rows >= 0]
+        if len(rows) < 2:
+            return []
+        sub = self.matrix[rows]
+        shared = triu(sub @ sub.T, k=1).tocoo()
+        keep = shared.data >= min_common
+        first, second = shared.row[keep], shared.col[keep]
+        count = shared.data[keep]
+        order = np.lexsort((entity_ids[second], entity_ids[first], -count))[:top]
+        pairs = list(zip(entity_ids[first[order]].tolist(), entity_ids[second[order]].tolist()))
+        return self.common(pairs, limit)
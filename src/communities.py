@@ -0,0 +1,525 @@
+"""
+Community detection: groups of densely connected contacts.
+
+    report = detect(conn, 'sqlite')                 # full run (Louvain)
+    report = update(conn, 'sqlite')                 # re-cluster around new edges
+    members(execute, report['run_id'], 0)           # largest community
+
+The graph is a sparse weighted adjacency (SciPy CSR) built from edges in
+one query: weight of X—Y = sum of occurrences over the selected relation
+types, both directions merged; self-loops and the graph owner (linked to
+everyone) are left out.
+
+Methods:
+    louvain             local moving + aggregation, repeated while
+                        modularity improves (Blondel et al. 2008)
+    label_propagation   one level, each node takes the label with the
+                        largest neighbor weight; faster, coarser
+
+Every run is stored:
+
+    community_runs(run_id, method, relations, resolution, modularity,
+                   communities, nodes, edges, max_edge_id, parent_run_id, ...)
+    communities(run_id, community_id, size)
+    entity_communities(run_id, entity_id, community_id)
+
+community_id 0 is the largest community of its run. Members of a
+community are one range of idx_entity_communities_community. update()
+starts from the latest run and moves only the endpoints of edges with
+edge_id > max_edge_id (and, while they keep moving, their neighbors),
+then stores the result as a new run.
+"""
+
+import json
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from scipy.sparse import coo_matrix
+
+import derived_state
+import entity_stats
+
+METHODS = ('louvain', 'label_propagation')
+
+# Runs kept per method by store_run (older memberships are deleted)
+KEEP_RUNS = 5
+
+MAX_LEVELS = 20
+MIN_GAIN = 1e-9
+
+TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS community_runs (
+        run_id {serial},
+        method TEXT NOT NULL,
+        relations TEXT,
+        resolution REAL NOT NULL,
+        modularity REAL,
+        communities INTEGER NOT NULL,
+        nodes INTEGER NOT NULL,
+        edges INTEGER NOT NULL,
+        max_edge_id INTEGER,
+        parent_run_id INTEGER,
+        seconds REAL,
+        created_at TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS communities (
+        run_id INTEGER NOT NULL,
+        community_id INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        PRIMARY KEY (run_id, community_id)
+    ){without_rowid}
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS entity_communities (
+        run_id INTEGER NOT NULL,
+        entity_id INTEGER NOT NULL,
+        community_id INTEGER NOT NULL,
+        PRIMARY KEY (run_id, entity_id)
+    ){without_rowid}
+    """,
+)
+
+# Members of a community: one index range, no sort
+INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_entity_communities_community
+    ON entity_communities(run_id, community_id, entity_id)
+"""
+
+RUN_COLUMNS = ('run_id', 'method', 'relations', 'resolution', 'modularity', 'communities',
+               'nodes', 'edges', 'max_edge_id', 'parent_run_id', 'seconds')
+
+# Neutral SQL (sql_dialect): '?' placeholders
+LATEST_RUN_SQL = """
+    SELECT run_id FROM community_runs
+    WHERE method = ? ORDER BY run_id DESC LIMIT 1
+"""
+
+COMMUNITIES_SQL = """
+    SELECT community_id, size FROM communities
+    WHERE run_id = ? AND size >= ?
+    ORDER BY community_id
+    LIMIT ?
+"""
+
+MEMBERS_SQL = """
+    SELECT e.entity_id, e.label, e.relationship_strength
+    FROM entity_communities ec
+    JOIN entities e ON e.entity_id = ec.entity_id
+    WHERE ec.run_id = ? AND ec.community_id = ?
+    ORDER BY e.relationship_strength IS NULL, e.relationship_strength DESC, e.label
+"""
+
+
+def create_tables(execute: Callable, db_type: str = 'sqlite'):
+    """Run / community / membership tables (WITHOUT ROWID on SQLite)."""
+    serial = 'SERIAL PRIMARY KEY' if db_type == 'postgresql' else 'INTEGER PRIMARY KEY'
+    without_rowid = ' WITHOUT ROWID' if db_type == 'sqlite' else ''
+    for sql in TABLES_SQL:
+        execute(sql.format(serial=serial, without_rowid=without_rowid), None)
+    execute(INDEX_SQL, None)
+
+
+class WeightedGraph:
+    """
+    Undirected weighted graph in CSR form (both directions stored).
+
+    nodes[i] is the entity_id of row i; degrees[i] the weighted degree
+    (a self-loop counts twice, as in the adjacency matrix).
+    """
+
+    def __init__(self, nodes: np.ndarray, matrix, edges: int = 0, max_edge_id: int = 0):
+        matrix = matrix.tocsr()
+        matrix.sum_duplicates()
+        self.nodes = nodes
+        self.indptr = matrix.indptr
+        self.indices = matrix.indices
+        self.weights = matrix.data.astype(np.float64)
+        self.degrees = np.asarray(matrix.sum(axis=1)).ravel()
+        self.total = float(self.degrees.sum())    # 2m
+        self.edges = edges
+        self.max_edge_id = max_edge_id
+        self.matrix = matrix
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @classmethod
+    def from_pairs(cls, subjects: np.ndarray, objects: np.ndarray, weights: np.ndarray,
+                   **kwargs) -> 'WeightedGraph':
+        """From entity-id pairs (duplicates summed, self-loops dropped)."""
+        keep = subjects != objects
+        subjects, objects, weights = subjects[keep], objects[keep], weights[keep]
+        nodes, inverse = np.unique(np.concatenate([subjects, objects]), return_inverse=True)
+        rows, cols = inverse[:len(subjects)], inverse[len(subjects):]
+        matrix = coo_matrix(
+            (np.concatenate([weights, weights]),
+             (np.concatenate([rows, cols]), np.concatenate([cols, rows]))),
+            shape=(len(nodes), len(nodes))
+        )
+        return cls(nodes, matrix, **kwargs)
+
+    def neighbor_lists(self):
+        """Per-row (neighbors, weights) as Python lists (fast inner loops)."""
+        indices = self.indices.tolist()
+        weights = self.weights.tolist()
+        bounds = self.indptr.tolist()
+        return ([indices[bounds[i]:bounds[i + 1]] for i in range(len(self))],
+                [weights[bounds[i]:bounds[i + 1]] for i in range(len(self))])
+
+    def aggregate(self, labels: np.ndarray) -> 'WeightedGraph':
+        """One node per community (internal weight → self-loop)."""
+        count = int(labels.max()) + 1 if len(labels) else 0
+        coo = self.matrix.tocoo()
+        matrix = coo_matrix((coo.data, (labels[coo.row], labels[coo.col])),
+                            shape=(count, count))
+        return WeightedGraph(np.arange(count), matrix)
+
+
+def load_graph(conn, db_type: str = 'sqlite', relations: Optional[Sequence[str]] = None,
+               exclude: Iterable[int] = ()) -> WeightedGraph:
+    """Weighted adjacency from edges (one query, aggregated per pair in SQL)."""
+    mark = '%s' if db_type == 'postgresql' else '?'
+    where = ''
+    params = ()
+    if relations:
+        where = f"WHERE relation_type IN ({', '.join([mark] * len(relations))})"
+        params = tuple(relations)
+    cursor = derived_state.plain_cursor(conn, db_type)
+    cursor.execute(f"""
+        SELECT subject_id, object_id, SUM(COALESCE(occurrences, 1)), MAX(edge_id)
+        FROM edges {where}
+        GROUP BY subject_id, object_id
+    """, params)
+    rows = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 4)
+    cursor.close()
+
+    # Newest edge seen, excluded ones included (update() starts after it)
+    max_edge_id = int(rows[:, 3].max()) if len(rows) else 0
+    exclude = np.array(list(exclude), dtype=np.int64)
+    subjects = rows[:, 0].astype(np.int64)
+    objects = rows[:, 1].astype(np.int64)
+    if len(exclude):
+        keep = ~(np.isin(subjects, exclude) | np.isin(objects, exclude))
+        rows, subjects, objects = rows[keep], subjects[keep], objects[keep]
+    return WeightedGraph.from_pairs(subjects, objects, rows[:, 2], edges=len(rows),
+                                    max_edge_id=max_edge_id)
+
+
+def modularity(graph: WeightedGraph, labels: np.ndarray, resolution: float = 1.0) -> float:
+    """Newman modularity of a partition (labels[i] = community of row i)."""
+    if not graph.total or not len(labels):
+        return 0.0
+    rows = np.repeat(np.arange(len(graph)), np.diff(graph.indptr))
+    same = labels[rows] == labels[graph.indices]
+    count = int(labels.max()) + 1
+    internal = np.bincount(labels[rows][same], weights=graph.weights[same], minlength=count)
+    totals = np.bincount(labels, weights=graph.degrees, minlength=count)
+    return float(internal.sum() / graph.total
+                 - resolution * np.square(totals / graph.total).sum())
+
+
+def _relabel(labels: np.ndarray) -> np.ndarray:
+    """Labels → 0..k-1 (order of first appearance)."""
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    order = np.argsort(np.argsort(first))
+    return order[inverse]
+
+
+def _local_move(graph: WeightedGraph, labels: np.ndarray, queue: Iterable[int],
+                resolution: float, propagate: bool = False) -> int:
+    """
+    Move queued nodes to the neighboring community with the best gain until
+    the queue is empty; a node that moves queues its neighbors.
+
+    Louvain gain of node i joining c: w(i, c) − resolution · k_i · tot(c) / 2m.
+    Label propagation (propagate): w(i, c) only. Returns the number of moves.
+    """
+    neighbors, weights = graph.neighbor_lists()
+    degrees = graph.degrees.tolist()
+    labels_list = labels.tolist()
+    totals = np.bincount(labels, weights=graph.degrees, minlength=len(labels)).tolist()
+    scale = 0.0 if propagate else resolution / graph.total
+    queue = deque(queue)
+    queued = [False] * len(labels_list)
+    for node in queue:
+        queued[node] = True
+    moves = 0
+
+    while queue:
+        node = queue.popleft()
+        queued[node] = False
+        current = labels_list[node]
+        links: Dict[int, float] = {}
+        for other, weight in zip(neighbors[node], weights[node]):
+            if other != node:
+                community = labels_list[other]
+                links[community] = links.get(community, 0.0) + weight
+        if not links:
+            continue
+
+        degree = degrees[node]
+        totals[current] -= degree
+        best = current
+        best_gain = links.get(current, 0.0) - scale * degree * totals[current]
+        for community, weight in links.items():
+            gain = weight - scale * degree * totals[community]
+            if gain > best_gain + MIN_GAIN:
+                best, best_gain = community, gain
+        totals[best] += degree
+
+        if best != current:
+            labels_list[node] = best
+            moves += 1
+            for other in neighbors[node]:
+                if not queued[other] and labels_list[other] != best:
+                    queued[other] = True
+                    queue.append(other)
+
+    labels[:] = labels_list
+    return moves
+
+
+def louvain(graph: WeightedGraph, resolution: float = 1.0, seed: int = 0,
+            init: Optional[np.ndarray] = None,
+            active: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Louvain communities: labels[i] for every row of graph.
+
+    init: starting partition (e.g. the previous run); active: rows that
+    may move (incremental update; default every row). Above the first
+    level only communities holding an active row may merge.
+    """
+    rng = np.random.default_rng(seed)
+    labels = _relabel(np.arange(len(graph)) if init is None else np.asarray(init))
+    if not graph.total:
+        return labels
+    rows = np.arange(len(graph)) if active is None else np.asarray(active, dtype=np.int64)
+    queue = rng.permutation(rows).tolist()
+    level_graph = graph
+    level_labels = labels.copy()
+    for level in range(MAX_LEVELS):
+        moves = _local_move(level_graph, level_labels, queue, resolution)
+        level_labels = _relabel(level_labels)
+        labels = level_labels[labels] if level else level_labels
+        if level and not moves:
+            break
+        aggregated = level_graph.aggregate(level_labels)
+        if len(aggregated) == len(level_graph):
+            break
+        level_graph = aggregated
+        level_labels = np.arange(len(level_graph))
+        queue = rng.permutation(np.unique(labels[rows])).tolist()
+    return _relabel(labels)
+
+
+def label_propagation(graph: WeightedGraph, seed: int = 0,
+                      init: Optional[np.ndarray] = None,
+                      active: Optional[np.ndarray] = None) -> np.ndarray:
+    """Weighted label propagation (asynchronous, one level)."""
+    rng = np.random.default_rng(seed)
+    labels = _relabel(np.arange(len(graph)) if init is None else np.asarray(init))
+    rows = np.arange(len(graph)) if active is None else np.asarray(active, dtype=np.int64)
+    _local_move(graph, labels, rng.permutation(rows).tolist(), resolution=0.0, propagate=True)
+    return _relabel(labels)
+
+
+def _by_size(labels: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Renumber so community 0 is the largest (ties: smallest entity_id)."""
+    if not len(labels):
+        return labels
+    sizes = np.bincount(labels)
+    smallest = np.full(len(sizes), np.iinfo(np.int64).max)
+    np.minimum.at(smallest, labels, nodes)
+    order = np.lexsort((smallest, -sizes))
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[labels]
+
+
+def _cluster(graph: WeightedGraph, method: str, resolution: float, seed: int,
+             init: Optional[np.ndarray] = None, active: Optional[np.ndarray] = None):
+    if method not in METHODS:
+        raise ValueError(f"Unknown method: {method} (known: {', '.join(METHODS)})")
+    if method == 'louvain':
+        return louvain(graph, resolution, seed, init, active)
+    return label_propagation(graph, seed, init, active)
+
+
+def store_run(conn, db_type: str, graph: WeightedGraph, labels: np.ndarray, method: str,
+              relations: Optional[Sequence[str]], resolution: float, seconds: float,
+              parent_run_id: Optional[int] = None, keep: int = KEEP_RUNS) -> Dict:
+    """Write a run, its communities and memberships; drop runs beyond keep. No commit."""
+    mark = '%s' if db_type == 'postgresql' else '?'
+    labels = _by_size(labels, graph.nodes)
+    sizes = np.bincount(labels) if len(labels) else np.zeros(0, dtype=np.int64)
+    report = {
+        'method': method,
+        'relations': list(relations) if relations else None,
+        'resolution': resolution,
+        'modularity': modularity(graph, labels, resolution),
+        'communities': len(sizes),
+        'nodes': len(graph),
+        'edges': graph.edges,
+        'max_edge_id': graph.max_edge_id,
+        'parent_run_id': parent_run_id,
+        'seconds': round(seconds, 3),
+    }
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        INSERT INTO community_runs (method, relations, resolution, modularity, communities,
+                                    nodes, edges, max_edge_id, parent_run_id, seconds,
+                                    created_at)
+        VALUES ({', '.join([mark] * 11)})
+        RETURNING run_id
+    """, (method, json.dumps(report['relations']), resolution, report['modularity'],
+          report['communities'], report['nodes'], report['edges'], report['max_edge_id'],
+          parent_run_id, report['seconds'], datetime.now().isoformat()))
+    run_id = cursor.fetchone()[0]
+    cursor.executemany(
+        f"INSERT INTO communities (run_id, community_id, size) VALUES ({mark}, {mark}, {mark})",
+        [(run_id, community, size) for community, size in enumerate(sizes.tolist())]
+    )
+    cursor.executemany(
+        f"""INSERT INTO entity_communities (run_id, entity_id, community_id)
+            VALUES ({mark}, {mark}, {mark})""",
+        zip([run_id] * len(labels), graph.nodes.tolist(), labels.tolist())
+    )
+    if keep:
+        _prune(cursor, mark, method, keep)
+    cursor.close()
+    report['run_id'] = run_id
+    return report
+
+
+def _prune(cursor, mark: str, method: str, keep: int):
+    """
+    Drop runs of method beyond the newest keep (Q8 reads the latest run of
+    each method). A run still named as parent_run_id by a remaining run
+    stays.
+    """
+    cursor.execute(f"SELECT run_id FROM community_runs WHERE method = {mark} ORDER BY run_id DESC",
+                   (method,))
+    stale = {row[0] for row in cursor.fetchall()[keep:]}
+    cursor.execute("SELECT run_id, parent_run_id FROM community_runs")
+    parents = dict(cursor.fetchall())
+    dropped = set()
+    while True:
+        named = {parent for run_id, parent in parents.items() if run_id not in dropped}
+        free = stale - dropped - named
+        if not free:
+            break
+        dropped |= free
+    old = [(run_id,) for run_id in sorted(dropped)]
+    for table in ('entity_communities', 'communities', 'community_runs'):
+        cursor.executemany(f"DELETE FROM {table} WHERE run_id = {mark}", old)
+
+
+def _owner(conn, db_type: str) -> List[int]:
+    """The graph owner (linked to everyone), left out of the clustering."""
+    owner = entity_stats.owner_id(derived_state.connection_execute(conn, db_type))
+    return [] if owner is None else [owner]
+
+
+def detect(conn, db_type: str = 'sqlite', method: str = 'louvain',
+           relations: Optional[Sequence[str]] = None, resolution: float = 1.0,
+           seed: int = 0, exclude_owner: bool = True, keep: int = KEEP_RUNS) -> Dict:
+    """
+    Full clustering run over edges, stored as a new run. Does not commit.
+
+    Returns the run report (run_id, modularity, communities, nodes, ...).
+    """
+    started = time.perf_counter()
+    graph = load_graph(conn, db_type, relations, _owner(conn, db_type) if exclude_owner else ())
+    labels = _cluster(graph, method, resolution, seed)
+    return store_run(conn, db_type, graph, labels, method, relations, resolution,
+                     time.perf_counter() - started, keep=keep)
+
+
+def update(conn, db_type: str = 'sqlite', method: str = 'louvain', run_id: Optional[int] = None,
+           seed: int = 0, exclude_owner: bool = True, keep: int = KEEP_RUNS) -> Dict:
+    """
+    Incremental run: start from run_id (default: the latest run of method)
+    and move only the nodes touched by edges added since (edge_id > its
+    max_edge_id). Falls back to a full run when there is no previous run.
+    Does not commit.
+    """
+    mark = '%s' if db_type == 'postgresql' else '?'
+    cursor = derived_state.plain_cursor(conn, db_type)
+    if run_id is None:
+        cursor.execute(f"SELECT MAX(run_id) FROM community_runs WHERE method = {mark}", (method,))
+        run_id = cursor.fetchone()[0]
+    if run_id is None:
+        cursor.close()
+        return detect(conn, db_type, method, seed=seed, exclude_owner=exclude_owner, keep=keep)
+    cursor.execute(f"SELECT {', '.join(RUN_COLUMNS)} FROM community_runs WHERE run_id = {mark}",
+                   (run_id,))
+    row = cursor.fetchone()
+    if row is None:
+        cursor.close()
+        raise ValueError(f"Unknown community run: {run_id}")
+    run = dict(zip(RUN_COLUMNS, row))
+    run['relations'] = relations = json.loads(run['relations']) if run['relations'] else None
+
+    where = f"WHERE edge_id > {mark}"
+    params = (run['max_edge_id'] or 0,)
+    if relations:
+        where += f" AND relation_type IN ({', '.join([mark] * len(relations))})"
+        params += tuple(relations)
+    cursor.execute(f"SELECT subject_id, object_id FROM edges {where}", params)
+    touched = {entity_id for pair in cursor.fetchall() for entity_id in pair}
+    if not touched:
+        # Nothing new: the stored run is current
+        cursor.close()
+        run['touched'] = 0
+        return run
+
+    started = time.perf_counter()
+    graph = load_graph(conn, db_type, relations, _owner(conn, db_type) if exclude_owner else ())
+    cursor.execute(f"SELECT entity_id, community_id FROM entity_communities WHERE run_id = {mark}",
+                   (run_id,))
+    previous = dict(cursor.fetchall())
+    cursor.close()
+
+    # Known nodes keep their community, new ones start alone
+    fresh = iter(range(max(previous.values(), default=-1) + 1, 2 ** 62))
+    init = np.array([previous[node] if node in previous else next(fresh)
+                     for node in graph.nodes.tolist()], dtype=np.int64)
+    positions = np.flatnonzero(np.isin(graph.nodes, list(touched)))
+
+    labels = _cluster(graph, run['method'], run['resolution'], seed, init, positions)
+    report = store_run(conn, db_type, graph, labels, run['method'], relations, run['resolution'],
+                       time.perf_counter() - started, parent_run_id=run_id, keep=keep)
+    report['touched'] = len(positions)
+    return report
+
+
+def latest_run(execute: Callable, method: str = 'louvain') -> Optional[int]:
+    """run_id of the newest run of a method (execute: neutral SQL, e.g. the universal DB)."""
+    cursor = execute(LATEST_RUN_SQL, (method,))
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else None
+
+
+def list_communities(execute: Callable, run_id: int, min_size: int = 2,
+                     limit: int = 50) -> List[Dict]:
+    """[{community_id, size}] largest first."""
+    cursor = execute(COMMUNITIES_SQL, (run_id, min_size, limit))
+    rows = cursor.fetchall()
+    cursor.close()
+    return [{'community_id': row[0], 'size': row[1]} for row in rows]
+
+
+def members(execute: Callable, run_id: int, community_id: int) -> List[Dict]:
+    """Members of one community, strongest relationships first."""
+    cursor = execute(MEMBERS_SQL, (run_id, community_id))
+    rows = cursor.fetchall()
+    cursor.close()
+    return [{'entity_id': row[0], 'label': row[1], 'relationship_strength': row[2]}
+            for row in rows]
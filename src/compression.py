@@ -0,0 +1,72 @@
+"""
+Codecs for Context Zone payloads (raw_data).
+
+Payloads are stored compressed and addressed by the SHA-256 of the
+uncompressed text, so identical bodies are stored once.
+"""
+
+import bz2
+import hashlib
+import lzma
+import zlib
+from typing import Callable, Dict, Tuple
+
+# Optional: zstd (faster, better ratio) if installed
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+DEFAULT_CODEC = 'zlib'
+
+CODECS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    'none': (lambda data: data, lambda data: data),
+    'zlib': (lambda data: zlib.compress(data, 6), zlib.decompress),
+    'bz2': (lambda data: bz2.compress(data, 9), bz2.decompress),
+    'lzma': (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+
+if ZSTD_AVAILABLE:
+    CODECS['zstd'] = (
+        lambda data: zstandard.ZstdCompressor(level=9).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+    )
+
+
+def content_hash(text: str) -> str:
+    """Content address of a payload (SHA-256 of the UTF-8 text)."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def check_codec(codec: str) -> str:
+    """Validate codec name."""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}' (available: {', '.join(sorted(CODECS))})")
+    return codec
+
+
+def compress_text(text: str, codec: str = DEFAULT_CODEC) -> bytes:
+    """Encode and compress a text payload."""
+    return CODECS[check_codec(codec)][0](text.encode('utf-8'))
+
+
+def encode_payload(text: str, codec: str = DEFAULT_CODEC) -> Tuple[str, bytes]:
+    """
+    Compress a payload, falling back to 'none' when compression doesn't help
+    (short bodies).
+
+    Returns:
+        (codec actually used, payload bytes)
+    """
+    raw = text.encode('utf-8')
+    compressed = CODECS[check_codec(codec)][0](raw)
+    if len(compressed) >= len(raw):
+        return 'none', raw
+    return codec, compressed
+
+
+def decompress_text(payload: bytes, codec: str) -> str:
+    """Decompress and decode a stored payload."""
+    return CODECS[check_codec(codec)][1](bytes(payload)).decode('utf-8')
@@ -0,0 +1,81 @@
+"""
+Shared plumbing of the tables derived from edges (centrality.py,
+recommendations.py, communities.py) and of the scorer.
+
+    execute = connection_execute(conn, db_type)   # plain tuples, any connection
+    version = edges_version(execute)              # {'edge_rows', 'max_edge_id'}
+    stored = read_state(execute, 'centrality_state', STATE_COLUMNS)
+    write_state(conn, db_type, 'centrality_state', STATE_COLUMNS, report)
+
+One versioning rule: derived tables depend on edges only, so their version
+is the edges row count + max edge_id. Entity edits (enrichment, rescoring)
+leave them current; edges above max_edge_id can be applied incrementally;
+a row count that moved otherwise means deletions (full rebuild).
+
+A state table holds one row (id = 1): relations as JSON, exclude_owner as
+an integer, everything else as is.
+"""
+
+import json
+from typing import Callable, Dict, Optional, Sequence
+
+
+def plain_cursor(conn, db_type: str = 'sqlite'):
+    """A cursor returning plain tuples, whatever row factory the connection uses."""
+    cursor = conn.cursor()
+    if db_type == 'sqlite':
+        cursor.row_factory = None
+    return cursor
+
+
+def connection_execute(conn, db_type: str = 'sqlite') -> Callable:
+    """execute(query, params) on a fresh plain_cursor (SQL already in the backend's dialect)."""
+    def execute(query, params=None):
+        cursor = plain_cursor(conn, db_type)
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        return cursor
+    return execute
+
+
+def fetchone(execute: Callable, query: str, params=None):
+    cursor = execute(query, params)
+    row = cursor.fetchone()
+    cursor.close()
+    return row
+
+
+def edges_version(execute: Callable) -> Dict:
+    """What derived tables depend on: the edges row count + max edge_id."""
+    edge_rows, max_edge_id = fetchone(execute, "SELECT COUNT(*), MAX(edge_id) FROM edges")
+    return {'edge_rows': edge_rows, 'max_edge_id': max_edge_id}
+
+
+def read_state(execute: Callable, table: str, columns: Sequence[str]) -> Optional[Dict]:
+    """The stored state row (None before the first run)."""
+    row = fetchone(execute, f"SELECT {', '.join(columns)} FROM {table} WHERE id = 1")
+    if row is None:
+        return None
+    stored = dict(zip(columns, row))
+    if 'relations' in stored:
+        stored['relations'] = json.loads(stored['relations']) if stored['relations'] else None
+    if 'exclude_owner' in stored:
+        stored['exclude_owner'] = bool(stored['exclude_owner'])
+    return stored
+
+
+def write_state(conn, db_type: str, table: str, columns: Sequence[str], stored: Dict):
+    """Replace the state row. No commit."""
+    mark = '%s' if db_type == 'postgresql' else '?'
+    cursor = conn.cursor()
+    cursor.execute(f"DELETE FROM {table}")
+    cursor.execute(
+        f"""INSERT INTO {table} (id, {', '.join(columns)})
+            VALUES (1, {', '.join([mark] * len(columns))})""",
+        tuple(json.dumps(stored[column]) if column == 'relations' else
+              int(stored[column]) if column == 'exclude_owner' else stored[column]
+              for column in columns)
+    )
+    cursor.close()
@@ -4,11 +4,26 @@ Implements Gemini's recommendations for maximum plasticity and reusability.
 """
 
 import sqlite3
-import json
 import hashlib
-from datetime import datetime
 from typing import Optional, Dict, List, Tuple
 
+import centrality
+import communities
+import entity_edges
+import entity_stats
+import event_time
+import neighborhood
+import recommendations
+import rollups
+import text_search
+import typeahead
+from compression import DEFAULT_CODEC, check_codec, content_hash, decompress_text, encode_payload
+from graph_export import EXPORT_CHUNK_SIZE, GraphMLWriter, JSONGraphWriter, iter_rows, open_export
+from lru import LRUCache
+from scoring import Scorer
+from sql_dialect import compile_query
+from sqlite_concurrency import SQLiteConnections, concurrency_enabled, retry_on_busy
+
 
 class EnhancedGraphDB:
     """
@@ -19,11 +34,59 @@ class EnhancedGraphDB:
     4. Export capabilities (GraphML, JSON)
     """
     
-    def __init__(self, db_path="data/contacts_v2.db"):
+    def __init__(
+        self,
+        db_path="data/contacts_v2.db",
+        concurrent: Optional[bool] = None,
+        identifier_cache_size: int = 100_000,
+        preload_identifiers: bool = False,
+        raw_codec: str = DEFAULT_CODEC,
+        scorer: Optional[Scorer] = None
+    ):
+        """
+        Args:
+            db_path: Path to SQLite file
+            concurrent: WAL + dedicated writer + thread-local readers
+                (default: CONTACTS_DB_CONCURRENT env var)
+            identifier_cache_size: Max identifier → entity_id entries kept in memory
+            preload_identifiers: Fill the identifier cache from the DB at startup
+            raw_codec: Compression codec for raw_data payloads (zlib, lzma, bz2, zstd, none)
+            scorer: status / relationship_strength formula (default: Scorer())
+        """
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
-        self.conn.row_factory = sqlite3.Row
+        self.raw_codec = check_codec(raw_codec)
+        self.identifier_cache = LRUCache(identifier_cache_size)
+        # Identifiers created in the open transaction (dropped on rollback)
+        self._uncommitted_identifiers = []
+        # Callables notified after each committed add_fact (see add_fact_hook)
+        self._fact_hooks = []
+        self._graph_index = None
+        self._path_finder = None
+        self._neighbor_engines = {}
+        self.scorer = scorer or Scorer()
+        # max_degree the stored relationship_strength values were scored with
+        self._scored_max_degree = None
+        self._owner_id = None
+        # Rows rescored against a possibly stale max_degree (see refresh_scores)
+        self.scores_dirty = False
+        
+        if concurrency_enabled(concurrent):
+            self._connections = SQLiteConnections(db_path)
+            self.conn = self._connections.writer
+        else:
+            self._connections = None
+            self.conn = sqlite3.connect(db_path)
+            self.conn.row_factory = sqlite3.Row
         self._create_enhanced_schema()
+        
+        if preload_identifiers:
+            self.preload_identifier_cache()
+    
+    def reader(self) -> sqlite3.Connection:
+        """Connection for read queries (thread-local in concurrent mode)."""
+        if self._connections:
+            return self._connections.reader()
+        return self.conn
     
     def _create_enhanced_schema(self):
         """Create enhanced database schema."""
@@ -74,11 +137,43 @@ class EnhancedGraphDB:
                 confidence REAL DEFAULT 1.0,
                 source_id INTEGER,
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                occurrences INTEGER NOT NULL DEFAULT 1,
+                avg_confidence REAL,
                 FOREIGN KEY (subject_id) REFERENCES entities(entity_id),
                 FOREIGN KEY (object_id) REFERENCES entities(entity_id),
                 FOREIGN KEY (source_id) REFERENCES sources(source_id)
             )
         """)
+        self._add_column_if_missing('edges', 'occurrences', 'INTEGER NOT NULL DEFAULT 1')
+        self._add_column_if_missing('edges', 'avg_confidence', 'REAL')
+        
+        # Typed event dates: integer day / Unix seconds, set on write
+        added = [self._add_column_if_missing('edges', column, declaration)
+                 for column, declaration in event_time.COLUMNS]
+        if any(added):
+            event_time.backfill(self.conn)
+        for sql in event_time.INDEX_SQL:
+            self.conn.execute(sql)
+        
+        # Sources that contributed to an edge (edges.source_id = first one)
+        backfill_edge_sources = not self._table_exists('edge_sources')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS edge_sources (
+                edge_id INTEGER NOT NULL,
+                source_id INTEGER NOT NULL,
+                PRIMARY KEY (edge_id, source_id),
+                FOREIGN KEY (edge_id) REFERENCES edges(edge_id),
+                FOREIGN KEY (source_id) REFERENCES sources(source_id)
+            ) WITHOUT ROWID
+        """)
+        if backfill_edge_sources:
+            self.conn.execute("""
+                INSERT OR IGNORE INTO edge_sources (edge_id, source_id)
+                SELECT edge_id, source_id FROM edges WHERE source_id IS NOT NULL
+            """)
+        
+        # One row per distinct fact (fails on legacy DBs with duplicates)
+        self.edges_unique = self._create_edges_unique_index()
         
         # Indexes for fast queries
         self.conn.execute("""
@@ -110,6 +205,51 @@ class EnhancedGraphDB:
             CREATE INDEX IF NOT EXISTS idx_entities_type ON entities(type)
         """)
         
+        # Data version: bumped on every Graph Zone write (snapshots, caches)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS graph_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        """)
+        self.conn.execute("INSERT OR IGNORE INTO graph_version (id, version) VALUES (1, 0)")
+        for table in ('entities', 'edges'):
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                self.conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version
+                    AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE graph_version SET version = version + 1 WHERE id = 1;
+                    END
+                """)
+        
+        # Per-entity aggregates (degree, first/last date), kept by triggers
+        self._add_column_if_missing('entities', 'degree', 'INTEGER NOT NULL DEFAULT 0')
+        self.conn.execute(entity_stats.INDEX_SQL)
+        backfill_entity_stats = not self._table_exists('entity_stats')
+        self.conn.execute(entity_stats.TABLE_SQL)
+        entity_stats.create_sqlite_triggers(self.conn)
+        if backfill_entity_stats:
+            entity_stats.rebuild(self._execute)
+        
+        # Incidence table: both ends of every edge (undirected scenario queries);
+        # one from before event_day is dropped and refilled
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(entity_edges)")]
+        if columns and 'event_day' not in columns:
+            entity_edges.drop(self._execute)
+        backfill_entity_edges = 'event_day' not in columns
+        entity_edges.create_table(self._execute)
+        entity_edges.create_sqlite_triggers(self.conn)
+        if backfill_entity_edges:
+            entity_edges.rebuild(self._execute)
+        
+        # Year/month rollups (Q1, Q6), kept by triggers
+        backfill_rollups = not self._table_exists('month_stats')
+        rollups.create_tables(self._execute)
+        rollups.create_sqlite_triggers(self.conn)
+        if backfill_rollups:
+            rollups.rebuild(self._execute)
+        
         # ============================================================
         # CONTEXT ZONE: Slow, "dirty", for provenance only
         # ============================================================
@@ -126,19 +266,121 @@ class EnhancedGraphDB:
         """)
         
         # Raw data (original events, emails, etc)
+        # content is legacy (uncompressed); new rows point to raw_blobs
         self.conn.execute("""
             CREATE TABLE IF NOT EXISTS raw_data (
                 raw_id INTEGER PRIMARY KEY AUTOINCREMENT,
                 source_id INTEGER NOT NULL,
                 data_type TEXT,
                 content TEXT,
+                content_hash TEXT,
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (source_id) REFERENCES sources(source_id)
+                FOREIGN KEY (source_id) REFERENCES sources(source_id),
+                FOREIGN KEY (content_hash) REFERENCES raw_blobs(content_hash)
             )
         """)
+        self._add_column_if_missing('raw_data', 'content_hash', 'TEXT')
+        
+        # Raw blobs: compressed payloads, content-addressed (SHA-256)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS raw_blobs (
+                content_hash TEXT PRIMARY KEY,
+                codec TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                payload BLOB NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_raw_data_source ON raw_data(source_id)
+        """)
+        
+        # Full-text search: entities by triggers, payload texts on write
+        backfill_search = not self._table_exists('context_search')
+        text_search.create_tables(self._execute)
+        text_search.create_sqlite_triggers(self.conn)
+        if backfill_search:
+            text_search.rebuild(self._execute)
+        
+        # Typeahead over labels and identifiers, kept by triggers
+        backfill_lookup = not self._table_exists('contact_lookup')
+        typeahead.create_index(self._execute)
+        typeahead.create_sqlite_triggers(self.conn)
+        if backfill_lookup:
+            typeahead.rebuild(self._execute)
+        
+        # Community detection runs (filled by detect_communities)
+        communities.create_tables(self._execute)
+        
+        # Centrality scores (filled by refresh_centrality)
+        centrality.create_tables(self._execute)
+        
+        # Q11 link prediction (filled by refresh_recommendations)
+        recommendations.create_tables(self._execute)
         
         self.conn.commit()
     
+    def _create_edges_unique_index(self) -> bool:
+        """Uniqueness key for edges; False if duplicates must be merged first."""
+        try:
+            self.conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_edges_unique
+                ON edges(subject_id, object_id, relation_type, COALESCE(event_date, ''))
+            """)
+            return True
+        except sqlite3.IntegrityError:
+            print("⚠️  edges содержит дубликаты фактов: запустите scripts/dedupe_edges.py")
+            return False
+    
+    def _execute(self, query: str, params=None) -> sqlite3.Cursor:
+        """execute(query, params) callable for the entity_stats helpers."""
+        return self.conn.execute(query, params or ())
+    
+    def _table_exists(self, table: str) -> bool:
+        """Check sqlite_master for a table."""
+        cursor = self.conn.execute("""
+            SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?
+        """, (table,))
+        return cursor.fetchone() is not None
+    
+    def _add_column_if_missing(self, table: str, column: str, declaration: str) -> bool:
+        """Add a column to an existing table (schema migration)."""
+        cursor = self.conn.execute(f"PRAGMA table_info({table})")
+        if column in [row[1] for row in cursor.fetchall()]:
+            return False
+        self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+        return True
+    
+    def commit(self):
+        """Commit the write transaction."""
+        self.conn.commit()
+        self._uncommitted_identifiers = []
+    
+    def rollback(self):
+        """Roll back the write transaction and forget identifiers it created."""
+        self.conn.rollback()
+        for identifier in self._uncommitted_identifiers:
+            self.identifier_cache.pop(identifier)
+        self._uncommitted_identifiers = []
+    
+    def preload_identifier_cache(self) -> int:
+        """
+        Bulk-load identifier → entity_id pairs into the resolution cache.
+        
+        Loads at most identifier_cache_size rows (most recent last, so they
+        survive LRU eviction).
+        
+        Returns:
+            Number of cached identifiers
+        """
+        cursor = self.reader().execute("""
+            SELECT identifier, entity_id FROM identifiers
+            ORDER BY rowid DESC
+            LIMIT ?
+        """, (self.identifier_cache.maxsize,))
+        rows = cursor.fetchall()
+        self.identifier_cache.update((row[0], row[1]) for row in reversed(rows))
+        return len(self.identifier_cache)
+    
     def get_or_create_entity(
         self, 
         identifier: str, 
@@ -160,32 +402,45 @@ class EnhancedGraphDB:
         Returns:
             entity_id (canonical)
         """
-        # Check if identifier exists
-        cursor = self.conn.execute("""
-            SELECT entity_id FROM identifiers WHERE identifier = ?
-        """, (identifier,))
-        
-        result = cursor.fetchone()
-        
-        if result:
-            return result[0]
-        
-        # Create new entity
-        cursor = self.conn.execute("""
-            INSERT INTO entities (label, type)
-            VALUES (?, ?)
-        """, (label or identifier, entity_type))
-        
-        entity_id = cursor.lastrowid
+        entity_id = self._resolve_entity(identifier, label, entity_type, identifier_type)
+        self.commit()
+        return entity_id
+    
+    def _resolve_entity(
+        self,
+        identifier: str,
+        label: Optional[str],
+        entity_type: str,
+        identifier_type: str
+    ) -> int:
+        """Resolve identifier via cache, else upsert in one statement (no commit)."""
+        entity_id = self.identifier_cache.get(identifier)
+        if entity_id is not None:
+            return entity_id
         
-        # Create identifier
-        self.conn.execute("""
+        # One round trip: claim the identifier for the next entity_id, or
+        # return the entity it already belongs to. AUTOINCREMENT never
+        # reuses ids, so an existing identifier can't point at seq + 1.
+        entity_id, created = self.conn.execute("""
             INSERT INTO identifiers (identifier, entity_id, identifier_type)
-            VALUES (?, ?, ?)
-        """, (identifier, entity_id, identifier_type))
+            VALUES (?, (
+                SELECT COALESCE(MAX(seq), 0) + 1 FROM sqlite_sequence WHERE name = 'entities'
+            ), ?)
+            ON CONFLICT(identifier) DO UPDATE SET identifier = excluded.identifier
+            RETURNING entity_id, entity_id = (
+                SELECT COALESCE(MAX(seq), 0) + 1 FROM sqlite_sequence WHERE name = 'entities'
+            )
+        """, (identifier, identifier_type)).fetchone()
         
-        self.conn.commit()
+        if created:
+            # Create new entity
+            self.conn.execute("""
+                INSERT INTO entities (entity_id, label, type)
+                VALUES (?, ?, ?)
+            """, (entity_id, label or identifier, entity_type))
+            self._uncommitted_identifiers.append(identifier)
         
+        self.identifier_cache.put(identifier, entity_id)
         return entity_id
     
     def add_identifier(self, identifier: str, entity_id: int, identifier_type: str = "email"):
@@ -195,11 +450,13 @@ class EnhancedGraphDB:
                 INSERT INTO identifiers (identifier, entity_id, identifier_type)
                 VALUES (?, ?, ?)
             """, (identifier, entity_id, identifier_type))
-            self.conn.commit()
+            self.commit()
+            self.identifier_cache.put(identifier, entity_id)
         except sqlite3.IntegrityError:
             # Identifier already exists
             pass
     
+    @retry_on_busy
     def add_fact(
         self,
         subject: str,
@@ -234,33 +491,407 @@ class EnhancedGraphDB:
             edge_id
         """
         # 1. Get or create canonical IDs
-        subject_id = self.get_or_create_entity(
-            subject, 
-            label=subject_label,
-            entity_type=subject_type
+        subject_id = self._resolve_entity(
+            subject, subject_label, subject_type, identifier_type="email"
         )
         
-        object_id = self.get_or_create_entity(
-            object,
-            label=object_label,
-            entity_type=object_type
+        object_id = self._resolve_entity(
+            object, object_label, object_type, identifier_type="email"
         )
         
         # 2. Save context (source)
         source_id = self._save_context(source_details)
         
-        # 3. Save edge
-        cursor = self.conn.execute("""
-            INSERT INTO edges (
-                subject_id, object_id, relation_type, 
-                event_date, confidence, source_id
-            )
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (subject_id, object_id, relation, event_date, confidence, source_id))
+        # 3. Save edge (idempotent upsert)
+        edge_id = self._upsert_edge(
+            subject_id, object_id, relation, event_date, confidence, source_id
+        )
         
-        self.conn.commit()
+        # 4. Rescore the two touched rows; the full pass runs once per import
+        self.refresh_scores((subject_id, object_id))
+        
+        if self._fact_hooks:
+            fact = {
+                'edge_id': edge_id,
+                'subject_id': subject_id,
+                'object_id': object_id,
+                'relation_type': relation,
+                'event_date': event_date,
+                'source_id': source_id,
+                'data_version': self.conn.execute(
+                    "SELECT version FROM graph_version WHERE id = 1"
+                ).fetchone()[0]
+            }
+        
+        self.commit()
+        
+        for hook in self._fact_hooks:
+            hook(fact)
+        
+        return edge_id
+    
+    def refresh_scores(self, entity_ids=None) -> Dict:
+        """
+        Rescore status and relationship_strength (self.scorer).
+        
+        With entity_ids only those rows are rescored, against the max_degree
+        of the last full rescore, and scores_dirty is set. Without them all
+        entities are rescored — call it once at the end of an import (close()
+        does it when scores are still dirty). Does not commit.
+        
+        Returns:
+            scoring report (see Scorer.rescore)
+        """
+        if entity_ids is not None:
+            if self._scored_max_degree is None:
+                self._owner_id = entity_stats.owner_id(self._execute)
+                self._scored_max_degree = self.scorer.max_degree(self._execute, self._owner_id)
+            self.scores_dirty = True
+            return self.scorer.rescore(self.conn, 'sqlite', entity_ids, self._scored_max_degree)
+        # Full rescore; the owner may have appeared since the last one
+        self._owner_id = entity_stats.owner_id(self._execute)
+        report = self.scorer.rescore(self.conn, 'sqlite')
+        self._scored_max_degree = report['max_degree']
+        self.scores_dirty = False
+        return report
+    
+    def rebuild_entity_stats(self) -> Dict:
+        """
+        Recompute entity_stats from edges and rescore every entity.
+        
+        Only needed after bulk edits with triggers disabled; normal writes
+        keep the aggregates current.
+        """
+        entity_stats.rebuild(self._execute)
+        report = self.refresh_scores()
+        self.commit()
+        return report
+    
+    def backfill_event_days(self) -> Dict:
+        """
+        Fill edges.event_day / event_ts where missing (edges written by
+        raw inserts); unparsable event_date values stay NULL.
+        """
+        updated = event_time.backfill(self.conn)
+        self.commit()
+        unparsed = self.conn.execute(
+            "SELECT COUNT(*) FROM edges WHERE event_date IS NOT NULL AND event_day IS NULL"
+        ).fetchone()[0]
+        return {'updated': updated, 'unparsed': unparsed}
+    
+    def rebuild_rollups(self) -> Dict:
+        """Recompute the year/month rollups from edges (one pass)."""
+        rollups.rebuild(self._execute)
+        self.commit()
+        return {
+            'entity_months': self.conn.execute(
+                "SELECT COUNT(*) FROM entity_month_stats").fetchone()[0],
+            'months': self.conn.execute("SELECT COUNT(*) FROM month_stats").fetchone()[0],
+        }
+    
+    def rebuild_search_index(self) -> Dict:
+        """Refill entity_search / context_search (payloads decompressed once)."""
+        report = text_search.rebuild(self._execute)
+        self.commit()
+        return report
+    
+    def search(self, text: str, limit: int = 20) -> List[Dict]:
+        """
+        Full-text search over contact labels, tags, notes and source texts.
+        
+        Returns:
+            Hits best first: kind ('entity' | 'context'), id (entity_id |
+            source_id), title, snippet (matches in [ ]), score
+        """
+        reader = self.reader()
+        return text_search.search(lambda query, params: reader.execute(query, params),
+                                  text, limit=limit)
+    
+    def suggest_contacts(self, text: Optional[str], limit: int = typeahead.PAGE_SIZE,
+                         offset: int = 0, entity_type: str = "Person",
+                         statuses: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Typeahead: one page of contacts whose name words / identifiers start
+        with the typed words, strongest first (see typeahead.suggest).
+        """
+        reader = self.reader()
+        return typeahead.suggest(lambda query, params: reader.execute(query, params), text,
+                                 entity_type=entity_type, statuses=statuses,
+                                 limit=limit, offset=offset)
+    
+    def detect_communities(self, method: str = 'louvain',
+                           relations: Optional[List[str]] = None,
+                           resolution: float = 1.0, incremental: bool = False) -> Dict:
+        """
+        Cluster the contact graph and store the run (see communities).
+        
+        incremental → start from the latest run of method and re-cluster
+        only around edges added since (its relations / resolution).
+        
+        Returns:
+            run report: run_id, modularity, communities, nodes, edges, seconds
+        """
+        if incremental:
+            report = communities.update(self.conn, 'sqlite', method)
+        else:
+            report = communities.detect(self.conn, 'sqlite', method, relations, resolution)
+        self.commit()
+        return report
+    
+    def list_communities(self, run_id: Optional[int] = None, min_size: int = 2,
+                         limit: int = 50, method: str = 'louvain') -> List[Dict]:
+        """Communities of a run (default: the latest), largest first."""
+        reader = self.reader()
+        execute = lambda query, params: reader.execute(query, params)
+        run_id = run_id if run_id is not None else communities.latest_run(execute, method)
+        if run_id is None:
+            return []
+        return communities.list_communities(execute, run_id, min_size, limit)
+    
+    def community_members(self, community_id: int, run_id: Optional[int] = None,
+                          method: str = 'louvain') -> List[Dict]:
+        """Members of a community (default: latest run), strongest first."""
+        reader = self.reader()
+        execute = lambda query, params: reader.execute(query, params)
+        run_id = run_id if run_id is not None else communities.latest_run(execute, method)
+        if run_id is None:
+            return []
+        return communities.members(execute, run_id, community_id)
+    
+    def refresh_centrality(self, relations: Optional[List[str]] = None,
+                           exclude_owner: bool = True,
+                           samples: Optional[int] = centrality.BETWEENNESS_SAMPLES,
+                           force: bool = False) -> Dict:
+        """
+        Recompute entity_centrality unless it matches the edges
+        (see centrality.refresh).
+        
+        Returns:
+            state report: edge_rows, max_edge_id, nodes, edges, seconds, recomputed
+        """
+        report = centrality.refresh(self.conn, 'sqlite', relations, exclude_owner, samples,
+                                    force=force)
+        if report['recomputed']:
+            self.commit()
+        return report
+    
+    def most_connected(self, metric: str = 'weighted_degree', top: int = 10,
+                       statuses: Optional[List[str]] = None, entity_type: str = 'Person',
+                       refresh: bool = True) -> List[Dict]:
+        """
+        Q5: highest centrality scores (precomputed, refreshed first if stale).
+        
+        Returns:
+            [{entity_id, label, status, relationship_strength, degree, score}]
+        """
+        if refresh:
+            self.refresh_centrality()
+        reader = self.reader()
+        execute = lambda query, params: reader.execute(*compile_query(query, 'sqlite', params))
+        return centrality.top(execute, metric, top, entity_type, statuses)
+    
+    def refresh_recommendations(self, relations: Optional[List[str]] = recommendations.RELATIONS,
+                                exclude_owner: bool = True, top_k: int = recommendations.TOP_K,
+                                force: bool = False) -> Dict:
+        """
+        Bring the Q11 recommendations up to date with edges: incremental
+        around new edges, full after deletions (see recommendations.refresh).
+        
+        Returns:
+            state report: mode, rescored, nodes, edges, seconds
+        """
+        report = recommendations.refresh(self.conn, 'sqlite', relations, exclude_owner, top_k,
+                                         force=force)
+        if report['mode'] != 'current':
+            self.commit()
+        return report
+    
+    def recommend_introductions(self, entity_id: int, limit: int = 10,
+                                refresh: bool = True) -> List[Dict]:
+        """
+        Q11: whom to introduce to a contact (Adamic-Adar over common contacts).
+        
+        Returns:
+            [{entity_id, label, relationship_strength, status, adamic_adar,
+              resource_allocation, common_neighbors}]
+        """
+        if refresh:
+            self.refresh_recommendations()
+        reader = self.reader()
+        return recommendations.recommend(lambda query, params: reader.execute(query, params),
+                                         entity_id, limit)
+    
+    def add_fact_hook(self, hook):
+        """
+        Register a callable run after every committed add_fact.
+
+        It receives a dict: edge_id, subject_id, object_id, relation_type,
+        event_date, source_id, data_version.
+        """
+        self._fact_hooks.append(hook)
+    
+    def graph_index(self, refresh: bool = False):
+        """
+        In-memory GraphIndex over edges, built on first use.
+
+        add_fact keeps it current; it is rebuilt when the data version shows
+        writes that bypassed add_fact (other processes, scripts, dedupe).
+        """
+        from graph_index import GraphIndex
+        
+        index = self._graph_index
+        if index is None or refresh or index.data_version != self.data_version():
+            if index is not None:
+                self._fact_hooks.remove(index.on_fact)
+            index = self._graph_index = GraphIndex.from_db(self.reader())
+            self.add_fact_hook(index.on_fact)
+        return index
+    
+    def _upsert_edge(
+        self,
+        subject_id: int,
+        object_id: int,
+        relation: str,
+        event_date: Optional[str],
+        confidence: float,
+        source_id: int
+    ) -> int:
+        """
+        Insert an edge or merge into the identical fact.
+        
+        A repeated (subject, object, relation, event_date) increments
+        occurrences once per new contributing source and keeps max/avg
+        confidence; re-importing the same source changes nothing.
+        """
+        typed_date = event_time.parse_event_date(event_date)  # (event_day, event_ts)
+        if not self.edges_unique:
+            # Legacy DB with duplicates: plain insert until dedupe_edges() runs
+            cursor = self.conn.execute("""
+                INSERT INTO edges (
+                    subject_id, object_id, relation_type, 
+                    event_date, confidence, avg_confidence, source_id,
+                    event_day, event_ts
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (subject_id, object_id, relation, event_date, confidence, confidence, source_id,
+                  *typed_date))
+            edge_id = cursor.lastrowid
+        else:
+            row = self.conn.execute("""
+                INSERT INTO edges (
+                    subject_id, object_id, relation_type, 
+                    event_date, confidence, avg_confidence, source_id,
+                    event_day, event_ts
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (subject_id, object_id, relation_type, COALESCE(event_date, ''))
+                DO UPDATE SET
+                    occurrences = occurrences + 1,
+                    avg_confidence = (COALESCE(avg_confidence, confidence) * occurrences
+                                      + excluded.confidence) / (occurrences + 1),
+                    confidence = MAX(confidence, excluded.confidence)
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM edge_sources es
+                    WHERE es.edge_id = edges.edge_id AND es.source_id = excluded.source_id
+                )
+                RETURNING edge_id
+            """, (subject_id, object_id, relation, event_date, confidence, confidence,
+                  source_id, *typed_date)).fetchone()
+            
+            if row:
+                edge_id = row[0]
+            else:
+                # Same fact from a source already counted
+                edge_id = self.conn.execute("""
+                    SELECT edge_id FROM edges
+                    WHERE subject_id = ? AND object_id = ? AND relation_type = ?
+                      AND COALESCE(event_date, '') = COALESCE(?, '')
+                """, (subject_id, object_id, relation, event_date)).fetchone()[0]
+        
+        if source_id is not None:
+            self.conn.execute("""
+                INSERT OR IGNORE INTO edge_sources (edge_id, source_id) VALUES (?, ?)
+            """, (edge_id, source_id))
+        
+        return edge_id
+    
+    def dedupe_edges(self) -> Dict:
+        """
+        Merge duplicate edges in place and create the uniqueness key.
+        
+        Duplicates collapse into the lowest edge_id: sources are unioned
+        into edge_sources, occurrences = number of distinct sources,
+        confidence = max, avg_confidence = mean.
+        
+        Returns:
+            Report dict (edges before/after, duplicates removed)
+        """
+        edges_before = self.conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0]
+        
+        self.conn.execute("DROP TABLE IF EXISTS temp.edge_keep")
+        self.conn.execute("""
+            CREATE TEMP TABLE edge_keep AS
+            SELECT
+                edge_id,
+                MIN(edge_id) OVER (
+                    PARTITION BY subject_id, object_id, relation_type, COALESCE(event_date, '')
+                ) AS keep_id
+            FROM edges
+        """)
+        self.conn.execute("CREATE INDEX temp.idx_edge_keep ON edge_keep(keep_id)")
+        
+        # 1. Union contributing sources into the kept edge
+        self.conn.execute("""
+            INSERT OR IGNORE INTO edge_sources (edge_id, source_id)
+            SELECT k.keep_id, e.source_id
+            FROM edges e
+            JOIN edge_keep k ON k.edge_id = e.edge_id
+            WHERE e.source_id IS NOT NULL
+            UNION
+            SELECT k.keep_id, es.source_id
+            FROM edge_sources es
+            JOIN edge_keep k ON k.edge_id = es.edge_id
+        """)
+        
+        # 2. Merge counters into the kept edge
+        self.conn.execute("""
+            UPDATE edges SET
+                confidence = agg.max_confidence,
+                avg_confidence = agg.avg_confidence,
+                occurrences = MAX(1, (
+                    SELECT COUNT(*) FROM edge_sources es WHERE es.edge_id = edges.edge_id
+                ))
+            FROM (
+                SELECT
+                    k.keep_id,
+                    MAX(e.confidence) AS max_confidence,
+                    AVG(COALESCE(e.avg_confidence, e.confidence)) AS avg_confidence
+                FROM edges e
+                JOIN edge_keep k ON k.edge_id = e.edge_id
+                GROUP BY k.keep_id
+            ) AS agg
+            WHERE edges.edge_id = agg.keep_id
+        """)
+        
+        # 3. Drop the duplicates
+        self.conn.execute("""
+            DELETE FROM edge_sources
+            WHERE edge_id IN (SELECT edge_id FROM edge_keep WHERE edge_id != keep_id)
+        """)
+        removed = self.conn.execute("""
+            DELETE FROM edges
+            WHERE edge_id IN (SELECT edge_id FROM edge_keep WHERE edge_id != keep_id)
+        """).rowcount
         
-        return cursor.lastrowid
+        self.conn.execute("DROP TABLE temp.edge_keep")
+        self.edges_unique = self._create_edges_unique_index()
+        self.commit()
+        
+        return {
+            'edges_before': edges_before,
+            'edges_after': edges_before - removed,
+            'duplicates_removed': removed
+        }
     
     def _save_context(self, source_details: Dict) -> int:
         """Save source context (Context Zone)."""
@@ -269,14 +900,14 @@ class EnhancedGraphDB:
         content = source_details.get('content', '')
         
         # Create hash for deduplication
-        content_hash = hashlib.md5(
+        source_hash = hashlib.md5(
             f"{filename}:{content}".encode()
         ).hexdigest()
         
         # Check if source exists
         cursor = self.conn.execute("""
             SELECT source_id FROM sources WHERE hash = ?
-        """, (content_hash,))
+        """, (source_hash,))
         
         result = cursor.fetchone()
         
@@ -287,134 +918,436 @@ class EnhancedGraphDB:
         cursor = self.conn.execute("""
             INSERT INTO sources (filename, source_type, hash)
             VALUES (?, ?, ?)
-        """, (filename, source_type, content_hash))
+        """, (filename, source_type, source_hash))
         
         source_id = cursor.lastrowid
         
-        # Save raw data
+        # Save raw data (payload stored once per content hash)
+        payload_hash = self._store_blob(content)
         self.conn.execute("""
-            INSERT INTO raw_data (source_id, data_type, content)
+            INSERT INTO raw_data (source_id, data_type, content_hash)
             VALUES (?, ?, ?)
-        """, (source_id, source_type, content))
-        
-        self.conn.commit()
+        """, (source_id, source_type, payload_hash))
+        text_search.record_context(self._execute, source_id, payload_hash, filename, content)
         
         return source_id
     
-    def export_to_graphml(self, output_file: str):
-        """Export graph to GraphML format (for Gephi, Neo4j, etc)."""
-        import xml.etree.ElementTree as ET
-        
-        # Create GraphML structure
-        graphml = ET.Element('graphml', xmlns="http://graphml.graphdrawing.org/xmlns")
-        
-        # Define keys (attributes)
-        ET.SubElement(graphml, 'key', id="label", **{
-            'for': 'node',
-            'attr.name': 'label',
-            'attr.type': 'string'
-        })
-        ET.SubElement(graphml, 'key', id="type", **{
-            'for': 'node',
-            'attr.name': 'type',
-            'attr.type': 'string'
-        })
-        ET.SubElement(graphml, 'key', id="relation", **{
-            'for': 'edge',
-            'attr.name': 'relation',
-            'attr.type': 'string'
-        })
-        ET.SubElement(graphml, 'key', id="confidence", **{
-            'for': 'edge',
-            'attr.name': 'confidence',
-            'attr.type': 'double'
-        })
-        
-        # Create graph
-        graph = ET.SubElement(graphml, 'graph', id="G", edgedefault="directed")
-        
-        # Add nodes
-        cursor = self.conn.execute("SELECT entity_id, label, type FROM entities")
-        for entity_id, label, entity_type in cursor.fetchall():
-            node = ET.SubElement(graph, 'node', id=str(entity_id))
-            ET.SubElement(node, 'data', key='label').text = label
-            ET.SubElement(node, 'data', key='type').text = entity_type
-        
-        # Add edges
-        cursor = self.conn.execute("""
-            SELECT edge_id, subject_id, object_id, relation_type, confidence
-            FROM edges
-        """)
-        for edge_id, subject_id, object_id, relation, confidence in cursor.fetchall():
-            edge = ET.SubElement(graph, 'edge', 
-                id=str(edge_id),
-                source=str(subject_id),
-                target=str(object_id)
-            )
-            ET.SubElement(edge, 'data', key='relation').text = relation
-            ET.SubElement(edge, 'data', key='confidence').text = str(confidence)
-        
-        # Write to file
-        tree = ET.ElementTree(graphml)
-        tree.write(output_file, encoding='utf-8', xml_declaration=True)
-    
-    def export_to_json(self, output_file: str):
-        """Export graph to JSON format (for D3.js, web visualization)."""
-        # Get nodes
-        cursor = self.conn.execute("SELECT entity_id, label, type FROM entities")
-        nodes = [
-            {
-                'id': entity_id,
-                'label': label,
-                'type': entity_type
-            }
-            for entity_id, label, entity_type in cursor.fetchall()
-        ]
+    def _store_blob(self, content: str, codec: Optional[str] = None) -> str:
+        """Store a compressed payload unless its content hash already exists."""
+        payload_hash = content_hash(content)
         
-        # Get edges
         cursor = self.conn.execute("""
-            SELECT subject_id, object_id, relation_type, confidence
-            FROM edges
-        """)
-        edges = [
-            {
-                'source': subject_id,
-                'target': object_id,
-                'relation': relation,
-                'confidence': confidence
-            }
-            for subject_id, object_id, relation, confidence in cursor.fetchall()
+            SELECT 1 FROM raw_blobs WHERE content_hash = ?
+        """, (payload_hash,))
+        
+        if cursor.fetchone() is None:
+            used_codec, payload = encode_payload(content, codec or self.raw_codec)
+            self.conn.execute("""
+                INSERT INTO raw_blobs (content_hash, codec, size, payload)
+                VALUES (?, ?, ?, ?)
+            """, (payload_hash, used_codec, len(content.encode('utf-8')), payload))
+        
+        return payload_hash
+    
+    def get_raw_content(self, source_id: int) -> List[str]:
+        """Original payloads of a source (decompressed on demand)."""
+        cursor = self.reader().execute("""
+            SELECT r.content, b.codec, b.payload
+            FROM raw_data r
+            LEFT JOIN raw_blobs b ON b.content_hash = r.content_hash
+            WHERE r.source_id = ?
+            ORDER BY r.raw_id
+        """, (source_id,))
+        
+        return [
+            content if payload is None else decompress_text(payload, codec)
+            for content, codec, payload in cursor.fetchall()
         ]
+    
+    def get_provenance(self, edge_id: int) -> Optional[Dict]:
+        """Source and original payload behind an edge."""
+        cursor = self.reader().execute("""
+            SELECT s.source_id, s.filename, s.source_type, s.processed_at
+            FROM edges e
+            JOIN sources s ON s.source_id = e.source_id
+            WHERE e.edge_id = ?
+        """, (edge_id,))
+        
+        row = cursor.fetchone()
+        if not row:
+            return None
         
-        # Write to file
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                'nodes': nodes,
-                'links': edges
-            }, f, ensure_ascii=False, indent=2)
+        return {
+            'source_id': row[0],
+            'filename': row[1],
+            'source_type': row[2],
+            'processed_at': row[3],
+            'content': self.get_raw_content(row[0])
+        }
+    
+    def compact_raw_data(self, codec: Optional[str] = None, batch_size: int = 500) -> Dict:
+        """
+        Move legacy uncompressed raw_data.content into raw_blobs and VACUUM.
+        
+        Args:
+            codec: Target codec (also re-encodes existing blobs stored with another codec)
+            batch_size: Rows per transaction
+            
+        Returns:
+            Report dict (rows, blobs, bytes before/after, bytes reclaimed)
+        """
+        target_codec = check_codec(codec or self.raw_codec)
+        bytes_before = self._database_size()
+        
+        # 1. Legacy rows → content-addressed blobs
+        raw_ids = [row[0] for row in self.conn.execute(
+            "SELECT raw_id FROM raw_data WHERE content IS NOT NULL"
+        ).fetchall()]
+        
+        for start in range(0, len(raw_ids), batch_size):
+            chunk = raw_ids[start:start + batch_size]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(f"""
+                SELECT raw_id, content FROM raw_data WHERE raw_id IN ({placeholders})
+            """, chunk).fetchall()
+            
+            updates = [
+                (self._store_blob(content, target_codec), raw_id)
+                for raw_id, content in rows
+            ]
+            self.conn.executemany("""
+                UPDATE raw_data SET content_hash = ?, content = NULL WHERE raw_id = ?
+            """, updates)
+            self.commit()
+        
+        # 2. Re-encode blobs stored with another codec ('none' = not compressible)
+        recoded = 0
+        if codec:
+            hashes = [row[0] for row in self.conn.execute(
+                "SELECT content_hash FROM raw_blobs WHERE codec NOT IN (?, 'none')",
+                (target_codec,)
+            ).fetchall()]
+            for payload_hash in hashes:
+                old_codec, payload = self.conn.execute(
+                    "SELECT codec, payload FROM raw_blobs WHERE content_hash = ?",
+                    (payload_hash,)
+                ).fetchone()
+                new_codec, new_payload = encode_payload(
+                    decompress_text(payload, old_codec), target_codec
+                )
+                self.conn.execute("""
+                    UPDATE raw_blobs SET codec = ?, payload = ? WHERE content_hash = ?
+                """, (new_codec, new_payload, payload_hash))
+                recoded += 1
+            self.commit()
+        
+        # 3. Drop blobs no raw_data row points to
+        orphans = self.conn.execute("""
+            DELETE FROM raw_blobs
+            WHERE NOT EXISTS (
+                SELECT 1 FROM raw_data r WHERE r.content_hash = raw_blobs.content_hash
+            )
+        """).rowcount
+        self.commit()
+        
+        self.conn.execute("VACUUM")
+        bytes_after = self._database_size()
+        
+        blobs = self.conn.execute("SELECT COUNT(*) FROM raw_blobs").fetchone()[0]
+        
+        return {
+            'rows_compacted': len(raw_ids),
+            'blobs_recoded': recoded,
+            'orphans_removed': orphans,
+            'blobs': blobs,
+            'codec': target_codec,
+            'bytes_before': bytes_before,
+            'bytes_after': bytes_after,
+            'bytes_reclaimed': bytes_before - bytes_after
+        }
+    
+    def _database_size(self) -> int:
+        """Database size in bytes (page_count × page_size)."""
+        page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+    
+    def _export_queries(self, since: Optional[str] = None) -> Tuple[str, str, tuple]:
+        """
+        Node/edge queries for exports.
+
+        since → only edges with event_date >= since (an event_day range), and the
+        entities they touch.
+        """
+        if since is None:
+            return "SELECT entity_id, label, type FROM entities", "", ()
+        nodes = """
+            SELECT entity_id, label, type FROM entities
+            WHERE entity_id IN (
+                SELECT subject_id FROM edges WHERE event_day >= ?
+                UNION
+                SELECT object_id FROM edges WHERE event_day >= ?
+            )
+        """
+        return nodes, "WHERE event_day >= ?", (event_time.to_day(since),)
+    
+    def export_to_graphml(self, output_file: str, compress: Optional[bool] = None,
+                          since: Optional[str] = None,
+                          chunk_size: int = EXPORT_CHUNK_SIZE):
+        """
+        Export graph to GraphML format (for Gephi, Neo4j, etc).
+
+        Streams rows from the cursor, so memory stays flat on large graphs.
+        compress=None → gzip when output_file ends with '.gz'.
+        """
+        node_keys = [('label', 'string'), ('type', 'string')]
+        edge_keys = [('relation', 'string'), ('confidence', 'double'),
+                     ('event_date', 'string'), ('occurrences', 'int')]
+        nodes_sql, edges_where, params = self._export_queries(since)
+        
+        conn = self.reader()
+        with open_export(output_file, compress) as f, \
+                GraphMLWriter(f, node_keys, edge_keys) as writer:
+            cursor = conn.execute(nodes_sql, params * 2)
+            for entity_id, label, entity_type in iter_rows(cursor, chunk_size):
+                writer.node(entity_id, label=label, type=entity_type)
+            
+            cursor = conn.execute(f"""
+                SELECT edge_id, subject_id, object_id, relation_type, confidence,
+                       event_date, occurrences
+                FROM edges {edges_where}
+            """, params)
+            for (edge_id, subject_id, object_id, relation, confidence,
+                 event_date, occurrences) in iter_rows(cursor, chunk_size):
+                writer.edge(edge_id, subject_id, object_id, relation=relation,
+                            confidence=confidence, event_date=event_date,
+                            occurrences=occurrences)
+    
+    def export_to_json(self, output_file: str, fmt: str = 'json',
+                       compress: Optional[bool] = None, since: Optional[str] = None,
+                       chunk_size: int = EXPORT_CHUNK_SIZE):
+        """
+        Export graph to JSON format (for D3.js, web visualization).
+
+        fmt='json' writes {"nodes": [...], "links": [...]}, fmt='ndjson'
+        one record per line. Streamed with compact separators.
+        """
+        nodes_sql, edges_where, params = self._export_queries(since)
+        
+        conn = self.reader()
+        with open_export(output_file, compress) as f, \
+                JSONGraphWriter(f, fmt, chunk_size=chunk_size) as writer:
+            cursor = conn.execute(nodes_sql, params * 2)
+            writer.nodes(
+                {'id': entity_id, 'label': label, 'type': entity_type}
+                for entity_id, label, entity_type in iter_rows(cursor, chunk_size)
+            )
+            
+            cursor = conn.execute(f"""
+                SELECT subject_id, object_id, relation_type, confidence, event_date
+                FROM edges {edges_where}
+            """, params)
+            writer.links(
+                {
+                    'source': subject_id,
+                    'target': object_id,
+                    'relation': relation,
+                    'confidence': confidence,
+                    'event_date': event_date
+                }
+                for subject_id, object_id, relation, confidence, event_date
+                in iter_rows(cursor, chunk_size)
+            )
+    
+    def path_finder(self):
+        """
+        PathFinder (intro chains) over graph_index(), weighted by
+        entities.relationship_strength. Rebuilt with the index.
+        """
+        from path_engine import PathFinder
+        
+        index = self.graph_index()
+        if self._path_finder is None or self._path_finder.index is not index:
+            strengths = dict(self.reader().execute(
+                "SELECT entity_id, relationship_strength FROM entities"
+            ).fetchall())
+            self._path_finder = PathFinder(index, strengths)
+        return self._path_finder
+    
+    def common_neighbors_engine(self, relations='co_attended', exclude_owner: bool = False):
+        """
+        CommonNeighbors (batched Q4) over graph_index(), one per relation
+        filter / owner exclusion. Rebuilt with the index.
+        """
+        from common_neighbors import CommonNeighbors
+        
+        index = self.graph_index()
+        key = (relations if relations is None or isinstance(relations, str)
+               else frozenset(relations), exclude_owner)
+        engine = self._neighbor_engines.get(key)
+        if engine is None or engine.index is not index:
+            owner = entity_stats.owner_id(self._execute) if exclude_owner else None
+            engine = self._neighbor_engines[key] = CommonNeighbors(
+                index, relations, () if owner is None else (owner,)
+            )
+        return engine
+    
+    def common_neighbors(self, pairs: List[Tuple[int, int]], relations='co_attended',
+                         limit: Optional[int] = None) -> List[Dict]:
+        """
+        Q4 for many (x, y) entity pairs at once.
+        
+        Returns:
+            [{x, y, count, neighbors: [{entity_id, relations_x, relations_y}]}]
+        """
+        return self.common_neighbors_engine(relations).common(pairs, limit)
+    
+    def shared_circles(self, statuses: Tuple[str, ...] = ('active',), top: int = 20,
+                       relations='co_attended', limit: Optional[int] = None) -> List[Dict]:
+        """
+        All-pairs report: contacts (of the given statuses) with the largest
+        shared circle, the owner left out on both sides.
+        
+        Returns:
+            common_neighbors() rows, best first, with x_label / y_label and
+            a label per shared contact
+        """
+        reader = self.reader()
+        entity_ids = [row[0] for row in reader.execute(*compile_query(
+            "SELECT entity_id FROM entities WHERE type = 'Person' AND status IN (?)",
+            'sqlite', (list(statuses),)
+        ))]
+        rows = self.common_neighbors_engine(relations, exclude_owner=True).strongest_pairs(
+            entity_ids, top, limit=limit
+        )
+        wanted = {entity_id for row in rows for entity_id in (row['x'], row['y'])}
+        wanted.update(n['entity_id'] for row in rows for n in row['neighbors'])
+        labels = dict(reader.execute(*compile_query(
+            "SELECT entity_id, label FROM entities WHERE entity_id IN (?)", 'sqlite', (list(wanted),)
+        )).fetchall()) if wanted else {}
+        for row in rows:
+            row['x_label'], row['y_label'] = labels.get(row['x']), labels.get(row['y'])
+            for neighbor in row['neighbors']:
+                neighbor['label'] = labels.get(neighbor['entity_id'])
+        return rows
+
+    def ego_network(self, entity, depth: int = neighborhood.DEPTH,
+                    relation_types: Optional[List[str]] = None,
+                    min_confidence: Optional[float] = None,
+                    date_range: Optional[Tuple[Optional[str], Optional[str]]] = None,
+                    max_nodes: int = neighborhood.MAX_NODES,
+                    max_degree: Optional[int] = neighborhood.HUB_DEGREE):
+        """
+        Neighborhood of one contact up to depth hops, streamed from the
+        index (see neighborhood.expand): hubs above max_degree are not
+        expanded, at most max_nodes contacts.
+
+        Args:
+            entity: entity_id, identifier (email, phone) or label
+            date_range: (since, until) ISO dates on edges.event_date
+
+        Yields:
+            ('node', {id, label, type, status, relationship_strength, degree, depth, hub}),
+            then ('edge', {id, source, target, relation, confidence, event_date, occurrences})
+        """
+        reader = self.reader()
+        execute = lambda query, params: reader.execute(*compile_query(query, 'sqlite', params))
+        center = neighborhood.resolve(execute, entity)
+        if center is None:
+            raise ValueError(f"Unknown entity: {entity}")
+        return neighborhood.expand(execute, center, depth, relation_types, min_confidence,
+                                   date_range, max_nodes, max_degree)
+
+    def export_ego_network(self, entity, output_file: str, fmt: str = 'json',
+                           compress: Optional[bool] = None, **options) -> Dict[str, int]:
+        """
+        Write ego_network(entity, **options) as GraphML / JSON / NDJSON
+        (neighborhood.FORMATS), element by element.
+
+        Returns:
+            {'nodes': n, 'edges': m}
+        """
+        records = self.ego_network(entity, **options)
+        with open_export(output_file, compress) as f:
+            return neighborhood.write(f, records, fmt, metadata={'center': str(entity), **{
+                key: value for key, value in options.items() if value is not None
+            }})
+
+    def data_version(self) -> int:
+        """Graph Zone version: changes whenever entities or edges change."""
+        return self.reader().execute(
+            "SELECT version FROM graph_version WHERE id = 1"
+        ).fetchone()[0]
+    
+    def snapshot(self, output_file: str = "data/graph_snapshot.bin") -> Dict:
+        """
+        Write a binary CSR snapshot of the graph (see graph_snapshot).
+
+        Returns the snapshot header (data_version, node/edge counts, ...).
+        """
+        from graph_snapshot import build_arrays, write_snapshot
+        
+        # Read arrays and version from the same snapshot of the DB
+        conn = self.reader()
+        in_transaction = conn.in_transaction
+        if not in_transaction:
+            conn.execute("BEGIN")
+        try:
+            version = conn.execute(
+                "SELECT version FROM graph_version WHERE id = 1"
+            ).fetchone()[0]
+            built = build_arrays(conn)
+        finally:
+            if not in_transaction:
+                conn.execute("COMMIT")
+        
+        header = write_snapshot(output_file, built, version)
+        header['dropped_edges'] = built['dropped_edges']
+        return header
+    
+    def load_snapshot(self, snapshot_file: str = "data/graph_snapshot.bin",
+                      allow_stale: bool = False):
+        """
+        Memory-map a snapshot written by snapshot().
+
+        Raises StaleSnapshotError if the DB changed since it was written
+        (unless allow_stale).
+        """
+        from graph_snapshot import GraphSnapshot
+        
+        snap = GraphSnapshot(snapshot_file)
+        if not allow_stale:
+            snap.check_version(self.data_version())
+        return snap
     
     def get_stats(self) -> Dict:
         """Get graph statistics."""
         stats = {}
         
         # Entities by type
-        cursor = self.conn.execute("""
+        cursor = self.reader().execute("""
             SELECT type, COUNT(*) FROM entities GROUP BY type
         """)
         for entity_type, count in cursor.fetchall():
             stats[entity_type] = count
         
         # Total edges
-        cursor = self.conn.execute("SELECT COUNT(*) FROM edges")
+        cursor = self.reader().execute("SELECT COUNT(*) FROM edges")
         stats['Edges'] = cursor.fetchone()[0]
         
         # Sources
-        cursor = self.conn.execute("SELECT COUNT(*) FROM sources")
+        cursor = self.reader().execute("SELECT COUNT(*) FROM sources")
         stats['Sources'] = cursor.fetchone()[0]
         
         return stats
     
     def close(self):
-        """Close database connection."""
-        self.conn.close()
+        """Close database connection (after a full rescore if scores are dirty)."""
+        if self.scores_dirty:
+            self.refresh_scores()
+            self.commit()
+        if self._connections:
+            self._connections.close()
+        else:
+            self.conn.close()
 
@@ -4,21 +4,101 @@ Automatically detects connection type from environment
 """
 
 import os
-import json
-import hashlib
+import uuid
 from datetime import datetime
 from typing import Optional, Dict, List, Tuple
 
 # Try PostgreSQL, fallback to SQLite
 try:
     import psycopg2
-    from psycopg2.extras import RealDictCursor
     POSTGRES_AVAILABLE = True
 except ImportError:
     POSTGRES_AVAILABLE = False
 
 import sqlite3
 
+import centrality
+import communities
+import entity_edges
+import entity_stats
+import event_time
+import neighborhood
+import recommendations
+import rollups
+import sql_dialect
+import text_search
+import typeahead
+from compression import DEFAULT_CODEC, check_codec, content_hash, decompress_text, encode_payload
+from graph_export import EXPORT_CHUNK_SIZE, GraphMLWriter, JSONGraphWriter, iter_rows, open_export
+from lru import LRUCache
+from query_cache import POSTGRES_VERSION_SQL
+from scoring import Scorer
+from sql_dialect import Query
+
+# add_fact statements: neutral SQL, prepared once per connection on PostgreSQL
+FIND_ENTITY = Query(
+    "SELECT entity_id FROM entities WHERE label = ? AND type = ?", name='find_entity'
+)
+INSERT_ENTITY = Query("""
+    INSERT INTO entities (label, type, created_at, updated_at)
+    VALUES (?, ?, ?, ?)
+    RETURNING entity_id
+""", name='insert_entity')
+INSERT_IDENTIFIER = Query("""
+    INSERT OR IGNORE INTO identifiers (identifier, entity_id, identifier_type)
+    VALUES (?, ?, ?)
+""", name='insert_identifier')
+FIND_SOURCE = Query("SELECT source_id FROM sources WHERE source_uri = ?", name='find_source')
+INSERT_SOURCE = Query("""
+    INSERT INTO sources (source_type, source_uri, ingested_at) VALUES (?, ?, ?)
+    RETURNING source_id
+""", name='insert_source')
+FIND_BLOB = Query("SELECT 1 FROM raw_blobs WHERE content_hash = ?", name='find_blob')
+INSERT_BLOB = Query(
+    "INSERT INTO raw_blobs (content_hash, codec, size, payload) VALUES (?, ?, ?, ?)",
+    name='insert_blob'
+)
+FIND_RAW = Query(
+    "SELECT 1 FROM raw_data WHERE source_id = ? AND content_hash = ?", name='find_raw'
+)
+# content stays empty (NOT NULL in existing schemas); text lives in raw_blobs
+INSERT_RAW = Query("""
+    INSERT INTO raw_data (source_id, content, content_hash, extracted_at)
+    VALUES (?, '', ?, ?)
+""", name='insert_raw')
+INSERT_EDGE = Query("""
+    INSERT INTO edges (subject_id, object_id, relation_type, event_date, confidence,
+                       avg_confidence, source_id, created_at, event_day, event_ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    RETURNING edge_id
+""", name='insert_edge')
+# Merge into the identical fact unless this source was already counted
+UPSERT_EDGE = Query("""
+    INSERT INTO edges (subject_id, object_id, relation_type, event_date, confidence,
+                       avg_confidence, source_id, created_at, event_day, event_ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (subject_id, object_id, relation_type, (COALESCE(event_date, '')))
+    DO UPDATE SET
+        occurrences = edges.occurrences + 1,
+        avg_confidence = (COALESCE(edges.avg_confidence, edges.confidence) * edges.occurrences
+                          + excluded.confidence) / (edges.occurrences + 1),
+        confidence = GREATEST(edges.confidence, excluded.confidence)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM edge_sources es
+        WHERE es.edge_id = edges.edge_id AND es.source_id = excluded.source_id
+    )
+    RETURNING edge_id, occurrences
+""", name='upsert_edge')
+FIND_EDGE = Query("""
+    SELECT edge_id FROM edges
+    WHERE subject_id = ? AND object_id = ? AND relation_type = ?
+      AND COALESCE(event_date, '') = COALESCE(?, '')
+""", name='find_edge')
+INSERT_EDGE_SOURCE = Query(
+    "INSERT INTO edge_sources (edge_id, source_id) VALUES (?, ?) ON CONFLICT DO NOTHING",
+    name='insert_edge_source'
+)
+
 
 class EnhancedGraphDB:
     """
@@ -31,7 +111,8 @@ class EnhancedGraphDB:
     6. Export capabilities (GraphML, JSON)
     """
     
-    def __init__(self, db_path=None, postgres_url=None):
+    def __init__(self, db_path=None, postgres_url=None, entity_cache_size: int = 100_000,
+                 raw_codec: str = DEFAULT_CODEC, scorer: Optional[Scorer] = None):
         """
         Initialize database connection.
         
@@ -42,6 +123,10 @@ class EnhancedGraphDB:
         """
         self.db_type = None
         self.conn = None
+        # (label, type) → entity_id resolution cache
+        self.entity_cache = LRUCache(entity_cache_size)
+        self.raw_codec = check_codec(raw_codec)
+        self.scorer = scorer or Scorer()
         
         # Try PostgreSQL first
         postgres_url = postgres_url or os.getenv('DATABASE_URL')
@@ -58,11 +143,16 @@ class EnhancedGraphDB:
         # Fallback to SQLite
         if not self.conn:
             db_path = db_path or "data/contacts_v2.db"
-            self.conn = sqlite3.connect(db_path)
+            self.conn = sqlite3.connect(
+                db_path, cached_statements=sql_dialect.STATEMENT_CACHE_SIZE
+            )
             self.conn.row_factory = sqlite3.Row
             self.db_type = 'sqlite'
             print(f"✅ Connected to SQLite: {db_path}")
         
+        # Neutral SQL ('?', IN (?), ...) → this dialect; prepared statements on PostgreSQL
+        self.statements = sql_dialect.Statements(self.db_type)
+        
         self._create_enhanced_schema()
     
     def _create_enhanced_schema(self):
@@ -72,6 +162,160 @@ class EnhancedGraphDB:
             self._create_postgresql_schema()
         else:
             self._create_sqlite_schema()
+        
+        self.edges_unique = self._create_edges_unique_index()
+        self._create_event_days()
+        self._create_entity_stats()
+        self._create_entity_edges()
+        self._create_rollups()
+        self._create_text_search()
+        self._create_typeahead()
+        self._create_communities()
+        self._create_centrality()
+        self._create_recommendations()
+    
+    def _create_event_days(self):
+        """Typed event dates (edges.event_day / event_ts), backfilled once."""
+        if self.db_type == 'postgresql':
+            columns = [row[0] for row in self.fetchall(
+                "SELECT column_name FROM information_schema.columns WHERE table_name = 'edges'"
+            )]
+        else:
+            columns = [row[1] for row in self.fetchall("PRAGMA table_info(edges)")]
+        missing = [(column, declaration) for column, declaration in event_time.COLUMNS
+                   if column not in columns]
+        for column, declaration in missing:
+            self.execute(f"ALTER TABLE edges ADD COLUMN {column} {declaration}").close()
+        if missing:
+            event_time.backfill(self.conn, self.db_type)
+        for sql in event_time.INDEX_SQL:
+            self.execute(sql).close()
+        self.conn.commit()
+    
+    def _create_entity_stats(self):
+        """Per-entity aggregates (entity_stats, entities.degree)."""
+        if self.db_type == 'postgresql':
+            self.execute(
+                "ALTER TABLE entities ADD COLUMN IF NOT EXISTS degree INTEGER NOT NULL DEFAULT 0"
+            ).close()
+            exists = self.fetchone("SELECT to_regclass('entity_stats')")[0] is not None
+        else:
+            columns = [row[1] for row in self.fetchall("PRAGMA table_info(entities)")]
+            if 'degree' not in columns:
+                self.execute(
+                    "ALTER TABLE entities ADD COLUMN degree INTEGER NOT NULL DEFAULT 0"
+                ).close()
+            exists = self.fetchone(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entity_stats'"
+            ) is not None
+        self.execute(entity_stats.TABLE_SQL).close()
+        self.execute(entity_stats.INDEX_SQL).close()
+        # SQLite: same triggers as EnhancedGraphDB (shared files stay consistent);
+        # PostgreSQL: _create_edge updates the aggregates itself
+        self._stats_triggers = self.db_type == 'sqlite'
+        if self._stats_triggers:
+            entity_stats.create_sqlite_triggers(self.conn)
+        if not exists:
+            entity_stats.rebuild(self.execute)
+            if not self._stats_triggers:
+                entity_stats.sync_entities(self.execute)
+        self.conn.commit()
+        # max_degree the stored relationship_strength values were scored with
+        self._scored_max_degree = None
+        self._owner_id = None
+        # Rows rescored against a possibly stale max_degree (see refresh_scores)
+        self.scores_dirty = False
+    
+    def _create_entity_edges(self):
+        """Incidence table: both ends of every edge (undirected scenario queries)."""
+        if self.db_type == 'postgresql':
+            columns = [row[0] for row in self.fetchall(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_name = 'entity_edges'"
+            )]
+        else:
+            columns = [row[1] for row in self.fetchall("PRAGMA table_info(entity_edges)")]
+        # From before event_day: dropped and refilled
+        if columns and 'event_day' not in columns:
+            entity_edges.drop(self.execute, self.db_type)
+        entity_edges.create_table(self.execute, self.db_type)
+        if self._stats_triggers:
+            entity_edges.create_sqlite_triggers(self.conn)
+        if 'event_day' not in columns:
+            entity_edges.rebuild(self.execute)
+        self.conn.commit()
+    
+    def _create_rollups(self):
+        """Year/month rollups of edge counts (Q1, Q6)."""
+        if self.db_type == 'postgresql':
+            exists = self.fetchone("SELECT to_regclass('month_stats')")[0] is not None
+        else:
+            exists = self.fetchone(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'month_stats'"
+            ) is not None
+        rollups.create_tables(self.execute, self.db_type)
+        if self._stats_triggers:
+            rollups.create_sqlite_triggers(self.conn)
+        if not exists:
+            rollups.rebuild(self.execute, self.db_type)
+        self.conn.commit()
+    
+    def _create_text_search(self):
+        """Full-text search (FTS5 / tsvector + GIN), backfilled once."""
+        if self.db_type == 'postgresql':
+            exists = self.fetchone("SELECT to_regclass('context_search')")[0] is not None
+        else:
+            exists = self.fetchone(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'context_search'"
+            ) is not None
+        text_search.create_tables(self.execute, self.db_type)
+        # PostgreSQL: entities.search_vector is a generated column
+        if self.db_type == 'sqlite':
+            text_search.create_sqlite_triggers(self.conn)
+        if not exists:
+            text_search.rebuild(self.execute, self.db_type, title_column='source_uri')
+        self.conn.commit()
+    
+    def _create_typeahead(self):
+        """Typeahead index (contact_lookup / pg_trgm), backfilled once."""
+        exists = self.db_type == 'postgresql' or self.fetchone(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contact_lookup'"
+        ) is not None
+        typeahead.create_index(self.execute, self.db_type)
+        if self.db_type == 'sqlite':
+            typeahead.create_sqlite_triggers(self.conn)
+        if not exists:
+            typeahead.rebuild(self.execute)
+        self.conn.commit()
+    
+    def _create_communities(self):
+        """Community detection runs (filled by detect_communities)."""
+        communities.create_tables(self.execute, self.db_type)
+        self.conn.commit()
+    
+    def _create_centrality(self):
+        """Centrality score cache (filled by refresh_centrality)."""
+        centrality.create_tables(self.execute, self.db_type)
+        self.conn.commit()
+    
+    def _create_recommendations(self):
+        """Q11 link-prediction table (filled by refresh_recommendations)."""
+        recommendations.create_tables(self.execute, self.db_type)
+        self.conn.commit()
+    
+    def _create_edges_unique_index(self) -> bool:
+        """One row per distinct fact; False while legacy duplicates remain."""
+        try:
+            self.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_edges_unique
+                ON edges (subject_id, object_id, relation_type, (COALESCE(event_date, '')))
+            """).close()
+            self.conn.commit()
+            return True
+        except Exception:
+            self.conn.rollback()
+            print("⚠️ edges contains duplicate facts: add_fact falls back to plain inserts")
+            return False
     
     def _create_postgresql_schema(self):
         """Create PostgreSQL schema."""
@@ -119,10 +363,23 @@ class EnhancedGraphDB:
                 confidence REAL DEFAULT 1.0,
                 source_id INTEGER,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                occurrences INTEGER NOT NULL DEFAULT 1,
+                avg_confidence REAL,
                 FOREIGN KEY (subject_id) REFERENCES entities(entity_id),
                 FOREIGN KEY (object_id) REFERENCES entities(entity_id)
             )
         """)
+        cursor.execute("ALTER TABLE edges ADD COLUMN IF NOT EXISTS occurrences INTEGER NOT NULL DEFAULT 1")
+        cursor.execute("ALTER TABLE edges ADD COLUMN IF NOT EXISTS avg_confidence REAL")
+        
+        # Edge Sources (every source that contributed to an edge)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS edge_sources (
+                edge_id INTEGER NOT NULL,
+                source_id INTEGER NOT NULL,
+                PRIMARY KEY (edge_id, source_id)
+            )
+        """)
         
         # Sources
         cursor.execute("""
@@ -147,7 +404,18 @@ class EnhancedGraphDB:
             )
         """)
         
+        # Raw Blobs (compressed payloads, one per content hash)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS raw_blobs (
+                content_hash TEXT PRIMARY KEY,
+                codec TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                payload BYTEA NOT NULL
+            )
+        """)
+        
         # Indexes
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_raw_data_source ON raw_data(source_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_edges_subject ON edges(subject_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_edges_object ON edges(object_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_identifiers_entity ON identifiers(entity_id)")
@@ -157,6 +425,10 @@ class EnhancedGraphDB:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_entities_last_interaction ON entities(last_interaction)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_entities_type ON entities(type)")
         
+        # Data version (result caches): bumped once per writing statement
+        for statement in POSTGRES_VERSION_SQL:
+            cursor.execute(statement)
+        
         self.conn.commit()
         cursor.close()
     
@@ -204,10 +476,26 @@ class EnhancedGraphDB:
                 confidence REAL DEFAULT 1.0,
                 source_id INTEGER,
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                occurrences INTEGER NOT NULL DEFAULT 1,
+                avg_confidence REAL,
                 FOREIGN KEY (subject_id) REFERENCES entities(entity_id),
                 FOREIGN KEY (object_id) REFERENCES entities(entity_id)
             )
         """)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(edges)").fetchall()]
+        if 'occurrences' not in columns:
+            self.conn.execute("ALTER TABLE edges ADD COLUMN occurrences INTEGER NOT NULL DEFAULT 1")
+        if 'avg_confidence' not in columns:
+            self.conn.execute("ALTER TABLE edges ADD COLUMN avg_confidence REAL")
+        
+        # Edge Sources (every source that contributed to an edge)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS edge_sources (
+                edge_id INTEGER NOT NULL,
+                source_id INTEGER NOT NULL,
+                PRIMARY KEY (edge_id, source_id)
+            ) WITHOUT ROWID
+        """)
         
         # Sources
         self.conn.execute("""
@@ -231,8 +519,30 @@ class EnhancedGraphDB:
                 FOREIGN KEY (source_id) REFERENCES sources(source_id)
             )
         """)
+
+        # Files created by EnhancedGraphDB: sources.filename instead of
+        # source_uri, legacy raw_data without content_hash
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(sources)").fetchall()]
+        if 'source_uri' not in columns:
+            self.conn.execute("ALTER TABLE sources ADD COLUMN source_uri TEXT")
+            if 'filename' in columns:
+                self.conn.execute("UPDATE sources SET source_uri = filename")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(raw_data)").fetchall()]
+        if 'content_hash' not in columns:
+            self.conn.execute("ALTER TABLE raw_data ADD COLUMN content_hash TEXT")
+
+        # Raw Blobs (compressed payloads, one per content hash)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS raw_blobs (
+                content_hash TEXT PRIMARY KEY,
+                codec TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                payload BLOB NOT NULL
+            ) WITHOUT ROWID
+        """)
         
         # Indexes
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_raw_data_source ON raw_data(source_id)")
         self.conn.execute("CREATE INDEX IF NOT EXISTS idx_edges_subject ON edges(subject_id)")
         self.conn.execute("CREATE INDEX IF NOT EXISTS idx_edges_object ON edges(object_id)")
         self.conn.execute("CREATE INDEX IF NOT EXISTS idx_identifiers_entity ON identifiers(entity_id)")
@@ -245,15 +555,15 @@ class EnhancedGraphDB:
         self.conn.commit()
     
     def execute(self, query, params=None):
-        """Execute query (abstraction for PostgreSQL/SQLite differences)."""
-        cursor = self.conn.cursor()
-        
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
+        """
+        Execute query (abstraction for PostgreSQL/SQLite differences).
         
-        return cursor
+        query: SQL text or sql_dialect.Query in neutral SQL ('?' placeholders,
+        IN (?) lists, ...), compiled for this backend; named queries run as
+        prepared statements on PostgreSQL.
+        """
+        cursor = self.conn.cursor()
+        return self.statements.execute(cursor, query, params)
     
     def fetchone(self, query, params=None):
         """Fetch one result."""
@@ -269,6 +579,39 @@ class EnhancedGraphDB:
         cursor.close()
         return results
     
+    def iter_query(self, query, params=None, chunk_size: int = EXPORT_CHUNK_SIZE,
+                   as_dict: bool = False):
+        """
+        Stream query results in chunks.
+
+        PostgreSQL uses a named (server-side) cursor, so rows are not
+        materialized on the client. as_dict → rows as column → value dicts.
+        """
+        if self.db_type == 'postgresql':
+            cursor = self.conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+            cursor.itersize = chunk_size
+        else:
+            cursor = self.conn.cursor()
+        try:
+            query, params = self.statements.compile(query, params)
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            rows = iter_rows(cursor, chunk_size)
+            if as_dict:
+                first = next(rows, None)
+                if first is None:
+                    return
+                columns = [column[0] for column in cursor.description]
+                yield dict(zip(columns, first))
+                for row in rows:
+                    yield dict(zip(columns, row))
+            else:
+                yield from rows
+        finally:
+            cursor.close()
+    
     def add_fact(self, subject_label: str, relation_type: str, object_label: str,
                  subject_type: str = "Person", object_type: str = "Person",
                  event_date: Optional[str] = None, confidence: float = 1.0,
@@ -280,165 +623,388 @@ class EnhancedGraphDB:
         
         Returns: (subject_id, object_id, edge_id)
         """
-        # Resolve or create subject
-        subject_id = self._resolve_or_create_entity(subject_label, subject_type)
-        
-        # Resolve or create object
-        object_id = self._resolve_or_create_entity(object_label, object_type)
+        try:
+            # Resolve or create subject
+            subject_id = self._resolve_or_create_entity(subject_label, subject_type)
+            
+            # Resolve or create object
+            object_id = self._resolve_or_create_entity(object_label, object_type)
+            
+            # Create source if not exists
+            source_id = self._get_or_create_source(source_type, source_uri)
+            
+            # Store raw content if provided
+            if raw_content:
+                self._store_raw_data(source_id, raw_content, source_uri)
+            
+            # Create edge
+            edge_id = self._create_edge(subject_id, object_id, relation_type, 
+                                        event_date, confidence, source_id)
+            
+            # Rescore the two touched rows; the full pass runs once per import
+            self.refresh_scores((subject_id, object_id))
+            
+            # One commit per fact
+            self.conn.commit()
+        except Exception:
+            self.rollback()
+            raise
         
-        # Create source if not exists
-        source_id = self._get_or_create_source(source_type, source_uri)
-        
-        # Store raw content if provided
-        if raw_content:
-            self._store_raw_data(source_id, raw_content)
+        return (subject_id, object_id, edge_id)
+    
+    def refresh_scores(self, entity_ids=None) -> Dict:
+        """
+        Rescore status and relationship_strength (self.scorer).
         
-        # Create edge
-        edge_id = self._create_edge(subject_id, object_id, relation_type, 
-                                    event_date, confidence, source_id)
+        With entity_ids only those rows are rescored, against the max_degree
+        of the last full rescore, and scores_dirty is set. Without them all
+        entities are rescored — once at the end of an import (close() does
+        it when scores are still dirty). Does not commit.
         
-        return (subject_id, object_id, edge_id)
+        Returns:
+            scoring report (see Scorer.rescore)
+        """
+        if entity_ids is not None:
+            if self._scored_max_degree is None:
+                self._owner_id = entity_stats.owner_id(self.execute)
+                self._scored_max_degree = self.scorer.max_degree(self.execute, self._owner_id)
+            self.scores_dirty = True
+            return self.scorer.rescore(self.conn, self.db_type, entity_ids,
+                                       self._scored_max_degree)
+        # Full rescore; the owner may have appeared since the last one
+        self._owner_id = entity_stats.owner_id(self.execute)
+        report = self.scorer.rescore(self.conn, self.db_type)
+        self._scored_max_degree = report['max_degree']
+        self.scores_dirty = False
+        return report
+    
+    def rebuild_entity_stats(self) -> Dict:
+        """Recompute entity_stats from edges and rescore every entity."""
+        entity_stats.rebuild(self.execute)
+        if not self._stats_triggers:
+            entity_stats.sync_entities(self.execute)
+        report = self.refresh_scores()
+        self.conn.commit()
+        return report
+    
+    def backfill_event_days(self) -> Dict:
+        """Fill edges.event_day / event_ts where missing; unparsable dates stay NULL."""
+        updated = event_time.backfill(self.conn, self.db_type)
+        self.conn.commit()
+        unparsed = self.fetchone(
+            "SELECT COUNT(*) FROM edges WHERE event_date IS NOT NULL AND event_day IS NULL"
+        )[0]
+        return {'updated': updated, 'unparsed': unparsed}
+    
+    def rebuild_rollups(self) -> Dict:
+        """Recompute the year/month rollups from edges (one pass)."""
+        rollups.rebuild(self.execute, self.db_type)
+        self.conn.commit()
+        return {
+            'entity_months': self.fetchone("SELECT COUNT(*) FROM entity_month_stats")[0],
+            'months': self.fetchone("SELECT COUNT(*) FROM month_stats")[0],
+        }
+    
+    def rebuild_search_index(self) -> Dict:
+        """Refill the full-text search index (payloads decompressed once)."""
+        report = text_search.rebuild(self.execute, self.db_type, title_column='source_uri')
+        self.conn.commit()
+        return report
+    
+    def search(self, text: str, limit: int = 20) -> List[Dict]:
+        """Ranked full-text hits (see text_search.search)."""
+        return text_search.search(self.execute, text, self.db_type, limit)
+    
+    def suggest_contacts(self, text: Optional[str], limit: int = typeahead.PAGE_SIZE,
+                         offset: int = 0, entity_type: str = "Person",
+                         statuses: Optional[List[str]] = None) -> List[Dict]:
+        """Typeahead: one page of matching contacts (see typeahead.suggest)."""
+        return typeahead.suggest(self.execute, text, self.db_type, entity_type, statuses,
+                                 limit, offset)
+    
+    def detect_communities(self, method: str = 'louvain',
+                           relations: Optional[List[str]] = None,
+                           resolution: float = 1.0, incremental: bool = False) -> Dict:
+        """Cluster the graph and store the run (see communities.detect / update)."""
+        try:
+            if incremental:
+                report = communities.update(self.conn, self.db_type, method)
+            else:
+                report = communities.detect(self.conn, self.db_type, method, relations,
+                                            resolution)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return report
+    
+    def list_communities(self, run_id: Optional[int] = None, min_size: int = 2,
+                         limit: int = 50, method: str = 'louvain') -> List[Dict]:
+        """Communities of a run (default: the latest), largest first."""
+        run_id = run_id if run_id is not None else communities.latest_run(self.execute, method)
+        if run_id is None:
+            return []
+        return communities.list_communities(self.execute, run_id, min_size, limit)
+    
+    def community_members(self, community_id: int, run_id: Optional[int] = None,
+                          method: str = 'louvain') -> List[Dict]:
+        """Members of a community (default: latest run), strongest first."""
+        run_id = run_id if run_id is not None else communities.latest_run(self.execute, method)
+        if run_id is None:
+            return []
+        return communities.members(self.execute, run_id, community_id)
+    
+    def refresh_centrality(self, relations: Optional[List[str]] = None,
+                           exclude_owner: bool = True,
+                           samples: Optional[int] = centrality.BETWEENNESS_SAMPLES,
+                           force: bool = False) -> Dict:
+        """Recompute entity_centrality unless it is current (see centrality.refresh)."""
+        try:
+            report = centrality.refresh(self.conn, self.db_type, relations, exclude_owner,
+                                        samples, force=force)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return report
+    
+    def most_connected(self, metric: str = 'weighted_degree', top: int = 10,
+                       statuses: Optional[List[str]] = None, entity_type: str = 'Person',
+                       refresh: bool = True) -> List[Dict]:
+        """Q5: highest centrality scores (precomputed, refreshed first if stale)."""
+        if refresh:
+            self.refresh_centrality()
+        return centrality.top(self.execute, metric, top, entity_type, statuses)
+    
+    def refresh_recommendations(self, relations: Optional[List[str]] = recommendations.RELATIONS,
+                                exclude_owner: bool = True, top_k: int = recommendations.TOP_K,
+                                force: bool = False) -> Dict:
+        """Update the Q11 recommendations (see recommendations.refresh)."""
+        try:
+            report = recommendations.refresh(self.conn, self.db_type, relations, exclude_owner,
+                                             top_k, force=force)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return report
+    
+    def recommend_introductions(self, entity_id: int, limit: int = 10,
+                                refresh: bool = True) -> List[Dict]:
+        """Q11: whom to introduce to a contact (stored top-k, refreshed first)."""
+        if refresh:
+            self.refresh_recommendations()
+        return recommendations.recommend(self.execute, entity_id, limit)
+
+    def ego_network(self, entity, depth: int = neighborhood.DEPTH,
+                    relation_types: Optional[List[str]] = None,
+                    min_confidence: Optional[float] = None,
+                    date_range: Optional[Tuple[Optional[str], Optional[str]]] = None,
+                    max_nodes: int = neighborhood.MAX_NODES,
+                    max_degree: Optional[int] = neighborhood.HUB_DEGREE):
+        """Stream the neighborhood of one contact (see neighborhood.expand)."""
+        center = neighborhood.resolve(self.execute, entity)
+        if center is None:
+            raise ValueError(f"Unknown entity: {entity}")
+        return neighborhood.expand(self.execute, center, depth, relation_types, min_confidence,
+                                   date_range, max_nodes, max_degree)
+
+    def export_ego_network(self, entity, output_path: str, fmt: str = 'json',
+                           compress: Optional[bool] = None, **options) -> Dict[str, int]:
+        """Write ego_network() as GraphML / JSON / NDJSON; returns node and edge counts."""
+        records = self.ego_network(entity, **options)
+        with open_export(output_path, compress) as f:
+            return neighborhood.write(f, records, fmt, metadata={'center': str(entity), **{
+                key: value for key, value in options.items() if value is not None
+            }})
+
+    def rollback(self):
+        """Roll back and drop cached entities (their rows may be gone)."""
+        self.conn.rollback()
+        self.entity_cache.clear()
+    
+    def preload_entity_cache(self) -> int:
+        """Bulk-load (label, type) → entity_id into the resolution cache."""
+        rows = self.fetchall(
+            "SELECT label, type, entity_id FROM entities ORDER BY entity_id DESC LIMIT ?",
+            (self.entity_cache.maxsize,)
+        )
+        self.entity_cache.update(((row[0], row[1]), row[2]) for row in reversed(rows))
+        return len(self.entity_cache)
     
     def _resolve_or_create_entity(self, label: str, entity_type: str) -> int:
         """Resolve or create entity (simplified entity resolution)."""
+        cached = self.entity_cache.get((label, entity_type))
+        if cached is not None:
+            return cached
+        
         # Check if entity exists
-        result = self.fetchone(
-            "SELECT entity_id FROM entities WHERE label = ? AND type = ?",
-            (label, entity_type)
-        )
+        result = self.fetchone(FIND_ENTITY, (label, entity_type))
         
         if result:
+            self.entity_cache.put((label, entity_type), result[0])
             return result[0]
         
         # Create new entity
-        cursor = self.execute(
-            """
-            INSERT INTO entities (label, type, created_at, updated_at)
-            VALUES (?, ?, ?, ?)
-            """,
-            (label, entity_type, datetime.now().isoformat(), datetime.now().isoformat())
-        )
-        
-        entity_id = cursor.lastrowid
-        self.conn.commit()
-        cursor.close()
+        now = datetime.now().isoformat()
+        entity_id = self.fetchone(INSERT_ENTITY, (label, entity_type, now, now))[0]
         
         # Add identifier
-        self.execute(
-            "INSERT OR IGNORE INTO identifiers (identifier, entity_id, identifier_type) VALUES (?, ?, ?)",
-            (label.lower(), entity_id, 'canonical')
-        )
-        self.conn.commit()
+        self.execute(INSERT_IDENTIFIER, (label.lower(), entity_id, 'canonical')).close()
         
+        self.entity_cache.put((label, entity_type), entity_id)
         return entity_id
     
     def _get_or_create_source(self, source_type: str, source_uri: Optional[str]) -> int:
         """Get or create source."""
         if source_uri:
-            result = self.fetchone(
-                "SELECT source_id FROM sources WHERE source_uri = ?",
-                (source_uri,)
-            )
+            result = self.fetchone(FIND_SOURCE, (source_uri,))
             if result:
                 return result[0]
         
-        cursor = self.execute(
-            "INSERT INTO sources (source_type, source_uri, ingested_at) VALUES (?, ?, ?)",
-            (source_type, source_uri, datetime.now().isoformat())
-        )
-        
-        source_id = cursor.lastrowid
-        self.conn.commit()
-        cursor.close()
-        
-        return source_id
+        return self.fetchone(
+            INSERT_SOURCE, (source_type, source_uri, datetime.now().isoformat())
+        )[0]
     
-    def _store_raw_data(self, source_id: int, content: str):
-        """Store raw data with hash."""
-        content_hash = hashlib.sha256(content.encode()).hexdigest()
-        
-        self.execute(
+    def _store_raw_data(self, source_id: int, content: str, title: Optional[str] = None):
+        """Store raw data: compressed payload once per hash + a reference row."""
+        payload_hash = content_hash(content)
+        
+        if not self.fetchone(FIND_BLOB, (payload_hash,)):
+            codec, payload = encode_payload(content, self.raw_codec)
+            self.execute(
+                INSERT_BLOB, (payload_hash, codec, len(content.encode('utf-8')), payload)
+            ).close()
+        
+        if self.fetchone(FIND_RAW, (source_id, payload_hash)):
+            return
+        
+        self.execute(INSERT_RAW, (source_id, payload_hash, datetime.now().isoformat())).close()
+        text_search.record_context(self.execute, source_id, payload_hash, title, content,
+                                   self.db_type)
+    
+    def get_raw_content(self, source_id: int) -> List[str]:
+        """Original payloads of a source (decompressed on demand)."""
+        rows = self.fetchall(
             """
-            INSERT OR IGNORE INTO raw_data (source_id, content, content_hash, extracted_at)
-            VALUES (?, ?, ?, ?)
+            SELECT r.content, b.codec, b.payload
+            FROM raw_data r
+            LEFT JOIN raw_blobs b ON b.content_hash = r.content_hash
+            WHERE r.source_id = ?
+            ORDER BY r.raw_id
             """,
-            (source_id, content, content_hash, datetime.now().isoformat())
+            (source_id,)
         )
-        self.conn.commit()
+        return [
+            row[0] if row[2] is None else decompress_text(row[2], row[1])
+            for row in rows
+        ]
     
     def _create_edge(self, subject_id: int, object_id: int, relation_type: str,
                     event_date: Optional[str], confidence: float, source_id: int) -> int:
-        """Create edge."""
-        cursor = self.execute(
-            """
-            INSERT INTO edges (subject_id, object_id, relation_type, event_date, confidence, source_id, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (subject_id, object_id, relation_type, event_date, confidence, source_id, datetime.now().isoformat())
-        )
-        
-        edge_id = cursor.lastrowid
-        self.conn.commit()
-        cursor.close()
+        """Create edge, or merge into the identical fact (occurrences, max/avg confidence)."""
+        event_day, event_ts = event_time.parse_event_date(event_date)
+        params = (subject_id, object_id, relation_type, event_date, confidence, confidence,
+                  source_id, datetime.now().isoformat(), event_day, event_ts)
+        counted = False
+        
+        if not self.edges_unique:
+            edge_id = self.fetchone(INSERT_EDGE, params)[0]
+            new_edge = True
+        else:
+            result = self.fetchone(UPSERT_EDGE, params)
+            
+            # occurrences = 1 → inserted; None → source already counted
+            new_edge = result is not None and result[1] == 1
+            if result is None:
+                # Same fact from a source already counted
+                result = self.fetchone(
+                    FIND_EDGE, (subject_id, object_id, relation_type, event_date)
+                )
+                counted = True
+            edge_id = result[0]
+        
+        if not self._stats_triggers and not counted:
+            entity_stats.record_edge(self.execute, subject_id, object_id, relation_type,
+                                     event_date, new_edge)
+            rollups.record_edge(self.execute, subject_id, object_id, relation_type,
+                                event_date, new_edge)
+            if new_edge:
+                entity_edges.record_edge(self.execute, edge_id, subject_id, object_id,
+                                         relation_type, event_date, event_day)
+        
+        if source_id is not None:
+            self.execute(INSERT_EDGE_SOURCE, (edge_id, source_id)).close()
         
         return edge_id
     
-    def export_graphml(self, output_path: str):
-        """Export graph to GraphML format."""
-        # Get all entities
-        entities = self.fetchall("SELECT entity_id, label, type FROM entities")
-        
-        # Get all edges
-        edges = self.fetchall("""
-            SELECT edge_id, subject_id, object_id, relation_type 
-            FROM edges
-        """)
-        
-        # Generate GraphML
-        graphml = ['<?xml version="1.0" encoding="UTF-8"?>']
-        graphml.append('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">')
-        graphml.append('  <graph id="G" edgedefault="directed">')
-        
-        # Nodes
-        for entity in entities:
-            entity_id, label, entity_type = entity[0], entity[1], entity[2]
-            graphml.append(f'    <node id="{entity_id}">')
-            graphml.append(f'      <data key="label">{label}</data>')
-            graphml.append(f'      <data key="type">{entity_type}</data>')
-            graphml.append('    </node>')
-        
-        # Edges
-        for edge in edges:
-            edge_id, subject_id, object_id, relation_type = edge[0], edge[1], edge[2], edge[3]
-            graphml.append(f'    <edge id="{edge_id}" source="{subject_id}" target="{object_id}">')
-            graphml.append(f'      <data key="relation">{relation_type}</data>')
-            graphml.append('    </edge>')
-        
-        graphml.append('  </graph>')
-        graphml.append('</graphml>')
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(graphml))
-    
-    def export_json(self, output_path: str):
-        """Export graph to JSON format."""
-        # Get all entities
-        entities = self.fetchall("SELECT * FROM entities")
-        
-        # Get all edges
-        edges = self.fetchall("SELECT * FROM edges")
-        
-        # Convert to dict
-        graph = {
-            'entities': [dict(e) for e in entities],
-            'edges': [dict(e) for e in edges]
-        }
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(graph, f, indent=2, ensure_ascii=False)
+    def _export_queries(self, since: Optional[str] = None) -> Tuple[str, str, tuple]:
+        """
+        Entity query, edge filter and params for exports.
+
+        since → only edges with event_date >= since (an event_day range), and the
+        entities they touch.
+        """
+        if since is None:
+            return "FROM entities", "", ()
+        entities = """
+            FROM entities
+            WHERE entity_id IN (
+                SELECT subject_id FROM edges WHERE event_day >= ?
+                UNION
+                SELECT object_id FROM edges WHERE event_day >= ?
+            )
+        """
+        return entities, "WHERE event_day >= ?", (event_time.to_day(since),)
+    
+    def export_graphml(self, output_path: str, compress: Optional[bool] = None,
+                       since: Optional[str] = None, chunk_size: int = EXPORT_CHUNK_SIZE):
+        """Export graph to GraphML format (streamed, optional gzip)."""
+        node_keys = [('label', 'string'), ('type', 'string')]
+        edge_keys = [('relation', 'string'), ('confidence', 'double'),
+                     ('event_date', 'string'), ('occurrences', 'int')]
+        entities_from, edges_where, params = self._export_queries(since)
+        
+        with open_export(output_path, compress) as f, \
+                GraphMLWriter(f, node_keys, edge_keys) as writer:
+            for entity_id, label, entity_type in self.iter_query(
+                f"SELECT entity_id, label, type {entities_from}", params * 2,
+                chunk_size=chunk_size
+            ):
+                writer.node(entity_id, label=label, type=entity_type)
+            
+            for (edge_id, subject_id, object_id, relation, confidence,
+                 event_date, occurrences) in self.iter_query(f"""
+                SELECT edge_id, subject_id, object_id, relation_type, confidence,
+                       event_date, occurrences
+                FROM edges {edges_where}
+            """, params, chunk_size=chunk_size):
+                writer.edge(edge_id, subject_id, object_id, relation=relation,
+                            confidence=confidence, event_date=event_date,
+                            occurrences=occurrences)
+    
+    def export_json(self, output_path: str, fmt: str = 'json',
+                    compress: Optional[bool] = None, since: Optional[str] = None,
+                    chunk_size: int = EXPORT_CHUNK_SIZE):
+        """
+        Export graph to JSON format: {"entities": [...], "edges": [...]}
+        (fmt='json') or one record per line (fmt='ndjson'), streamed.
+        """
+        entities_from, edges_where, params = self._export_queries(since)
+        
+        with open_export(output_path, compress) as f, \
+                JSONGraphWriter(f, fmt, nodes_key='entities', links_key='edges',
+                                chunk_size=chunk_size) as writer:
+            writer.nodes(self.iter_query(f"SELECT * {entities_from}", params * 2,
+                                         chunk_size=chunk_size, as_dict=True))
+            writer.links(self.iter_query(f"SELECT * FROM edges {edges_where}", params,
+                                         chunk_size=chunk_size, as_dict=True))
     
     def close(self):
-        """Close database connection."""
+        """Close database connection (after a full rescore if scores are dirty)."""
+        if self.conn and self.scores_dirty:
+            self.refresh_scores()
+            self.conn.commit()
         if self.conn:
             self.conn.close()
 
@@ -0,0 +1,133 @@
+"""
+Entity–edge incidence table: every edge seen from both of its ends.
+
+    entity_edges(entity_id, other_id, relation_type, event_date, event_day, edge_id)
+
+An edge X—Y is stored as (X, Y, ...) and (Y, X, ...) (a self-loop once),
+so "all edges of X" is `entity_id = X` — an index range — instead of
+`subject_id = X OR object_id = X`, which can't use idx_edges_subject /
+idx_edges_object in a join and scans edges.
+
+Covering indexes (every column a scenario needs is in the index):
+    primary key  (relation_type, entity_id, edge_id)  + other_id, event_date, event_day
+                 → degree / first / last meeting per entity (Q2, Q5)
+    idx_entity_edges_day      (relation_type, event_day, entity_id, edge_id)
+                 → edges of a relation in a day range (event_time.year_range,
+                   event_time.days_ago)
+    idx_entity_edges_entity   (entity_id, relation_type, other_id)
+                 → neighbors of one entity (Q11, paths)
+
+SQLite keeps it with triggers on edges; the universal DB on PostgreSQL
+calls record_edge() from _create_edge. A table from before event_day is
+dropped (drop()) and rebuilt by the DB classes.
+"""
+
+from typing import Callable, Optional
+
+TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS entity_edges (
+        entity_id INTEGER NOT NULL,
+        other_id INTEGER NOT NULL,
+        relation_type TEXT NOT NULL,
+        event_date TEXT,
+        event_day INTEGER,
+        edge_id INTEGER NOT NULL,
+        PRIMARY KEY (relation_type, entity_id, edge_id)
+    ){without_rowid}
+"""
+
+INDEX_SQL = (
+    """CREATE INDEX IF NOT EXISTS idx_entity_edges_day
+       ON entity_edges(relation_type, event_day, entity_id, edge_id)""",
+    """CREATE INDEX IF NOT EXISTS idx_entity_edges_entity
+       ON entity_edges(entity_id, relation_type, other_id)""",
+)
+
+# Edge row (NEW/OLD) ↔ its incidence rows
+_ADD_EDGE = """
+    INSERT OR IGNORE INTO entity_edges (entity_id, other_id, relation_type, event_date,
+                                        event_day, edge_id)
+    VALUES ({row}.subject_id, {row}.object_id, {row}.relation_type, {row}.event_date,
+            {row}.event_day, {row}.edge_id);
+    INSERT OR IGNORE INTO entity_edges (entity_id, other_id, relation_type, event_date,
+                                        event_day, edge_id)
+    SELECT {row}.object_id, {row}.subject_id, {row}.relation_type, {row}.event_date,
+           {row}.event_day, {row}.edge_id
+    WHERE {row}.object_id != {row}.subject_id;
+"""
+
+_REMOVE_EDGE = """
+    DELETE FROM entity_edges
+    WHERE relation_type = {row}.relation_type
+      AND entity_id IN ({row}.subject_id, {row}.object_id)
+      AND edge_id = {row}.edge_id;
+"""
+
+SQLITE_TRIGGERS = {
+    'trg_edges_insert_incidence': f"""
+        AFTER INSERT ON edges BEGIN {_ADD_EDGE.format(row='NEW')} END
+    """,
+    'trg_edges_delete_incidence': f"""
+        AFTER DELETE ON edges BEGIN {_REMOVE_EDGE.format(row='OLD')} END
+    """,
+    'trg_edges_update_incidence': f"""
+        AFTER UPDATE OF subject_id, object_id, relation_type, event_date, event_day ON edges
+        WHEN OLD.subject_id IS NOT NEW.subject_id OR OLD.object_id IS NOT NEW.object_id
+          OR OLD.relation_type IS NOT NEW.relation_type OR OLD.event_date IS NOT NEW.event_date
+          OR OLD.event_day IS NOT NEW.event_day
+        BEGIN {_REMOVE_EDGE.format(row='OLD')} {_ADD_EDGE.format(row='NEW')} END
+    """,
+}
+
+
+def create_table(execute: Callable, db_type: str = 'sqlite'):
+    """Table + covering indexes (WITHOUT ROWID on SQLite: the PK is the table)."""
+    without_rowid = ' WITHOUT ROWID' if db_type == 'sqlite' else ''
+    execute(TABLE_SQL.format(without_rowid=without_rowid), None)
+    for sql in INDEX_SQL:
+        execute(sql, None)
+
+
+def create_sqlite_triggers(conn):
+    """Install the maintenance triggers on a SQLite connection."""
+    for name, body in SQLITE_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+def drop(execute: Callable, db_type: str = 'sqlite'):
+    """Drop the table (and its SQLite triggers) before a schema change."""
+    if db_type == 'sqlite':
+        for name in SQLITE_TRIGGERS:
+            execute(f"DROP TRIGGER IF EXISTS {name}", None)
+    execute("DROP TABLE IF EXISTS entity_edges", None)
+
+
+def rebuild(execute: Callable):
+    """Refill entity_edges from edges (two set-based inserts)."""
+    execute("DELETE FROM entity_edges", None)
+    execute("""
+        INSERT INTO entity_edges (entity_id, other_id, relation_type, event_date, event_day,
+                                  edge_id)
+        SELECT subject_id, object_id, relation_type, event_date, event_day, edge_id FROM edges
+    """, None)
+    execute("""
+        INSERT INTO entity_edges (entity_id, other_id, relation_type, event_date, event_day,
+                                  edge_id)
+        SELECT object_id, subject_id, relation_type, event_date, event_day, edge_id FROM edges
+        WHERE object_id != subject_id
+    """, None)
+    # Without statistics the planner prefers the primary key (relation_type
+    # equality) over a day range on idx_entity_edges_day
+    execute("ANALYZE entity_edges", None)
+
+
+def record_edge(execute: Callable, edge_id: int, subject_id: int, object_id: int,
+                relation_type: str, event_date: Optional[str], event_day: Optional[int]):
+    """Application-side maintenance (no triggers): a newly inserted edge."""
+    for entity_id, other_id in {(subject_id, object_id), (object_id, subject_id)}:
+        execute("""
+            INSERT INTO entity_edges (entity_id, other_id, relation_type, event_date, event_day,
+                                      edge_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT DO NOTHING
+        """, (entity_id, other_id, relation_type, event_date, event_day, edge_id)).close()
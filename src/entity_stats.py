@@ -0,0 +1,226 @@
+"""
+Per-entity aggregates maintained on the write path.
+
+entity_stats holds, per (entity, relation type): degree (distinct edges),
+interactions (sum of edge occurrences) and the first/last event date.
+entities.degree / first_seen / last_interaction are the totals over all
+relation types, so status and relationship_strength (see scoring.py) can
+be rescored for a handful of entities after each fact instead of a full
+enrichment pass. max_degree excludes the owner (Olga), who is connected
+to everyone.
+
+SQLite keeps the aggregates with triggers (any writer, including scripts,
+stays consistent); the universal DB calls record_edge() from _create_edge.
+All SQL uses '?' placeholders and takes an execute(query, params) callable.
+"""
+
+from typing import Callable, Iterable, Optional
+
+OWNER_QUERY = """
+    SELECT entity_id FROM identifiers
+    WHERE identifier LIKE '%olga%' OR identifier LIKE '%rozet%'
+    LIMIT 1
+"""
+
+TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS entity_stats (
+        entity_id INTEGER NOT NULL,
+        relation_type TEXT NOT NULL,
+        degree INTEGER NOT NULL DEFAULT 0,
+        interactions INTEGER NOT NULL DEFAULT 0,
+        first_date TEXT,
+        last_date TEXT,
+        PRIMARY KEY (entity_id, relation_type)
+    )
+"""
+
+INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_entities_degree ON entities(degree)"
+
+# Edge row (NEW/OLD) → +1 edge for its subject and object (a self-loop once)
+_ADD_EDGE = """
+    INSERT INTO entity_stats (entity_id, relation_type, degree, interactions,
+                              first_date, last_date)
+    SELECT entity_id, {row}.relation_type, 1, {row}.occurrences,
+           {row}.event_date, {row}.event_date
+    FROM (SELECT {row}.subject_id AS entity_id UNION SELECT {row}.object_id)
+    WHERE true
+    ON CONFLICT (entity_id, relation_type) DO UPDATE SET
+        degree = degree + 1,
+        interactions = interactions + excluded.interactions,
+        first_date = COALESCE(MIN(first_date, excluded.first_date),
+                              first_date, excluded.first_date),
+        last_date = COALESCE(MAX(last_date, excluded.last_date),
+                             last_date, excluded.last_date);
+"""
+
+# −1 edge; a removed boundary date is looked up again among remaining edges
+_REMOVE_EDGE = """
+    UPDATE entity_stats SET
+        degree = degree - 1,
+        interactions = interactions - {row}.occurrences,
+        first_date = CASE WHEN first_date = {row}.event_date THEN (
+            SELECT MIN(event_date) FROM edges
+            WHERE (subject_id = entity_stats.entity_id OR object_id = entity_stats.entity_id)
+              AND relation_type = entity_stats.relation_type
+        ) ELSE first_date END,
+        last_date = CASE WHEN last_date = {row}.event_date THEN (
+            SELECT MAX(event_date) FROM edges
+            WHERE (subject_id = entity_stats.entity_id OR object_id = entity_stats.entity_id)
+              AND relation_type = entity_stats.relation_type
+        ) ELSE last_date END
+    WHERE entity_id IN ({row}.subject_id, {row}.object_id)
+      AND relation_type = {row}.relation_type;
+    DELETE FROM entity_stats
+    WHERE entity_id IN ({row}.subject_id, {row}.object_id)
+      AND relation_type = {row}.relation_type
+      AND degree <= 0;
+"""
+
+_SYNC_ENTITY = """
+    UPDATE entities SET
+        degree = (SELECT COALESCE(SUM(degree), 0) FROM entity_stats
+                  WHERE entity_id = {row}.entity_id),
+        first_seen = (SELECT MIN(first_date) FROM entity_stats
+                      WHERE entity_id = {row}.entity_id),
+        last_interaction = (SELECT MAX(last_date) FROM entity_stats
+                            WHERE entity_id = {row}.entity_id)
+    WHERE entity_id = {row}.entity_id;
+"""
+
+_KEY_CHANGED = """
+    OLD.subject_id IS NOT NEW.subject_id OR OLD.object_id IS NOT NEW.object_id
+    OR OLD.relation_type IS NOT NEW.relation_type OR OLD.event_date IS NOT NEW.event_date
+"""
+
+SQLITE_TRIGGERS = {
+    'trg_edges_insert_stats': f"""
+        AFTER INSERT ON edges BEGIN {_ADD_EDGE.format(row='NEW')} END
+    """,
+    'trg_edges_delete_stats': f"""
+        AFTER DELETE ON edges BEGIN {_REMOVE_EDGE.format(row='OLD')} END
+    """,
+    'trg_edges_occurrences_stats': f"""
+        AFTER UPDATE OF occurrences ON edges
+        WHEN NOT ({_KEY_CHANGED}) AND OLD.occurrences IS NOT NEW.occurrences
+        BEGIN
+            UPDATE entity_stats SET interactions = interactions + NEW.occurrences - OLD.occurrences
+            WHERE entity_id IN (NEW.subject_id, NEW.object_id)
+              AND relation_type = NEW.relation_type;
+        END
+    """,
+    'trg_edges_key_stats': f"""
+        AFTER UPDATE OF subject_id, object_id, relation_type, event_date ON edges
+        WHEN {_KEY_CHANGED}
+        BEGIN {_REMOVE_EDGE.format(row='OLD')} {_ADD_EDGE.format(row='NEW')} END
+    """,
+    'trg_entity_stats_insert_sync': f"""
+        AFTER INSERT ON entity_stats BEGIN {_SYNC_ENTITY.format(row='NEW')} END
+    """,
+    'trg_entity_stats_update_sync': f"""
+        AFTER UPDATE ON entity_stats BEGIN {_SYNC_ENTITY.format(row='NEW')} END
+    """,
+    'trg_entity_stats_delete_sync': f"""
+        AFTER DELETE ON entity_stats BEGIN {_SYNC_ENTITY.format(row='OLD')} END
+    """,
+}
+
+
+def create_sqlite_triggers(conn):
+    """Install the maintenance triggers on a SQLite connection."""
+    for name, body in SQLITE_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+def rebuild(execute: Callable):
+    """Recompute entity_stats from edges (one set-based pass)."""
+    execute("DELETE FROM entity_stats", None)
+    execute("""
+        INSERT INTO entity_stats (entity_id, relation_type, degree, interactions,
+                                  first_date, last_date)
+        SELECT entity_id, relation_type, COUNT(*), SUM(occurrences),
+               MIN(event_date), MAX(event_date)
+        FROM (
+            SELECT subject_id AS entity_id, relation_type, occurrences, event_date
+            FROM edges
+            UNION ALL
+            SELECT object_id, relation_type, occurrences, event_date
+            FROM edges
+            WHERE object_id != subject_id
+        ) AS sides
+        GROUP BY entity_id, relation_type
+    """, None)
+
+
+def record_edge(execute: Callable, subject_id: int, object_id: int, relation_type: str,
+                event_date: Optional[str], new_edge: bool):
+    """
+    Application-side maintenance (no triggers): a new edge, or one more
+    occurrence of an existing edge.
+    """
+    for entity_id in {subject_id, object_id}:
+        if new_edge:
+            execute("""
+                INSERT INTO entity_stats (entity_id, relation_type, degree, interactions,
+                                          first_date, last_date)
+                VALUES (?, ?, 1, 1, ?, ?)
+                ON CONFLICT (entity_id, relation_type) DO UPDATE SET
+                    degree = entity_stats.degree + 1,
+                    interactions = entity_stats.interactions + 1,
+                    first_date = CASE
+                        WHEN entity_stats.first_date IS NULL
+                          OR excluded.first_date < entity_stats.first_date
+                        THEN COALESCE(excluded.first_date, entity_stats.first_date)
+                        ELSE entity_stats.first_date END,
+                    last_date = CASE
+                        WHEN entity_stats.last_date IS NULL
+                          OR excluded.last_date > entity_stats.last_date
+                        THEN COALESCE(excluded.last_date, entity_stats.last_date)
+                        ELSE entity_stats.last_date END
+            """, (entity_id, relation_type, event_date, event_date)).close()
+        else:
+            execute("""
+                UPDATE entity_stats SET interactions = interactions + 1
+                WHERE entity_id = ? AND relation_type = ?
+            """, (entity_id, relation_type)).close()
+    if new_edge:
+        sync_entities(execute, {subject_id, object_id})
+
+
+def sync_entities(execute: Callable, entity_ids: Optional[Iterable[int]] = None):
+    """Copy totals from entity_stats to entities (all entities if ids is None)."""
+    where, params = '', None
+    if entity_ids is not None:
+        entity_ids = list(entity_ids)
+        where = f"WHERE entity_id IN ({','.join('?' * len(entity_ids))})"
+        params = tuple(entity_ids)
+    execute(f"""
+        UPDATE entities SET
+            degree = (SELECT COALESCE(SUM(degree), 0) FROM entity_stats s
+                      WHERE s.entity_id = entities.entity_id),
+            first_seen = (SELECT MIN(first_date) FROM entity_stats s
+                          WHERE s.entity_id = entities.entity_id),
+            last_interaction = (SELECT MAX(last_date) FROM entity_stats s
+                                WHERE s.entity_id = entities.entity_id)
+        {where}
+    """, params).close()
+
+
+def owner_id(execute: Callable) -> Optional[int]:
+    """entity_id of the graph owner (excluded from max_degree)."""
+    cursor = execute(OWNER_QUERY, None)
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else None
+
+
+def max_degree(execute: Callable, exclude: Optional[int] = None) -> int:
+    """Largest entities.degree, skipping `exclude` (index walk, not a scan)."""
+    cursor = execute("""
+        SELECT degree FROM entities
+        WHERE degree IS NOT NULL AND entity_id != ?
+        ORDER BY degree DESC
+        LIMIT 1
+    """, (-1 if exclude is None else exclude,))
+    row = cursor.fetchone()
+    cursor.close()
+    return (row[0] if row else 0) or 1
@@ -0,0 +1,112 @@
+"""
+Typed event dates: edges.event_day / edges.event_ts next to event_date.
+
+event_date stays the text as imported (ISO date, ISO datetime with a
+timezone from process_calendar, or NULL). On write the DB also stores
+
+    event_day  days since 1970-01-01 of the calendar date as written
+               (the YYYY-MM-DD prefix, no timezone shift)
+    event_ts   Unix seconds (naive datetimes and plain dates taken as UTC)
+
+so "in year Y" / "in the last N years" are integer ranges on
+idx_edges_relation_day (relation_type, event_day):
+
+    start, end = year_range(2024)
+    ... WHERE relation_type = 'co_attended' AND event_day >= ? AND event_day < ?
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+EPOCH = date(1970, 1, 1)
+
+COLUMNS = (('event_day', 'INTEGER'), ('event_ts', 'BIGINT'))
+
+INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_edges_relation_day ON edges(relation_type, event_day)",
+    "CREATE INDEX IF NOT EXISTS idx_edges_event_day ON edges(event_day)",
+)
+
+
+def day_number(day: date) -> int:
+    """Days since 1970-01-01."""
+    return (day - EPOCH).days
+
+
+def from_day_number(day: int) -> date:
+    return EPOCH + timedelta(days=day)
+
+
+def parse_event_date(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """event_date text → (event_day, event_ts); (None, None) if not a date."""
+    if not value:
+        return None, None
+    try:
+        day = date.fromisoformat(value[:10])
+    except ValueError:
+        return None, None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        moment = datetime(day.year, day.month, day.day)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return day_number(day), int(moment.timestamp())
+
+
+def to_day(value) -> int:
+    """date / datetime / 'YYYY-MM-DD...' → day number (for range bounds)."""
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return day_number(value)
+
+
+def year_range(year: int) -> Tuple[int, int]:
+    """[first day, first day of next year) of a year."""
+    return day_number(date(year, 1, 1)), day_number(date(year + 1, 1, 1))
+
+
+def days_ago(days: int, today: Optional[date] = None) -> int:
+    """Day number `days` before today ("last N years" = days_ago(N * 365))."""
+    return day_number(today or date.today()) - days
+
+
+def backfill(conn, db_type: str = 'sqlite') -> int:
+    """
+    Fill event_day/event_ts for edges written without them (migration,
+    raw inserts). Each distinct event_date is parsed once; rows are
+    updated with one UPDATE ... FROM join. Does not commit; returns the
+    rows updated.
+    """
+    mark = '%s' if db_type == 'postgresql' else '?'
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT DISTINCT event_date FROM edges
+        WHERE event_day IS NULL AND event_date IS NOT NULL
+    """)
+    parsed = [(value, *parse_event_date(value)) for (value,) in cursor.fetchall()]
+    parsed = [row for row in parsed if row[1] is not None]
+    if not parsed:
+        cursor.close()
+        return 0
+
+    cursor.execute("DROP TABLE IF EXISTS event_days")
+    cursor.execute("""
+        CREATE TEMP TABLE event_days (
+            event_date TEXT PRIMARY KEY,
+            event_day INTEGER,
+            event_ts BIGINT
+        )
+    """)
+    cursor.executemany(f"INSERT INTO event_days VALUES ({mark}, {mark}, {mark})", parsed)
+    cursor.execute("""
+        UPDATE edges SET event_day = d.event_day, event_ts = d.event_ts
+        FROM event_days d
+        WHERE edges.event_date = d.event_date AND edges.event_day IS NULL
+    """)
+    updated = cursor.rowcount
+    cursor.execute("DROP TABLE event_days")
+    cursor.close()
+    return updated
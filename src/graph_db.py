@@ -1,24 +1,45 @@
 """SQLite Graph Database with Fact Reification."""
 
 import sqlite3
-import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional
 from pathlib import Path
 from datetime import datetime
 
+import text_search
+from graph_export import EXPORT_CHUNK_SIZE, JSONGraphWriter, iter_rows, open_export
+from sqlite_concurrency import SQLiteConnections, concurrency_enabled, retry_on_busy
+
 
 class GraphDB:
     """SQLite-based Graph Database."""
     
-    def __init__(self, db_path: str = "data/contacts.db"):
-        """Initialize SQLite database."""
+    def __init__(self, db_path: str = "data/contacts.db", concurrent: Optional[bool] = None):
+        """
+        Initialize SQLite database.
+        
+        Args:
+            db_path: Path to SQLite file
+            concurrent: WAL + dedicated writer + thread-local readers
+                (default: CONTACTS_DB_CONCURRENT env var)
+        """
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(exist_ok=True)
         
-        self.conn = sqlite3.connect(str(self.db_path))
-        self.conn.row_factory = sqlite3.Row
+        if concurrency_enabled(concurrent):
+            self._connections = SQLiteConnections(str(self.db_path))
+            self.conn = self._connections.writer
+        else:
+            self._connections = None
+            self.conn = sqlite3.connect(str(self.db_path))
+            self.conn.row_factory = sqlite3.Row
         self._create_schema()
     
+    def reader(self) -> sqlite3.Connection:
+        """Connection for read queries (thread-local in concurrent mode)."""
+        if self._connections:
+            return self._connections.reader()
+        return self.conn
+    
     def _create_schema(self):
         """Create database schema."""
         cursor = self.conn.cursor()
@@ -56,6 +77,7 @@ class GraphDB:
                 confidence REAL NOT NULL,
                 context TEXT,
                 created_at TIMESTAMP,
+                event_date TEXT,  -- when it happened (calendar: event start)
                 FOREIGN KEY (subject_id) REFERENCES nodes(canonical_id),
                 FOREIGN KEY (object_id) REFERENCES nodes(canonical_id)
             )
@@ -77,81 +99,178 @@ class GraphDB:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_facts_subject ON facts(subject_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_facts_object ON facts(object_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_facts_type ON facts(relation_type)")
-        
+
+        # facts.event_date (databases created before the column)
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(facts)")}
+        if "event_date" not in columns:
+            cursor.execute("ALTER TABLE facts ADD COLUMN event_date TEXT")
+            self._backfill_event_dates(cursor)
+
+        # co_attended in a year, last meeting per contact, years with data
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_facts_type_date ON facts(relation_type, event_date)"
+        )
+
+        # Full-text search over node names and fact contexts (triggers);
+        # INSERT OR REPLACE must fire the delete triggers too
+        self.conn.execute("PRAGMA recursive_triggers = ON")
+        if text_search.create_graph_db_index(self.conn):
+            text_search.rebuild_graph_db_index(self.conn)
+
         self.conn.commit()
+
+    @staticmethod
+    def _backfill_event_dates(cursor) -> int:
+        """
+        One-time backfill of facts.event_date from the event nodes written
+        by process_calendar (metadata {'date': start, 'id': uid}):
+        participated_in points at the event node, co_attended carries the
+        event uid at the end of fact_id ("{p1}:co_attended:{p2}:{uid}").
+        """
+        cursor.execute("""
+            UPDATE facts SET event_date = (
+                SELECT json_extract(n.metadata, '$.date')
+                FROM nodes n
+                WHERE n.canonical_id = CASE facts.relation_type
+                    WHEN 'participated_in' THEN facts.object_id
+                    ELSE 'event:' || substr(facts.fact_id, length(
+                        facts.subject_id || ':co_attended:' || facts.object_id || ':') + 1)
+                END
+                  AND n.type = 'Event' AND json_valid(n.metadata)
+            )
+            WHERE relation_type IN ('participated_in', 'co_attended')
+              AND event_date IS NULL
+        """)
+        return cursor.rowcount
     
     def close(self):
         """Close database connection."""
-        self.conn.close()
+        if self._connections:
+            self._connections.close()
+        else:
+            self.conn.close()
     
     def store_fact(self, fact: Dict[str, Any]):
         """Store a single fact with reification."""
-        cursor = self.conn.cursor()
+        self.store_facts([fact])
+    
+    def store_facts(self, facts: Iterable[Dict[str, Any]], batch_size: int = 1000) -> int:
+        """
+        Store many facts with reification (bulk path).
         
-        # 1. Insert/update Source
-        cursor.execute("""
-            INSERT INTO sources (url, authority, first_seen, last_processed)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(url) DO UPDATE SET last_processed = ?
-        """, (
-            fact["source_url"],
-            fact.get("authority", 1.0),
-            datetime.now().isoformat(),
-            datetime.now().isoformat(),
-            datetime.now().isoformat()
-        ))
-        
-        # 2. Insert Nodes (subject and object) if not exist
-        for node_key in ["subject", "object"]:
-            cursor.execute("""
+        Each batch is written in one transaction: sources are upserted once
+        per document, nodes, facts and claims go through executemany, and a
+        single timestamp is shared by every row of the call.
+        
+        Args:
+            facts: Iterable of fact dicts (same keys as store_fact;
+                optional event_date: ISO date/datetime of the event)
+            batch_size: Number of facts per transaction
+            
+        Returns:
+            Number of facts stored
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        
+        now = datetime.now().isoformat()
+        stored = 0
+        batch = []
+        
+        for fact in facts:
+            batch.append(fact)
+            if len(batch) >= batch_size:
+                stored += self._store_batch(batch, now)
+                batch = []
+        
+        if batch:
+            stored += self._store_batch(batch, now)
+        
+        return stored
+    
+    @retry_on_busy
+    def _store_batch(self, facts: List[Dict[str, Any]], now: str) -> int:
+        """Write one batch of facts in a single transaction."""
+        sources = {}
+        nodes = {}
+        
+        for fact in facts:
+            sources.setdefault(fact["source_url"], fact.get("authority", 1.0))
+            for node_key in ["subject", "object"]:
+                nodes.setdefault(fact[f"{node_key}_canonical_id"], (
+                    fact[f"{node_key}_canonical_id"],
+                    fact[f"{node_key}_name"],
+                    fact[f"{node_key}_type"],
+                    now
+                ))
+        
+        with self.conn:
+            # 1. Insert/update Sources (once per document)
+            self.conn.executemany("""
+                INSERT INTO sources (url, authority, first_seen, last_processed)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET last_processed = excluded.last_processed
+            """, [(url, authority, now, now) for url, authority in sources.items()])
+            
+            # 2. Insert Nodes (subject and object) if not exist
+            self.conn.executemany("""
                 INSERT OR IGNORE INTO nodes (canonical_id, name, type, first_seen)
                 VALUES (?, ?, ?, ?)
-            """, (
-                fact[f"{node_key}_canonical_id"],
-                fact[f"{node_key}_name"],
-                fact[f"{node_key}_type"],
-                datetime.now().isoformat()
-            ))
-        
-        # 3. Insert Fact
-        cursor.execute("""
-            INSERT OR REPLACE INTO facts 
-            (fact_id, relation_type, subject_id, object_id, start_date, end_date, 
-             confidence, context, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            fact["fact_id"],
-            fact["relation_type"],
-            fact["subject_canonical_id"],
-            fact["object_canonical_id"],
-            fact.get("start_date"),
-            fact.get("end_date"),
-            fact["confidence"],
-            fact.get("context", ""),
-            datetime.now().isoformat()
-        ))
-        
-        # 4. Insert Claim
-        cursor.execute("""
-            INSERT OR REPLACE INTO claims (source_url, fact_id, confidence_llm)
-            VALUES (?, ?, ?)
-        """, (
-            fact["source_url"],
-            fact["fact_id"],
-            fact["confidence"]
-        ))
+            """, list(nodes.values()))
+            
+            # 3. Insert Facts
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO facts 
+                (fact_id, relation_type, subject_id, object_id, start_date, end_date, 
+                 confidence, context, created_at, event_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(
+                fact["fact_id"],
+                fact["relation_type"],
+                fact["subject_canonical_id"],
+                fact["object_canonical_id"],
+                fact.get("start_date"),
+                fact.get("end_date"),
+                fact["confidence"],
+                fact.get("context", ""),
+                now,
+                fact.get("event_date")
+            ) for fact in facts])
+            
+            # 4. Insert Claims
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO claims (source_url, fact_id, confidence_llm)
+                VALUES (?, ?, ?)
+            """, [(
+                fact["source_url"],
+                fact["fact_id"],
+                fact["confidence"]
+            ) for fact in facts])
         
-        self.conn.commit()
+        return len(facts)
     
     def query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """Execute SQL query."""
-        cursor = self.conn.cursor()
+        cursor = self.reader().cursor()
         cursor.execute(sql, params)
         return [dict(row) for row in cursor.fetchall()]
     
+    def search_events(self, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Events whose name or participation contexts match text (FTS5, best first).
+        
+        Returns:
+            Dicts: name, canonical_id, event_date, participants,
+            snippet (matches in [ ]), score
+        """
+        match = text_search.fts_query(text)
+        if not match:
+            return []
+        return self.query(text_search.EVENT_SEARCH_SQL, (match, match, limit, match, match))
+    
     def get_stats(self) -> Dict[str, int]:
         """Get database statistics."""
-        cursor = self.conn.cursor()
+        cursor = self.reader().cursor()
         
         stats = {}
         
@@ -189,36 +308,58 @@ class GraphDB:
         """
         return self.query(sql, (person_name,))
     
-    def export_graph_json(self, output_path: str = "data/graph.json"):
-        """Export graph to JSON for visualization."""
-        # Get all nodes
-        nodes = self.query("SELECT canonical_id, name, type FROM nodes")
-        
-        # Get all facts with source info
-        facts = self.query("""
-            SELECT 
-                f.*,
-                n_subj.name as subject_name,
-                n_obj.name as object_name,
-                s.url as source_url
-            FROM facts f
-            JOIN nodes n_subj ON f.subject_id = n_subj.canonical_id
-            JOIN nodes n_obj ON f.object_id = n_obj.canonical_id
-            JOIN claims c ON f.fact_id = c.fact_id
-            JOIN sources s ON c.source_url = s.url
-        """)
+    def export_graph_json(self, output_path: str = "data/graph.json", fmt: str = "json",
+                          compress: Optional[bool] = None, since: Optional[str] = None,
+                          chunk_size: int = EXPORT_CHUNK_SIZE):
+        """
+        Export graph to JSON for visualization.
+
+        Streams nodes and edges (fmt='json' document or fmt='ndjson' lines);
+        since → only facts dated (event_date, else start_date, else
+        created_at) on/after it.
+        """
+        fact_filter = ""
+        params: tuple = ()
+        if since is not None:
+            fact_filter = "WHERE COALESCE(f.event_date, f.start_date, f.created_at) >= ?"
+            params = (since,)
         
-        graph = {
-            "nodes": nodes,
-            "edges": facts,
-            "metadata": {
-                "created": datetime.now().isoformat(),
-                "stats": self.get_stats()
-            }
+        metadata = {
+            "created": datetime.now().isoformat(),
+            "stats": self.get_stats()
         }
         
-        Path(output_path).parent.mkdir(exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(graph, f, indent=2, ensure_ascii=False)
+        conn = self.reader()
+        with open_export(output_path, compress) as out, \
+                JSONGraphWriter(out, fmt, links_key="edges", metadata=metadata,
+                                chunk_size=chunk_size) as writer:
+            if since is None:
+                cursor = conn.execute("SELECT canonical_id, name, type FROM nodes")
+            else:
+                cursor = conn.execute(f"""
+                    SELECT canonical_id, name, type FROM nodes
+                    WHERE canonical_id IN (
+                        SELECT f.subject_id FROM facts f {fact_filter}
+                        UNION
+                        SELECT f.object_id FROM facts f {fact_filter}
+                    )
+                """, params * 2)
+            writer.nodes(dict(row) for row in iter_rows(cursor, chunk_size))
+            
+            # Facts with source info
+            cursor = conn.execute(f"""
+                SELECT 
+                    f.*,
+                    n_subj.name as subject_name,
+                    n_obj.name as object_name,
+                    s.url as source_url
+                FROM facts f
+                JOIN nodes n_subj ON f.subject_id = n_subj.canonical_id
+                JOIN nodes n_obj ON f.object_id = n_obj.canonical_id
+                JOIN claims c ON f.fact_id = c.fact_id
+                JOIN sources s ON c.source_url = s.url
+                {fact_filter}
+            """, params)
+            writer.links(dict(row) for row in iter_rows(cursor, chunk_size))
         
         return output_path
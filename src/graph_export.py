@@ -0,0 +1,218 @@
+"""
+Streaming graph exporters (GraphML, JSON, NDJSON).
+
+Rows are pulled from the cursor in chunks and written straight to the
+output, so peak memory doesn't depend on the number of nodes/edges.
+Output is gzip-compressed when requested (or when the path ends in .gz).
+"""
+
+import gzip
+import json
+import re
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+EXPORT_CHUNK_SIZE = 5000
+
+JSON_FORMATS = ('json', 'ndjson')
+
+# Characters not allowed in XML 1.0 documents (even escaped)
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def open_export(output_path: str, compress: Optional[bool] = None) -> TextIO:
+    """
+    Open an export file for writing text.
+
+    compress=None → gzip if the path ends with '.gz'.
+    """
+    path = Path(output_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if compress is None:
+        compress = path.suffix == '.gz'
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
+
+
+def iter_rows(cursor, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator:
+    """Iterate a cursor with fetchmany() instead of fetchall()."""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def _xml_text(value) -> str:
+    if isinstance(value, float):
+        text = repr(value)
+    else:
+        text = str(value)
+    return escape(_XML_INVALID.sub('', text))
+
+
+class GraphMLWriter:
+    """
+    Incremental GraphML writer.
+
+    Keys are declared up front as (id, for, attr.type); nodes and edges
+    are written one element at a time. None values are omitted.
+
+        with GraphMLWriter(f, node_keys, edge_keys) as writer:
+            writer.node(1, label='Ольга')
+            writer.edge(1, 1, 2, relation='co_attended')
+    """
+
+    def __init__(self, stream: TextIO,
+                 node_keys: Iterable[Tuple[str, str]],
+                 edge_keys: Iterable[Tuple[str, str]],
+                 directed: bool = True):
+        self.stream = stream
+        self.node_keys = list(node_keys)
+        self.edge_keys = list(edge_keys)
+        self.directed = directed
+
+    def __enter__(self):
+        write = self.stream.write
+        write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        for domain, keys in (('node', self.node_keys), ('edge', self.edge_keys)):
+            for key, attr_type in keys:
+                write(f'  <key id={quoteattr(key)} for="{domain}" '
+                      f'attr.name={quoteattr(key)} attr.type="{attr_type}"/>\n')
+        edgedefault = 'directed' if self.directed else 'undirected'
+        write(f'  <graph id="G" edgedefault="{edgedefault}">\n')
+        return self
+
+    def _data(self, data: Dict) -> str:
+        return ''.join(
+            f'<data key={quoteattr(key)}>{_xml_text(value)}</data>'
+            for key, value in data.items() if value is not None
+        )
+
+    def node(self, node_id, **data):
+        self.stream.write(
+            f'    <node id={quoteattr(str(node_id))}>{self._data(data)}</node>\n'
+        )
+
+    def edge(self, edge_id, source, target, **data):
+        self.stream.write(
+            f'    <edge id={quoteattr(str(edge_id))} source={quoteattr(str(source))} '
+            f'target={quoteattr(str(target))}>{self._data(data)}</edge>\n'
+        )
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stream.write('  </graph>\n</graphml>\n')
+        return False
+
+
+# One shared encoder: json.dumps() with options builds a new one per call
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def _dumps(obj) -> str:
+    return _ENCODER.encode(obj)
+
+
+class JSONGraphWriter:
+    """
+    Incremental JSON graph writer.
+
+    fmt='json'   → one D3-compatible document:
+                   {"nodes":[...],"links":[...],"metadata":{...}}
+    fmt='ndjson' → one record per line, tagged with "kind"
+                   (metadata, node, link) — for jq / pipelines.
+
+    All nodes must be written before the first link. Array keys are
+    configurable so existing export layouts are preserved. nodes()/links()
+    encode whole chunks at once, which is much faster than per record.
+    """
+
+    def __init__(self, stream: TextIO, fmt: str = 'json', nodes_key: str = 'nodes',
+                 links_key: str = 'links', metadata: Optional[Dict[str, Any]] = None,
+                 chunk_size: int = EXPORT_CHUNK_SIZE):
+        if fmt not in JSON_FORMATS:
+            raise ValueError(f"Unknown JSON format '{fmt}' (available: {', '.join(JSON_FORMATS)})")
+        self.stream = stream
+        self.fmt = fmt
+        self.nodes_key = nodes_key
+        self.links_key = links_key
+        self.metadata = metadata
+        self.chunk_size = chunk_size
+        self._section = None
+        self._first = True
+
+    def __enter__(self):
+        if self.fmt == 'ndjson':
+            if self.metadata is not None:
+                self.stream.write(_dumps({'kind': 'metadata', **self.metadata}) + '\n')
+        else:
+            self.stream.write('{')
+        return self
+
+    def _open_section(self, section: str):
+        if self._section == section:
+            return
+        if section == 'nodes' and self._section == 'links':
+            raise ValueError("nodes must be written before links")
+        if self.fmt == 'json':
+            if self._section is not None:
+                self.stream.write('],')
+            key = self.nodes_key if section == 'nodes' else self.links_key
+            self.stream.write(f'{_dumps(key)}:[')
+        self._section = section
+        self._first = True
+
+    def _write_chunk(self, section: str, kind: str, records: List[Dict[str, Any]]):
+        self._open_section(section)
+        if not records:
+            return
+        if self.fmt == 'ndjson':
+            self.stream.write(''.join(
+                _dumps({'kind': kind, **record}) + '\n' for record in records
+            ))
+            return
+        # "[{...},{...}]" → "{...},{...}"
+        body = _dumps(records)[1:-1]
+        self.stream.write(body if self._first else ',' + body)
+        self._first = False
+
+    def _write_all(self, section: str, kind: str, records: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                self._open_section(section)
+                return count
+            self._write_chunk(section, kind, chunk)
+            count += len(chunk)
+
+    def node(self, record: Dict[str, Any]):
+        self._write_chunk('nodes', 'node', [record])
+
+    def link(self, record: Dict[str, Any]):
+        self._write_chunk('links', 'link', [record])
+
+    def nodes(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Write many nodes; returns how many."""
+        return self._write_all('nodes', 'node', records)
+
+    def links(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Write many links; returns how many."""
+        return self._write_all('links', 'link', records)
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.fmt == 'json':
+            # Always emit both arrays, even if empty
+            if self._section is None:
+                self._open_section('nodes')
+            self._open_section('links')
+            self.stream.write(']')
+            if self.metadata is not None:
+                self.stream.write(f',"metadata":{_dumps(self.metadata)}')
+            self.stream.write('}\n')
+        return False
@@ -0,0 +1,162 @@
+"""
+In-memory adjacency index over the edges table.
+
+Built once with a single scan, then kept current by EnhancedGraphDB.add_fact
+(fact hook). Neighbor lookups and degrees are dict/set operations instead
+of `subject_id = X OR object_id = X` self-joins; path search lives in
+path_engine.
+"""
+
+import heapq
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+Relations = Optional[Union[str, Iterable[str]]]
+
+
+class GraphIndex:
+    """
+    Undirected neighbor index with relation-type and date filters.
+
+    _adj[entity][relation][neighbor] → edge_ids (an edge between X and Y
+    is visible from both sides; a self-loop once).
+    """
+
+    def __init__(self):
+        # edge_id → (subject_id, object_id, relation_type, event_date)
+        self.edges: Dict[int, Tuple[int, int, str, Optional[str]]] = {}
+        self._adj: Dict[int, Dict[str, Dict[int, List[int]]]] = defaultdict(
+            lambda: defaultdict(dict)
+        )
+        # source_id → relation → entities mentioned together (edges.source_id)
+        self._sources: Dict[int, Dict[str, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self.data_version: Optional[int] = None
+        # Bumped on every new edge (derived caches check it)
+        self.revision = 0
+
+    @classmethod
+    def from_db(cls, conn, chunk_size: int = 50_000) -> 'GraphIndex':
+        """Build from an EnhancedGraphDB connection (one scan of edges)."""
+        index = cls()
+        in_transaction = conn.in_transaction
+        if not in_transaction:
+            conn.execute("BEGIN")
+        try:
+            index.data_version = conn.execute(
+                "SELECT version FROM graph_version WHERE id = 1"
+            ).fetchone()[0]
+            cursor = conn.execute("""
+                SELECT edge_id, subject_id, object_id, relation_type, event_date, source_id
+                FROM edges
+            """)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    index.add_edge(*row)
+        finally:
+            if not in_transaction:
+                conn.execute("COMMIT")
+        return index
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple]) -> 'GraphIndex':
+        """
+        Build from (edge_id, subject_id, object_id, relation_type, event_date,
+        source_id) rows — any backend (e.g. the web UI's PostgreSQL connection).
+        """
+        index = cls()
+        for row in rows:
+            index.add_edge(*row)
+        return index
+
+    def add_edge(self, edge_id: int, subject_id: int, object_id: int, relation_type: str,
+                 event_date: Optional[str] = None, source_id: Optional[int] = None):
+        """Register an edge (idempotent: known edge_ids are ignored)."""
+        if edge_id in self.edges:
+            return
+        self.edges[edge_id] = (subject_id, object_id, relation_type, event_date)
+        self.revision += 1
+        self._adj[subject_id][relation_type].setdefault(object_id, []).append(edge_id)
+        if object_id != subject_id:
+            self._adj[object_id][relation_type].setdefault(subject_id, []).append(edge_id)
+        if source_id is not None:
+            members = self._sources[source_id][relation_type]
+            members.add(subject_id)
+            members.add(object_id)
+
+    def on_fact(self, fact: Dict):
+        """EnhancedGraphDB fact hook."""
+        self.add_edge(fact['edge_id'], fact['subject_id'], fact['object_id'],
+                      fact['relation_type'], fact['event_date'], fact['source_id'])
+        self.data_version = fact['data_version']
+
+    def _relations(self, entity_id: int, relations: Relations) -> List[Dict[int, List[int]]]:
+        by_relation = self._adj.get(entity_id)
+        if not by_relation:
+            return []
+        if relations is None:
+            return list(by_relation.values())
+        if isinstance(relations, str):
+            relations = (relations,)
+        return [by_relation[r] for r in relations if r in by_relation]
+
+    def _in_range(self, edge_ids: List[int], since: Optional[str], until: Optional[str]) -> bool:
+        for edge_id in edge_ids:
+            event_date = self.edges[edge_id][3]
+            if event_date is None:
+                continue
+            if since is not None and event_date < since:
+                continue
+            if until is not None and event_date[:len(until)] > until:
+                continue
+            return True
+        return False
+
+    def neighbors(self, entity_id: int, relations: Relations = None,
+                  since: Optional[str] = None, until: Optional[str] = None) -> Set[int]:
+        """
+        Entities sharing an edge with entity_id, either direction.
+
+        since/until (ISO dates, inclusive) keep only neighbors with at least
+        one dated edge in range.
+        """
+        result: Set[int] = set()
+        for neighbors in self._relations(entity_id, relations):
+            if since is None and until is None:
+                result.update(neighbors)
+            else:
+                result.update(other for other, edge_ids in neighbors.items()
+                              if self._in_range(edge_ids, since, until))
+        return result
+
+    def degree(self, entity_id: int, relations: Relations = None) -> int:
+        """Number of distinct edges touching entity_id."""
+        return sum(len(edge_ids)
+                   for neighbors in self._relations(entity_id, relations)
+                   for edge_ids in neighbors.values())
+
+    def top_degree(self, relations: Relations = None, top: int = 10,
+                   exclude: Iterable[int] = ()) -> List[Tuple[int, int]]:
+        """[(entity_id, degree)] by degree desc, entity_id asc."""
+        exclude = set(exclude)
+        degrees = ((entity_id, self.degree(entity_id, relations))
+                   for entity_id in self._adj if entity_id not in exclude)
+        return heapq.nsmallest(top, ((e, d) for e, d in degrees if d),
+                               key=lambda item: (-item[1], item[0]))
+
+    def common_neighbors(self, a: int, b: int, relations: Relations = None) -> Set[int]:
+        """Entities connected to both a and b."""
+        return self.neighbors(a, relations) & self.neighbors(b, relations)
+
+    def source_groups(self, relation: str, min_size: int = 1) -> Dict[int, Set[int]]:
+        """source_id → entities linked by `relation` in that source."""
+        return {
+            source_id: by_relation[relation]
+            for source_id, by_relation in self._sources.items()
+            if len(by_relation.get(relation, ())) >= min_size
+        }
+
+    def __len__(self) -> int:
+        return len(self.edges)
@@ -0,0 +1,277 @@
+"""
+Binary CSR snapshot of the graph (Graph Zone → NumPy).
+
+One file holds a JSON header followed by 64-byte aligned arrays:
+
+    entity_ids, entity_types, label_offsets, label_bytes   — nodes
+    indptr, indices, edge_ids, relations,
+    confidence, occurrences, event_dates                   — CSR by subject
+    in_indptr, in_edges                                    — reverse index
+
+Loading memory-maps the file, so every array is a zero-copy view and a
+script gets the whole graph in milliseconds. The header records the DB
+data version the snapshot was built from (see EnhancedGraphDB.data_version).
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+MAGIC = b'CGSNAP1\n'
+ALIGN = 64
+FORMAT_VERSION = 1
+
+NODE_ARRAYS = ('entity_ids', 'entity_types', 'label_offsets', 'label_bytes')
+EDGE_ARRAYS = ('indptr', 'indices', 'edge_ids', 'relations', 'confidence',
+               'occurrences', 'event_dates', 'in_indptr', 'in_edges')
+
+
+class StaleSnapshotError(RuntimeError):
+    """Snapshot was built from an older version of the database."""
+
+
+def _parse_dates(values: List[Optional[str]]) -> np.ndarray:
+    """'YYYY-MM-DD[...]' strings → datetime64[D] (NaT when missing/invalid)."""
+    try:
+        return np.array([value[:10] if value else 'NaT' for value in values],
+                        dtype='datetime64[D]')
+    except ValueError:
+        dates = np.empty(len(values), dtype='datetime64[D]')
+        for i, value in enumerate(values):
+            try:
+                dates[i] = np.datetime64(value[:10] if value else 'NaT', 'D')
+            except ValueError:
+                dates[i] = np.datetime64('NaT')
+        return dates
+
+
+def build_arrays(conn, chunk_size: int = 50_000) -> Dict:
+    """
+    Read entities and edges (EnhancedGraphDB schema) into CSR arrays.
+
+    Returns {'arrays': {...}, 'relations': [...], 'entity_types': [...],
+    'dropped_edges': n} — edges pointing at missing entities are dropped.
+    """
+    rows = conn.execute("SELECT entity_id, label, type FROM entities ORDER BY entity_id").fetchall()
+    entity_ids = np.array([row[0] for row in rows], dtype=np.int64)
+
+    type_names = sorted({row[2] or '' for row in rows})
+    type_codes = {name: code for code, name in enumerate(type_names)}
+    entity_types = np.array([type_codes[row[2] or ''] for row in rows], dtype=np.int16)
+
+    encoded = [(row[1] or '').encode('utf-8') for row in rows]
+    label_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(label) for label in encoded], out=label_offsets[1:])
+    label_bytes = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    del rows, encoded
+
+    relation_names: List[str] = []
+    relation_codes: Dict[str, int] = {}
+    edge_ids, subjects, objects, relations = [], [], [], []
+    confidence, occurrences, event_dates = [], [], []
+
+    cursor = conn.execute("""
+        SELECT edge_id, subject_id, object_id, relation_type, confidence,
+               occurrences, event_date
+        FROM edges
+        ORDER BY subject_id, object_id, edge_id
+    """)
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            break
+        for edge_id, subject_id, object_id, relation, conf, occ, event_date in chunk:
+            code = relation_codes.get(relation)
+            if code is None:
+                code = relation_codes[relation] = len(relation_names)
+                relation_names.append(relation)
+            edge_ids.append(edge_id)
+            subjects.append(subject_id)
+            objects.append(object_id)
+            relations.append(code)
+            confidence.append(1.0 if conf is None else conf)
+            occurrences.append(occ or 1)
+            event_dates.append(event_date)
+
+    n = len(entity_ids)
+    subject_ids = np.array(subjects, dtype=np.int64)
+    object_ids = np.array(objects, dtype=np.int64)
+    src = np.searchsorted(entity_ids, subject_ids)
+    dst = np.searchsorted(entity_ids, object_ids)
+    valid = (src < n) & (dst < n)
+    valid[valid] = ((entity_ids[src[valid]] == subject_ids[valid]) &
+                    (entity_ids[dst[valid]] == object_ids[valid]))
+
+    src, dst = src[valid], dst[valid]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+
+    # Reverse index: positions of incoming edges, grouped by object
+    in_edges = np.argsort(dst, kind='stable').astype(np.int64)
+    in_indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(dst, minlength=n), out=in_indptr[1:])
+
+    arrays = {
+        'entity_ids': entity_ids,
+        'entity_types': entity_types,
+        'label_offsets': label_offsets,
+        'label_bytes': label_bytes,
+        'indptr': indptr,
+        'indices': dst.astype(np.int32),
+        'edge_ids': np.array(edge_ids, dtype=np.int64)[valid],
+        'relations': np.array(relations, dtype=np.int16)[valid],
+        'confidence': np.array(confidence, dtype=np.float32)[valid],
+        'occurrences': np.array(occurrences, dtype=np.int32)[valid],
+        'event_dates': _parse_dates(event_dates)[valid],
+        'in_indptr': in_indptr,
+        'in_edges': in_edges,
+    }
+    return {
+        'arrays': arrays,
+        'relations': relation_names,
+        'entity_types': type_names,
+        'dropped_edges': int((~valid).sum()),
+    }
+
+
+def write_snapshot(path: str, built: Dict, data_version: int) -> Dict:
+    """Write arrays from build_arrays() to a single snapshot file (atomically)."""
+    arrays = built['arrays']
+    layout = {}
+    offset = 0
+    for name in NODE_ARRAYS + EDGE_ARRAYS:
+        array = np.ascontiguousarray(arrays[name])
+        offset += (-offset) % ALIGN
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+
+    header = {
+        'format': FORMAT_VERSION,
+        'data_version': data_version,
+        'created_at': datetime.now().isoformat(),
+        'nodes': int(len(arrays['entity_ids'])),
+        'edges': int(len(arrays['edge_ids'])),
+        'relations': built['relations'],
+        'entity_types': built['entity_types'],
+        'arrays': layout,
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    # Data section starts aligned after magic + length + header
+    preamble = len(MAGIC) + 8 + len(header_bytes)
+    data_start = preamble + (-preamble) % ALIGN
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(data_start.to_bytes(8, 'little'))
+        f.write(header_bytes)
+        f.write(b'\0' * (data_start - preamble))
+        for name in NODE_ARRAYS + EDGE_ARRAYS:
+            array = np.ascontiguousarray(arrays[name])
+            f.write(b'\0' * (data_start + layout[name]['offset'] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_header(path: str) -> Dict:
+    """Snapshot header (without mapping the arrays)."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a graph snapshot")
+        data_start = int.from_bytes(f.read(8), 'little')
+        raw = f.read(data_start - len(MAGIC) - 8)
+    header = json.loads(raw.rstrip(b'\0').decode('utf-8'))
+    header['data_start'] = data_start
+    return header
+
+
+class GraphSnapshot:
+    """
+    Memory-mapped, read-only view of a snapshot file.
+
+    Nodes are addressed by position (0..nodes-1); entity_ids maps a
+    position to entity_id and index_of() goes the other way. Out-edges of
+    node i are indptr[i]:indptr[i+1]; in_edges lists edge positions grouped
+    by object node (in_indptr).
+    """
+
+    def __init__(self, path: str, mmap: bool = True):
+        self.path = str(path)
+        self.header = read_header(path)
+        buffer = np.memmap(path, dtype=np.uint8, mode='r') if mmap else \
+            np.fromfile(path, dtype=np.uint8)
+        start = self.header['data_start']
+        for name, spec in self.header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            offset = start + spec['offset']
+            view = buffer[offset:offset + count * dtype.itemsize].view(dtype)
+            setattr(self, name, view.reshape(spec['shape']))
+        self.relation_names: List[str] = self.header['relations']
+        self.entity_type_names: List[str] = self.header['entity_types']
+        self.data_version: int = self.header['data_version']
+
+    @property
+    def num_nodes(self) -> int:
+        return self.header['nodes']
+
+    @property
+    def num_edges(self) -> int:
+        return self.header['edges']
+
+    @property
+    def sources(self) -> np.ndarray:
+        """Subject position of every edge (expanded from indptr)."""
+        return np.repeat(np.arange(self.num_nodes, dtype=np.int32), np.diff(self.indptr))
+
+    def index_of(self, entity_id: int) -> int:
+        """Node position for an entity_id (KeyError if absent)."""
+        i = int(np.searchsorted(self.entity_ids, entity_id))
+        if i >= self.num_nodes or self.entity_ids[i] != entity_id:
+            raise KeyError(entity_id)
+        return i
+
+    def label(self, i: int) -> str:
+        start, end = self.label_offsets[i], self.label_offsets[i + 1]
+        return bytes(self.label_bytes[start:end]).decode('utf-8')
+
+    def entity_type(self, i: int) -> str:
+        return self.entity_type_names[self.entity_types[i]]
+
+    def relation_code(self, relation: str) -> int:
+        """Dictionary code of a relation type (-1 if not in the snapshot)."""
+        try:
+            return self.relation_names.index(relation)
+        except ValueError:
+            return -1
+
+    def out_edges(self, i: int) -> slice:
+        return slice(int(self.indptr[i]), int(self.indptr[i + 1]))
+
+    def in_edge_positions(self, i: int) -> np.ndarray:
+        return self.in_edges[self.in_indptr[i]:self.in_indptr[i + 1]]
+
+    def neighbors(self, i: int) -> np.ndarray:
+        """Distinct neighbor positions, ignoring direction."""
+        outgoing = self.indices[self.out_edges(i)]
+        incoming = self.sources_of(self.in_edge_positions(i))
+        return np.union1d(outgoing, incoming)
+
+    def sources_of(self, edge_positions: np.ndarray) -> np.ndarray:
+        """Subject positions for given edge positions (binary search in indptr)."""
+        return (np.searchsorted(self.indptr, edge_positions, side='right') - 1).astype(np.int32)
+
+    def check_version(self, data_version: int):
+        """Raise StaleSnapshotError if the DB has changed since the snapshot."""
+        if data_version != self.data_version:
+            raise StaleSnapshotError(
+                f"Snapshot {self.path} is stale (built at data version "
+                f"{self.data_version}, database is at {data_version})"
+            )
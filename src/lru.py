@@ -0,0 +1,67 @@
+"""Small bounded LRU mapping with hit/miss counters."""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Tuple
+
+
+class LRUCache:
+    """
+    Bounded least-recently-used cache.
+
+    Used for identifier → entity_id resolution and query results.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 100_000):
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return cached value (and mark it recent) or default."""
+        value = self._data.get(key, self._MISSING)
+        if value is self._MISSING:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        """Insert or refresh a value, evicting the oldest entry if full."""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def update(self, items: Iterable[Tuple[Hashable, Any]]):
+        """Bulk insert (e.g. preload)."""
+        for key, value in items:
+            self.put(key, value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key."""
+        return self._data.pop(key, default)
+
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def info(self) -> Dict[str, int]:
+        """Hit/miss counters and size."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'maxsize': self.maxsize
+        }
@@ -99,11 +99,12 @@ def main():
             entities = er.resolve(result["entities"])
             log(f"   After ER: {len(entities)} canonical entities")
             
-            # 5. Store to Neo4j
+            # 5. Store to graph (one transaction per document)
+            facts = []
             for relation in result["relations"]:
                 try:
                     # Build fact dict
-                    fact = {
+                    facts.append({
                         "source_url": url,
                         "authority": 1.0,  # Seed = high authority
                         "fact_id": generate_fact_id(relation),
@@ -118,15 +119,15 @@ def main():
                         "end_date": relation.get("temporal", {}).get("end_iso"),
                         "confidence": relation.get("confidence", 0.8),
                         "context": relation.get("context", "")
-                    }
-                    
-                    db.store_fact(fact)
-                    total_facts += 1
+                    })
                     
                 except Exception as e:
-                    log(f"   ⚠️  Failed to store relation: {e}")
+                    log(f"   ⚠️  Failed to build relation: {e}")
+            
+            stored = db.store_facts(facts)
+            total_facts += stored
             
-            log(f"   ✓ Stored {num_relations} facts")
+            log(f"   ✓ Stored {stored} facts")
             
         except Exception as e:
             log(f"❌ Error processing {url}: {e}")
@@ -0,0 +1,210 @@
+"""
+Ego networks: the neighborhood of one contact, straight from the database.
+
+    for kind, record in expand(execute, anna_id, depth=2):
+        ...                                         # ('node', {...}) / ('edge', {...})
+    write_json(stream, expand(...))                 # D3 nodes/links
+    write_graphml(stream, expand(...))              # Gephi
+
+Nodes are discovered level by level: one query per frontier chunk over
+entity_edges (index range per entity) joined to edges for the filters,
+strongest ties first, until max_nodes. Hubs — degree above max_degree,
+e.g. the owner — are kept as nodes but not expanded (the center always
+is). Each level's nodes are yielded as soon as they are found; then the
+edges among all found nodes (the induced subgraph) follow in one query.
+The full graph is never loaded.
+
+execute(query, params) takes neutral SQL (sql_dialect: '?', IN (?) lists).
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple, Union
+
+import event_time
+from graph_export import EXPORT_CHUNK_SIZE, JSON_FORMATS, GraphMLWriter, JSONGraphWriter
+
+DEPTH = 2
+MAX_NODES = 500
+HUB_DEGREE = 200
+
+FORMATS = ('graphml',) + JSON_FORMATS
+
+# Entity ids per IN (?) list
+CHUNK = 500
+
+NODE_KEYS = [('label', 'string'), ('type', 'string'), ('status', 'string'),
+             ('relationship_strength', 'double'), ('degree', 'int'), ('depth', 'int'),
+             ('hub', 'boolean')]
+EDGE_KEYS = [('relation', 'string'), ('confidence', 'double'), ('event_date', 'string'),
+             ('occurrences', 'int')]
+
+NODES_SQL = """
+    SELECT entity_id, label, type, status, relationship_strength, degree
+    FROM entities WHERE entity_id IN (?)
+"""
+
+
+def resolve(execute: Callable, entity: Union[int, str]) -> Optional[int]:
+    """entity_id for an id, an identifier (email, phone, ...) or a label."""
+    if isinstance(entity, int):
+        return entity
+    for query in ("SELECT entity_id FROM identifiers WHERE identifier = ? LIMIT 1",
+                  "SELECT entity_id FROM entities WHERE label = ? LIMIT 1"):
+        cursor = execute(query, (entity,))
+        row = cursor.fetchone()
+        cursor.close()
+        if row:
+            return row[0]
+    return None
+
+
+def _filters(relation_types: Optional[Sequence[str]], min_confidence: Optional[float],
+             date_range: Optional[Tuple[Optional[str], Optional[str]]]) -> Tuple[str, tuple]:
+    """Extra WHERE terms on entity_edges ee / edges e, and their params."""
+    where = ''
+    params = ()
+    if relation_types:
+        where += " AND ee.relation_type IN (?)"
+        params += (list(relation_types),)
+    if min_confidence is not None:
+        where += " AND e.confidence >= ?"
+        params += (min_confidence,)
+    since, until = date_range or (None, None)
+    if since is not None:
+        where += " AND e.event_day >= ?"
+        params += (event_time.to_day(since),)
+    if until is not None:
+        where += " AND e.event_day <= ?"
+        params += (event_time.to_day(until),)
+    return where, params
+
+
+def _chunks(items: List[int], size: int = CHUNK) -> Iterator[List[int]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _nodes(execute: Callable, entity_ids: List[int], depth: int,
+           max_degree: Optional[int]) -> List[Dict]:
+    records = []
+    for chunk in _chunks(entity_ids):
+        cursor = execute(NODES_SQL, (chunk,))
+        rows = {row[0]: row for row in cursor.fetchall()}
+        cursor.close()
+        for entity_id in chunk:
+            _, label, entity_type, status, strength, degree = rows.get(
+                entity_id, (entity_id, None, None, None, None, None))
+            records.append({
+                'id': entity_id, 'label': label, 'type': entity_type, 'status': status,
+                'relationship_strength': strength, 'degree': degree, 'depth': depth,
+                'hub': max_degree is not None and (degree or 0) > max_degree,
+            })
+    return records
+
+
+def expand(execute: Callable, center: int, depth: int = DEPTH,
+           relation_types: Optional[Sequence[str]] = None,
+           min_confidence: Optional[float] = None,
+           date_range: Optional[Tuple[Optional[str], Optional[str]]] = None,
+           max_nodes: int = MAX_NODES,
+           max_degree: Optional[int] = HUB_DEGREE) -> Iterator[Tuple[str, Dict]]:
+    """
+    Stream the ego network of center: ('node', record) per contact (with
+    its depth and hub flag), then ('edge', record) per edge among them.
+
+    date_range: (since, until) ISO dates, inclusive; either may be None.
+    max_degree=None expands hubs too.
+    """
+    where, params = _filters(relation_types, min_confidence, date_range)
+    neighbors_sql = f"""
+        SELECT ee.other_id, SUM(e.occurrences) AS weight
+        FROM entity_edges ee
+        JOIN edges e ON e.edge_id = ee.edge_id
+        WHERE ee.entity_id IN (?) AND ee.other_id != ee.entity_id{where}
+        GROUP BY ee.other_id
+        ORDER BY weight DESC, ee.other_id
+        LIMIT ?
+    """
+
+    [root] = _nodes(execute, [center], 0, max_degree)
+    yield 'node', root
+    known = {center}
+    frontier = [center]
+    for level in range(1, depth + 1):
+        found: List[int] = []
+        for chunk in _chunks(frontier):
+            if len(known) >= max_nodes:
+                break
+            cursor = execute(neighbors_sql, (chunk,) + params + (max_nodes + len(known),))
+            for other_id, _ in cursor.fetchall():
+                if other_id not in known and len(known) < max_nodes:
+                    known.add(other_id)
+                    found.append(other_id)
+            cursor.close()
+        if not found:
+            break
+        records = _nodes(execute, found, level, max_degree)
+        for record in records:
+            yield 'node', record
+        frontier = [record['id'] for record in records if not record['hub']]
+
+    # Induced edges, each once (from its subject side)
+    members = sorted(known)
+    edges_sql = f"""
+        SELECT e.edge_id, e.subject_id, e.object_id, e.relation_type, e.confidence,
+               e.event_date, e.occurrences
+        FROM entity_edges ee
+        JOIN edges e ON e.edge_id = ee.edge_id
+        WHERE ee.entity_id IN (?) AND ee.other_id IN (?)
+          AND ee.entity_id = e.subject_id{where}
+    """
+    for chunk in _chunks(members):
+        cursor = execute(edges_sql, (chunk, members) + params)
+        for edge_id, subject_id, object_id, relation, confidence, event_date, occurrences \
+                in cursor.fetchall():
+            yield 'edge', {'id': edge_id, 'source': subject_id, 'target': object_id,
+                           'relation': relation, 'confidence': confidence,
+                           'event_date': event_date, 'occurrences': occurrences}
+        cursor.close()
+
+
+def write_graphml(stream: TextIO, records: Iterator[Tuple[str, Dict]]) -> Dict[str, int]:
+    """Write an expand() stream as GraphML, element by element; returns counts."""
+    counts = {'nodes': 0, 'edges': 0}
+    with GraphMLWriter(stream, NODE_KEYS, EDGE_KEYS) as writer:
+        for kind, record in records:
+            if kind == 'node':
+                data = {key: record[key] for key, _ in NODE_KEYS}
+                data['hub'] = 'true' if data['hub'] else 'false'
+                writer.node(record['id'], **data)
+                counts['nodes'] += 1
+            else:
+                writer.edge(record['id'], record['source'], record['target'],
+                            **{key: record[key] for key, _ in EDGE_KEYS})
+                counts['edges'] += 1
+    return counts
+
+
+def write_json(stream: TextIO, records: Iterator[Tuple[str, Dict]], fmt: str = 'json',
+               metadata: Optional[Dict] = None,
+               chunk_size: int = EXPORT_CHUNK_SIZE) -> Dict[str, int]:
+    """Write an expand() stream as JSON / NDJSON (nodes/links); returns counts."""
+    counts = {'nodes': 0, 'edges': 0}
+    with JSONGraphWriter(stream, fmt, metadata=metadata, chunk_size=chunk_size) as writer:
+        for kind, record in records:
+            if kind == 'node':
+                writer.node(record)
+                counts['nodes'] += 1
+            else:
+                writer.link(record)
+                counts['edges'] += 1
+    return counts
+
+
+def write(stream: TextIO, records: Iterator[Tuple[str, Dict]], fmt: str = 'json',
+          metadata: Optional[Dict] = None) -> Dict[str, int]:
+    """write_graphml / write_json by format name (FORMATS)."""
+    if fmt == 'graphml':
+        return write_graphml(stream, records)
+    if fmt not in JSON_FORMATS:
+        raise ValueError(f"Unknown format '{fmt}' (available: {', '.join(FORMATS)})")
+    return write_json(stream, records, fmt, metadata)
@@ -0,0 +1,398 @@
+"""
+Path finding over a GraphIndex: introduction chains.
+
+- shortest_path: bidirectional BFS (fewest hops)
+- warmest_path: Dijkstra where entering a contact costs 1 / relationship_strength,
+  so chains through strong relationships win
+- k_paths: top-k loopless alternatives (Yen's algorithm, Lawler's refinement)
+
+All searches accept relation-type filters and a max depth (hops). With
+SciPy installed, weighted searches first compute the exact cost-to-target
+tree in C (sparse Dijkstra); it answers unbounded queries directly and
+guides A* for hop-bounded and Yen spur searches.
+"""
+
+import heapq
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from graph_index import GraphIndex
+
+# Optional: SciPy sparse graph routines (fast cost-to-target trees)
+try:
+    import numpy as np
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra as sparse_dijkstra
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+Relations = Optional[Union[str, Iterable[str]]]
+Path = List[int]
+
+MIN_STRENGTH = 0.001
+INF = float('inf')
+
+
+class PathFinder:
+    """
+    Intro-chain search over an undirected GraphIndex.
+
+    strengths: entity_id → relationship_strength (0..1); missing or
+    smaller values are clamped to min_strength. Neighbor lists are cached
+    per relation filter and dropped when the index gets new edges.
+    """
+
+    def __init__(self, index: GraphIndex, strengths: Optional[Dict[int, float]] = None,
+                 min_strength: float = MIN_STRENGTH):
+        self.index = index
+        self.min_strength = min_strength
+        self.default_cost = 1.0 / min_strength
+        self.costs = {
+            entity_id: 1.0 / max(strength or 0.0, min_strength)
+            for entity_id, strength in (strengths or {}).items()
+        }
+        self._adjacency: Dict[object, Dict[int, Tuple[int, ...]]] = {}
+        self._matrices: Dict[object, Tuple] = {}
+        self._trees: Dict[bool, Tuple] = {}
+        self._revision = index.revision
+
+    def entry_cost(self, entity_id: int) -> float:
+        """Cost of stepping onto a contact: inverse relationship strength."""
+        return self.costs.get(entity_id, self.default_cost)
+
+    def path_cost(self, path: Path, weighted: bool = True) -> float:
+        if not weighted:
+            return float(len(path) - 1)
+        return sum(self.entry_cost(node) for node in path[1:])
+
+    def _key(self, relations: Relations):
+        if self._revision != self.index.revision:
+            self._adjacency.clear()
+            self._matrices.clear()
+            self._trees.clear()
+            self._revision = self.index.revision
+        if relations is None or isinstance(relations, str):
+            return relations
+        return frozenset(relations)
+
+    def _adjacency_for(self, relations: Relations) -> Dict[int, Tuple[int, ...]]:
+        """node → neighbors (cached per relation filter)."""
+        key = self._key(relations)
+        adjacency = self._adjacency.get(key)
+        if adjacency is None:
+            adjacency = self._adjacency[key] = _LazyAdjacency(self.index, relations)
+        return adjacency
+
+    def _target_tree(self, target: int, relations: Relations, weighted: bool):
+        """
+        Exact cost from every node to target (SciPy): (positions, costs, next_hop).
+
+        The sparse matrix holds arc u → v weighted by u's entry cost, i.e.
+        the reversed graph, so one Dijkstra from target gives cost-to-target.
+        """
+        key = self._key(relations)
+        # One cached tree per weighting (k_paths reuses it for every spur)
+        tree_key = (key, target)
+        cached = self._trees.get(weighted)
+        if cached is not None and cached[0] == tree_key:
+            return cached[1]
+        matrix = self._matrices.get(key)
+        if matrix is None:
+            adjacency = self._adjacency_for(relations)
+            nodes = list(self.index._adj)
+            positions = {node: i for i, node in enumerate(nodes)}
+            degrees = np.fromiter((len(adjacency[node]) for node in nodes),
+                                  dtype=np.int64, count=len(nodes))
+            columns = np.fromiter((positions[other] for node in nodes for other in adjacency[node]),
+                                  dtype=np.int32, count=int(degrees.sum()))
+            indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+            np.cumsum(degrees, out=indptr[1:])
+            row_costs = np.array([self.entry_cost(node) for node in nodes], dtype=np.float64)
+            graph = csr_matrix((np.repeat(row_costs, degrees), columns, indptr),
+                               shape=(len(nodes), len(nodes)))
+            matrix = self._matrices[key] = (nodes, positions, graph)
+        nodes, positions, graph = matrix
+        if target not in positions:
+            tree = (positions, None, None)
+        else:
+            dist, pred = sparse_dijkstra(graph, indices=positions[target],
+                                         unweighted=not weighted, return_predecessors=True)
+            tree = (positions, dist.tolist(), pred)
+        self._trees[weighted] = (tree_key, tree)
+        return tree
+
+    def _heuristic(self, target: int, relations: Relations, weighted: bool):
+        """
+        Admissible A* heuristic: exact unblocked cost-to-target (or None).
+        weighted=False gives the hop distance, used to prune hop-bounded search.
+        """
+        if not SCIPY_AVAILABLE:
+            return None
+        positions, dist, _ = self._target_tree(target, relations, weighted)
+        if dist is None:
+            return lambda node: INF
+        return lambda node: dist[positions[node]] if node in positions else INF
+
+    # ------------------------------------------------------------------
+    # Unweighted
+    # ------------------------------------------------------------------
+
+    def shortest_path(self, source: int, target: int, relations: Relations = None,
+                      max_depth: Optional[int] = None) -> Optional[Path]:
+        """Fewest-hops path via bidirectional BFS (None if none within max_depth)."""
+        if source == target:
+            return [source]
+        adjacency = self._adjacency_for(relations)
+        # node → (parent, depth) per side
+        visited = ({source: (None, 0)}, {target: (None, 0)})
+        frontiers = ([source], [target])
+        hops = 0
+        while frontiers[0] and frontiers[1] and (max_depth is None or hops < max_depth):
+            # Expand one full level of the smaller frontier
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            seen, other_seen = visited[side], visited[1 - side]
+            next_frontier, meetings = [], []
+            for node in frontiers[side]:
+                depth = seen[node][1] + 1
+                for other in adjacency[node]:
+                    if other in seen:
+                        continue
+                    seen[other] = (node, depth)
+                    next_frontier.append(other)
+                    if other in other_seen:
+                        meetings.append(other)
+            frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+            hops += 1
+            if meetings:
+                meeting = min(meetings, key=lambda m: (visited[0][m][1] + visited[1][m][1], m))
+                return _join(meeting, lambda n: visited[0][n][0], lambda n: visited[1][n][0])
+        return None
+
+    # ------------------------------------------------------------------
+    # Weighted
+    # ------------------------------------------------------------------
+
+    def warmest_path(self, source: int, target: int, relations: Relations = None,
+                     max_depth: Optional[int] = None) -> Optional[Tuple[float, Path]]:
+        """Cheapest path by inverse relationship strength: (cost, path) or None."""
+        return self._search(source, target, relations, max_depth, weighted=True)
+
+    def _search(self, source: int, target: int, relations: Relations,
+                max_depth: Optional[int], weighted: bool,
+                blocked_nodes: Set[int] = frozenset(),
+                blocked_edges: Set[Tuple[int, int]] = frozenset()
+                ) -> Optional[Tuple[float, Path]]:
+        if source == target:
+            return 0.0, [source]
+        adjacency = self._adjacency_for(relations)
+        costs = self.costs if weighted else {}
+        default = self.default_cost if weighted else 1.0
+        if SCIPY_AVAILABLE:
+            if max_depth is None and not blocked_nodes and not blocked_edges:
+                return self._tree_path(source, target, relations, weighted)
+            hops_left = None if max_depth is None else self._heuristic(target, relations, False)
+            return _astar(adjacency, costs, default, source, target, max_depth,
+                          blocked_nodes, blocked_edges,
+                          self._heuristic(target, relations, weighted), hops_left)
+        if max_depth is None:
+            return _bidirectional_dijkstra(adjacency, costs, default, source, target,
+                                           blocked_nodes, blocked_edges)
+        return _astar(adjacency, costs, default, source, target, max_depth,
+                      blocked_nodes, blocked_edges, None)
+
+    def _tree_path(self, source: int, target: int, relations: Relations,
+                   weighted: bool) -> Optional[Tuple[float, Path]]:
+        """Follow next hops of the cost-to-target tree from source."""
+        positions, dist, next_hop = self._target_tree(target, relations, weighted)
+        if dist is None or source not in positions or dist[positions[source]] == INF:
+            return None
+        nodes = self._matrices[self._key(relations)][0]
+        path, i, goal = [source], positions[source], positions[target]
+        while i != goal:
+            i = int(next_hop[i])
+            path.append(nodes[i])
+        return self.path_cost(path, weighted), path
+
+    # ------------------------------------------------------------------
+    # Alternatives
+    # ------------------------------------------------------------------
+
+    def k_paths(self, source: int, target: int, k: int = 3, relations: Relations = None,
+                max_depth: Optional[int] = None, weighted: bool = True
+                ) -> List[Tuple[float, Path]]:
+        """Top-k loopless paths, cheapest first (Yen's algorithm)."""
+        first = self._search(source, target, relations, max_depth, weighted)
+        if first is None:
+            return []
+        # (cost, path, deviation index)
+        found = [(first[0], first[1], 0)]
+        candidates: List[Tuple[float, int, Path, int]] = []
+        seen_paths = {tuple(first[1])}
+        tie = count()
+
+        while len(found) < k:
+            _, previous, deviation = found[-1]
+            # Lawler: spurs before the deviation point were tried for the parent path
+            for i in range(deviation, len(previous) - 1):
+                spur_depth = None if max_depth is None else max_depth - i
+                if spur_depth is not None and spur_depth < 1:
+                    break
+                spur_node = previous[i]
+                root = previous[:i + 1]
+                blocked_edges = set()
+                for _, path, _ in found:
+                    if len(path) > i + 1 and path[:i + 1] == root:
+                        blocked_edges.add((path[i], path[i + 1]))
+                        blocked_edges.add((path[i + 1], path[i]))
+                spur = self._search(spur_node, target, relations, spur_depth, weighted,
+                                    set(root[:-1]), blocked_edges)
+                if spur is None:
+                    continue
+                path = root[:-1] + spur[1]
+                if tuple(path) in seen_paths:
+                    continue
+                seen_paths.add(tuple(path))
+                heapq.heappush(candidates,
+                               (self.path_cost(path, weighted), next(tie), path, i))
+            if not candidates:
+                break
+            cost, _, path, deviation = heapq.heappop(candidates)
+            found.append((cost, path, deviation))
+        return [(cost, path) for cost, path, _ in found]
+
+
+class _LazyAdjacency(dict):
+    """node → tuple of neighbors (self-loops dropped), filled on first access."""
+
+    def __init__(self, index: GraphIndex, relations: Relations):
+        super().__init__()
+        self.index = index
+        self.relations = relations
+
+    def __missing__(self, node: int) -> Tuple[int, ...]:
+        neighbors = self.index.neighbors(node, self.relations)
+        neighbors.discard(node)
+        result = self[node] = tuple(neighbors)
+        return result
+
+
+def _join(meeting: int, forward_parent, backward_parent) -> Path:
+    """Stitch source → meeting → target from two parent maps."""
+    path = [meeting]
+    while forward_parent(path[-1]) is not None:
+        path.append(forward_parent(path[-1]))
+    path.reverse()
+    while backward_parent(path[-1]) is not None:
+        path.append(backward_parent(path[-1]))
+    return path
+
+
+def _bidirectional_dijkstra(adjacency, costs, default, source, target,
+                            blocked_nodes, blocked_edges) -> Optional[Tuple[float, Path]]:
+    """
+    Node-weighted bidirectional Dijkstra. Forward distances include the
+    entry cost of the node itself, backward distances exclude it.
+    """
+    cost_of = costs.get
+    dist = ({source: 0.0}, {target: 0.0})
+    parents = ({source: None}, {target: None})
+    settled = (set(), set())
+    heaps = ([(0.0, source)], [(0.0, target)])
+    best, meeting = INF, None
+
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        heap, side_dist, side_parents = heaps[side], dist[side], parents[side]
+        other_dist = dist[1 - side]
+        cost, node = heapq.heappop(heap)
+        if node in settled[side]:
+            continue
+        settled[side].add(node)
+        # backward: stepping from other onto node costs node's entry cost
+        backward_step = cost_of(node, default) if side else 0.0
+        for other in adjacency[node]:
+            if other in blocked_nodes:
+                continue
+            if blocked_edges and (node, other) in blocked_edges:
+                continue
+            new_cost = cost + (backward_step if side else cost_of(other, default))
+            if new_cost < side_dist.get(other, INF):
+                side_dist[other] = new_cost
+                side_parents[other] = node
+                heapq.heappush(heap, (new_cost, other))
+            if other in other_dist:
+                total = side_dist[other] + other_dist[other]
+                if total < best:
+                    best, meeting = total, other
+
+    if meeting is None:
+        return None
+    return best, _join(meeting, parents[0].get, parents[1].get)
+
+
+def _astar(adjacency, costs, default, source, target, max_depth,
+           blocked_nodes, blocked_edges, heuristic, hops_left=None
+           ) -> Optional[Tuple[float, Path]]:
+    """
+    A* (plain Dijkstra without a heuristic), optionally hop-bounded.
+
+    Hop-bounded search is label setting over (node, hops): a state is only
+    worth expanding if no cheaper state reached node in fewer hops. The
+    heuristic must be consistent (exact unblocked cost-to-target is);
+    hops_left (a lower bound on remaining hops) prunes states that can't
+    reach target within max_depth.
+    """
+    # Cut off target: avoid sweeping the whole component
+    if not any(other not in blocked_nodes and (other, target) not in blocked_edges
+               for other in adjacency[target]):
+        return None
+
+    cost_of = costs.get
+    h = heuristic or (lambda node: 0.0)
+    bounded = max_depth is not None
+    limit = max_depth + 1 if bounded else 1
+
+    start_h = h(source)
+    if start_h == INF:
+        return None
+    heap = [(start_h, 0.0, 0, source)]
+    parents: Dict[Tuple[int, int], Optional[Tuple[int, int]]] = {(source, 0): None}
+    state_costs: Dict[Tuple[int, int], float] = {(source, 0): 0.0}
+    best_hops: Dict[int, int] = {}
+    while heap:
+        _, cost, hops, node = heapq.heappop(heap)
+        key = (node, hops if bounded else 0)
+        if cost > state_costs[key] or best_hops.get(node, limit) <= key[1]:
+            continue
+        best_hops[node] = key[1]
+        if node == target:
+            path, state = [], key
+            while state is not None:
+                path.append(state[0])
+                state = parents[state]
+            return cost, path[::-1]
+        if bounded and hops == max_depth:
+            continue
+        next_hops = hops + 1
+        next_key_hops = next_hops if bounded else 0
+        for other in adjacency[node]:
+            if other in blocked_nodes or best_hops.get(other, limit) <= next_key_hops:
+                continue
+            if blocked_edges and (node, other) in blocked_edges:
+                continue
+            state = (other, next_key_hops)
+            new_cost = cost + cost_of(other, default)
+            if new_cost >= state_costs.get(state, INF):
+                continue
+            estimate = h(other)
+            if estimate == INF:
+                continue
+            if hops_left is not None and next_hops + hops_left(other) > max_depth:
+                continue
+            state_costs[state] = new_cost
+            parents[state] = key
+            heapq.heappush(heap, (new_cost + estimate, new_cost, next_hops, other))
+    return None
@@ -0,0 +1,162 @@
+"""
+Query result cache keyed by the data version.
+
+    cache = QueryCache(maxsize=256)
+    rows = cache.fetch(query, params, token, lambda: run(query, params))
+
+An entry is keyed by (normalized SQL, params, token), where token is a
+cheap data version read before every query:
+
+    SQLite      the graph_version row, bumped by triggers (EnhancedGraphDB);
+                without it the edges row count + max edge_id
+    PostgreSQL  the graph_version row, bumped by statement-level triggers
+
+Both are the same for every connection, so entries are shared across
+thread-local readers. Writes made through the cache also invalidate it.
+
+When the data changes the token changes, older entries are never hit
+again and age out of the LRU. Without a token (no version row) queries
+run uncached.
+"""
+
+import re
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from lru import LRUCache
+
+# PostgreSQL: version row + statement-level triggers (one bump per statement)
+POSTGRES_VERSION_SQL = (
+    """CREATE TABLE IF NOT EXISTS graph_version (
+           id INTEGER PRIMARY KEY CHECK (id = 1),
+           version BIGINT NOT NULL
+       )""",
+    "INSERT INTO graph_version (id, version) VALUES (1, 0) ON CONFLICT DO NOTHING",
+    """CREATE OR REPLACE FUNCTION bump_graph_version() RETURNS trigger AS $$
+       BEGIN
+           UPDATE graph_version SET version = version + 1 WHERE id = 1;
+           RETURN NULL;
+       END
+       $$ LANGUAGE plpgsql""",
+) + tuple(
+    statement
+    for table in ('entities', 'identifiers', 'edges')
+    for statement in (
+        f"DROP TRIGGER IF EXISTS trg_{table}_version ON {table}",
+        f"""CREATE TRIGGER trg_{table}_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_graph_version()""",
+    )
+)
+
+# Quoted literals are kept verbatim, whitespace elsewhere collapses
+_SQL_TOKENS = re.compile(r"('(?:[^']|'')*')|\s+")
+
+
+def normalize_sql(query: str) -> str:
+    """SQL text with insignificant whitespace collapsed."""
+    return _SQL_TOKENS.sub(lambda m: m.group(1) or ' ', query).strip()
+
+
+def is_read_query(query: str) -> bool:
+    """SELECT / WITH ... SELECT (cacheable, safe on a reader connection)."""
+    return query.lstrip().upper().startswith(('SELECT', 'WITH'))
+
+
+def freeze(value: Any) -> Hashable:
+    """Params as a hashable key (lists for '= ANY(%s)' become tuples)."""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    return value
+
+
+def sqlite_data_version(conn) -> Optional[Hashable]:
+    """
+    graph_version row, else (edges row count, max edge_id); None when
+    neither table exists (queries run uncached). Not PRAGMA data_version:
+    that one counts per connection.
+    """
+    try:
+        row = conn.execute("SELECT version FROM graph_version WHERE id = 1").fetchone()
+        if row is not None:
+            return 'graph_version', row[0]
+    except sqlite3.OperationalError:
+        pass
+    try:
+        return tuple(conn.execute("SELECT COUNT(*), MAX(edge_id) FROM edges").fetchone())
+    except sqlite3.OperationalError:
+        return None
+
+
+def postgres_data_version(conn) -> Optional[int]:
+    """graph_version row (None if the table is missing: queries run uncached)."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT version FROM graph_version WHERE id = 1")
+        row = cursor.fetchone()
+        return row[0] if row else None
+    except Exception:
+        conn.rollback()
+        return None
+    finally:
+        cursor.close()
+
+
+class QueryCache:
+    """
+    LRU of query results for read queries.
+
+    Args:
+        maxsize: Max cached results
+        max_rows: Larger results are returned but not cached
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 256, max_rows: int = 10_000):
+        self.max_rows = max_rows
+        self.writes = 0
+        self.uncached = 0
+        self._results = LRUCache(maxsize)
+        self._lock = threading.Lock()
+
+    def fetch(self, query: str, params, token: Optional[Hashable],
+              run: Callable[[], Optional[List]]) -> Optional[List]:
+        """Cached result of run() for this query/params/data version."""
+        if token is None:
+            self.uncached += 1
+            return run()
+        key = (normalize_sql(query), freeze(params or ()), token, self.writes)
+        with self._lock:
+            rows = self._results.get(key, self._MISSING)
+        if rows is not self._MISSING:
+            return rows
+        rows = run()
+        if rows is not None and len(rows) <= self.max_rows:
+            with self._lock:
+                self._results.put(key, rows)
+        else:
+            self.uncached += 1
+        return rows
+
+    def invalidate(self):
+        """A write went through our own connection (may not bump the version token)."""
+        with self._lock:
+            self.writes += 1
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def info(self) -> Dict:
+        """LRU counters + hit rate, writes seen, uncached queries."""
+        with self._lock:
+            info = self._results.info()
+        lookups = info['hits'] + info['misses']
+        info['hit_rate'] = info['hits'] / lookups if lookups else 0.0
+        info['writes'] = self.writes
+        info['uncached'] = self.uncached
+        return info
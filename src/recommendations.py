@@ -0,0 +1,244 @@
+"""
+Q11 "whom to introduce": link prediction over the contact graph.
+
+    refresh(conn, 'sqlite')                      # full run, then incremental
+    recommend(execute, entity_id, 10)            # one index range
+
+A candidate for contact u is any two-hop contact c (u—w—c) that u is not
+linked to yet. Scores over common neighbors w, from sparse products of
+the binary adjacency A (degree k):
+
+    common_neighbors      |N(u) ∩ N(c)|                 A · A
+    adamic_adar           Σ 1 / log k(w)                A · diag(1/log k) · A
+    resource_allocation   Σ 1 / k(w)                    A · diag(1/k) · A
+
+Rows are scored in blocks; per contact only the top_k candidates by
+Adamic-Adar (then resource allocation, common neighbors) are kept, in
+recommendations(entity_id, rank, candidate_id, ...) — the primary key
+makes a lookup one range scan.
+
+The graph is communities.load_graph over co_attended edges without the
+owner (a common neighbor of everyone). recommendation_state records the
+edges version it was built from (derived_state.py); refresh() then only
+rescores contacts within two hops of new edges (their candidates, or
+their neighbors' degrees, moved).
+Deleted edges or other parameters → full run.
+"""
+
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+
+import derived_state
+import entity_stats
+from communities import WeightedGraph, load_graph
+
+RELATIONS = ('co_attended',)
+TOP_K = 20
+
+# Contacts scored per sparse product (bounds the two-hop matrix in memory)
+BLOCK = 2048
+
+TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS recommendations (
+        entity_id INTEGER NOT NULL,
+        rank INTEGER NOT NULL,
+        candidate_id INTEGER NOT NULL,
+        adamic_adar REAL NOT NULL,
+        resource_allocation REAL NOT NULL,
+        common_neighbors INTEGER NOT NULL,
+        PRIMARY KEY (entity_id, rank)
+    ){without_rowid}
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS recommendation_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        edge_rows INTEGER NOT NULL,
+        max_edge_id INTEGER,
+        relations TEXT,
+        exclude_owner INTEGER NOT NULL,
+        top_k INTEGER NOT NULL,
+        nodes INTEGER NOT NULL,
+        edges INTEGER NOT NULL,
+        seconds REAL,
+        computed_at TEXT
+    )
+    """,
+)
+
+STATE_COLUMNS = ('edge_rows', 'max_edge_id', 'relations', 'exclude_owner', 'top_k',
+                 'nodes', 'edges', 'seconds', 'computed_at')
+
+SCORE_COLUMNS = ('adamic_adar', 'resource_allocation', 'common_neighbors')
+
+# Neutral SQL (sql_dialect): '?' placeholders
+RECOMMEND_SQL = """
+    SELECT r.candidate_id, e.label, e.relationship_strength, e.status,
+           r.adamic_adar, r.resource_allocation, r.common_neighbors
+    FROM recommendations r
+    JOIN entities e ON e.entity_id = r.candidate_id
+    WHERE r.entity_id = ? AND e.type = 'Person'
+    ORDER BY r.rank
+    LIMIT ?
+"""
+
+
+def create_tables(execute: Callable, db_type: str = 'sqlite'):
+    """Top-k table (WITHOUT ROWID on SQLite) and the state row."""
+    without_rowid = ' WITHOUT ROWID' if db_type == 'sqlite' else ''
+    for sql in TABLES_SQL:
+        execute(sql.format(without_rowid=without_rowid), None)
+
+
+class LinkScorer:
+    """
+    Two-hop scores on a binary adjacency.
+
+    Args:
+        graph: WeightedGraph (weights are ignored: a link is a link)
+    """
+
+    def __init__(self, graph: WeightedGraph):
+        adjacency = csr_matrix(graph.matrix, dtype=np.float64, copy=True)
+        adjacency.setdiag(0)
+        adjacency.eliminate_zeros()
+        adjacency.data[:] = 1.0
+        self.graph = graph
+        self.adjacency = adjacency
+        degree = np.diff(adjacency.indptr).astype(np.float64)
+        # A degree-1 node is no common neighbor of two others: weight unused
+        with np.errstate(divide='ignore'):
+            self.adamic_adar = diags(np.where(degree > 1, 1.0 / np.log(degree), 0.0))
+            self.resource_allocation = diags(np.where(degree > 0, 1.0 / degree, 0.0))
+
+    def top(self, rows: np.ndarray, top_k: int = TOP_K) -> Dict[str, np.ndarray]:
+        """
+        Best candidates of the given rows (positions in graph.nodes).
+
+        Returns arrays: row, rank, candidate (positions) and SCORE_COLUMNS.
+        """
+        sub = self.adjacency[rows]
+        # Candidates: paths of length two, minus the contact itself and its links
+        paths = (sub @ self.adjacency).tocoo()
+        keep = (paths.col != rows[paths.row]) & \
+            (np.asarray(sub[paths.row, paths.col]).ravel() == 0)
+        row, candidate = paths.row[keep], paths.col[keep]
+        scores = {'common_neighbors': paths.data[keep]}
+        for column, weights in (('adamic_adar', self.adamic_adar),
+                                ('resource_allocation', self.resource_allocation)):
+            product = (sub @ weights @ self.adjacency).tocsr()
+            # Rounded: equal sums in another order must tie
+            scores[column] = np.round(np.asarray(product[row, candidate]).ravel(), 9)
+
+        # Per row: Adamic-Adar desc, then resource allocation, common neighbors,
+        # candidate entity_id (stable ranks)
+        order = np.lexsort((self.graph.nodes[candidate], -scores['common_neighbors'],
+                            -scores['resource_allocation'], -scores['adamic_adar'], row))
+        row = row[order]
+        starts = np.flatnonzero(np.r_[True, row[1:] != row[:-1]]) if len(row) else row
+        rank = np.arange(len(row)) - np.repeat(starts, np.diff(np.r_[starts, len(row)]))
+        best = rank < top_k
+        result = {'row': rows[row[best]], 'rank': rank[best], 'candidate': candidate[order][best]}
+        for column in SCORE_COLUMNS:
+            result[column] = scores[column][order][best]
+        return result
+
+
+def state(conn, db_type: str = 'sqlite') -> Optional[Dict]:
+    """What the stored recommendations were built from (None before the first run)."""
+    return derived_state.read_state(derived_state.connection_execute(conn, db_type),
+                                    'recommendation_state', STATE_COLUMNS)
+
+
+def _store_rows(conn, db_type: str, graph: WeightedGraph, scorer: LinkScorer,
+                rows: Optional[np.ndarray], top_k: int):
+    """Rescore rows (None: all) in blocks and replace their recommendations. No commit."""
+    mark = '%s' if db_type == 'postgresql' else '?'
+    cursor = conn.cursor()
+    if rows is None:
+        cursor.execute("DELETE FROM recommendations")
+        rows = np.arange(len(graph))
+    else:
+        cursor.executemany(f"DELETE FROM recommendations WHERE entity_id = {mark}",
+                           [(entity_id,) for entity_id in graph.nodes[rows].tolist()])
+    for start in range(0, len(rows), BLOCK):
+        best = scorer.top(rows[start:start + BLOCK], top_k)
+        cursor.executemany(
+            f"""INSERT INTO recommendations (entity_id, rank, candidate_id,
+                                             {', '.join(SCORE_COLUMNS)})
+                VALUES ({', '.join([mark] * 6)})""",
+            zip(graph.nodes[best['row']].tolist(), best['rank'].tolist(),
+                graph.nodes[best['candidate']].tolist(), best['adamic_adar'].tolist(),
+                best['resource_allocation'].tolist(),
+                best['common_neighbors'].astype(np.int64).tolist())
+        )
+    cursor.close()
+
+
+def refresh(conn, db_type: str = 'sqlite', relations: Optional[Sequence[str]] = RELATIONS,
+            exclude_owner: bool = True, top_k: int = TOP_K, force: bool = False) -> Dict:
+    """
+    Bring recommendations up to date with edges. Does not commit.
+
+    Returns the state report plus mode ('current' | 'incremental' | 'full')
+    and rescored (contacts whose rows were rewritten).
+    """
+    relations = list(relations) if relations else None
+    execute = derived_state.connection_execute(conn, db_type)
+    mark = '%s' if db_type == 'postgresql' else '?'
+    version = derived_state.edges_version(execute)
+    stored = state(conn, db_type)
+    wanted = {'relations': relations, 'exclude_owner': exclude_owner, 'top_k': top_k}
+    same_params = stored is not None and all(stored[key] == value
+                                             for key, value in wanted.items())
+    if not force and same_params and all(stored[key] == value for key, value in version.items()):
+        return dict(stored, mode='current', rescored=0)
+
+    # Only added edges since the stored run → incremental
+    new_edges = []
+    if not force and same_params and stored['max_edge_id'] is not None:
+        cursor = execute(f"SELECT subject_id, object_id FROM edges WHERE edge_id > {mark}",
+                         (stored['max_edge_id'],))
+        new_edges = cursor.fetchall()
+        cursor.close()
+    incremental = bool(new_edges) and \
+        stored['edge_rows'] + len(new_edges) == version['edge_rows']
+
+    started = time.perf_counter()
+    owner = entity_stats.owner_id(execute) if exclude_owner else None
+    graph = load_graph(conn, db_type, relations, () if owner is None else (owner,))
+    scorer = LinkScorer(graph)
+    rows = None
+    if incremental:
+        touched = np.flatnonzero(np.isin(graph.nodes, np.array(new_edges).ravel()))
+        # Their two-hop neighborhoods changed (candidates, or neighbor degrees)
+        reach = np.zeros(len(graph), dtype=bool)
+        reach[touched] = True
+        reach |= np.asarray(scorer.adjacency[touched].sum(axis=0)).ravel() > 0
+        rows = np.flatnonzero(reach)
+
+    _store_rows(conn, db_type, graph, scorer, rows, top_k)
+    report = dict(wanted, **version, nodes=len(graph), edges=graph.edges,
+                  seconds=round(time.perf_counter() - started, 3),
+                  computed_at=datetime.now().isoformat())
+    derived_state.write_state(conn, db_type, 'recommendation_state', STATE_COLUMNS, report)
+    return dict(report, mode='incremental' if incremental else 'full',
+                rescored=len(graph) if rows is None else len(rows))
+
+
+def recommend(execute: Callable, entity_id: int, limit: int = 10) -> List[Dict]:
+    """
+    Stored recommendations for a contact, best first (execute: neutral SQL).
+
+    Returns [{entity_id, label, relationship_strength, status,
+              adamic_adar, resource_allocation, common_neighbors}].
+    """
+    cursor = execute(RECOMMEND_SQL, (entity_id, limit))
+    rows = cursor.fetchall()
+    cursor.close()
+    return [dict(zip(('entity_id', 'label', 'relationship_strength', 'status') + SCORE_COLUMNS,
+                     row)) for row in rows]
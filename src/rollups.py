@@ -0,0 +1,216 @@
+"""
+Temporal rollups: edge counts per month.
+
+    entity_month_stats(relation_type, year, entity_id, month, edges, interactions)
+    month_stats(relation_type, year, month, edges, interactions)
+
+edges counts distinct facts (edges rows), interactions sums their
+occurrences. A fact X—Y counts once for X and once for Y in
+entity_month_stats and once in month_stats. Only dated edges are rolled
+up; month is 0 when event_date has a year only.
+
+"Top contacts in 2024" reads one (relation_type, year) range of
+entity_month_stats — at most 12 rows per contact — instead of every edge
+of the year; "activity by month" reads 12 rows of month_stats.
+
+SQLite keeps the rollups with triggers on edges; the universal DB on
+PostgreSQL calls record_edge() from _create_edge. rebuild() recomputes
+both tables in one pass over edges.
+"""
+
+from typing import Callable, Optional, Tuple
+
+TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS entity_month_stats (
+        relation_type TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        entity_id INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        edges INTEGER NOT NULL DEFAULT 0,
+        interactions INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (relation_type, year, entity_id, month)
+    ){without_rowid}
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS month_stats (
+        relation_type TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        edges INTEGER NOT NULL DEFAULT 0,
+        interactions INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (relation_type, year, month)
+    ){without_rowid}
+    """,
+)
+
+# Timeline of one contact
+INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_entity_month_stats_entity
+    ON entity_month_stats(entity_id, relation_type, year, month)
+"""
+
+# event_date → (year, month) in each dialect; same rules as period()
+_DATED = {
+    'sqlite': "{col} GLOB '[0-9][0-9][0-9][0-9]*'",
+    'postgresql': "{col} ~ '^[0-9]{{4}}'",
+}
+_MONTH_DIGITS = {
+    'sqlite': "substr({col}, 6, 2) GLOB '[0-9][0-9]'",
+    'postgresql': "substr({col}, 6, 2) ~ '^[0-9]{{2}}$'",
+}
+
+
+def _year(col: str) -> str:
+    return f"CAST(substr({col}, 1, 4) AS INTEGER)"
+
+
+def _month(col: str, db_type: str) -> str:
+    digits = _MONTH_DIGITS[db_type].format(col=col)
+    return f"CASE WHEN {digits} THEN CAST(substr({col}, 6, 2) AS INTEGER) ELSE 0 END"
+
+
+def period(event_date: Optional[str]) -> Optional[Tuple[int, int]]:
+    """(year, month) of an event date, None if undated (month 0: year only)."""
+    if not event_date or len(event_date) < 4 or not event_date[:4].isdigit():
+        return None
+    month = event_date[5:7]
+    return int(event_date[:4]), int(month) if len(month) == 2 and month.isdigit() else 0
+
+
+def _add_edge(row: str) -> str:
+    dated = _DATED['sqlite'].format(col=f'{row}.event_date')
+    year, month = _year(f'{row}.event_date'), _month(f'{row}.event_date', 'sqlite')
+    return f"""
+    INSERT INTO entity_month_stats (relation_type, year, entity_id, month, edges, interactions)
+    SELECT {row}.relation_type, {year}, entity_id, {month}, 1, {row}.occurrences
+    FROM (SELECT {row}.subject_id AS entity_id UNION SELECT {row}.object_id)
+    WHERE {dated}
+    ON CONFLICT (relation_type, year, entity_id, month) DO UPDATE SET
+        edges = edges + 1,
+        interactions = interactions + excluded.interactions;
+    INSERT INTO month_stats (relation_type, year, month, edges, interactions)
+    SELECT {row}.relation_type, {year}, {month}, 1, {row}.occurrences
+    WHERE {dated}
+    ON CONFLICT (relation_type, year, month) DO UPDATE SET
+        edges = edges + 1,
+        interactions = interactions + excluded.interactions;
+    """
+
+
+def _change(row: str, edges: str, interactions: str) -> str:
+    """Add edges/interactions to the existing rollup rows of an edge row."""
+    year, month = _year(f'{row}.event_date'), _month(f'{row}.event_date', 'sqlite')
+    return f"""
+    UPDATE entity_month_stats SET edges = edges + {edges},
+                                  interactions = interactions + {interactions}
+    WHERE relation_type = {row}.relation_type AND year = {year}
+      AND entity_id IN ({row}.subject_id, {row}.object_id) AND month = {month};
+    UPDATE month_stats SET edges = edges + {edges},
+                           interactions = interactions + {interactions}
+    WHERE relation_type = {row}.relation_type AND year = {year} AND month = {month};
+    """
+
+
+_REMOVE_EDGE = _change('OLD', '-1', '-OLD.occurrences') + f"""
+    DELETE FROM entity_month_stats
+    WHERE relation_type = OLD.relation_type AND year = {_year('OLD.event_date')}
+      AND entity_id IN (OLD.subject_id, OLD.object_id)
+      AND month = {_month('OLD.event_date', 'sqlite')} AND edges <= 0;
+    DELETE FROM month_stats
+    WHERE relation_type = OLD.relation_type AND year = {_year('OLD.event_date')}
+      AND month = {_month('OLD.event_date', 'sqlite')} AND edges <= 0;
+"""
+
+_KEY_CHANGED = """
+    OLD.subject_id IS NOT NEW.subject_id OR OLD.object_id IS NOT NEW.object_id
+    OR OLD.relation_type IS NOT NEW.relation_type OR OLD.event_date IS NOT NEW.event_date
+"""
+
+SQLITE_TRIGGERS = {
+    'trg_edges_insert_rollups': f"""
+        AFTER INSERT ON edges BEGIN {_add_edge('NEW')} END
+    """,
+    'trg_edges_delete_rollups': f"""
+        AFTER DELETE ON edges BEGIN {_REMOVE_EDGE} END
+    """,
+    'trg_edges_occurrences_rollups': f"""
+        AFTER UPDATE OF occurrences ON edges
+        WHEN NOT ({_KEY_CHANGED}) AND OLD.occurrences IS NOT NEW.occurrences
+        BEGIN {_change('NEW', '0', 'NEW.occurrences - OLD.occurrences')} END
+    """,
+    'trg_edges_key_rollups': f"""
+        AFTER UPDATE OF subject_id, object_id, relation_type, event_date ON edges
+        WHEN {_KEY_CHANGED}
+        BEGIN {_REMOVE_EDGE} {_add_edge('NEW')} END
+    """,
+}
+
+
+def create_tables(execute: Callable, db_type: str = 'sqlite'):
+    """Both rollup tables + the per-contact index."""
+    without_rowid = ' WITHOUT ROWID' if db_type == 'sqlite' else ''
+    for sql in TABLES_SQL:
+        execute(sql.format(without_rowid=without_rowid), None)
+    execute(INDEX_SQL, None)
+
+
+def create_sqlite_triggers(conn):
+    """Install the maintenance triggers on a SQLite connection."""
+    for name, body in SQLITE_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+def rebuild(execute: Callable, db_type: str = 'sqlite'):
+    """Recompute both rollups from edges (set-based, one pass each)."""
+    dated = _DATED[db_type].format(col='event_date')
+    year, month = _year('event_date'), _month('event_date', db_type)
+    execute("DELETE FROM entity_month_stats", None)
+    execute("DELETE FROM month_stats", None)
+    execute(f"""
+        INSERT INTO entity_month_stats (relation_type, year, entity_id, month, edges, interactions)
+        SELECT relation_type, year, entity_id, month, COUNT(*), SUM(occurrences)
+        FROM (
+            SELECT relation_type, {year} AS year, subject_id AS entity_id,
+                   {month} AS month, occurrences
+            FROM edges WHERE {dated}
+            UNION ALL
+            SELECT relation_type, {year}, object_id, {month}, occurrences
+            FROM edges WHERE {dated} AND object_id != subject_id
+        ) AS sides
+        GROUP BY relation_type, year, entity_id, month
+    """, None)
+    execute(f"""
+        INSERT INTO month_stats (relation_type, year, month, edges, interactions)
+        SELECT relation_type, {year}, {month}, COUNT(*), SUM(occurrences)
+        FROM edges WHERE {dated}
+        GROUP BY relation_type, {year}, {month}
+    """, None)
+
+
+def record_edge(execute: Callable, subject_id: int, object_id: int, relation_type: str,
+                event_date: Optional[str], new_edge: bool):
+    """
+    Application-side maintenance (no triggers): a new edge, or one more
+    occurrence of an existing edge.
+    """
+    when = period(event_date)
+    if when is None:
+        return
+    year, month = when
+    edges = 1 if new_edge else 0
+    for entity_id in {subject_id, object_id}:
+        execute("""
+            INSERT INTO entity_month_stats (relation_type, year, entity_id, month, edges, interactions)
+            VALUES (?, ?, ?, ?, ?, 1)
+            ON CONFLICT (relation_type, year, entity_id, month) DO UPDATE SET
+                edges = entity_month_stats.edges + excluded.edges,
+                interactions = entity_month_stats.interactions + 1
+        """, (relation_type, year, entity_id, month, edges)).close()
+    execute("""
+        INSERT INTO month_stats (relation_type, year, month, edges, interactions)
+        VALUES (?, ?, ?, ?, 1)
+        ON CONFLICT (relation_type, year, month) DO UPDATE SET
+            edges = month_stats.edges + excluded.edges,
+            interactions = month_stats.interactions + 1
+    """, (relation_type, year, month, edges)).close()
@@ -0,0 +1,336 @@
+"""
+Vectorized scoring of entities: relationship_strength and status.
+
+All entities are read with one query, scored with NumPy array operations
+and only changed rows are written back (temp table + one UPDATE ... FROM).
+The same Scorer rescores the couple of entities touched by each add_fact.
+
+Formulas are pluggable: a formula maps arrays (degree, max_degree, days)
+to strengths in [0, 1] and is registered by name:
+
+    @register_formula('degree_only')
+    def degree_only(degree, max_degree, days):
+        return degree / max_degree
+
+    Scorer(formula='degree_recency', degree_weight=0.7)
+
+days is NaN for entities without a dated interaction. With
+Scorer(centrality='pagerank') the "degree" a formula sees is a stored
+centrality score (see centrality.py) and max_degree its maximum.
+"""
+
+from collections import Counter
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+import centrality as centrality_scores
+import derived_state
+import entity_stats
+
+FORMULAS: Dict[str, Callable] = {}
+
+STATUSES = ('active', 'cooling', 'cold', 'directory')
+
+# Changed rows from which SQLite score indexes are rebuilt instead of updated
+BULK_INDEX_REBUILD = 20_000
+
+STRENGTH_BUCKETS = (
+    (0.8, 'very_strong (0.8-1.0)'),
+    (0.5, 'strong (0.5-0.8)'),
+    (0.2, 'medium (0.2-0.5)'),
+    (-np.inf, 'weak (0.0-0.2)'),
+)
+
+
+def register_formula(name: str):
+    """Decorator: make a formula available as Scorer(formula=name)."""
+    def decorator(fn):
+        FORMULAS[name] = fn
+        return fn
+    return decorator
+
+
+def _recency(days: np.ndarray, recency_days: float) -> np.ndarray:
+    """recency_days / (recency_days + days): 1.0 today, 0.5 after recency_days, 0 if unknown."""
+    with np.errstate(invalid='ignore'):
+        recency = recency_days / (recency_days + np.maximum(days, 0))
+    return np.nan_to_num(recency, nan=0.0)
+
+
+@register_formula('degree_recency')
+def degree_recency(degree, max_degree, days, degree_weight: float = 0.5,
+                   recency_days: float = 365.0):
+    """Default: 50% normalized degree + 50% recency (fix_critical_v2_1, Q-G2)."""
+    return (degree_weight * degree / max_degree
+            + (1.0 - degree_weight) * _recency(days, recency_days))
+
+
+@register_formula('degree')
+def degree_only(degree, max_degree, days):
+    """Degree centrality only (the original v2 enrichment)."""
+    return degree / max_degree
+
+
+@register_formula('recency')
+def recency_only(degree, max_degree, days, recency_days: float = 365.0):
+    """Recency only."""
+    return _recency(days, recency_days)
+
+
+@register_formula('half_life')
+def half_life(degree, max_degree, days, degree_weight: float = 0.5,
+              half_life_days: float = 180.0):
+    """Normalized degree + exponential decay of the last interaction."""
+    decay = np.nan_to_num(np.exp2(-np.maximum(days, 0) / half_life_days), nan=0.0)
+    return degree_weight * degree / max_degree + (1.0 - degree_weight) * decay
+
+
+def parse_days(values: Iterable[Optional[str]], today: Optional[date] = None) -> np.ndarray:
+    """Whole days since each ISO date/datetime string (NaN when missing/invalid)."""
+    values = list(values)
+    try:
+        dates = np.array([value[:10] if value else 'NaT' for value in values],
+                         dtype='datetime64[D]')
+    except ValueError:
+        dates = np.empty(len(values), dtype='datetime64[D]')
+        for i, value in enumerate(values):
+            try:
+                dates[i] = np.datetime64(value[:10] if value else 'NaT', 'D')
+            except ValueError:
+                dates[i] = np.datetime64('NaT')
+    today = np.datetime64(today or date.today(), 'D')
+    days = (today - dates).astype('float64')
+    days[np.isnat(dates)] = np.nan
+    return days
+
+
+def strength_bucket(strengths: np.ndarray) -> np.ndarray:
+    """Label of the STRENGTH_BUCKETS range for each strength."""
+    labels = np.empty(len(strengths), dtype=object)
+    labels[:] = STRENGTH_BUCKETS[-1][1]
+    for threshold, label in reversed(STRENGTH_BUCKETS[:-1]):
+        labels[strengths >= threshold] = label
+    return labels
+
+
+class Scorer:
+    """
+    Status thresholds + a named strength formula.
+
+    Args:
+        formula: Name in FORMULAS
+        active_days: Last interaction within this many days → 'active'
+        cooling_days: ... within this many days → 'cooling', older → 'cold'
+            (no dated interaction → 'directory')
+        exclude_owner: Leave Olga out of max_degree
+        precision: Decimal places stored for relationship_strength
+        centrality: Use this entity_centrality metric instead of degree
+            (scores must have been computed, see centrality.refresh)
+        **params: Formula parameters (e.g. degree_weight=0.6)
+    """
+
+    def __init__(self, formula: str = 'degree_recency', active_days: int = 180,
+                 cooling_days: int = 730, exclude_owner: bool = True,
+                 precision: int = 3, centrality: Optional[str] = None, **params):
+        if formula not in FORMULAS:
+            raise ValueError(
+                f"Unknown scoring formula '{formula}' (available: {', '.join(sorted(FORMULAS))})"
+            )
+        self.formula = formula
+        self.active_days = active_days
+        self.cooling_days = cooling_days
+        self.exclude_owner = exclude_owner
+        self.precision = precision
+        if centrality is not None and centrality not in centrality_scores.METRICS:
+            raise ValueError(
+                f"Unknown centrality metric '{centrality}' "
+                f"(available: {', '.join(centrality_scores.METRICS)})"
+            )
+        self.centrality = centrality
+        self.params = params
+
+    def strength(self, degree: np.ndarray, max_degree: float, days: np.ndarray) -> np.ndarray:
+        # Degrees are counts (≥ 1 when any); centrality scores may be tiny
+        scale = max(max_degree, 1) if self.centrality is None else (max_degree or 1.0)
+        strengths = FORMULAS[self.formula](degree, scale, days, **self.params)
+        return np.round(np.asarray(strengths, dtype='float64'), self.precision)
+
+    def status(self, days: np.ndarray) -> np.ndarray:
+        return np.select(
+            [np.isnan(days), days <= self.active_days, days <= self.cooling_days],
+            ['directory', 'active', 'cooling'],
+            default='cold'
+        ).astype(object)
+
+    def max_degree(self, execute: Callable, owner_id: Optional[int] = None,
+                   degree: Optional[np.ndarray] = None,
+                   entity_ids: Optional[np.ndarray] = None) -> float:
+        """
+        Normalization constant: from the given arrays (covering all
+        entities) or through the entities.degree / centrality index.
+        """
+        owner_id = owner_id if self.exclude_owner else None
+        if degree is None:
+            if self.centrality is not None:
+                return centrality_scores.max_score(execute, self.centrality)
+            return entity_stats.max_degree(execute, owner_id)
+        kept = degree[entity_ids != owner_id] if owner_id is not None else degree
+        if self.centrality is not None:
+            return float(kept.max()) if len(kept) else 0.0
+        return int(kept.max()) if len(kept) and kept.max() > 0 else 1
+
+    def rescore(self, conn, db_type: str = 'sqlite', entity_ids: Optional[Iterable[int]] = None,
+                max_degree: Optional[int] = None, today: Optional[date] = None,
+                dry_run: bool = False) -> Dict:
+        """
+        Rescore entities (all, or just entity_ids) and write changed rows.
+
+        Does not commit. Returns a report: entities, changed, max_degree and,
+        for a full rescore, distribution_diff() of the before/after values.
+        """
+        mark = '%s' if db_type == 'postgresql' else '?'
+        execute = derived_state.connection_execute(conn, db_type)
+
+        score = "COALESCE(degree, 0)"
+        if self.centrality is not None:
+            score = f"""COALESCE((SELECT c.{self.centrality} FROM entity_centrality c
+                                  WHERE c.entity_id = entities.entity_id), 0)"""
+        query = f"""
+            SELECT entity_id, {score}, last_interaction, status, relationship_strength
+            FROM entities
+        """
+        if entity_ids is not None:
+            entity_ids = list(entity_ids)
+            query += f" WHERE entity_id IN ({','.join([mark] * len(entity_ids))})"
+        cursor = execute(query, tuple(entity_ids or ()))
+        rows = cursor.fetchall()
+
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        degree = np.array([row[1] for row in rows], dtype='float64')
+        days = parse_days((row[2] for row in rows), today)
+        old_status = np.array([row[3] for row in rows], dtype=object)
+        old_strength = np.array(
+            [np.nan if row[4] is None else row[4] for row in rows], dtype='float64'
+        )
+        del rows
+
+        if max_degree is None:
+            owner_id = entity_stats.owner_id(execute) if self.exclude_owner else None
+            if entity_ids is None:
+                max_degree = self.max_degree(execute, owner_id, degree, ids)
+            else:
+                max_degree = self.max_degree(execute, owner_id)
+        strength = self.strength(degree, max_degree, days)
+        status = self.status(days)
+
+        # NaN (never scored) compares unequal, so such rows are written
+        changed = ((status != old_status)
+                   | ~(np.abs(strength - old_strength) < 0.5 * 10 ** -self.precision))
+        report = {
+            'entities': len(ids),
+            'changed': int(changed.sum()),
+            'max_degree': max_degree,
+        }
+        if entity_ids is None:
+            report.update(distribution_diff(old_status, old_strength, status, strength, changed))
+        if dry_run or not changed.any():
+            cursor.close()
+            return report
+
+        updates = list(zip(status[changed].tolist(), strength[changed].tolist(),
+                           ids[changed].tolist()))
+        now = datetime.now().isoformat()
+        if len(updates) <= 64:
+            cursor.executemany(f"""
+                UPDATE entities SET status = {mark}, relationship_strength = {mark},
+                                    updated_at = '{now}'
+                WHERE entity_id = {mark}
+            """, updates)
+        else:
+            self._write_via_temp_table(cursor, db_type, mark, updates, now)
+        cursor.close()
+        return report
+
+    @staticmethod
+    def _write_via_temp_table(cursor, db_type: str, mark: str, updates: List, now: str):
+        """Bulk write: fill a temp table, then one UPDATE ... FROM join."""
+        cursor.execute("DROP TABLE IF EXISTS rescored")
+        cursor.execute("""
+            CREATE TEMP TABLE rescored (
+                status TEXT,
+                relationship_strength REAL,
+                entity_id INTEGER PRIMARY KEY
+            )
+        """)
+        cursor.executemany(f"INSERT INTO rescored VALUES ({mark}, {mark}, {mark})", updates)
+        
+        # SQLite: rewriting most rows in random index order is slower than
+        # rebuilding the score indexes once (sort) afterwards
+        indexes = []
+        if db_type == 'sqlite' and len(updates) >= BULK_INDEX_REBUILD:
+            indexes = cursor.execute("""
+                SELECT name, sql FROM sqlite_master
+                WHERE type = 'index' AND tbl_name = 'entities' AND sql IS NOT NULL
+                  AND (sql LIKE '%relationship_strength%' OR sql LIKE '%status%')
+            """).fetchall()
+            for name, _ in indexes:
+                cursor.execute(f"DROP INDEX {name}")
+        
+        cursor.execute(f"""
+            UPDATE entities SET
+                status = r.status,
+                relationship_strength = r.relationship_strength,
+                updated_at = '{now}'
+            FROM rescored r
+            WHERE entities.entity_id = r.entity_id
+        """)
+        for _, sql in indexes:
+            cursor.execute(sql)
+        cursor.execute("DROP TABLE rescored")
+
+
+def distribution_diff(old_status: np.ndarray, old_strength: np.ndarray,
+                      status: np.ndarray, strength: np.ndarray, changed: np.ndarray) -> Dict:
+    """Status / strength-bucket counts before and after, status transitions."""
+    return {
+        'status_before': Counter(old_status.tolist()),
+        'status_after': Counter(status.tolist()),
+        'strength_before': Counter(strength_bucket(np.nan_to_num(old_strength)).tolist()),
+        'strength_after': Counter(strength_bucket(strength).tolist()),
+        'transitions': Counter(
+            f"{before} → {after}"
+            for before, after in zip(old_status[changed], status[changed])
+            if before != after
+        ),
+    }
+
+
+def format_report(report: Dict) -> List[str]:
+    """Before/after distribution diff as printable lines."""
+    lines = [
+        f"Entities: {report['entities']}, changed: {report['changed']}, "
+        f"max_degree: {report['max_degree']}",
+        "",
+        "  Status:",
+    ]
+
+    def diff(before: Counter, after: Counter, order) -> List[str]:
+        keys = list(order) + sorted((set(before) | set(after)) - set(order), key=str)
+        result = []
+        for key in keys:
+            b, a = before.get(key, 0), after.get(key, 0)
+            if b or a:
+                delta = f" ({a - b:+d})" if a != b else ""
+                result.append(f"    • {key}: {b} → {a}{delta}")
+        return result
+
+    lines += diff(report['status_before'], report['status_after'], STATUSES)
+    lines += ["", "  Relationship Strength:"]
+    lines += diff(report['strength_before'], report['strength_after'],
+                  [label for _, label in STRENGTH_BUCKETS])
+    if report['transitions']:
+        lines += ["", "  Переходы status:"]
+        lines += [f"    • {key}: {count}" for key, count in report['transitions'].most_common()]
+    return lines
@@ -0,0 +1,288 @@
+"""
+One query definition for SQLite and PostgreSQL, compiled once per dialect.
+
+    TOP = Query(\"\"\"
+        SELECT label FROM entities
+        WHERE status IN (?) AND YEAR(last_interaction) = ? LIMIT ?
+    \"\"\", name='top')
+    TOP.compile('sqlite', (['active', 'cold'], 2024, 10))
+        → "... status IN (?, ?) AND CAST(substr(last_interaction, 1, 4) AS INTEGER) = ? ...",
+          ('active', 'cold', 2024, 10)
+    TOP.compile('postgresql', (['active', 'cold'], 2024, 10))
+        → "... status = ANY(%s) AND CAST(substr(last_interaction, 1, 4) AS INTEGER) = %s ...",
+          (['active', 'cold'], 2024, 10)
+
+Neutral SQL is SQLite-flavoured:
+
+    ?                   %s on PostgreSQL ('%' in the text becomes '%%')
+    x IN (?)            a list param: IN (?, ?, ?) on SQLite, = ANY(%s) on PostgreSQL
+    x NOT IN (?)        NOT IN (?, ?, ?) / <> ALL(%s)
+    YEAR(date)          year of an ISO date string (same rule as rollups)
+    GREATEST(a, b)      MAX(a, b) on SQLite
+    INSERT OR IGNORE    INSERT ... ON CONFLICT DO NOTHING on PostgreSQL
+
+Text without '?' passes through untouched (helper modules that already
+build '%s' queries keep working). Compiled text is cached per dialect
+and list sizes, so a query is parsed once and hands the driver the same
+string every time:
+
+    SQLite      sqlite3's per-connection statement cache (cached_statements)
+                reuses the prepared statement for identical text
+    PostgreSQL  Statements.execute() runs named queries as server-side
+                prepared statements: PREPARE once per connection, then
+                EXECUTE — no re-parse, no re-plan
+"""
+
+import re
+import threading
+from typing import Optional, Sequence, Tuple, Union
+
+from lru import LRUCache
+
+# sqlite3.connect(cached_statements=...): room for every hot query of a process
+STATEMENT_CACHE_SIZE = 256
+
+_TOKENS = re.compile(r"""
+      (?P<literal>'(?:[^']|'')*'|"(?:[^"]|"")*")
+    | (?P<comment>--[^\n]*)
+    | (?P<not_in>\bNOT\s+IN\s*\(\s*\?\s*\))
+    | (?P<in>\bIN\s*\(\s*\?\s*\))
+    | (?P<param>\?)
+    | (?P<year>\bYEAR\s*\()
+    | (?P<greatest>\bGREATEST\s*\()
+    | (?P<ignore>\bINSERT\s+OR\s+IGNORE\b)
+""", re.IGNORECASE | re.VERBOSE)
+
+# x IN (?) / x NOT IN (?) per dialect
+_IN = {'sqlite': 'IN ({})', 'postgresql': '= ANY({})'}
+_NOT_IN = {'sqlite': 'NOT IN ({})', 'postgresql': '<> ALL({})'}
+
+
+def _closing_paren(sql: str, start: int) -> int:
+    """Index of the ')' closing the '(' just before start (quotes skipped)."""
+    depth = 1
+    position = start
+    while position < len(sql):
+        char = sql[position]
+        if char in "'\"":
+            position = sql.index(char, position + 1)
+            while sql.startswith(char, position + 1):  # doubled quote
+                position = sql.index(char, position + 2)
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return position
+        position += 1
+    raise ValueError(f"Unbalanced parentheses in: {sql}")
+
+
+def _expand_year(sql: str) -> str:
+    """YEAR(x) → CAST(substr(x, 1, 4) AS INTEGER), nested calls included."""
+    while True:
+        match = next((m for m in _TOKENS.finditer(sql) if m.lastgroup == 'year'), None)
+        if match is None:
+            return sql
+        end = _closing_paren(sql, match.end())
+        sql = (f"{sql[:match.start()]}CAST(substr({sql[match.end():end]}, 1, 4) AS INTEGER)"
+               f"{sql[end + 1:]}")
+
+
+class Query:
+    """
+    A neutral SQL statement, parsed once.
+
+    Args:
+        sql: Query text (see module docstring)
+        name: Statement name; named queries run as prepared statements on
+            PostgreSQL (Statements.execute)
+    """
+
+    def __init__(self, sql: str, name: Optional[str] = None):
+        if name is not None and not re.fullmatch(r'[a-z_][a-z0-9_]*', name):
+            raise ValueError(f"Invalid statement name: {name!r}")
+        self.sql = sql
+        self.name = name
+        self.parts = []      # text chunks and ('param' | 'in' | 'not_in') markers
+        self.insert_or_ignore = False
+
+        text = []
+        position = 0
+        expanded = _expand_year(sql)
+        for match in _TOKENS.finditer(expanded):
+            text.append(expanded[position:match.start()])
+            kind = match.lastgroup
+            if kind in ('literal', 'comment'):
+                text.append(match.group())
+            elif kind == 'greatest':
+                text.append(('greatest', match.group()))
+            elif kind == 'ignore':
+                self.insert_or_ignore = True
+                text.append(('ignore', match.group()))
+            else:
+                self.parts.append(text)
+                self.parts.append(kind)
+                text = []
+            position = match.end()
+        text.append(expanded[position:])
+        self.parts.append(text)
+        self.placeholders = len(self.parts) // 2
+        self._compiled = LRUCache(64)
+
+    def __repr__(self):
+        return f"Query(name={self.name!r}, placeholders={self.placeholders})"
+
+    def _text(self, chunks, db_type: str, escape: bool) -> str:
+        """Literal SQL between placeholders in this dialect."""
+        out = []
+        for chunk in chunks:
+            if isinstance(chunk, tuple):
+                kind, original = chunk
+                if kind == 'greatest':
+                    out.append('MAX(' if db_type == 'sqlite' else original)
+                else:
+                    out.append(original if db_type == 'sqlite' else 'INSERT')
+            else:
+                out.append(chunk.replace('%', '%%') if escape else chunk)
+        return ''.join(out)
+
+    def text(self, db_type: str, sizes: Tuple[int, ...] = (), prepared: bool = False) -> str:
+        """
+        SQL text for a dialect (cached).
+
+        sizes: length of each IN (?) list param, in order (SQLite only).
+        prepared: $1, $2, ... placeholders for a PostgreSQL PREPARE.
+        """
+        key = (db_type, sizes, prepared)
+        sql = self._compiled.get(key)
+        if sql is not None:
+            return sql
+
+        # psycopg2 formats the text only when params are passed
+        escape = db_type == 'postgresql' and self.placeholders > 0 and not prepared
+        out = []
+        lists = iter(sizes)
+        for index, chunk in enumerate(self.parts):
+            if index % 2 == 0:
+                out.append(self._text(chunk, db_type, escape))
+            elif db_type == 'postgresql':
+                mark = f'${index // 2 + 1}' if prepared else '%s'
+                out.append(mark if chunk == 'param' else
+                           (_IN if chunk == 'in' else _NOT_IN)[db_type].format(mark))
+            elif chunk == 'param':
+                out.append('?')
+            else:
+                marks = ', '.join('?' * next(lists))
+                out.append((_IN if chunk == 'in' else _NOT_IN)[db_type].format(marks))
+        sql = ''.join(out)
+        if db_type == 'postgresql' and self.insert_or_ignore and \
+                not re.search(r'\bON\s+CONFLICT\b', sql, re.IGNORECASE):
+            sql = sql.rstrip().rstrip(';') + ' ON CONFLICT DO NOTHING'
+        self._compiled.put(key, sql)
+        return sql
+
+    def compile(self, db_type: str, params: Optional[Sequence] = None,
+                prepared: bool = False) -> Tuple[str, Optional[tuple]]:
+        """(sql, params) ready for the driver of db_type."""
+        if not self.placeholders:
+            return self.text(db_type, prepared=prepared), params
+        params = tuple(params or ())
+        if len(params) != self.placeholders:
+            raise ValueError(
+                f"Query expects {self.placeholders} params, got {len(params)}: {self.sql}"
+            )
+        kinds = self.parts[1::2]
+        if db_type == 'postgresql':
+            # psycopg2 adapts a list (not a tuple) to an ARRAY for = ANY(%s)
+            return self.text(db_type, prepared=prepared), tuple(
+                value if kind == 'param' else list(value)
+                for kind, value in zip(kinds, params)
+            )
+        sizes = []
+        flat = []
+        for kind, value in zip(kinds, params):
+            if kind == 'param':
+                flat.append(value)
+            else:
+                value = list(value)
+                sizes.append(len(value))
+                flat.extend(value)
+        return self.text(db_type, tuple(sizes)), tuple(flat)
+
+
+# Ad-hoc SQL strings → parsed Query (the text is the key)
+_parsed = LRUCache(1024)
+_parsed_lock = threading.Lock()
+
+
+def as_query(query: Union[str, Query]) -> Query:
+    """Query for a string, parsed once per distinct text."""
+    if isinstance(query, Query):
+        return query
+    with _parsed_lock:
+        parsed = _parsed.get(query)
+        if parsed is None:
+            parsed = Query(query)
+            _parsed.put(query, parsed)
+    return parsed
+
+
+def compile_query(query: Union[str, Query], db_type: str,
+                  params: Optional[Sequence] = None) -> Tuple[str, Optional[tuple]]:
+    """(sql, params) for db_type; see Query.compile."""
+    return as_query(query).compile(db_type, params)
+
+
+class Statements:
+    """
+    Runs queries on one connection.
+
+    SQLite: compiled text, reused from sqlite3's statement cache.
+    PostgreSQL: named queries are PREPAREd on first use (once per
+    connection), then run with EXECUTE; the rest run as compiled text.
+    """
+
+    def __init__(self, db_type: str):
+        self.db_type = db_type
+        self.prepared = {}   # name → compiled text
+        self._lock = threading.Lock()
+
+    def compile(self, query: Union[str, Query],
+                params: Optional[Sequence] = None) -> Tuple[str, Optional[tuple]]:
+        return compile_query(query, self.db_type, params)
+
+    def _prepare(self, cursor, query: Query) -> str:
+        """PREPARE the named query on this connection (once); returns the name."""
+        sql = query.text('postgresql', prepared=True)
+        with self._lock:
+            known = self.prepared.get(query.name)
+            if known is None:
+                cursor.execute(f"PREPARE {query.name} AS {sql}")
+                self.prepared[query.name] = sql
+            elif known != sql:
+                raise ValueError(f"Statement name {query.name!r} used by two queries")
+        return query.name
+
+    def execute(self, cursor, query: Union[str, Query], params: Optional[Sequence] = None):
+        """Run query on cursor (results stay on the cursor)."""
+        query = as_query(query)
+        if self.db_type == 'postgresql' and query.name:
+            name = self._prepare(cursor, query)
+            _, args = query.compile(self.db_type, params, prepared=True)
+            if args:
+                cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(args))})", args)
+            else:
+                cursor.execute(f"EXECUTE {name}")
+            return cursor
+        sql, args = query.compile(self.db_type, params)
+        if args:
+            cursor.execute(sql, args)
+        else:
+            cursor.execute(sql)
+        return cursor
+
+    def forget(self):
+        """The connection was replaced: its prepared statements are gone."""
+        with self._lock:
+            self.prepared.clear()
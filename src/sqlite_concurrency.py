@@ -0,0 +1,146 @@
+"""
+Concurrent reader/writer mode for the SQLite stores.
+
+Opt-in (``concurrent=True`` or ``CONTACTS_DB_CONCURRENT=1``):
+- WAL journal with tuned synchronous / cache_size / mmap pragmas
+- one dedicated writer connection with busy timeout and retry
+- thread-local read-only connections, closed once their thread has ended
+  (Streamlit runs every rerun on a new thread)
+
+Isolation (see docs/CONCURRENCY.md):
+- Readers never block on the writer and never block it: each read
+  transaction sees the last snapshot committed before it started.
+- Writers are serialized by SQLite; a second writer waits up to
+  ``busy_timeout_ms`` and the whole unit of work is retried on SQLITE_BUSY.
+- A reader connection outside an explicit transaction sees new commits
+  on its next statement (autocommit reads).
+"""
+
+import os
+import time
+import sqlite3
+import threading
+import functools
+from pathlib import Path
+from typing import Optional
+
+from sql_dialect import STATEMENT_CACHE_SIZE
+
+
+BUSY_TIMEOUT_MS = 30000
+BUSY_RETRIES = 5
+BUSY_RETRY_DELAY = 0.05
+
+WAL_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',      # durable at checkpoints, safe against corruption in WAL
+    'cache_size': -65536,         # 64 MB page cache (negative = KiB)
+    'mmap_size': 268435456,       # 256 MB memory-mapped reads
+    'temp_store': 'MEMORY',
+}
+
+
+def concurrency_enabled(concurrent: Optional[bool] = None) -> bool:
+    """Resolve the concurrency flag (explicit value wins over env var)."""
+    if concurrent is not None:
+        return concurrent
+    return os.getenv('CONTACTS_DB_CONCURRENT', '').lower() in ('1', 'true', 'yes')
+
+
+def apply_pragmas(conn: sqlite3.Connection, busy_timeout_ms: int = BUSY_TIMEOUT_MS):
+    """Switch a connection to WAL with the tuned pragmas."""
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    for pragma, value in WAL_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+
+
+def is_busy_error(error: Exception) -> bool:
+    """True for SQLITE_BUSY / SQLITE_LOCKED errors."""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and (
+        'locked' in message or 'busy' in message
+    )
+
+
+def retry_on_busy(method=None, *, retries: int = BUSY_RETRIES, delay: float = BUSY_RETRY_DELAY):
+    """
+    Retry a write method of a store (anything with ``self.conn``) on SQLITE_BUSY.
+
+    The open transaction is rolled back before each retry (through the
+    store's own ``rollback()`` when it has one, so caches stay coherent),
+    hence the decorated method must be a complete unit of work.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            for attempt in range(retries + 1):
+                try:
+                    return func(self, *args, **kwargs)
+                except sqlite3.OperationalError as e:
+                    if not is_busy_error(e) or attempt == retries:
+                        raise
+                    getattr(self, 'rollback', self.conn.rollback)()
+                    time.sleep(delay * (2 ** attempt))
+        return wrapper
+
+    if method is not None:
+        return decorator(method)
+    return decorator
+
+
+class SQLiteConnections:
+    """Dedicated writer connection plus thread-local read-only connections."""
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = BUSY_TIMEOUT_MS,
+                 row_factory=sqlite3.Row):
+        self.db_path = str(db_path)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.row_factory = row_factory
+        self._local = threading.local()
+        # Owning thread → its reader
+        self._readers = {}
+        self._readers_lock = threading.Lock()
+
+        # Writer may be handed between threads (e.g. Streamlit sessions);
+        # callers serialize access through write_lock.
+        self.write_lock = threading.RLock()
+        self.writer = sqlite3.connect(self.db_path, check_same_thread=False,
+                                      cached_statements=STATEMENT_CACHE_SIZE)
+        self.writer.row_factory = row_factory
+        apply_pragmas(self.writer, busy_timeout_ms)
+
+    def reader(self) -> sqlite3.Connection:
+        """Read-only connection owned by the calling thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, isolation_level=None,
+                                   check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+            conn.row_factory = self.row_factory
+            conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+            conn.execute(f"PRAGMA cache_size = {WAL_PRAGMAS['cache_size']}")
+            conn.execute(f"PRAGMA mmap_size = {WAL_PRAGMAS['mmap_size']}")
+            conn.execute("PRAGMA query_only = 1")
+            self._local.conn = conn
+            self.close_finished_readers()
+            with self._readers_lock:
+                self._readers[threading.current_thread()] = conn
+        return conn
+
+    def close_finished_readers(self) -> int:
+        """Close readers of threads that have ended; returns how many."""
+        with self._readers_lock:
+            finished = [thread for thread in self._readers if not thread.is_alive()]
+            for thread in finished:
+                self._readers.pop(thread).close()
+        return len(finished)
+
+    def close(self):
+        """Close the writer and every reader connection."""
+        with self._readers_lock:
+            for conn in self._readers.values():
+                conn.close()
+            self._readers = {}
+        self._local = threading.local()
+        self.writer.close()
@@ -0,0 +1,407 @@
+"""
+Full-text search over contacts and their context.
+
+Enhanced graph (entities + Context Zone):
+    entity_search   label, tags, notes of entities  (rowid = entity_id)
+    context_search  source title + raw payload text (event summaries,
+                    fact contexts), one row per raw_data payload
+
+Legacy GraphDB (nodes + facts):
+    node_search     nodes.name (people, organizations, event summaries)
+    fact_search     facts.context
+
+SQLite: FTS5 tables, bm25 ranking, snippet(). FTS5 has no Russian
+stemmer, so the query side does the morphology: every word is cut to
+its stem (stem()) and searched as a prefix — "декорирования" →
+"декорирован"* also finds "декорирование", "декорированием". The
+unicode61 tokenizer does not fold ё, so indexed text and queries are
+folded to е. Entity / node / fact tables are kept by triggers; context
+rows are added on write (the payload text is only in hand there — it
+is stored compressed).
+
+PostgreSQL: tsvector columns with the built-in 'russian' configuration
+(snowball stemmer) + GIN indexes, ts_rank ranking, ts_headline
+snippets. entities.search_vector and context_search.search_vector are
+generated columns, so they follow every write.
+"""
+
+import re
+from typing import Callable, Dict, List, Optional
+
+from compression import decompress_text
+
+# Snippet markers and size (tokens)
+MARK_START, MARK_END, ELLIPSIS = '[', ']', '…'
+SNIPPET_TOKENS = 12
+
+TOKENIZER = "unicode61 remove_diacritics 2"
+
+_WORD = re.compile(r'\w+')
+_CYRILLIC = re.compile(r'[а-я]+$')
+
+# Inflectional endings (nouns, adjectives, participles), longest first
+_ENDINGS = sorted({
+    'иями', 'ями', 'ами', 'иях', 'ием', 'ией', 'иям', 'ого', 'его', 'ому', 'ему',
+    'ыми', 'ими', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ый', 'ий', 'ой', 'ей',
+    'ым', 'им', 'ом', 'ем', 'ых', 'их', 'ую', 'юю', 'ою', 'ею', 'ов', 'ев',
+    'ам', 'ям', 'ах', 'ях', 'ию', 'ью', 'ия', 'ья', 'ье', 'ии',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+}, key=len, reverse=True)
+
+MIN_STEM = 3
+
+
+def fold_yo(text: str) -> str:
+    """ё → е: indexed text (unicode61 folds the case itself)."""
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def fold(text: str) -> str:
+    """Lower case, ё → е: query words."""
+    return fold_yo(text.lower())
+
+
+def fold_sql(column: str) -> str:
+    """fold_yo() in SQLite."""
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def stem(word: str) -> str:
+    """Light Russian stemmer: strip one inflectional ending (stem >= 3 letters)."""
+    word = fold(word)
+    if not _CYRILLIC.match(word):
+        return word
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def words(text: Optional[str]) -> List[str]:
+    return _WORD.findall(fold(text or ''))
+
+
+def fts_query(text: Optional[str]) -> str:
+    """User input → FTS5 MATCH expression: every word's stem as a prefix (AND)."""
+    return ' '.join(f'"{stem(word)}"*' for word in words(text))
+
+
+def ts_query(text: Optional[str]) -> str:
+    """User input → to_tsquery('russian', ...) expression (prefix AND)."""
+    return ' & '.join(f'{word}:*' for word in words(text))
+
+
+def match_param(text: Optional[str], db_type: str = 'sqlite') -> str:
+    """Search parameter for the dialect ('' when there is nothing to search)."""
+    return ts_query(text) if db_type == 'postgresql' else fts_query(text)
+
+
+# ============================================================
+# Enhanced graph: entities + Context Zone
+# ============================================================
+
+SQLITE_TABLES = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS entity_search
+    USING fts5(label, tags, notes, tokenize = '{TOKENIZER}')
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS context_search
+    USING fts5(source_id UNINDEXED, content_hash UNINDEXED, title, body,
+               tokenize = '{TOKENIZER}')
+    """,
+)
+
+_ADD_ENTITY = f"""
+    INSERT INTO entity_search (rowid, label, tags, notes)
+    VALUES (NEW.entity_id, {fold_sql('NEW.label')}, {fold_sql('NEW.tags')},
+            {fold_sql('NEW.notes')});
+"""
+
+SQLITE_TRIGGERS = {
+    'trg_entities_insert_search': f"""
+        AFTER INSERT ON entities BEGIN {_ADD_ENTITY} END
+    """,
+    'trg_entities_delete_search': """
+        AFTER DELETE ON entities BEGIN
+            DELETE FROM entity_search WHERE rowid = OLD.entity_id;
+        END
+    """,
+    'trg_entities_update_search': f"""
+        AFTER UPDATE OF label, tags, notes ON entities BEGIN
+            DELETE FROM entity_search WHERE rowid = OLD.entity_id;
+            {_ADD_ENTITY}
+        END
+    """,
+}
+
+_RUSSIAN_VECTOR = "setweight(to_tsvector('russian', coalesce({col}, '')), '{weight}')"
+
+
+def _vector(*weighted) -> str:
+    return ' || '.join(_RUSSIAN_VECTOR.format(col=col, weight=weight) for col, weight in weighted)
+
+
+POSTGRES_SQL = (
+    f"""
+    ALTER TABLE entities ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS ({_vector(('label', 'A'), ('tags', 'B'), ('notes', 'C'))}) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_entities_search ON entities USING GIN (search_vector)",
+    f"""
+    CREATE TABLE IF NOT EXISTS context_search (
+        source_id INTEGER NOT NULL,
+        content_hash TEXT NOT NULL,
+        title TEXT,
+        body TEXT,
+        search_vector tsvector
+            GENERATED ALWAYS AS ({_vector(('title', 'B'), ('body', 'D'))}) STORED,
+        PRIMARY KEY (source_id, content_hash)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_context_search ON context_search USING GIN (search_vector)",
+)
+
+
+def create_tables(execute: Callable, db_type: str = 'sqlite'):
+    """Search tables (FTS5 on SQLite; tsvector columns + GIN on PostgreSQL)."""
+    for sql in (POSTGRES_SQL if db_type == 'postgresql' else SQLITE_TABLES):
+        execute(sql, None)
+
+
+def create_sqlite_triggers(conn):
+    """Install the entity_search maintenance triggers on a SQLite connection."""
+    for name, body in SQLITE_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+def record_context(execute: Callable, source_id: int, content_hash: Optional[str],
+                   title: Optional[str], body: Optional[str], db_type: str = 'sqlite'):
+    """Index one raw payload (called where raw_data rows are written)."""
+    if db_type == 'postgresql':
+        execute("""
+            INSERT INTO context_search (source_id, content_hash, title, body)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT DO NOTHING
+        """, (source_id, content_hash or '', title, body)).close()
+    else:
+        execute("""
+            INSERT INTO context_search (source_id, content_hash, title, body)
+            VALUES (?, ?, ?, ?)
+        """, (source_id, content_hash, fold_yo(title or ''), fold_yo(body or ''))).close()
+
+
+def rebuild(execute: Callable, db_type: str = 'sqlite', title_column: str = 'filename') -> Dict:
+    """
+    Refill the search index: entities set-based, contexts by decompressing
+    every raw payload once. title_column: sources column shown as the
+    context title (filename in EnhancedGraphDB, source_uri in the
+    universal schema).
+    """
+    if db_type != 'postgresql':
+        execute("DELETE FROM entity_search", None)
+        execute(f"""
+            INSERT INTO entity_search (rowid, label, tags, notes)
+            SELECT entity_id, {fold_sql('label')}, {fold_sql('tags')}, {fold_sql('notes')}
+            FROM entities
+        """, None)
+    execute("DELETE FROM context_search", None)
+    rows = execute(f"""
+        SELECT r.source_id, r.content_hash, s.{title_column}, r.content, b.codec, b.payload
+        FROM raw_data r
+        JOIN sources s ON s.source_id = r.source_id
+        LEFT JOIN raw_blobs b ON b.content_hash = r.content_hash
+    """, None).fetchall()
+    for source_id, payload_hash, title, content, codec, payload in rows:
+        body = content if payload is None else decompress_text(bytes(payload), codec)
+        record_context(execute, source_id, payload_hash, title, body, db_type)
+    return {
+        'entities': execute("SELECT COUNT(*) FROM entities", None).fetchone()[0],
+        'contexts': len(rows),
+    }
+
+
+def _search_sql(db_type: str) -> str:
+    if db_type == 'postgresql':
+        # ts_headline is costly: only for the rows that made the LIMIT
+        return f"""
+            SELECT hit.kind, hit.id, hit.title,
+                   ts_headline('russian', hit.text, to_tsquery('russian', %s),
+                               'StartSel={MARK_START}, StopSel={MARK_END},
+                                MaxWords={SNIPPET_TOKENS}, MinWords=3, MaxFragments=1,
+                                FragmentDelimiter={ELLIPSIS}') AS snippet,
+                   hit.score
+            FROM (
+                SELECT 'entity' AS kind, e.entity_id AS id, e.label AS title,
+                       concat_ws(' · ', e.label, e.tags, e.notes) AS text,
+                       ts_rank(e.search_vector, q) AS score
+                FROM entities e, to_tsquery('russian', %s) q
+                WHERE e.search_vector @@ q
+                UNION ALL
+                SELECT 'context', c.source_id, c.title, c.body, ts_rank(c.search_vector, q)
+                FROM context_search c, to_tsquery('russian', %s) q
+                WHERE c.search_vector @@ q
+                ORDER BY score DESC
+                LIMIT %s
+            ) hit
+            ORDER BY hit.score DESC
+        """
+    snippet = f"'{MARK_START}', '{MARK_END}', '{ELLIPSIS}', {SNIPPET_TOKENS}"
+    return f"""
+        SELECT kind, id, title, snippet, score FROM (
+            SELECT 'entity' AS kind, e.entity_id AS id, e.label AS title,
+                   snippet(entity_search, -1, {snippet}) AS snippet,
+                   -bm25(entity_search, 10.0, 5.0, 1.0) AS score
+            FROM entity_search JOIN entities e ON e.entity_id = entity_search.rowid
+            WHERE entity_search MATCH ?
+            UNION ALL
+            SELECT 'context', source_id, title,
+                   snippet(context_search, 3, {snippet}),
+                   -bm25(context_search, 0.0, 0.0, 2.0, 1.0)
+            FROM context_search
+            WHERE context_search MATCH ?
+        )
+        ORDER BY score DESC
+        LIMIT ?
+    """
+
+
+def search_query(text: str, db_type: str = 'sqlite', limit: int = 20):
+    """
+    (sql, params) for a ranked search, or (None, None) if text has no
+    words. Rows: (kind 'entity' | 'context', id, title, snippet, score),
+    best first; id is entity_id or source_id.
+    """
+    match = match_param(text, db_type)
+    if not match:
+        return None, None
+    params = (match,) * 3 + (limit,) if db_type == 'postgresql' else (match, match, limit)
+    return _search_sql(db_type), params
+
+
+def search(execute: Callable, text: str, db_type: str = 'sqlite',
+           limit: int = 20) -> List[Dict]:
+    """Ranked hits as dicts (kind, id, title, snippet, score)."""
+    sql, params = search_query(text, db_type, limit)
+    if sql is None:
+        return []
+    columns = ('kind', 'id', 'title', 'snippet', 'score')
+    return [dict(zip(columns, row)) for row in execute(sql, params).fetchall()]
+
+
+# ============================================================
+# Legacy GraphDB: nodes + facts
+# ============================================================
+
+GRAPH_DB_TABLES = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS node_search USING fts5(name, tokenize = '{TOKENIZER}')",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS fact_search USING fts5(context, tokenize = '{TOKENIZER}')",
+)
+
+# facts are written with INSERT OR REPLACE: the delete triggers only see
+# the replaced row with PRAGMA recursive_triggers = ON (GraphDB sets it)
+GRAPH_DB_TRIGGERS = {
+    'trg_nodes_insert_search': f"""
+        AFTER INSERT ON nodes BEGIN
+            INSERT INTO node_search (rowid, name) VALUES (NEW.rowid, {fold_sql('NEW.name')});
+        END
+    """,
+    'trg_nodes_delete_search': """
+        AFTER DELETE ON nodes BEGIN
+            DELETE FROM node_search WHERE rowid = OLD.rowid;
+        END
+    """,
+    'trg_nodes_update_search': f"""
+        AFTER UPDATE OF name ON nodes BEGIN
+            DELETE FROM node_search WHERE rowid = OLD.rowid;
+            INSERT INTO node_search (rowid, name) VALUES (NEW.rowid, {fold_sql('NEW.name')});
+        END
+    """,
+    'trg_facts_insert_search': f"""
+        AFTER INSERT ON facts WHEN NEW.context <> '' BEGIN
+            INSERT INTO fact_search (rowid, context)
+            VALUES (NEW.rowid, {fold_sql('NEW.context')});
+        END
+    """,
+    'trg_facts_delete_search': """
+        AFTER DELETE ON facts BEGIN
+            DELETE FROM fact_search WHERE rowid = OLD.rowid;
+        END
+    """,
+    'trg_facts_update_search': f"""
+        AFTER UPDATE OF context ON facts BEGIN
+            DELETE FROM fact_search WHERE rowid = OLD.rowid;
+            INSERT INTO fact_search (rowid, context)
+            SELECT NEW.rowid, {fold_sql('NEW.context')} WHERE NEW.context <> '';
+        END
+    """,
+}
+
+
+def create_graph_db_index(conn) -> bool:
+    """node_search / fact_search + triggers; True if the tables are new."""
+    new = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fact_search'"
+    ).fetchone() is None
+    for sql in GRAPH_DB_TABLES:
+        conn.execute(sql)
+    for name, body in GRAPH_DB_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    return new
+
+
+def rebuild_graph_db_index(conn):
+    """Refill node_search / fact_search from nodes and facts."""
+    conn.execute("DELETE FROM node_search")
+    conn.execute(f"INSERT INTO node_search (rowid, name) SELECT rowid, {fold_sql('name')} FROM nodes")
+    conn.execute("DELETE FROM fact_search")
+    conn.execute(f"""
+        INSERT INTO fact_search (rowid, context)
+        SELECT rowid, {fold_sql('context')} FROM facts WHERE context <> ''
+    """)
+
+
+def _snippet(table: str) -> str:
+    return (f"snippet({table}, 0, '{MARK_START}', '{MARK_END}', '{ELLIPSIS}', "
+            f"{SNIPPET_TOKENS})")
+
+
+# CROSS JOIN keeps the FTS match as the outer loop (otherwise SQLite may
+# scan every participated_in fact and probe the index once per row);
+# snippets are cut only for the winning hits (MATCH + rowid lookup);
+# +relation_type steers the per-event lookups to idx_facts_object.
+# Params: match × 4, limit
+EVENT_SEARCH_SQL = f"""
+    WITH hits AS (
+        SELECT n.canonical_id AS event_id, -bm25(node_search) AS score,
+               'node' AS hit_table, node_search.rowid AS hit_rowid
+        FROM node_search CROSS JOIN nodes n ON n.rowid = node_search.rowid
+        WHERE node_search MATCH ? AND n.type = 'Event'
+        UNION ALL
+        SELECT f.object_id, -bm25(fact_search), 'fact', fact_search.rowid
+        FROM fact_search CROSS JOIN facts f ON f.rowid = fact_search.rowid
+        WHERE fact_search MATCH ? AND f.relation_type = 'participated_in'
+    ),
+    best AS (
+        -- bare columns: the best-scoring hit of each event
+        SELECT event_id, MAX(score) AS score, hit_table, hit_rowid
+        FROM hits GROUP BY event_id
+        ORDER BY score DESC
+        LIMIT ?
+    )
+    SELECT e.name, b.event_id AS canonical_id,
+           (SELECT MAX(p.event_date) FROM facts p
+            WHERE p.object_id = b.event_id AND +p.relation_type = 'participated_in') AS event_date,
+           (SELECT COUNT(*) FROM facts p
+            WHERE p.object_id = b.event_id AND +p.relation_type = 'participated_in') AS participants,
+           CASE b.hit_table
+               WHEN 'node' THEN (SELECT {_snippet('node_search')} FROM node_search
+                                 WHERE node_search MATCH ? AND rowid = b.hit_rowid)
+               ELSE (SELECT {_snippet('fact_search')} FROM fact_search
+                     WHERE fact_search MATCH ? AND rowid = b.hit_rowid)
+           END AS snippet,
+           b.score
+    FROM best b
+    JOIN nodes e ON e.canonical_id = b.event_id
+    ORDER BY b.score DESC
+"""
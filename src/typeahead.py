@@ -0,0 +1,169 @@
+"""
+Typeahead contact search: a page of matches for a partial name or email.
+
+    suggest_query('анна пет')  →  (sql, params), rows
+        (entity_id, label, primary_identifier, status)
+
+ordered by relationship_strength, LIMIT/OFFSET pages of PAGE_SIZE, so
+the UI gets a few dozen rows per keystroke however many contacts exist.
+Empty input → the strongest contacts.
+
+SQLite: FTS5 tables contact_lookup (folded label, rowid = entity_id)
+and identifier_lookup (one row per identifier) with prefix indexes for
+1–3 characters; every typed word is a prefix ("анна пет" finds
+"Анна Петрова", "anna.p" finds anna.petrova@gmail.com). Kept by
+triggers on entities and identifiers.
+
+PostgreSQL: pg_trgm GIN indexes on the folded label and identifiers;
+the typed words match as substrings in order (label LIKE '%анна%пет%').
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence
+
+from text_search import TOKENIZER, fold_sql, words
+
+PAGE_SIZE = 20
+
+SQLITE_TABLES = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS contact_lookup
+        USING fts5(label, tokenize = '{TOKENIZER}', prefix = '1 2 3')""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS identifier_lookup
+        USING fts5(identifier, entity_id UNINDEXED, tokenize = '{TOKENIZER}', prefix = '1 2 3')""",
+)
+
+# Identifiers get their own table (rowid = identifiers.rowid): adding one is a
+# plain insert, not a delete + re-insert of the entity row, which would flush
+# the FTS5 pending terms on every new identifier during an import.
+SQLITE_TRIGGERS = {
+    'trg_entities_insert_lookup': f"""
+        AFTER INSERT ON entities BEGIN
+            INSERT INTO contact_lookup (rowid, label) VALUES (NEW.entity_id, {fold_sql('NEW.label')});
+        END
+    """,
+    'trg_entities_label_lookup': f"""
+        AFTER UPDATE OF label ON entities BEGIN
+            DELETE FROM contact_lookup WHERE rowid = OLD.entity_id;
+            INSERT INTO contact_lookup (rowid, label) VALUES (NEW.entity_id, {fold_sql('NEW.label')});
+        END
+    """,
+    'trg_entities_delete_lookup': """
+        AFTER DELETE ON entities BEGIN
+            DELETE FROM contact_lookup WHERE rowid = OLD.entity_id;
+        END
+    """,
+    'trg_identifiers_insert_lookup': """
+        AFTER INSERT ON identifiers BEGIN
+            INSERT INTO identifier_lookup (rowid, identifier, entity_id)
+            VALUES (NEW.rowid, NEW.identifier, NEW.entity_id);
+        END
+    """,
+    'trg_identifiers_delete_lookup': """
+        AFTER DELETE ON identifiers BEGIN
+            DELETE FROM identifier_lookup WHERE rowid = OLD.rowid;
+        END
+    """,
+    'trg_identifiers_update_lookup': """
+        AFTER UPDATE OF identifier, entity_id ON identifiers BEGIN
+            DELETE FROM identifier_lookup WHERE rowid = OLD.rowid;
+            INSERT INTO identifier_lookup (rowid, identifier, entity_id)
+            VALUES (NEW.rowid, NEW.identifier, NEW.entity_id);
+        END
+    """,
+}
+
+_LABEL_PG = "translate(lower(label), 'ё', 'е')"
+
+POSTGRES_SQL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"""CREATE INDEX IF NOT EXISTS idx_entities_label_trgm
+        ON entities USING GIN (({_LABEL_PG}) gin_trgm_ops)""",
+    """CREATE INDEX IF NOT EXISTS idx_identifiers_trgm
+        ON identifiers USING GIN ((lower(identifier)) gin_trgm_ops)""",
+)
+
+
+def create_index(execute: Callable, db_type: str = 'sqlite'):
+    """contact_lookup / identifier_lookup (SQLite) or the trigram indexes (PostgreSQL)."""
+    for sql in (POSTGRES_SQL if db_type == 'postgresql' else SQLITE_TABLES):
+        execute(sql, None)
+
+
+def create_sqlite_triggers(conn):
+    """Install the lookup maintenance triggers on a SQLite connection."""
+    for name, body in SQLITE_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+def rebuild(execute: Callable):
+    """Refill contact_lookup and identifier_lookup from entities and identifiers (SQLite)."""
+    execute("DELETE FROM contact_lookup", None)
+    execute("DELETE FROM identifier_lookup", None)
+    execute(f"""
+        INSERT INTO contact_lookup (rowid, label)
+        SELECT entity_id, {fold_sql('label')} FROM entities
+    """, None)
+    execute("""
+        INSERT INTO identifier_lookup (rowid, identifier, entity_id)
+        SELECT rowid, identifier, entity_id FROM identifiers
+    """, None)
+
+
+def suggest_query(text: Optional[str], db_type: str = 'sqlite', entity_type: str = 'Person',
+                  statuses: Optional[Sequence[str]] = None, limit: int = PAGE_SIZE,
+                  offset: int = 0):
+    """(sql, params) for one page of suggestions."""
+    mark = '%s' if db_type == 'postgresql' else '?'
+    typed = words(text)
+    status_filter = ''
+    if statuses:
+        status_filter = f"AND e.status IN ({', '.join([mark] * len(statuses))})"
+    order = f"""
+        ORDER BY e.relationship_strength IS NULL, e.relationship_strength DESC, e.label
+        LIMIT {mark} OFFSET {mark}
+    """
+    columns = "e.entity_id, e.label, e.primary_identifier, e.status"
+    filters = (entity_type, *(statuses or ()))
+    page = (limit, offset)
+
+    if not typed:
+        sql = f"SELECT {columns} FROM entities e WHERE e.type = {mark} {status_filter} {order}"
+        return sql, filters + page
+
+    if db_type == 'postgresql':
+        pattern = '%' + '%'.join(typed) + '%'
+        sql = f"""
+            SELECT {columns}
+            FROM entities e
+            WHERE e.entity_id IN (
+                SELECT entity_id FROM entities WHERE {_LABEL_PG} LIKE %s
+                UNION
+                SELECT entity_id FROM identifiers WHERE lower(identifier) LIKE %s
+            )
+              AND e.type = %s {status_filter}
+            {order}
+        """
+        return sql, (pattern, pattern) + filters + page
+
+    # CROSS JOIN: the FTS matches drive the join (no scan of entities)
+    match = ' '.join(f'"{word}"*' for word in typed)
+    sql = f"""
+        WITH hits (entity_id) AS (
+            SELECT rowid FROM contact_lookup WHERE contact_lookup MATCH ?
+            UNION
+            SELECT entity_id FROM identifier_lookup WHERE identifier_lookup MATCH ?
+        )
+        SELECT {columns}
+        FROM hits CROSS JOIN entities e ON e.entity_id = hits.entity_id
+        WHERE e.type = ? {status_filter}
+        {order}
+    """
+    return sql, (match, match) + filters + page
+
+
+def suggest(execute: Callable, text: Optional[str], db_type: str = 'sqlite',
+            entity_type: str = 'Person', statuses: Optional[Sequence[str]] = None,
+            limit: int = PAGE_SIZE, offset: int = 0) -> List[Dict]:
+    """One page of suggestions as dicts (entity_id, label, primary_identifier, status)."""
+    sql, params = suggest_query(text, db_type, entity_type, statuses, limit, offset)
+    columns = ('entity_id', 'label', 'primary_identifier', 'status')
+    return [dict(zip(columns, row)) for row in execute(sql, params).fetchall()]
@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from target_scenarios import GraphQueries
+
+# Scenario graph shared by the GraphQueries tests: (attendees, date) per meeting
+MEETINGS = (
+    (['olga@x', 'anna@x', 'boris@x'], '2023-02-01'),
+    (['anna@x', 'vera@x', 'gleb@x', 'boris@x'], '2024-03-05'),
+    (['olga@x', 'dina@x'], '2024-06-01'),
+)
+
+
+def add_meeting(db, n, attendees, date):
+    source = {'filename': f'meeting{n}.ics', 'type': 'calendar', 'content': f'Meeting {n}'}
+    for i, a in enumerate(attendees):
+        for b in attendees[i + 1:]:
+            db.add_fact(a, 'co_attended', b, source, event_date=date,
+                        subject_label=a.split('@')[0].title(),
+                        object_label=b.split('@')[0].title())
+
+
+@pytest.fixture
+def meeting():
+    """meeting(db, n, attendees, date): co_attended between every pair, from meeting{n}.ics."""
+    return add_meeting
+
+
+@pytest.fixture
+def scenario_queries(tmp_path, meeting):
+    """GraphQueries on tmp_path / "contacts.db" holding MEETINGS (closed by the test)."""
+    queries = GraphQueries(str(tmp_path / "contacts.db"))
+    for n, (attendees, date) in enumerate(MEETINGS, 1):
+        meeting(queries.db, n, attendees, date)
+    return queries
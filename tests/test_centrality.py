@@ -0,0 +1,100 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import centrality
+from communities import WeightedGraph
+from enhanced_graph_db import EnhancedGraphDB
+from enhanced_graph_db_universal import EnhancedGraphDB as UniversalGraphDB
+from scoring import Scorer
+
+
+def graph(pairs, weights=None):
+    pairs = np.array(pairs)
+    return WeightedGraph.from_pairs(pairs[:, 0], pairs[:, 1],
+                                    np.ones(len(pairs)) if weights is None else np.array(weights))
+
+
+def test_metrics_on_small_graphs():
+    # Path 0-1-2-3-4: betweenness (n-1)(n-2)-normalized = 2·pairs through / 12
+    path = graph([(0, 1), (1, 2), (2, 3), (3, 4)])
+    assert np.allclose(centrality.betweenness(path, samples=None),
+                       np.array([0, 3, 4, 3, 0]) * 2 / 12)
+
+    # Star + a pendant on one leaf: the hub leads every metric
+    star = graph([(0, 1), (0, 2), (0, 3), (0, 4), (4, 5)], [1, 1, 1, 3, 1])
+    scores = centrality.compute(star, samples=None)
+    for metric in centrality.METRICS:
+        assert np.argmax(scores[metric]) == 0, metric
+    assert scores['degree'].tolist() == [4, 1, 1, 1, 2, 1]
+    assert scores['weighted_degree'].tolist() == [6, 1, 1, 1, 4, 1]
+    assert np.isclose(scores['pagerank'].sum(), 1.0)
+    assert np.isclose(np.linalg.norm(scores['eigenvector']), 1.0)
+
+    # Sampled betweenness estimates the exact one
+    rng = np.random.default_rng(0)
+    random = graph(rng.integers(0, 200, size=(800, 2)))
+    exact = centrality.betweenness(random, samples=None)
+    sampled = centrality.betweenness(random, samples=100)
+    assert np.corrcoef(exact, sampled)[0, 1] > 0.9
+
+
+def build(path):
+    db = EnhancedGraphDB(str(path))
+    source = {'filename': 'cal.ics', 'type': 'calendar', 'content': 'x'}
+    for a, b in [('anna', 'boris'), ('anna', 'vera'), ('anna', 'gleb'), ('gleb', 'dina')]:
+        db.add_fact(f'{a}@x', 'co_attended', f'{b}@x', source,
+                    subject_label=a.title(), object_label=b.title())
+    for person in ('anna', 'boris', 'vera', 'gleb', 'dina'):
+        db.add_fact('olga.rozet@x', 'co_attended', f'{person}@x', source,
+                    subject_label='Olga', object_label=person.title())
+    return db
+
+
+def test_cached_scores_and_ranking(tmp_path):
+    db = build(tmp_path / "contacts.db")
+
+    first = db.refresh_centrality()
+    assert first['recomputed'] and first['nodes'] == 5
+    assert not db.refresh_centrality()['recomputed']
+    assert db.refresh_centrality(samples=None)['recomputed']
+
+    # Entity edits (enrichment, rescoring) leave the scores current
+    db.conn.execute("UPDATE entities SET notes = 'x', relationship_strength = 0.1")
+    db.commit()
+    assert centrality.is_current(db.conn, samples=None)
+    assert not db.refresh_centrality(samples=None)['recomputed']
+
+    # Owner left out; Anna bridges everyone, Gleb links Dina
+    assert [row['label'] for row in db.most_connected('betweenness', 2)] == ['Anna', 'Gleb']
+    assert db.most_connected('degree', 1)[0]['degree'] == 3
+    assert db.most_connected('pagerank', 10, statuses=['nobody']) == []
+
+    # New data → recomputed on the next ranking
+    for name in ('egor', 'lev'):
+        db.add_fact(f'{name}@x', 'co_attended', 'gleb@x',
+                    {'filename': 'x', 'type': 'x', 'content': name},
+                    subject_label=name.title(), object_label='Gleb')
+    assert [row['label'] for row in db.most_connected('betweenness', 1)] == ['Gleb']
+    assert centrality.state(db.conn)['nodes'] == 7
+
+    # Strength from PageRank: normalized by the stored maximum
+    db.scorer = Scorer(centrality='pagerank')
+    db.refresh_scores()
+    strengths = dict(db.conn.execute("SELECT label, relationship_strength FROM entities"))
+    assert max(strengths.values()) == strengths['Gleb'] > strengths['Boris']
+    db.close()
+
+
+def test_universal_centrality(tmp_path):
+    db = UniversalGraphDB(db_path=str(tmp_path / "universal.db"))
+    for a, b in [('Anna', 'Boris'), ('Anna', 'Vera'), ('Anna', 'Gleb')]:
+        db.add_fact(a, 'co_attended', b)
+    assert db.most_connected('pagerank', 1)[0]['label'] == 'Anna'
+    assert not db.refresh_centrality()['recomputed']
+    db.add_fact('Gleb', 'co_attended', 'Dina')
+    assert db.refresh_centrality()['recomputed']
+    db.close()
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from common_neighbors import CommonNeighbors
+from enhanced_graph_db import EnhancedGraphDB
+from graph_index import GraphIndex
+
+EDGES = [
+    (1, 10, 20, 'co_attended'), (2, 11, 20, 'co_attended'), (3, 10, 21, 'co_attended'),
+    (4, 11, 21, 'emailed'), (5, 11, 21, 'co_attended'), (6, 12, 21, 'co_attended'),
+    (7, 10, 99, 'co_attended'), (8, 11, 99, 'co_attended'), (9, 12, 99, 'co_attended'),
+]
+
+
+def test_batched_pairs():
+    index = GraphIndex.from_rows((edge_id, a, b, relation, None, None)
+                                 for edge_id, a, b, relation in EDGES)
+    engine = CommonNeighbors(index, exclude=(99,))
+    pairs = [(10, 11), (10, 12), (11, 12), (10, 404), (10, 99)]
+
+    assert engine.counts(pairs).tolist() == [2, 1, 1, 0, 0]
+    [both, *_] = engine.common(pairs)
+    assert [n['entity_id'] for n in both['neighbors']] == [20, 21]
+    assert both['neighbors'][1] == {'entity_id': 21, 'relations_x': ('co_attended',),
+                                    'relations_y': ('co_attended', 'emailed')}
+
+    # Relation filter; the index grows → arrays rebuilt
+    meetings = CommonNeighbors(index, 'co_attended')
+    assert meetings.counts([(10, 11), (10, 12)]).tolist() == [3, 2]
+    index.add_edge(10, 12, 20, 'co_attended')
+    assert meetings.counts([(10, 12)]).tolist() == [3]
+
+    [best, second] = engine.strongest_pairs([10, 11, 12], top=2)
+    assert (best['x'], best['y'], best['count']) == (10, 11, 2)
+    assert (second['x'], second['y'], second['count']) == (10, 12, 2)
+
+
+def test_shared_circles(tmp_path):
+    db = EnhancedGraphDB(str(tmp_path / "contacts.db"))
+    source = {'filename': 'cal.ics', 'type': 'calendar', 'content': 'x'}
+    for a, b in [('anna', 'vera'), ('boris', 'vera'), ('anna', 'gleb'), ('boris', 'gleb'),
+                 ('dina', 'gleb')]:
+        db.add_fact(f'{a}@x', 'co_attended', f'{b}@x', source,
+                    subject_label=a.title(), object_label=b.title())
+    for person in ('anna', 'boris', 'dina'):
+        db.add_fact('olga.rozet@x', 'co_attended', f'{person}@x', source,
+                    subject_label='Olga', object_label=person.title())
+    db.conn.execute("UPDATE entities SET status = 'active'")
+    db.commit()
+
+    rows = db.shared_circles(top=3)
+    assert [({row['x_label'], row['y_label']}, row['count']) for row in rows] == [
+        ({'Anna', 'Boris'}, 2), ({'Vera', 'Gleb'}, 2), ({'Anna', 'Dina'}, 1)]
+    assert [n['label'] for n in rows[0]['neighbors']] == ['Vera', 'Gleb']
+    # The owner (everyone's contact) is no shared contact
+    assert [n['label'] for n in rows[2]['neighbors']] == ['Gleb']
+    db.close()
@@ -0,0 +1,128 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import communities
+from enhanced_graph_db import EnhancedGraphDB
+from enhanced_graph_db_universal import EnhancedGraphDB as UniversalGraphDB
+
+DESIGN = ['anna', 'boris', 'vera', 'gleb']
+FINANCE = ['dina', 'egor', 'zhanna', 'ivan']
+
+
+def clique(db, people, source):
+    for i, a in enumerate(people):
+        for b in people[i + 1:]:
+            db.add_fact(f'{a}@x', 'co_attended', f'{b}@x', source,
+                        subject_label=a.title(), object_label=b.title())
+
+
+def build(path):
+    db = EnhancedGraphDB(str(path))
+    source = {'filename': 'cal.ics', 'type': 'calendar', 'content': 'x'}
+    clique(db, DESIGN, source)
+    clique(db, FINANCE, source)
+    db.add_fact('gleb@x', 'co_attended', 'dina@x', source,
+                subject_label='Gleb', object_label='Dina')
+    # The owner knows everyone: left out of the clustering
+    for person in DESIGN + FINANCE:
+        db.add_fact('olga.rozet@x', 'co_attended', f'{person}@x', source,
+                    subject_label='Olga', object_label=person.title())
+    return db
+
+
+def groups(db, run_id=None):
+    return [sorted(member['label'] for member in db.community_members(c['community_id'], run_id))
+            for c in db.list_communities(run_id)]
+
+
+def test_detect_and_update(tmp_path):
+    db = build(tmp_path / "contacts.db")
+    expected = sorted([sorted(name.title() for name in DESIGN),
+                       sorted(name.title() for name in FINANCE)])
+
+    for method in communities.METHODS:
+        report = db.detect_communities(method=method)
+        assert report['communities'] == 2 and report['nodes'] == 8
+        assert report['modularity'] > 0.35
+        assert sorted(groups(db, report['run_id'])) == expected
+    assert db.list_communities(method='label_propagation') == \
+        db.list_communities(report['run_id'])
+
+    # Incremental: a newcomer joins the design group; only its neighborhood moves
+    first = db.detect_communities()
+    source = {'filename': 'new.ics', 'type': 'calendar', 'content': 'y'}
+    for person in ('anna', 'boris', 'vera'):
+        db.add_fact('lev@x', 'co_attended', f'{person}@x', source,
+                    subject_label='Lev', object_label=person.title())
+    update = db.detect_communities(incremental=True)
+    assert update['parent_run_id'] == first['run_id'] and update['touched'] == 4
+    assert sorted(groups(db)) == sorted([sorted(['Anna', 'Boris', 'Gleb', 'Lev', 'Vera']),
+                                         expected[1]])
+    # Nothing new since: the stored run is returned as is
+    assert db.detect_communities(incremental=True)['run_id'] == update['run_id']
+
+    # Old runs are pruned per method: the label propagation run survives
+    for _ in range(communities.KEEP_RUNS):
+        db.detect_communities()
+    runs = dict(db.conn.execute(
+        "SELECT method, COUNT(*) FROM community_runs GROUP BY method").fetchall())
+    assert runs == {'louvain': communities.KEEP_RUNS, 'label_propagation': 1}
+    assert db.list_communities(method='label_propagation')
+
+    # A run named as parent stays while its child is kept
+    parent = db.detect_communities()
+    db.add_fact('mila@x', 'co_attended', 'anna@x', source,
+                subject_label='Mila', object_label='Anna')
+    child = db.detect_communities(incremental=True)
+    assert child['parent_run_id'] == parent['run_id']
+    for _ in range(communities.KEEP_RUNS - 1):
+        db.detect_communities()
+    stored = lambda run_id: db.conn.execute(
+        "SELECT 1 FROM community_runs WHERE run_id = ?", (run_id,)).fetchone() is not None
+    assert stored(parent['run_id']) and stored(child['run_id'])
+    db.detect_communities()
+    assert not stored(child['run_id']) and not stored(parent['run_id'])
+    assert db.conn.execute("SELECT COUNT(DISTINCT run_id) FROM entity_communities").fetchone()[0] \
+        == communities.KEEP_RUNS + 1
+    db.close()
+
+
+def test_louvain_on_planted_partition():
+    rng = np.random.default_rng(3)
+    size, count = 30, 10
+    group = np.repeat(np.arange(count), size)
+    subjects, objects = [], []
+    for g in range(count):
+        members = np.flatnonzero(group == g)
+        for _ in range(150):
+            a, b = rng.choice(members, 2, replace=False)
+            subjects.append(a)
+            objects.append(b)
+    for _ in range(60):
+        a, b = rng.choice(len(group), 2, replace=False)
+        subjects.append(a)
+        objects.append(b)
+    graph = communities.WeightedGraph.from_pairs(
+        np.array(subjects), np.array(objects), np.ones(len(subjects)))
+
+    labels = communities.louvain(graph)
+    assert len(np.unique(labels)) == count
+    assert all(len(np.unique(labels[group[graph.nodes] == g])) == 1 for g in range(count))
+    assert communities.modularity(graph, labels) > communities.modularity(graph, group[graph.nodes]) - 1e-9
+
+
+def test_universal_communities(tmp_path):
+    db = UniversalGraphDB(db_path=str(tmp_path / "universal.db"))
+    for people in (DESIGN, FINANCE):
+        for i, a in enumerate(people):
+            for b in people[i + 1:]:
+                db.add_fact(a, 'co_attended', b)
+    report = db.detect_communities()
+    assert report['communities'] == 2
+    assert [c['size'] for c in db.list_communities()] == [4, 4]
+    assert len(db.community_members(0)) == 4
+    db.close()
@@ -0,0 +1,211 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from enhanced_graph_db import EnhancedGraphDB
+
+
+SOURCE = {'filename': 'calendar.ics', 'type': 'calendar', 'content': 'Meeting'}
+
+
+def test_get_or_create_entity_upsert(tmp_path):
+    db = EnhancedGraphDB(str(tmp_path / "contacts.db"))
+
+    a = db.get_or_create_entity("a@example.com", label="A")
+    b = db.get_or_create_entity("b@example.com", label="B")
+    assert a != b
+    assert db.get_or_create_entity("a@example.com") == a
+
+    # Cold cache: resolution goes through the upsert, not a new entity
+    db.identifier_cache.clear()
+    assert db.get_or_create_entity("a@example.com", label="Other") == a
+
+    cursor = db.conn.execute("SELECT COUNT(*) FROM entities")
+    assert cursor.fetchone()[0] == 2
+    cursor = db.conn.execute("SELECT label FROM entities WHERE entity_id = ?", (a,))
+    assert cursor.fetchone()[0] == "A"
+
+    db.close()
+
+
+def test_identifier_cache_preload_and_add_identifier(tmp_path):
+    path = str(tmp_path / "contacts.db")
+    db = EnhancedGraphDB(path)
+    a = db.get_or_create_entity("a@example.com", label="A")
+    db.close()
+
+    db = EnhancedGraphDB(path, preload_identifiers=True)
+    assert "a@example.com" in db.identifier_cache
+
+    db.add_identifier("alias@example.com", a)
+    before = db.identifier_cache.info()['hits']
+    db.add_fact("alias@example.com", "co_attended", "a@example.com", SOURCE)
+    assert db.identifier_cache.info()['hits'] == before + 2
+
+    cursor = db.conn.execute("SELECT subject_id, object_id FROM edges")
+    assert tuple(cursor.fetchone()) == (a, a)
+
+    db.close()
+
+
+def test_rollback_drops_uncommitted_identifiers(tmp_path):
+    db = EnhancedGraphDB(str(tmp_path / "contacts.db"))
+
+    db._resolve_entity("ghost@example.com", None, "Person", "email")
+    assert "ghost@example.com" in db.identifier_cache
+    db.rollback()
+    assert "ghost@example.com" not in db.identifier_cache
+
+    cursor = db.conn.execute("SELECT COUNT(*) FROM identifiers")
+    assert cursor.fetchone()[0] == 0
+
+    db.close()
+
+
+def test_raw_payloads_deduplicated_and_compressed(tmp_path):
+    db = EnhancedGraphDB(str(tmp_path / "contacts.db"), raw_codec="lzma")
+    body = "BEGIN:VEVENT\nSUMMARY:Встреча\nEND:VEVENT\n" * 50
+
+    e1 = db.add_fact("a@x", "co_attended", "b@x",
+                     {'filename': 'a.ics', 'type': 'calendar', 'content': body})
+    db.add_fact("a@x", "co_attended", "c@x",
+                {'filename': 'b.ics', 'type': 'calendar', 'content': body})
+
+    assert db.conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0] == 2
+    codec, size, stored = db.conn.execute(
+        "SELECT codec, size, length(payload) FROM raw_blobs"
+    ).fetchone()
+    assert db.conn.execute("SELECT COUNT(*) FROM raw_blobs").fetchone()[0] == 1
+    assert codec == "lzma" and stored < size
+
+    provenance = db.get_provenance(e1)
+    assert provenance['filename'] == 'a.ics'
+    assert provenance['content'] == [body]
+
+    db.close()
+
+
+def test_compact_raw_data_moves_legacy_content(tmp_path):
+    db = EnhancedGraphDB(str(tmp_path / "contacts.db"))
+    body = "legacy payload " * 200
+    db.conn.execute("INSERT INTO sources (filename, source_type, hash) VALUES ('f', 't', 'h')")
+    db.conn.executemany(
+        "INSERT INTO raw_data (source_id, data_type, content) VALUES (1, 't', ?)",
+        [(body,), (body,)]
+    )
+    db.commit()
+
+    report = db.compact_raw_data()
+
+    assert report['rows_compacted'] == 2
+    assert report['blobs'] == 1
+    assert db.conn.execute(
+        "SELECT COUNT(*) FROM raw_data WHERE content IS NOT NULL"
+    ).fetchone()[0] == 0
+    assert db.get_raw_content(1) == [body, body]
+
+    db.close()
+
+
+def test_add_fact_is_idempotent_per_source(tmp_path):
+    db = EnhancedGraphDB(str(tmp_path / "contacts.db"))
+    other = {'filename': 'other.ics', 'type': 'calendar', 'content': 'Other'}
+
+    e1 = db.add_fact("a@x", "co_attended", "b@x", SOURCE, event_date="2024-05-01", confidence=0.6)
+    e2 = db.add_fact("a@x", "co_attended", "b@x", SOURCE, event_date="2024-05-01", confidence=0.6)
+    e3 = db.add_fact("a@x", "co_attended", "b@x", other, event_date="2024-05-01", confidence=1.0)
+    e4 = db.add_fact("a@x", "co_attended", "b@x", SOURCE, event_date=None)
+
+    assert e1 == e2 == e3 != e4
+    row = db.conn.execute(
+        "SELECT occurrences, confidence, avg_confidence FROM edges WHERE edge_id = ?", (e1,)
+    ).fetchone()
+    assert tuple(row) == (2, 1.0, 0.8)
+    assert db.conn.execute(
+        "SELECT COUNT(*) FROM edge_sources WHERE edge_id = ?", (e1,)
+    ).fetchone()[0] == 2
+
+    db.close()
+
+
+def test_dedupe_edges_merges_legacy_duplicates(tmp_path):
+    path = str(tmp_path / "contacts.db")
+    db = EnhancedGraphDB(path)
+    db.add_fact("a@x", "co_attended", "b@x", SOURCE, event_date="2024-05-01")
+    db.conn.execute("DROP INDEX idx_edges_unique")
+    db.conn.executemany("""
+        INSERT INTO edges (subject_id, object_id, relation_type, event_date, confidence, source_id)
+        VALUES (1, 2, 'co_attended', '2024-05-01', ?, ?)
+    """, [(0.5, 1), (0.9, 7)])
+    db.commit()
+    db.close()
+
+    db = EnhancedGraphDB(path)
+    assert not db.edges_unique
+
+    report = db.dedupe_edges()
+    assert report == {'edges_before': 3, 'edges_after': 1, 'duplicates_removed': 2}
+    assert db.edges_unique
+
+    row = db.conn.execute("SELECT occurrences, confidence FROM edges").fetchone()
+    assert tuple(row) == (2, 1.0)
+
+    db.close()
+
+
+def test_entity_stats_follow_writes(tmp_path):
+    db = EnhancedGraphDB(str(tmp_path / "contacts.db"))
+    other = {'filename': 'other.ics', 'type': 'calendar', 'content': 'Other'}
+    today = datetime.now().date()
+    recent = (today - timedelta(days=10)).isoformat()
+    old = (today - timedelta(days=1000)).isoformat()
+
+    db.add_fact("olga.rozet@x", "co_attended", "a@x", SOURCE, event_date=recent)
+    db.add_fact("olga.rozet@x", "co_attended", "b@x", SOURCE, event_date=old)
+    db.add_fact("a@x", "co_attended", "b@x", SOURCE, event_date=old)
+    db.add_fact("a@x", "co_attended", "b@x", other, event_date=old)
+    db.add_fact("a@x", "works_at", "c@x", SOURCE)
+    # Touched rows were rescored against a stale max_degree: one full pass per import
+    assert db.scores_dirty
+    db.refresh_scores()
+    db.commit()
+    assert not db.scores_dirty
+
+    def stats(identifier):
+        entity_id = db.get_or_create_entity(identifier)
+        per_relation = db.conn.execute("""
+            SELECT relation_type, degree, interactions, first_date, last_date
+            FROM entity_stats WHERE entity_id = ? ORDER BY relation_type
+        """, (entity_id,)).fetchall()
+        entity = db.conn.execute("""
+            SELECT degree, first_seen, last_interaction, status, relationship_strength
+            FROM entities WHERE entity_id = ?
+        """, (entity_id,)).fetchone()
+        return [tuple(row) for row in per_relation], tuple(entity)
+
+    # Olga (degree 2) is excluded from max_degree: a has 3 edges
+    assert stats("a@x") == (
+        [('co_attended', 2, 3, old, recent), ('works_at', 1, 1, None, None)],
+        (3, old, recent, 'active', round(0.5 + 0.5 * 365 / 375, 3))
+    )
+    assert stats("b@x")[1][3:] == ('cold', round(0.5 * 2 / 3 + 0.5 * 365 / 1365, 3))
+    assert stats("c@x")[1][3:] == ('directory', round(0.5 / 3, 3))
+
+    # Deleting edges recomputes boundary dates
+    db.conn.execute("""
+        DELETE FROM edges WHERE relation_type = 'co_attended' AND event_date = ?
+    """, (recent,))
+    db.refresh_scores()
+    db.commit()
+    assert stats("a@x") == (
+        [('co_attended', 1, 2, old, old), ('works_at', 1, 1, None, None)],
+        (2, old, old, 'cold', round(0.5 + 0.5 * 365 / 1365, 3))
+    )
+
+    snapshot = db.conn.execute("SELECT * FROM entity_stats ORDER BY 1, 2").fetchall()
+    db.rebuild_entity_stats()
+    assert db.conn.execute("SELECT * FROM entity_stats ORDER BY 1, 2").fetchall() == snapshot
+
+    db.close()
@@ -0,0 +1,90 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+import entity_edges
+from target_scenarios import GraphQueries
+
+
+def incidence(conn):
+    return sorted(tuple(row) for row in conn.execute("SELECT * FROM entity_edges"))
+
+
+def expected(conn):
+    rows = []
+    for edge_id, s, o, rel, date, day in conn.execute("""
+            SELECT edge_id, subject_id, object_id, relation_type, event_date, event_day
+            FROM edges"""):
+        rows.append((s, o, rel, date, day, edge_id))
+        if s != o:
+            rows.append((o, s, rel, date, day, edge_id))
+    return sorted(rows)
+
+
+def test_entity_edges_follow_writes(tmp_path, scenario_queries, meeting):
+    queries = scenario_queries
+    conn = queries.db.conn
+
+    edges = conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0]
+    assert edges == 10
+    assert incidence(conn) == expected(conn)
+    assert len(incidence(conn)) == 2 * edges
+
+    # Same fact again: no new incidence rows
+    meeting(queries.db, 4, ['olga@x', 'dina@x'], '2024-06-01')
+    assert len(incidence(conn)) == 2 * edges
+
+    anna = queries._find_entity('Anna')
+    dina = queries._find_entity('Dina')
+    conn.execute("UPDATE edges SET object_id = ? WHERE object_id = ?", (anna, dina))
+    conn.execute("DELETE FROM edges WHERE event_date = '2023-02-01'")
+    conn.commit()
+    assert incidence(conn) == expected(conn)
+    assert conn.execute(
+        "SELECT COUNT(*) FROM entity_edges WHERE entity_id = ?", (dina,)
+    ).fetchone()[0] == 0
+
+    before = incidence(conn)
+    entity_edges.rebuild(lambda query, params: conn.execute(query, params or ()))
+    assert incidence(conn) == before
+
+    # A table from before event_day is rebuilt on open
+    entity_edges.drop(lambda query, params: conn.execute(query, params or ()))
+    conn.execute("""
+        CREATE TABLE entity_edges (entity_id INTEGER NOT NULL, other_id INTEGER NOT NULL,
+                                   relation_type TEXT NOT NULL, event_date TEXT,
+                                   edge_id INTEGER NOT NULL,
+                                   PRIMARY KEY (relation_type, entity_id, edge_id)) WITHOUT ROWID
+    """)
+    conn.commit()
+    queries.db.close()
+    queries = GraphQueries(str(tmp_path / "contacts.db"))
+    assert incidence(queries.db.conn) == before
+    queries.db.close()
+
+
+def test_scenario_queries_use_incidence_indexes(scenario_queries, capsys):
+    queries = scenario_queries
+    conn = queries.db.conn
+
+    statements = []
+    conn.set_trace_callback(statements.append)
+    queries.q2_cold_contacts(0)
+    assert queries._q5_sql(3) == [('Anna', 5), ('Boris', 5), ('Vera', 3)]
+    conn.set_trace_callback(None)
+
+    output = capsys.readouterr().out
+    assert "Dina (последняя встреча: 2024-06-01)" in output
+
+    statements = [sql for sql in statements if 'entity_edges' in sql]
+    assert len(statements) == 2
+    for sql in statements:
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        assert not any('SCAN ed' in step or 'edges ed' in step for step in plan), plan
+        incidence_steps = [step for step in plan if step.startswith(('SEARCH ee', 'SCAN ee'))]
+        assert incidence_steps, plan
+        assert all('PRIMARY KEY' in step or 'COVERING INDEX' in step
+                   for step in incidence_steps), plan
+    queries.db.close()
@@ -0,0 +1,55 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import event_time
+from enhanced_graph_db import EnhancedGraphDB
+
+
+def test_parse_event_date():
+    day_2024 = event_time.day_number(date(2024, 3, 5))
+    assert event_time.parse_event_date('2024-03-05') == (day_2024, 1709596800)
+    # Calendar day as written; the timestamp honours the offset
+    assert event_time.parse_event_date('2024-03-05T01:00:00+03:00') == (day_2024, 1709589600)
+    assert event_time.parse_event_date('2024-03-05T10:00:00Z')[1] == 1709632800
+    assert event_time.parse_event_date('2024-03-05 10:00') == (day_2024, 1709632800)
+    assert event_time.parse_event_date('2024') == (None, None)
+    assert event_time.parse_event_date(None) == (None, None)
+    assert event_time.from_day_number(day_2024) == date(2024, 3, 5)
+    assert event_time.year_range(2024) == (19723, 20089)
+    assert event_time.days_ago(10, today=date(2024, 3, 15)) == day_2024
+
+
+def test_event_day_written_and_backfilled(tmp_path):
+    db = EnhancedGraphDB(str(tmp_path / "contacts.db"))
+    source = {'filename': 'cal.ics', 'type': 'calendar', 'content': 'x'}
+    db.add_fact('olga@x', 'co_attended', 'anna@x', source, event_date='2024-03-05T10:00:00+01:00')
+    db.add_fact('olga@x', 'co_attended', 'boris@x', source, event_date='2023-12-31')
+    db.add_fact('olga@x', 'works_at', 'org@x', source)
+    db.add_fact('olga@x', 'co_attended', 'vera@x', source, event_date='soon')
+
+    rows = dict(db.conn.execute("SELECT event_date, event_day FROM edges").fetchall())
+    assert rows == {
+        '2024-03-05T10:00:00+01:00': event_time.to_day('2024-03-05'),
+        '2023-12-31': event_time.to_day(date(2023, 12, 31)),
+        None: None,
+        'soon': None,
+    }
+
+    # Raw writers leave the typed columns empty → backfill
+    db.conn.execute("UPDATE edges SET event_day = NULL, event_ts = NULL")
+    assert db.backfill_event_days() == {'updated': 2, 'unparsed': 1}
+    assert dict(db.conn.execute("SELECT event_date, event_day FROM edges").fetchall()) == rows
+
+    # "In year Y" is an index range scan
+    start, end = event_time.year_range(2024)
+    query = """
+        SELECT COUNT(*) FROM edges
+        WHERE relation_type = 'co_attended' AND event_day >= ? AND event_day < ?
+    """
+    assert db.conn.execute(query, (start, end)).fetchone()[0] == 1
+    plan = ' '.join(row[3] for row in db.conn.execute(f"EXPLAIN QUERY PLAN {query}", (start, end)))
+    assert 'idx_edges_relation_day (relation_type=? AND event_day>? AND event_day<?)' in plan
+    db.close()
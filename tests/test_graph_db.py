@@ -0,0 +1,174 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from graph_db import GraphDB
+
+
+def make_fact(i, source="https://example.org/a"):
+    return {
+        "source_url": source,
+        "fact_id": f"fact:{i}",
+        "relation_type": "works_at",
+        "subject_name": f"Person {i % 3}",
+        "subject_type": "Person",
+        "subject_canonical_id": f"temp:Person {i % 3}",
+        "object_name": "Org",
+        "object_type": "Organization",
+        "object_canonical_id": "temp:Org",
+        "confidence": 0.9,
+        "context": f"fact {i}"
+    }
+
+
+def test_store_facts_matches_store_fact(tmp_path):
+    facts = [make_fact(i, source=f"https://example.org/{i % 2}") for i in range(10)]
+
+    single = GraphDB(str(tmp_path / "single.db"))
+    for fact in facts:
+        single.store_fact(fact)
+
+    bulk = GraphDB(str(tmp_path / "bulk.db"))
+    assert bulk.store_facts(facts, batch_size=4) == 10
+
+    assert single.get_stats() == bulk.get_stats()
+    assert bulk.get_stats() == {"Person": 3, "Organization": 1, "Facts": 10, "Sources": 2}
+
+    rows = bulk.query("SELECT COUNT(*) AS n FROM claims")
+    assert rows[0]["n"] == 10
+
+    single.close()
+    bulk.close()
+
+
+def test_store_facts_shares_timestamp(tmp_path):
+    db = GraphDB(str(tmp_path / "contacts.db"))
+    db.store_facts([make_fact(i) for i in range(5)])
+
+    rows = db.query("SELECT DISTINCT created_at FROM facts")
+    assert len(rows) == 1
+
+    db.close()
+
+
+def test_concurrent_reader_not_blocked_by_writer(tmp_path):
+    db = GraphDB(str(tmp_path / "contacts.db"), concurrent=True)
+    db.store_facts([make_fact(0)])
+
+    assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    # Writer holds an open write transaction ...
+    db.conn.execute("BEGIN IMMEDIATE")
+    db.conn.execute(
+        "INSERT INTO nodes (canonical_id, name, type) VALUES ('temp:X', 'X', 'Person')"
+    )
+
+    # ... and the reader still sees the last committed snapshot immediately
+    assert db.get_stats()["Person"] == 1
+
+    db.conn.commit()
+    assert db.get_stats()["Person"] == 2
+
+    db.close()
+
+
+def test_readers_closed_after_their_thread(tmp_path):
+    import threading
+
+    from sqlite_concurrency import SQLiteConnections
+
+    connections = SQLiteConnections(str(tmp_path / "contacts.db"))
+    connections.writer.execute("CREATE TABLE t (x INTEGER)")
+    connections.writer.commit()
+    used = []
+
+    # One thread per Streamlit rerun
+    for _ in range(5):
+        thread = threading.Thread(target=lambda: used.append(
+            connections.reader().execute("SELECT COUNT(*) FROM t").fetchone()[0]))
+        thread.start()
+        thread.join()
+    assert used == [0] * 5
+    # Each new reader closed the previous thread's one
+    assert len(connections._readers) == 1
+    assert connections.close_finished_readers() == 1
+    assert connections.reader() is connections.reader()
+    assert len(connections._readers) == 1
+    connections.close()
+
+
+def test_export_graph_json_streams_document(tmp_path):
+    import json
+
+    db = GraphDB(str(tmp_path / "contacts.db"))
+    db.store_facts([make_fact(i) for i in range(3)])
+
+    output = db.export_graph_json(str(tmp_path / "graph.json"))
+    with open(output, encoding='utf-8') as f:
+        graph = json.load(f)
+    assert len(graph["nodes"]) == 4 and len(graph["edges"]) == 3
+    assert graph["metadata"]["stats"]["Facts"] == 3
+    assert graph["edges"][0]["source_url"] == "https://example.org/a"
+
+    db.close()
+
+
+
+def test_event_dates_stored_and_backfilled(tmp_path):
+    import json
+    import sqlite3
+
+    # Database from before facts.event_date, written by process_calendar
+    path = str(tmp_path / "contacts.db")
+    legacy = sqlite3.connect(path)
+    legacy.execute("""
+        CREATE TABLE nodes (canonical_id TEXT PRIMARY KEY, name TEXT NOT NULL,
+                            type TEXT NOT NULL, metadata TEXT, first_seen TIMESTAMP)
+    """)
+    legacy.execute("""
+        CREATE TABLE facts (fact_id TEXT PRIMARY KEY, relation_type TEXT NOT NULL,
+                            subject_id TEXT NOT NULL, object_id TEXT NOT NULL,
+                            start_date TEXT, end_date TEXT, confidence REAL NOT NULL,
+                            context TEXT, created_at TIMESTAMP)
+    """)
+    events = {'a1': '2023-05-02', 'b:2': '2024-03-05T10:00:00+03:00', 'c3': None}
+    for uid, start in events.items():
+        legacy.execute("INSERT INTO nodes VALUES (?, ?, 'Event', ?, datetime())",
+                       (f"event:{uid}", uid, json.dumps({'date': start, 'id': uid})))
+        legacy.execute("""
+            INSERT INTO facts (fact_id, relation_type, subject_id, object_id, confidence, context)
+            VALUES (?, 'participated_in', 'email:olga@x', ?, 0.95, ?)
+        """, (f"email:olga@x:participated_in:event:{uid}", f"event:{uid}", f"on {start}"))
+        legacy.execute("""
+            INSERT INTO facts (fact_id, relation_type, subject_id, object_id, confidence, context)
+            VALUES (?, 'co_attended', 'email:olga@x', 'email:anna@x', 0.9, ?)
+        """, (f"email:olga@x:co_attended:email:anna@x:{uid}", f"on {start}"))
+    legacy.commit()
+    legacy.close()
+
+    db = GraphDB(path)
+    db.store_facts([{**make_fact(0), "relation_type": "co_attended", "event_date": "2024-11-20"},
+                    make_fact(1)])
+    rows = db.query("SELECT relation_type, event_date FROM facts ORDER BY fact_id")
+    assert [tuple(row.values()) for row in rows] == [
+        ('co_attended', '2023-05-02'),
+        ('co_attended', '2024-03-05T10:00:00+03:00'),
+        ('co_attended', None),
+        ('participated_in', '2023-05-02'),
+        ('participated_in', '2024-03-05T10:00:00+03:00'),
+        ('participated_in', None),
+        ('co_attended', '2024-11-20'),
+        ('works_at', None),
+    ]
+
+    # Meetings per year: one aggregate over idx_facts_type_date
+    query = """
+        SELECT substr(event_date, 1, 4) AS year, COUNT(*) AS n FROM facts
+        WHERE relation_type = 'co_attended' AND event_date IS NOT NULL
+        GROUP BY year
+    """
+    assert [tuple(row.values()) for row in db.query(query)] == [('2023', 1), ('2024', 2)]
+    plan = ' '.join(row[3] for row in db.conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+    assert 'COVERING INDEX idx_facts_type_date' in plan
+    db.close()
@@ -0,0 +1,111 @@
+import gzip
+import json
+import sys
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from enhanced_graph_db import EnhancedGraphDB
+
+NS = '{http://graphml.graphdrawing.org/xmlns}'
+
+
+def make_graph(path, n_edges):
+    """Synthetic graph written directly (bypassing add_fact for speed)."""
+    db = EnhancedGraphDB(str(path))
+    n_nodes = max(n_edges // 10, 2)
+    db.conn.executemany(
+        "INSERT INTO entities (entity_id, label, type) VALUES (?, ?, 'Person')",
+        [(i, f"Person {i}") for i in range(1, n_nodes + 1)]
+    )
+    db.conn.executemany("""
+        INSERT INTO edges (subject_id, object_id, relation_type, event_date, confidence)
+        VALUES (?, ?, 'co_attended', ?, 0.9)
+    """, [(i % n_nodes + 1, (i * 7) % n_nodes + 1, f"2024-01-{i % 28 + 1:02d}#{i}")
+          for i in range(n_edges)])
+    db.commit()
+    return db
+
+
+def peak_export_memory(db, output):
+    tracemalloc.start()
+    db.export_to_graphml(str(output), chunk_size=500)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def test_graphml_escaping_and_gzip(tmp_path):
+    db = EnhancedGraphDB(str(tmp_path / "contacts.db"))
+    db.add_fact("a@x", "co_attended", "b@x",
+                {'filename': 'f.ics', 'type': 'calendar', 'content': 'x'},
+                subject_label='Ольга <"R&D">', object_label="O'Brien\x01")
+
+    output = tmp_path / "graph.graphml.gz"
+    db.export_to_graphml(str(output))
+    db.close()
+
+    with gzip.open(output, 'rt', encoding='utf-8') as f:
+        root = ET.parse(f).getroot()
+
+    labels = sorted(
+        d.text for d in root.iter(f'{NS}data') if d.get('key') == 'label'
+    )
+    assert labels == ["O'Brien", 'Ольга <"R&D">']
+    edge = root.find(f'{NS}graph/{NS}edge')
+    assert (edge.get('source'), edge.get('target')) == ('1', '2')
+
+
+def test_graphml_export_memory_is_constant(tmp_path):
+    small = make_graph(tmp_path / "small.db", 2_000)
+    large = make_graph(tmp_path / "large.db", 40_000)
+
+    small_peak = peak_export_memory(small, tmp_path / "small.graphml")
+    large_peak = peak_export_memory(large, tmp_path / "large.graphml")
+    small.close()
+    large.close()
+
+    # 20x more edges, same memory envelope
+    assert large_peak < small_peak * 2 + 64 * 1024
+    size = (tmp_path / "large.graphml").stat().st_size
+    assert large_peak < size / 10
+
+
+def test_json_export_modes_and_since(tmp_path):
+    db = EnhancedGraphDB(str(tmp_path / "contacts.db"))
+    source = {'filename': 'f.ics', 'type': 'calendar', 'content': 'x'}
+    db.add_fact("a@x", "co_attended", "b@x", source, event_date="2023-03-01")
+    db.add_fact("a@x", "co_attended", "c@x", source, event_date="2024-06-01",
+                object_label="Сергей")
+
+    db.export_to_json(str(tmp_path / "all.json"))
+    db.export_to_json(str(tmp_path / "recent.ndjson.gz"), fmt='ndjson', since="2024-01-01")
+    db.close()
+
+    with open(tmp_path / "all.json", encoding='utf-8') as f:
+        graph = json.load(f)
+    assert len(graph['nodes']) == 3 and len(graph['links']) == 2
+    assert graph['links'][0]['relation'] == 'co_attended'
+
+    with gzip.open(tmp_path / "recent.ndjson.gz", 'rt', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [r['kind'] for r in records] == ['node', 'node', 'link']
+    assert {r['label'] for r in records[:2]} == {'a@x', 'Сергей'}
+    assert records[2]['event_date'] == '2024-06-01'
+
+
+def test_json_export_memory_is_constant(tmp_path):
+    small = make_graph(tmp_path / "small.db", 2_000)
+    large = make_graph(tmp_path / "large.db", 40_000)
+
+    peaks = []
+    for db, name in ((small, "small"), (large, "large")):
+        tracemalloc.start()
+        db.export_to_json(str(tmp_path / f"{name}.json"), chunk_size=500)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        db.close()
+
+    assert peaks[1] < peaks[0] * 2 + 64 * 1024
@@ -0,0 +1,74 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+PEOPLE = ['olga@x', 'anna@x', 'boris@x', 'vera@x', 'gleb@x', 'dina@x', 'egor@x']
+
+
+@pytest.fixture
+def queries(scenario_queries, meeting):
+    db = scenario_queries.db
+    meeting(db, 4, ['gleb@x', 'egor@x'], '2022-01-01')
+    db.add_fact('anna@x', 'works_at', 'org', {'filename': 'cv', 'type': 'cv', 'content': 'x'},
+                object_type='Organization')
+    return scenario_queries
+
+
+def both(queries, method, *args):
+    index_result = getattr(queries, f'_{method}_index')(*args)
+    sql_result = getattr(queries, f'_{method}_sql')(*args)
+    return index_result, sql_result
+
+
+def test_index_matches_sql(queries):
+
+    index_q5, sql_q5 = both(queries, 'q5', 10)
+    assert index_q5 == sql_q5
+    assert index_q5[0] == ('Anna', 5)
+
+    for pair in [('Anna', 'Gleb'), ('Olga', 'Vera'), ('Dina', 'Egor')]:
+        index_q4, sql_q4 = both(queries, 'q4', *pair)
+        assert index_q4 == sql_q4
+
+    # Q3 (depth 2 in SQL): same reachability; the index finds longer chains too
+    olga = queries._olga_id()
+    for name in ['Anna', 'Vera', 'Dina']:
+        target = queries._find_entity(name)
+        index_q3 = queries._q3_index(olga, target, max_depth=2)
+        assert bool(index_q3) == bool(queries._q3_sql(olga, target))
+    egor = queries._find_entity('Egor')
+    assert queries._q3_sql(olga, egor) == []
+    [(hops, chain)] = queries._q3_index(olga, egor, warmest=False)
+    assert hops == 3 and chain[0] == 'Olga' and chain[-1] == 'Egor'
+
+    queries.db.close()
+
+
+def test_index_follows_add_fact_and_filters(queries, meeting):
+    db = queries.db
+    index = db.graph_index()
+    anna = queries._find_entity('Anna')
+
+    assert db.graph_index() is index
+    assert len(index.neighbors(anna, 'co_attended')) == 4
+    assert len(index.neighbors(anna, 'co_attended', since='2024-01-01')) == 3
+    assert len(index.neighbors(anna, 'co_attended', until='2023')) == 2
+    assert len(index.neighbors(anna)) == 5
+
+    # Kept current by the add_fact hook, no rebuild
+    meeting(db, 5, ['anna@x', 'egor@x'], '2024-09-09')
+    assert db.graph_index() is index
+    assert queries._find_entity('Egor') in index.neighbors(anna)
+    assert queries._q5_index(10) == queries._q5_sql(10)
+
+    # Writes that bypass add_fact trigger a rebuild
+    db.conn.execute("DELETE FROM edges WHERE relation_type = 'works_at'")
+    db.commit()
+    rebuilt = db.graph_index()
+    assert rebuilt is not index
+    assert len(rebuilt.neighbors(anna)) == 5
+
+    db.close()
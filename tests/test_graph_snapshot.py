@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from enhanced_graph_db import EnhancedGraphDB
+from graph_snapshot import StaleSnapshotError
+
+SOURCE = {'filename': 'calendar.ics', 'type': 'calendar', 'content': 'Meeting'}
+
+
+def make_db(path):
+    db = EnhancedGraphDB(str(path))
+    db.add_fact("a@x", "co_attended", "b@x", SOURCE, event_date="2024-05-01",
+                subject_label="Ольга", confidence=0.5)
+    db.add_fact("a@x", "works_at", "org", SOURCE, object_type="Organization")
+    db.add_fact("c@x", "co_attended", "a@x", SOURCE, event_date="2023-01-02T10:00")
+    return db
+
+
+def test_snapshot_round_trip(tmp_path):
+    db = make_db(tmp_path / "contacts.db")
+    output = tmp_path / "graph.bin"
+    header = db.snapshot(str(output))
+    assert (header['nodes'], header['edges']) == (4, 3)
+
+    snap = db.load_snapshot(str(output))
+    assert isinstance(snap.indptr, np.memmap) or isinstance(snap.indptr.base, np.memmap)
+
+    a = snap.index_of(1)
+    assert snap.label(a) == "Ольга"
+    assert snap.entity_type(snap.index_of(3)) == "Organization"
+
+    out = snap.out_edges(a)
+    assert [snap.entity_ids[j] for j in snap.indices[out]] == [2, 3]
+    assert [snap.relation_names[r] for r in snap.relations[out]] == ['co_attended', 'works_at']
+    assert snap.confidence[out][0] == pytest.approx(0.5)
+    assert str(snap.event_dates[out][0]) == '2024-05-01'
+    assert np.isnat(snap.event_dates[out][1])
+
+    # Undirected neighborhood includes the incoming edge from c@x
+    assert sorted(snap.entity_ids[snap.neighbors(a)]) == [2, 3, 4]
+    assert list(snap.sources) == [a, a, snap.index_of(4)]
+
+    db.close()
+
+
+def test_stale_snapshot_detected(tmp_path):
+    db = make_db(tmp_path / "contacts.db")
+    output = str(tmp_path / "graph.bin")
+    db.snapshot(output)
+    db.load_snapshot(output)
+
+    # Re-importing the same fact is a no-op and keeps the snapshot current
+    db.add_fact("a@x", "co_attended", "b@x", SOURCE, event_date="2024-05-01")
+    db.load_snapshot(output)
+
+    db.add_fact("b@x", "co_attended", "c@x", SOURCE)
+    with pytest.raises(StaleSnapshotError):
+        db.load_snapshot(output)
+    assert db.load_snapshot(output, allow_stale=True).num_edges == 3
+
+    db.close()
@@ -0,0 +1,98 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import neighborhood
+from enhanced_graph_db import EnhancedGraphDB
+from enhanced_graph_db_universal import EnhancedGraphDB as UniversalGraphDB
+from sql_dialect import compile_query
+
+
+def build(path):
+    """anna — boris — vera — gleb chain; owner olga knows everyone (a hub)."""
+    db = EnhancedGraphDB(str(path))
+    source = {'filename': 'cal.ics', 'type': 'calendar', 'content': 'x'}
+    db.add_fact('anna@x', 'co_attended', 'boris@x', source, event_date='2024-03-01',
+                subject_label='Anna', object_label='Boris')
+    db.add_fact('boris@x', 'co_attended', 'vera@x', source, event_date='2022-05-01',
+                subject_label='Boris', object_label='Vera')
+    db.add_fact('vera@x', 'co_attended', 'gleb@x', source, event_date='2024-06-01',
+                subject_label='Vera', object_label='Gleb')
+    db.add_fact('boris@x', 'works_at', 'Studio', source, confidence=0.5,
+                subject_label='Boris', object_label='Studio', object_type='Organization')
+    for person in ('anna', 'boris', 'vera', 'gleb', 'dina', 'egor'):
+        db.add_fact('olga@x', 'co_attended', f'{person}@x', source,
+                    subject_label='Olga', object_label=person.title())
+    return db
+
+
+def labels(records, kind='node'):
+    return sorted(record['label'] for k, record in records if k == kind)
+
+
+def test_depth_filters_and_caps(tmp_path):
+    db = build(tmp_path / "contacts.db")
+    olga = db.conn.execute("SELECT entity_id FROM entities WHERE label = 'Olga'").fetchone()[0]
+
+    one = list(db.ego_network('anna@x', depth=1))
+    assert labels(one) == ['Anna', 'Boris', 'Olga']
+    assert one[0][1]['label'] == 'Anna' and one[0][1]['depth'] == 0
+    # Induced edges only: anna—boris, olga—anna, olga—boris
+    assert len([r for k, r in one if k == 'edge']) == 3
+
+    # Olga is a hub: kept, not expanded (dina / egor stay out)
+    two = list(db.ego_network('Anna', depth=2, max_degree=4))
+    assert labels(two) == ['Anna', 'Boris', 'Olga', 'Studio', 'Vera']
+    hubs = [r['label'] for k, r in two if k == 'node' and r['hub']]
+    assert hubs == ['Olga']
+    assert 'Dina' in labels(db.ego_network('Anna', depth=2, max_degree=None))
+
+    filtered = db.ego_network('anna@x', depth=3, relation_types=['co_attended'],
+                              date_range=('2023-01-01', None), max_degree=None)
+    assert labels(filtered) == ['Anna', 'Boris']
+    assert labels(db.ego_network('boris@x', depth=1, min_confidence=0.8, max_degree=None)) == \
+        ['Anna', 'Boris', 'Olga', 'Vera']
+
+    capped = list(db.ego_network(olga, depth=2, max_nodes=3))
+    assert len(labels(capped)) == 3
+
+    try:
+        list(db.ego_network('nobody@x'))
+        assert False, "unknown entity must raise"
+    except ValueError:
+        pass
+    db.close()
+
+
+def test_expansion_uses_index(tmp_path):
+    db = build(tmp_path / "contacts.db")
+    where, params = neighborhood._filters(['co_attended'], 0.5, ('2024-01-01', None))
+    sql, args = compile_query(f"""
+        SELECT ee.other_id FROM entity_edges ee JOIN edges e ON e.edge_id = ee.edge_id
+        WHERE ee.entity_id IN (?){where}
+    """, 'sqlite', ([1, 2],) + params)
+    plan = ' '.join(row[3] for row in db.conn.execute("EXPLAIN QUERY PLAN " + sql, args))
+    assert 'idx_entity_edges_entity' in plan and 'SCAN' not in plan
+    db.close()
+
+
+def test_export_ego_network(tmp_path):
+    db = build(tmp_path / "contacts.db")
+    counts = db.export_ego_network('anna@x', str(tmp_path / "ego.json"), depth=1)
+    document = json.loads((tmp_path / "ego.json").read_text())
+    assert counts == {'nodes': 3, 'edges': 3}
+    assert len(document['nodes']) == 3 and len(document['links']) == 3
+    assert document['metadata']['depth'] == 1
+
+    counts = db.export_ego_network('anna@x', str(tmp_path / "ego.graphml.gz"), fmt='graphml',
+                                   depth=1)
+    assert counts == {'nodes': 3, 'edges': 3}
+    db.close()
+
+    universal = UniversalGraphDB(db_path=str(tmp_path / "universal.db"))
+    universal.add_fact('anna', 'co_attended', 'boris')
+    universal.add_fact('boris', 'co_attended', 'vera')
+    assert labels(universal.ego_network('anna', depth=2)) == ['anna', 'boris', 'vera']
+    universal.close()
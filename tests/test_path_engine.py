@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import path_engine
+from graph_index import GraphIndex
+from path_engine import PathFinder
+
+#   1 — 2 — 3 — 6
+#   |         /
+#   4 — 5 ———
+#   1 ··· 7 (works_at only)
+EDGES = [
+    (1, 1, 2, 'co_attended'), (2, 2, 3, 'co_attended'), (3, 3, 6, 'co_attended'),
+    (4, 1, 4, 'co_attended'), (5, 4, 5, 'co_attended'), (6, 5, 6, 'co_attended'),
+    (7, 1, 7, 'works_at'), (8, 7, 6, 'works_at'),
+]
+STRENGTHS = {2: 0.1, 3: 0.1, 4: 0.9, 5: 0.9, 6: 0.5, 7: 0.01}
+
+
+@pytest.fixture(autouse=True, params=[True, False], ids=['scipy', 'pure-python'])
+def scipy_mode(request, monkeypatch):
+    if request.param and not path_engine.SCIPY_AVAILABLE:
+        pytest.skip("scipy not installed")
+    monkeypatch.setattr(path_engine, 'SCIPY_AVAILABLE', request.param)
+
+
+def finder():
+    index = GraphIndex.from_rows((e, s, o, r, None, None) for e, s, o, r in EDGES)
+    return PathFinder(index, STRENGTHS)
+
+
+def test_shortest_path_bfs_with_filters_and_depth():
+    paths = finder()
+    assert paths.shortest_path(1, 6) == [1, 7, 6]
+    assert paths.shortest_path(1, 6, relations='co_attended') in ([1, 2, 3, 6], [1, 4, 5, 6])
+    assert paths.shortest_path(1, 6, relations='co_attended', max_depth=2) is None
+    assert paths.shortest_path(2, 5, relations='co_attended') in ([2, 1, 4, 5], [2, 3, 6, 5])
+    assert paths.shortest_path(1, 99) is None
+
+
+def test_warmest_path_prefers_strong_ties():
+    paths = finder()
+    cost, path = paths.warmest_path(1, 6)
+    assert path == [1, 4, 5, 6]
+    assert cost == paths.path_cost(path)
+
+    # Hop limit forces the weaker short chain
+    cost, path = paths.warmest_path(1, 6, max_depth=2)
+    assert path == [1, 7, 6]
+    assert paths.warmest_path(1, 6, relations='co_attended', max_depth=2) is None
+
+
+def test_k_paths_yen():
+    paths = finder()
+    ranked = paths.k_paths(1, 6, k=5)
+    assert [path for _, path in ranked] == [[1, 4, 5, 6], [1, 2, 3, 6], [1, 7, 6]]
+    costs = [cost for cost, _ in ranked]
+    assert costs == sorted(costs)
+
+    hops = paths.k_paths(1, 6, k=2, weighted=False)
+    assert [path for _, path in hops] == [[1, 7, 6], [1, 2, 3, 6]] or \
+        [path for _, path in hops] == [[1, 7, 6], [1, 4, 5, 6]]
+    assert paths.k_paths(1, 6, k=3, relations='co_attended', max_depth=3)[0][1] == [1, 4, 5, 6]
+
+
+def test_cache_follows_new_edges():
+    paths = finder()
+    assert paths.warmest_path(2, 5, relations='co_attended')[1] in ([2, 1, 4, 5], [2, 3, 6, 5])
+    paths.index.add_edge(9, 2, 5, 'co_attended')
+    assert paths.warmest_path(2, 5, relations='co_attended')[1] == [2, 5]
+    assert paths.shortest_path(2, 5) == [2, 5]
@@ -0,0 +1,88 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from query_cache import QueryCache, normalize_sql, sqlite_data_version
+
+
+def test_normalize_sql_keeps_literals():
+    assert normalize_sql("SELECT  *\n  FROM t\tWHERE a = 'x  y' ") == \
+        "SELECT * FROM t WHERE a = 'x  y'"
+    assert normalize_sql("SELECT 'it''s  1'") == "SELECT 'it''s  1'"
+
+
+def test_cache_follows_data_version(tmp_path):
+    path = str(tmp_path / "cache.db")
+    reader = sqlite3.connect(path)
+    writer = sqlite3.connect(path)
+    writer.executescript("""
+        CREATE TABLE t (x INTEGER);
+        CREATE TABLE graph_version (id INTEGER PRIMARY KEY, version INTEGER NOT NULL);
+        INSERT INTO graph_version VALUES (1, 0);
+        CREATE TRIGGER trg_t_version AFTER INSERT ON t BEGIN
+            UPDATE graph_version SET version = version + 1 WHERE id = 1;
+        END;
+    """)
+    writer.execute("INSERT INTO t VALUES (1)")
+    writer.commit()
+
+    cache = QueryCache(maxsize=2, max_rows=3)
+    runs = []
+
+    def fetch(query, params=None, conn=reader):
+        def run():
+            runs.append(query)
+            return conn.execute(query, params or ()).fetchall()
+        return cache.fetch(query, params, sqlite_data_version(conn), run)
+
+    assert fetch("SELECT COUNT(*) FROM t") == [(1,)]
+    assert fetch("SELECT   COUNT(*)\n FROM t") == [(1,)]
+    assert fetch("SELECT x FROM t WHERE x IN (?, ?)", [1, 2]) == [(1,)]
+    assert fetch("SELECT x FROM t WHERE x IN (?, ?)", (1, 2)) == [(1,)]
+    assert len(runs) == 2
+    assert cache.info()['hits'] == 2
+
+    # Another reader connection (a new Streamlit thread) shares the entries
+    other = sqlite3.connect(path)
+    assert fetch("SELECT COUNT(*) FROM t", conn=other) == [(1,)]
+    assert len(runs) == 2
+    other.close()
+
+    # Commit on another connection → graph_version changes
+    writer.execute("INSERT INTO t VALUES (2)")
+    writer.commit()
+    assert fetch("SELECT COUNT(*) FROM t") == [(2,)]
+
+    # Writes the version row does not see: invalidate()
+    reader.execute("UPDATE t SET x = 10 WHERE x = 1")
+    reader.commit()
+    cache.invalidate()
+    assert fetch("SELECT MAX(x) FROM t") == [(10,)]
+
+    # Over max_rows: returned, not cached
+    for x in (3, 4):
+        writer.execute("INSERT INTO t VALUES (?)", (x,))
+    writer.commit()
+    assert len(fetch("SELECT x FROM t")) == 4
+    assert len(fetch("SELECT x FROM t")) == 4
+    info = cache.info()
+    assert info['uncached'] == 2
+    assert info['size'] <= 2
+
+    # No version token: always runs
+    before = len(runs)
+    cache.fetch("SELECT 1", None, None, lambda: runs.append('x') or [(1,)])
+    assert len(runs) == before + 1
+    reader.close()
+    writer.close()
+
+
+def test_sqlite_version_without_version_row(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "legacy.db"))
+    assert sqlite_data_version(conn) is None
+    conn.execute("CREATE TABLE edges (edge_id INTEGER PRIMARY KEY)")
+    conn.execute("INSERT INTO edges VALUES (7)")
+    assert sqlite_data_version(conn) == (1, 7)
+    conn.close()
@@ -0,0 +1,87 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import recommendations
+from communities import WeightedGraph
+from enhanced_graph_db import EnhancedGraphDB
+from enhanced_graph_db_universal import EnhancedGraphDB as UniversalGraphDB
+
+SOURCE = {'filename': 'cal.ics', 'type': 'calendar', 'content': 'x'}
+
+
+def meet(db, a, b, content='x'):
+    db.add_fact(f'{a}@x', 'co_attended', f'{b}@x', dict(SOURCE, content=content),
+                subject_label=a.title(), object_label=b.title())
+
+
+def build(path):
+    db = EnhancedGraphDB(str(path))
+    # Anna and Boris share Vera and Gleb; Dina is one hop further via Gleb (a hub)
+    for a, b in [('anna', 'vera'), ('anna', 'gleb'), ('boris', 'vera'), ('boris', 'gleb'),
+                 ('gleb', 'dina'), ('gleb', 'egor'), ('gleb', 'zhanna')]:
+        meet(db, a, b)
+    for person in ('anna', 'boris', 'vera', 'gleb', 'dina'):
+        meet(db, 'olga.rozet', person)
+    return db
+
+
+def labels(rows):
+    return [row['label'] for row in rows]
+
+
+def entity(db, label):
+    return db.conn.execute("SELECT entity_id FROM entities WHERE label = ?", (label,)).fetchone()[0]
+
+
+def test_recommendations(tmp_path):
+    db = build(tmp_path / "contacts.db")
+    anna = entity(db, 'Anna')
+
+    rows = db.recommend_introductions(anna)
+    # Boris: 2 common contacts; the rest only through the hub Gleb (owner left out)
+    assert labels(rows) == ['Boris', 'Dina', 'Egor', 'Zhanna']
+    boris = rows[0]
+    assert boris['common_neighbors'] == 2
+    assert np.isclose(boris['adamic_adar'], 1 / np.log(2) + 1 / np.log(5))
+    assert np.isclose(boris['resource_allocation'], 1 / 2 + 1 / 5)
+    assert db.refresh_recommendations()['mode'] == 'current'
+
+    # Incremental: only the two-hop neighborhood of the new edge is rescored
+    meet(db, 'anna', 'dina', 'y')
+    report = db.refresh_recommendations()
+    assert report['mode'] == 'incremental' and report['rescored'] < report['nodes']
+    assert 'Dina' not in labels(db.recommend_introductions(anna, refresh=False))
+    incremental = db.conn.execute("SELECT * FROM recommendations ORDER BY 1, 2").fetchall()
+    assert db.refresh_recommendations(force=True)['mode'] == 'full'
+    assert db.conn.execute("SELECT * FROM recommendations ORDER BY 1, 2").fetchall() == incremental
+
+    # Deleted edges → full run
+    db.conn.execute("DELETE FROM edges WHERE edge_id = (SELECT MAX(edge_id) FROM edges)")
+    db.commit()
+    assert db.refresh_recommendations()['mode'] == 'full'
+    assert labels(db.recommend_introductions(anna, 2)) == ['Boris', 'Dina']
+    db.close()
+
+
+def test_top_k_per_contact():
+    # Star around 0: every leaf pair shares only the hub
+    leaves = np.arange(1, 9)
+    graph = WeightedGraph.from_pairs(np.zeros(8, dtype=np.int64), leaves, np.ones(8))
+    best = recommendations.LinkScorer(graph).top(np.arange(9), top_k=3)
+    assert not (best['row'] == 0).any()
+    assert np.bincount(best['row'], minlength=9)[1:].tolist() == [3] * 8
+    assert best['rank'][best['row'] == 1].tolist() == [0, 1, 2]
+    assert best['candidate'][best['row'] == 1].tolist() == [2, 3, 4]
+
+
+def test_universal_recommendations(tmp_path):
+    db = UniversalGraphDB(db_path=str(tmp_path / "universal.db"))
+    for a, b in [('Anna', 'Vera'), ('Boris', 'Vera'), ('Anna', 'Gleb'), ('Boris', 'Gleb')]:
+        db.add_fact(a, 'co_attended', b)
+    anna = db.fetchone("SELECT entity_id FROM entities WHERE label = ?", ('Anna',))[0]
+    assert labels(db.recommend_introductions(anna)) == ['Boris']
+    db.close()
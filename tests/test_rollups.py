@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+import rollups
+from enhanced_graph_db_universal import EnhancedGraphDB as UniversalGraphDB
+from target_scenarios import GraphQueries
+
+
+def snapshot(conn):
+    return (
+        sorted(tuple(row) for row in conn.execute("SELECT * FROM entity_month_stats")),
+        sorted(tuple(row) for row in conn.execute("SELECT * FROM month_stats")),
+    )
+
+
+def test_period():
+    assert rollups.period('2024-03-05T10:00') == (2024, 3)
+    assert rollups.period('2024') == (2024, 0)
+    assert rollups.period('2024-3-5') == (2024, 0)
+    assert rollups.period(None) is None
+    assert rollups.period('next week') is None
+
+
+def test_rollups_follow_writes(tmp_path, capsys, meeting):
+    queries = GraphQueries(str(tmp_path / "contacts.db"))
+    db, conn = queries.db, queries.db.conn
+    meeting(db, 1, ['olga@x', 'anna@x', 'boris@x'], '2023-02-01')
+    meeting(db, 2, ['anna@x', 'vera@x', 'gleb@x', 'boris@x'], '2024-03-05')
+    meeting(db, 3, ['olga@x', 'dina@x'], '2024-03-20')
+    meeting(db, 4, ['olga@x', 'anna@x'], '2024-11-02')
+    meeting(db, 5, ['olga@x', 'anna@x'], '2024-11-02')  # same fact, 2nd source
+    meeting(db, 6, ['anna@x', 'egor@x'], None)
+
+    assert tuple(conn.execute("""
+        SELECT edges, interactions FROM month_stats
+        WHERE relation_type = 'co_attended' AND year = 2024 AND month = 11
+    """).fetchone()) == (1, 2)
+
+    queries.q1_most_frequent_contacts(2024)
+    queries.q6_activity_by_month(2024)
+    output = capsys.readouterr().out
+    assert "1. Anna: 4 встреч" in output
+    assert "2024-03: ███████ (7)" in output
+    assert "2024-11: █ (1)" in output
+
+    # Triggers match a full rebuild after updates and deletes
+    anna = queries._find_entity('Anna')
+    conn.execute("UPDATE edges SET event_date = '2025-01-01' WHERE event_date = '2023-02-01'")
+    conn.execute("DELETE FROM edges WHERE subject_id = ? AND event_date = '2024-11-02'", (anna,))
+    conn.execute("DELETE FROM edges WHERE object_id = ? AND event_date = '2024-11-02'", (anna,))
+    conn.commit()
+    maintained = snapshot(conn)
+    assert db.rebuild_rollups() == {'entity_months': len(maintained[0]),
+                                    'months': len(maintained[1])}
+    assert snapshot(conn) == maintained
+    assert not conn.execute("SELECT 1 FROM month_stats WHERE month = 11").fetchall()
+    db.close()
+
+
+def test_rollups_without_triggers(tmp_path):
+    """PostgreSQL path: _create_edge records the rollups itself."""
+    db = UniversalGraphDB(db_path=str(tmp_path / "universal.db"))
+    for name in rollups.SQLITE_TRIGGERS:
+        db.conn.execute(f"DROP TRIGGER {name}")
+    db._stats_triggers = False
+
+    db.add_fact('Olga', 'co_attended', 'Anna', event_date='2024-03-05')
+    db.add_fact('Olga', 'co_attended', 'Anna', event_date='2024-03-05', source_uri='b.ics')
+    db.add_fact('Anna', 'co_attended', 'Boris', event_date='2024-03-20')
+    db.add_fact('Anna', 'co_attended', 'Boris', event_date='2024')
+    db.add_fact('Boris', 'co_attended', 'Vera')
+
+    maintained = snapshot(db.conn)
+    db.rebuild_rollups()
+    assert snapshot(db.conn) == maintained
+    assert ('co_attended', 2024, 3, 2, 3) in maintained[1]
+    db.close()
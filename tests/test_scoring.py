@@ -0,0 +1,86 @@
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import scoring
+from enhanced_graph_db import EnhancedGraphDB
+from scoring import Scorer, format_report, register_formula
+
+TODAY = date(2026, 1, 1)
+
+
+def legacy_score(degree, max_degree, last_interaction):
+    """fix_critical_v2_1 per-entity formula."""
+    if not last_interaction:
+        return 'directory', round(0.5 * degree / max_degree, 3)
+    days = (TODAY - date.fromisoformat(last_interaction[:10])).days
+    status = 'active' if days <= 180 else 'cooling' if days <= 730 else 'cold'
+    return status, round(0.5 * degree / max_degree + 0.5 * 365.0 / (365.0 + days), 3)
+
+
+def make_db(tmp_path, count=200):
+    db = EnhancedGraphDB(str(tmp_path / "contacts.db"))
+    rows = [
+        (f"P{i}", i % 17, None if i % 5 == 0 else (TODAY - timedelta(days=i * 7)).isoformat())
+        for i in range(count)
+    ]
+    rows.append(("Olga", 1000, TODAY.isoformat()))
+    db.conn.executemany(
+        "INSERT INTO entities (label, type, degree, last_interaction) VALUES (?, 'Person', ?, ?)",
+        rows
+    )
+    db.conn.execute("INSERT INTO identifiers VALUES ('o.g.rozet@x', ?, 'email', NULL)", (count + 1,))
+    db.commit()
+    return db, rows
+
+
+def test_vectorized_matches_legacy_formula(tmp_path, monkeypatch):
+    # Force the temp-table + index rebuild path
+    monkeypatch.setattr(scoring, 'BULK_INDEX_REBUILD', 10)
+    db, rows = make_db(tmp_path)
+
+    report = db.scorer.rescore(db.conn, today=TODAY, dry_run=True)
+    assert report['changed'] == len(rows) and report['max_degree'] == 16
+    assert db.conn.execute("SELECT COUNT(*) FROM entities WHERE status = 'unknown'").fetchone()[0] == len(rows)
+
+    report = db.scorer.rescore(db.conn, today=TODAY)
+    db.commit()
+    assert report['status_before'] == {'unknown': len(rows)}
+    assert sum(report['status_after'].values()) == len(rows)
+    assert any('unknown → cold' in line for line in format_report(report))
+
+    stored = db.conn.execute(
+        "SELECT label, status, relationship_strength FROM entities ORDER BY entity_id"
+    ).fetchall()
+    for (label, degree, last), (_, status, strength) in zip(rows, stored):
+        assert (status, strength) == legacy_score(degree, 16, last), label
+    assert db.conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name = 'idx_entities_relationship_strength'"
+    ).fetchone()[0] == 1
+
+    # Nothing changes on a second run
+    assert db.scorer.rescore(db.conn, today=TODAY)['changed'] == 0
+    db.close()
+
+
+def test_pluggable_formula(tmp_path):
+    @register_formula('degree_squared')
+    def degree_squared(degree, max_degree, days, power=2.0):
+        return (degree / max_degree) ** power
+
+    db, rows = make_db(tmp_path, count=20)
+    scorer = Scorer('degree_squared', active_days=30, exclude_owner=False, power=1.0)
+    scorer.rescore(db.conn, today=TODAY)
+    strengths = dict(db.conn.execute("SELECT label, relationship_strength FROM entities").fetchall())
+    assert strengths['P16'] == round(16 / 1000, 3) and strengths['Olga'] == 1.0
+    assert np.array_equal(scorer.status(np.array([0.0, 31.0, np.nan])),
+                          ['active', 'cooling', 'directory'])
+
+    with pytest.raises(ValueError):
+        Scorer('no_such_formula')
+    db.close()
@@ -0,0 +1,76 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from sql_dialect import Query, Statements, compile_query
+
+TOP = Query("""
+    SELECT label FROM t  -- status IN (?) ?
+    WHERE status IN (?) AND id NOT IN (?) AND YEAR(day) = ? AND label LIKE 'a%?'
+    LIMIT ?
+""", name='top')
+
+
+def test_compile_per_dialect():
+    sql, params = TOP.compile('sqlite', (['a', 'b'], (3,), 2024, 5))
+    assert 'status IN (?, ?) AND id NOT IN (?)' in sql
+    assert "CAST(substr(day, 1, 4) AS INTEGER) = ?" in sql
+    assert "LIKE 'a%?'" in sql and '-- status IN (?) ?' in sql
+    assert params == ('a', 'b', 3, 2024, 5)
+
+    sql, params = TOP.compile('postgresql', (('a', 'b'), [3], 2024, 5))
+    assert 'status = ANY(%s) AND id <> ALL(%s)' in sql
+    assert "LIKE 'a%%?'" in sql and sql.count('%s') == 4
+    assert params == (['a', 'b'], [3], 2024, 5)
+
+    sql, _ = TOP.compile('postgresql', (['a'], [3], 2024, 5), prepared=True)
+    assert 'ANY($1)' in sql and 'ALL($2)' in sql and "LIKE 'a%?'" in sql and 'LIMIT $4' in sql
+
+    # Same text object per dialect / list sizes (statement cache hits)
+    assert TOP.compile('sqlite', (['x', 'y'], [1], 1, 1))[0] is \
+        TOP.compile('sqlite', (['c', 'd'], [2], 2, 2))[0]
+
+    assert compile_query("INSERT OR IGNORE INTO t (a) VALUES (?)", 'postgresql', (1,)) == \
+        ('INSERT INTO t (a) VALUES (%s) ON CONFLICT DO NOTHING', (1,))
+    assert compile_query("SELECT GREATEST(a, ?) FROM t", 'sqlite', (1,)) == \
+        ('SELECT MAX(a, ?) FROM t', (1,))
+    # '%s' queries of helper modules pass through
+    assert compile_query("SELECT 1 WHERE a LIKE '%x' AND b = %s", 'postgresql', (1,)) == \
+        ("SELECT 1 WHERE a LIKE '%x' AND b = %s", (1,))
+
+
+def test_statements_on_sqlite():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE t (id INTEGER, label TEXT, status TEXT, day TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?)", [
+        (1, 'ab?', 'a', '2024-01-02'), (2, 'ac?', 'b', '2024-05-01'),
+        (3, 'ad?', 'a', '2024-03-03'), (4, 'ae?', 'a', '2023-01-01'),
+    ])
+    statements = Statements('sqlite')
+    rows = statements.execute(conn.cursor(), TOP, (['a', 'b'], [3], 2024, 10)).fetchall()
+    assert sorted(rows) == [('ab?',), ('ac?',)]
+    assert statements.execute(conn.cursor(), TOP, ([], [], 2024, 10)).fetchall() == []
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.calls = []
+
+    def execute(self, sql, params=None):
+        self.calls.append((sql, params))
+
+
+def test_statements_prepare_once_on_postgresql():
+    statements = Statements('postgresql')
+    cursor = RecordingCursor()
+    statements.execute(cursor, TOP, (['a'], [1], 2024, 5))
+    statements.execute(cursor, TOP, (['b', 'c'], [], 2023, 5))
+    statements.execute(cursor, "SELECT 1 FROM t WHERE id = ?", (1,))
+
+    prepare, first, second, adhoc = cursor.calls
+    assert prepare[0].startswith('PREPARE top AS') and '$4' in prepare[0]
+    assert first == ('EXECUTE top (%s, %s, %s, %s)', (['a'], [1], 2024, 5))
+    assert second == ('EXECUTE top (%s, %s, %s, %s)', (['b', 'c'], [], 2023, 5))
+    assert adhoc == ('SELECT 1 FROM t WHERE id = %s', (1,))
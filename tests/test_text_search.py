@@ -0,0 +1,142 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import text_search
+from enhanced_graph_db import EnhancedGraphDB
+from enhanced_graph_db_universal import EnhancedGraphDB as UniversalGraphDB
+from graph_db import GraphDB
+
+
+def test_query_building():
+    assert text_search.stem('Декорирования') == 'декорирован'
+    assert text_search.stem('Ольгой') == 'ольг'
+    assert text_search.stem('дом') == 'дом'
+    assert text_search.stem('Design') == 'design'
+    assert text_search.fts_query('Ёлка, "дизайн" OR*') == '"елк"* "дизайн"* "or"*'
+    assert text_search.ts_query('ёлка дизайн') == 'елка:* & дизайн:*'
+    assert text_search.fts_query(' ,; ') == ''
+    assert text_search.search_query('', 'sqlite') == (None, None)
+
+
+def test_enhanced_search_follows_writes(tmp_path):
+    db = EnhancedGraphDB(str(tmp_path / "contacts.db"))
+    db.add_fact('olga@x', 'co_attended', 'anna@x',
+                {'filename': 'calendar.ics', 'type': 'calendar',
+                 'content': 'Встреча по декорированию интерьеров в Париже'},
+                subject_label='Ольга Розет', object_label='Анна Петрова')
+    db.add_fact('olga@x', 'co_attended', 'boris@x',
+                {'filename': 'mail.eml', 'type': 'email', 'content': 'Обсудили бюджет выставки'},
+                subject_label='Ольга Розет', object_label='Борис')
+
+    # Notes / tags edited as in the web_ui enrichment tab
+    db.conn.execute("""
+        UPDATE entities SET tags = 'дизайн, Ёлки', notes = 'Куратор выставок'
+        WHERE label = 'Борис'
+    """)
+    db.commit()
+
+    hits = db.search('декорирование')
+    assert [(hit['kind'], hit['title']) for hit in hits] == [('context', 'calendar.ics')]
+    assert hits[0]['snippet'] == 'Встреча по [декорированию] интерьеров в Париже'
+
+    assert [hit['title'] for hit in db.search('кураторы')] == ['Борис']
+    assert [hit['title'] for hit in db.search('выставками')] == ['mail.eml']
+    assert [hit['title'] for hit in db.search('ёлка')] == ['Борис']
+    assert [hit['title'] for hit in db.search('Петровой')] == ['Анна Петрова']
+    assert db.search('Ольга бюджет') == []
+
+    db.conn.execute("UPDATE entities SET notes = NULL WHERE label = 'Борис'")
+    db.commit()
+    assert [hit['title'] for hit in db.search('куратор')] == []
+
+    # Rebuild gives the same answers (contexts decompressed from raw_blobs)
+    assert db.rebuild_search_index() == {'entities': 3, 'contexts': 2}
+    assert [hit['title'] for hit in db.search('дизайн')] == ['Борис']
+    assert [hit['title'] for hit in db.search('выставка')] == ['mail.eml']
+    db.close()
+
+
+
+def test_universal_search(tmp_path):
+    db = UniversalGraphDB(db_path=str(tmp_path / "universal.db"))
+    db.add_fact('Ольга Розет', 'co_attended', 'Вера', source_type='calendar',
+                source_uri='gcal:event:1', raw_content='Декорирование: итоги года')
+    db.add_fact('Ольга Розет', 'co_attended', 'Вера', source_type='calendar',
+                source_uri='gcal:event:2', raw_content='Созвон о декорировании')
+    assert [hit['title'] for hit in db.search('декорирование')] == [
+        'gcal:event:1', 'gcal:event:2']
+    assert [hit['title'] for hit in db.search('Веры')] == ['Вера']
+    assert db.rebuild_search_index() == {'entities': 2, 'contexts': 2}
+    assert len(db.search('декорирование')) == 2
+    db.close()
+
+
+def test_universal_opens_enhanced_file(tmp_path):
+    # Legacy data/contacts_v2.db layout: sources.filename, raw_data without content_hash
+    legacy = """
+        CREATE TABLE sources (source_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                              filename TEXT NOT NULL, source_type TEXT, hash TEXT UNIQUE,
+                              processed_at TEXT DEFAULT CURRENT_TIMESTAMP);
+        CREATE TABLE raw_data (raw_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                               source_id INTEGER NOT NULL, data_type TEXT, content TEXT,
+                               created_at TEXT DEFAULT CURRENT_TIMESTAMP);
+        INSERT INTO sources (filename, source_type) VALUES ('calendar.ics', 'calendar');
+        INSERT INTO raw_data (source_id, content) VALUES (1, 'Встреча по декорированию');
+    """
+    for name in ('legacy.db', 'enhanced.db'):
+        path = tmp_path / name
+        conn = sqlite3.connect(str(path))
+        conn.executescript(legacy)
+        conn.close()
+        if name == 'enhanced.db':
+            db = EnhancedGraphDB(str(path))
+            db.add_fact('olga@x', 'co_attended', 'anna@x',
+                        {'filename': 'mail.eml', 'type': 'email', 'content': 'Декорирование зала'},
+                        subject_label='Ольга Розет', object_label='Анна')
+            db.close()
+
+        db = UniversalGraphDB(db_path=str(path))
+        titles = ['calendar.ics'] + (['mail.eml'] if name == 'enhanced.db' else [])
+        assert sorted(hit['title'] for hit in db.search('декорирование')) == titles
+        assert db.rebuild_search_index()['contexts'] == len(titles)
+        assert sorted(hit['title'] for hit in db.search('декорирование')) == titles
+        db.close()
+
+
+def test_graph_db_search_events(tmp_path):
+    db = GraphDB(str(tmp_path / "contacts.db"))
+    events = {
+        'event:1': ('Декорирование: воркшоп', '2024-03-05', 3),
+        'event:2': ('Планёрка', '2023-01-10', 2),
+        'event:3': ('Созвон', '2022-06-01', 2),
+    }
+    for event_id, (name, date, people) in events.items():
+        db.conn.execute("INSERT INTO nodes (canonical_id, name, type) VALUES (?, ?, 'Event')",
+                        (event_id, name))
+        for i in range(people):
+            db.conn.execute("""
+                INSERT INTO facts (fact_id, relation_type, subject_id, object_id,
+                                   confidence, context, event_date)
+                VALUES (?, 'participated_in', ?, ?, 0.95, ?, ?)
+            """, (f"p{i}:{event_id}", f"email:p{i}@x", event_id,
+                  f"Attended '{name}' on {date}", date))
+    # Keyword only in a context, and a context rewritten by INSERT OR REPLACE
+    db.conn.execute("""
+        INSERT OR REPLACE INTO facts (fact_id, relation_type, subject_id, object_id,
+                                      confidence, context, event_date)
+        VALUES ('p0:event:3', 'participated_in', 'email:p0@x', 'event:3', 0.95,
+                'Обсуждали декорирование витрин', '2022-06-01')
+    """)
+    db.conn.commit()
+
+    hits = db.search_events('декорированием')
+    assert [(hit['canonical_id'], hit['participants'], hit['event_date']) for hit in hits] == [
+        ('event:1', 3, '2024-03-05'), ('event:3', 2, '2022-06-01')]
+    assert hits[1]['snippet'] == 'Обсуждали [декорирование] витрин'
+    assert [hit['name'] for hit in db.search_events('планерка')] == ['Планёрка']
+    assert db.search_events('Созвон') and not db.search_events('созвон 2023')
+    assert db.conn.execute("SELECT COUNT(*) FROM fact_search").fetchone()[0] == 7
+    db.close()
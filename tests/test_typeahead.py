@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import typeahead
+from enhanced_graph_db import EnhancedGraphDB
+from enhanced_graph_db_universal import EnhancedGraphDB as UniversalGraphDB
+
+
+def labels(rows):
+    return [row['label'] for row in rows]
+
+
+def test_suggest_contacts(tmp_path):
+    db = EnhancedGraphDB(str(tmp_path / "contacts.db"))
+    source = {'filename': 'cal.ics', 'type': 'calendar', 'content': 'x'}
+    people = [('anna.petrova@gmail.com', 'Анна Петрова'), ('petr@x.ru', 'Пётр Иванов'),
+              ('boris@x.ru', 'Борис Петров'), ('vera@x.ru', 'Вера')]
+    for email, label in people:
+        db.add_fact('olga@x.ru', 'co_attended', email, source,
+                    subject_label='Ольга', object_label=label)
+    strengths = {'Борис Петров': 0.9, 'Анна Петрова': 0.8, 'Пётр Иванов': 0.7, 'Ольга': 0.5,
+                 'Вера': 0.3}
+    db.conn.executemany("UPDATE entities SET relationship_strength = ? WHERE label = ?",
+                        [(strength, label) for label, strength in strengths.items()])
+    db.conn.execute("UPDATE entities SET status = 'archived' WHERE label = 'Вера'")
+    db.commit()
+
+    assert labels(db.suggest_contacts('пет')) == ['Борис Петров', 'Анна Петрова', 'Пётр Иванов']
+    assert labels(db.suggest_contacts('анна пет')) == ['Анна Петрова']
+    assert labels(db.suggest_contacts('Петр')) == labels(db.suggest_contacts('пётр'))
+    assert labels(db.suggest_contacts('anna.pe')) == ['Анна Петрова']
+    assert labels(db.suggest_contacts('x.ru')) == ['Борис Петров', 'Пётр Иванов', 'Ольга', 'Вера']
+    statuses = [row[0] for row in db.conn.execute(
+        "SELECT DISTINCT status FROM entities WHERE status != 'archived'")]
+    assert labels(db.suggest_contacts('', statuses=statuses)) == [
+        label for label in labels(db.suggest_contacts('', limit=10)) if label != 'Вера']
+    assert db.suggest_contacts('зз') == []
+
+    # Pages
+    first = db.suggest_contacts('', limit=2)
+    second = db.suggest_contacts('', limit=2, offset=2)
+    assert labels(first) == ['Борис Петров', 'Анна Петрова']
+    assert len(second) == 2 and not set(labels(first)) & set(labels(second))
+
+    # Index follows label / identifier changes
+    db.conn.execute("UPDATE entities SET label = 'Вера Цой' WHERE label = 'Вера'")
+    db.add_identifier('tsoy@y.ru', db.suggest_contacts('цой')[0]['entity_id'])
+    db.commit()
+    assert labels(db.suggest_contacts('tsoy')) == ['Вера Цой']
+
+    # The FTS index drives the query: no scan of entities
+    sql, params = typeahead.suggest_query('пет')
+    plan = ' '.join(row[3] for row in db.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+    assert 'SCAN contact_lookup VIRTUAL TABLE' in plan and 'SCAN e ' not in plan
+    db.close()
+
+
+def test_suggest_contacts_universal(tmp_path):
+    db = UniversalGraphDB(db_path=str(tmp_path / "universal.db"))
+    db.add_fact('Ольга Розет', 'co_attended', 'Анна Петрова')
+    db.add_fact('Ольга Розет', 'works_at', 'Петровский завод', object_type='Organization')
+    assert labels(db.suggest_contacts('петр')) == ['Анна Петрова']
+    assert labels(db.suggest_contacts('петр', entity_type='Organization')) == ['Петровский завод']
+    db.close()
@@ -3,10 +3,30 @@ Web UI для графа деловых контактов
 Работает с PostgreSQL (Supabase) через Streamlit secrets
 """
 
+import io
+import sys
+from pathlib import Path
+
 import streamlit as st
 import psycopg2
 from datetime import datetime, timedelta
 
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+from enhanced_graph_db import EnhancedGraphDB
+from enhanced_graph_db_universal import EnhancedGraphDB as UniversalGraphDB
+from sqlite_concurrency import SQLiteConnections, concurrency_enabled
+from graph_index import GraphIndex
+from path_engine import PathFinder
+from query_cache import (QueryCache, is_read_query, postgres_data_version,
+                         sqlite_data_version)
+from sql_dialect import STATEMENT_CACHE_SIZE, Query, Statements
+import centrality
+import communities
+import neighborhood
+import recommendations
+import text_search
+import typeahead
+
 # Page config
 st.set_page_config(
     page_title="Деловые Контакты — Ольга Розет",
@@ -28,7 +48,13 @@ def get_db_connection():
         # Fallback to SQLite
         try:
             import sqlite3
-            conn = sqlite3.connect("data/contacts_v2.db", check_same_thread=False)
+            if concurrency_enabled():
+                # WAL: thread-local readers never wait for the cron writer
+                conn = SQLiteConnections("data/contacts_v2.db", row_factory=None)
+                st.sidebar.warning("🟡 SQLite (Local, WAL)")
+                return conn, 'sqlite'
+            conn = sqlite3.connect("data/contacts_v2.db", check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
             st.sidebar.warning("🟡 SQLite (Local)")
             return conn, 'sqlite'
         except Exception as sqlite_error:
@@ -39,23 +65,206 @@ def get_db_connection():
 
 conn, db_type = get_db_connection()
 
+@st.cache_resource
+def prepare_schema():
+    """
+    Служебные таблицы (entity_edges, rollups, centrality, recommendations,
+    communities, поиск) на немигрированной БД: создать и заполнить один раз.
+    Схему ведут классы хранилища — с теми же триггерами, что и при записи.
+    """
+    if db_type == 'postgresql':
+        store = UniversalGraphDB(postgres_url=st.secrets["connections"]["postgresql"]["url"])
+    else:
+        store = EnhancedGraphDB("data/contacts_v2.db")
+    store.close()
+
+prepare_schema()
+
+@st.cache_resource
+def get_statements():
+    """Запросы, скомпилированные под db_type; на PostgreSQL — prepared statements подключения."""
+    return Statements(db_type)
+
+statements = get_statements()
+
+@st.cache_resource
+def get_query_cache():
+    """Кэш результатов запросов: общий для всех сессий, живёт до изменения данных."""
+    return QueryCache(maxsize=256)
+
+query_cache = get_query_cache()
+
+def _data_version():
+    """Дешёвый токен версии данных (читается перед каждым запросом)."""
+    if db_type == 'postgresql':
+        return postgres_data_version(conn)
+    if isinstance(conn, SQLiteConnections):
+        return sqlite_data_version(conn.reader())
+    return sqlite_data_version(conn)
+
+def _execute_concurrent(query, params):
+    """SELECT — через читателя своего потока, запись — через единственного writer."""
+    sql, args = statements.compile(query, params)
+    if is_read_query(sql):
+        return conn.reader().execute(sql, args or ()).fetchall()
+    with conn.write_lock, conn.writer:
+        conn.writer.execute(sql, args or ())
+    return None
+
+def _run_query(query, params):
+    if isinstance(conn, SQLiteConnections):
+        return _execute_concurrent(query, params)
+    cur = conn.cursor()
+    statements.execute(cur, query, params)
+    if cur.description:  # SELECT query
+        results = cur.fetchall()
+        cur.close()
+        return results
+    else:  # UPDATE/INSERT query
+        conn.commit()
+        cur.close()
+        return None
+
 def execute_query(query, params=None):
-    """Выполнить SQL запрос и вернуть результаты."""
+    """
+    Выполнить SQL запрос и вернуть результаты (SELECT — из кэша, пока данные не менялись).
+    
+    query — текст или sql_dialect.Query: один нейтральный SQL ('?', IN (?)) для обеих БД.
+    """
     try:
-        cur = conn.cursor()
-        cur.execute(query, params or ())
-        if cur.description:  # SELECT query
-            results = cur.fetchall()
-            cur.close()
-            return results
-        else:  # UPDATE/INSERT query
-            conn.commit()
-            cur.close()
-            return None
+        sql, args = statements.compile(query, params)
+        if is_read_query(sql):
+            return query_cache.fetch(sql, args, _data_version(),
+                                     lambda: _run_query(query, params))
+        results = _run_query(query, params)
+        query_cache.invalidate()
+        return results
     except Exception as e:
         st.error(f"❌ Ошибка выполнения запроса: {e}")
         return []
 
+def run_write(work):
+    """
+    work(conn) на соединении записи, затем commit: пересчёт производных
+    таблиц (centrality, recommendations, communities). None при ошибке.
+    """
+    try:
+        if isinstance(conn, SQLiteConnections):
+            with conn.write_lock, conn.writer:
+                return work(conn.writer)
+        try:
+            result = work(conn)
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+    except Exception as e:
+        st.error(f"❌ Ошибка пересчёта: {e}")
+        return None
+
+def open_cursor(query, params=None):
+    """Курсор для потокового чтения (neighborhood.expand), мимо кэша результатов."""
+    cur = (conn.reader() if isinstance(conn, SQLiteConnections) else conn).cursor()
+    statements.execute(cur, query, params)
+    return cur
+
+def pick_contact(key, statuses=None):
+    """
+    Typeahead: поиск по имени/email, в selectbox — одна страница подсказок.
+    
+    Возвращает (entity_id, label) или None: тёзки различаются по entity_id.
+    """
+    text = st.text_input("Контакт (имя или email):", key=f"{key}_text",
+                         placeholder="Начните вводить…")
+    page = st.session_state.get(f"{key}_page", 1)
+    query, params = typeahead.suggest_query(
+        text, db_type, statuses=statuses,
+        limit=typeahead.PAGE_SIZE + 1, offset=(page - 1) * typeahead.PAGE_SIZE
+    )
+    results = execute_query(query, params) or []
+    has_more = len(results) > typeahead.PAGE_SIZE
+    if page > 1 or has_more:
+        st.number_input("Страница подсказок:", min_value=1,
+                        max_value=page + 1 if has_more else page, key=f"{key}_page")
+    options = {}
+    for entity_id, label, identifier, _ in results[:typeahead.PAGE_SIZE]:
+        shown = f"{label} · {identifier}" if identifier else label
+        if shown in options:
+            shown = f"{shown} · #{entity_id}"
+        options[shown] = (entity_id, label)
+    if not options:
+        return None
+    return options[st.selectbox("Выберите контакт:", list(options), key=f"{key}_choice")]
+
+# Scenario queries: one definition for SQLite and PostgreSQL (prepared on PostgreSQL)
+TOP_CONTACTS = Query("""
+    SELECT 
+        e.label,
+        e.status,
+        e.relationship_strength,
+        e.last_interaction,
+        SUM(r.edges) as meeting_count
+    FROM entity_month_stats r
+    JOIN entities e ON e.entity_id = r.entity_id
+    WHERE 
+        e.type = 'Person'
+        AND r.relation_type = 'co_attended'
+        AND r.year = ?
+        AND e.status IN (?)
+    GROUP BY e.entity_id, e.label, e.status, e.relationship_strength, e.last_interaction
+    ORDER BY meeting_count DESC
+    LIMIT ?
+""", name='top_contacts')
+
+COLD_CONTACTS = Query("""
+    SELECT 
+        e.label,
+        e.status,
+        e.relationship_strength,
+        e.last_interaction,
+        e.tags
+    FROM entities e
+    WHERE 
+        e.type = 'Person'
+        AND e.last_interaction IS NOT NULL
+        AND e.last_interaction < ?
+    ORDER BY e.last_interaction DESC
+    LIMIT 50
+""", name='cold_contacts')
+
+ENTITY_LABELS = Query("SELECT entity_id, label FROM entities WHERE entity_id IN (?)",
+                      name='entity_labels')
+
+# Q5: precomputed centrality (scripts/compute_centrality.py), one query per metric
+MOST_CONNECTED = {
+    metric: Query(centrality.top_sql(metric, statuses=True), name=f'most_connected_{metric}')
+    for metric in centrality.METRICS
+}
+CENTRALITY_STATE = Query("SELECT nodes, computed_at FROM centrality_state",
+                         name='centrality_state')
+
+# Q11: stored link-prediction top-k (scripts/recommend_introductions.py)
+INTRODUCTIONS = Query(recommendations.RECOMMEND_SQL, name='introductions')
+RECOMMENDATION_STATE = Query("SELECT computed_at FROM recommendation_state",
+                             name='recommendation_state')
+
+ENRICHMENT = Query("""
+    SELECT tags, notes, status, relationship_strength
+    FROM entities WHERE entity_id = ?
+""", name='enrichment')
+
+SAVE_ENRICHMENT = Query("""
+    UPDATE entities 
+    SET tags = ?, notes = ?, updated_at = ?
+    WHERE entity_id = ?
+""", name='save_enrichment')
+
+# Q8: stored community runs (scripts/detect_communities.py)
+LATEST_COMMUNITY_RUN = Query(communities.LATEST_RUN_SQL, name='latest_community_run')
+COMMUNITIES = Query(communities.COMMUNITIES_SQL, name='communities')
+COMMUNITY_MEMBERS = Query(communities.MEMBERS_SQL, name='community_members')
+
 # Sidebar
 st.sidebar.title("🌐 Деловые Контакты")
 st.sidebar.markdown("---")
@@ -65,9 +274,13 @@ scenario = st.sidebar.selectbox(
     [
         "Q1: Топ контактов",
         "Q2: Остывшие контакты",
+        "Q3: Путь до контакта",
         "Q5: Самые связанные",
+        "Q8: Кластеры",
         "Q11: Кого представить?",
-        "Обогащение: Tags & Notes"
+        "Окружение контакта",
+        "Обогащение: Tags & Notes",
+        "Поиск: заметки и события"
     ]
 )
 
@@ -101,21 +314,8 @@ if scenario == "Q1: Топ контактов":
     
     col1, col2, col3 = st.columns(3)
     
-    # Get available years
-    if db_type == 'postgresql':
-        results = execute_query("""
-            SELECT DISTINCT EXTRACT(YEAR FROM event_date::date) as year 
-            FROM edges 
-            WHERE event_date IS NOT NULL 
-            ORDER BY year DESC
-        """)
-    else:  # sqlite
-        results = execute_query("""
-            SELECT DISTINCT substr(event_date, 1, 4) as year 
-            FROM edges 
-            WHERE event_date IS NOT NULL 
-            ORDER BY year DESC
-        """)
+    # Get available years (month rollup: a few rows per year)
+    results = execute_query("SELECT DISTINCT year FROM month_stats ORDER BY year DESC")
     available_years = [int(row[0]) for row in results] if results else []
     
     if not available_years:
@@ -142,47 +342,7 @@ if scenario == "Q1: Топ контактов":
         st.info("ℹ️ Выберите хотя бы один status")
         st.stop()
     
-    if db_type == 'postgresql':
-        query = """
-            SELECT 
-                e.label,
-                e.status,
-                e.relationship_strength,
-                e.last_interaction,
-                COUNT(DISTINCT ed.edge_id) as meeting_count
-            FROM entities e
-            JOIN edges ed ON (ed.subject_id = e.entity_id OR ed.object_id = e.entity_id)
-            WHERE 
-                e.type = 'Person'
-                AND ed.relation_type = 'co_attended'
-                AND EXTRACT(YEAR FROM ed.event_date::date) = %s
-                AND e.status = ANY(%s)
-            GROUP BY e.entity_id, e.label, e.status, e.relationship_strength, e.last_interaction
-            ORDER BY meeting_count DESC
-            LIMIT %s
-        """
-        results = execute_query(query, (year, status_filter, top_n))
-    else:  # sqlite
-        placeholders = ','.join('?' * len(status_filter))
-        query = f"""
-            SELECT 
-                e.label,
-                e.status,
-                e.relationship_strength,
-                e.last_interaction,
-                COUNT(DISTINCT ed.edge_id) as meeting_count
-            FROM entities e
-            JOIN edges ed ON (ed.subject_id = e.entity_id OR ed.object_id = e.entity_id)
-            WHERE 
-                e.type = 'Person'
-                AND ed.relation_type = 'co_attended'
-                AND ed.event_date LIKE ?
-                AND e.status IN ({placeholders})
-            GROUP BY e.entity_id
-            ORDER BY meeting_count DESC
-            LIMIT ?
-        """
-        results = execute_query(query, (f"{year}%", *status_filter, top_n))
+    results = execute_query(TOP_CONTACTS, (year, status_filter, top_n))
     
     if results:
         st.markdown(f"**Топ-{top_n} контактов в {year} году:**")
@@ -205,40 +365,7 @@ elif scenario == "Q2: Остывшие контакты":
     # Debug info to show reactivity
     st.info(f"🔄 Текущее значение порога: **{years_threshold} лет** → дата отсечки: {threshold_date}")
     
-    if db_type == 'postgresql':
-        query = """
-            SELECT 
-                e.label,
-                e.status,
-                e.relationship_strength,
-                e.last_interaction,
-                e.tags
-            FROM entities e
-            WHERE 
-                e.type = 'Person'
-                AND e.last_interaction IS NOT NULL
-                AND e.last_interaction < %s
-            ORDER BY e.last_interaction DESC
-            LIMIT 50
-        """
-    else:  # sqlite
-        query = """
-            SELECT 
-                e.label,
-                e.status,
-                e.relationship_strength,
-                e.last_interaction,
-                e.tags
-            FROM entities e
-            WHERE 
-                e.type = 'Person'
-                AND e.last_interaction IS NOT NULL
-                AND e.last_interaction < ?
-            ORDER BY e.last_interaction DESC
-            LIMIT 50
-        """
-    
-    results = execute_query(query, (threshold_date,))
+    results = execute_query(COLD_CONTACTS, (threshold_date,))
     
     if results:
         st.markdown(f"**Контакты без взаимодействия > {years_threshold} лет:**")
@@ -253,10 +380,75 @@ elif scenario == "Q2: Остывшие контакты":
     else:
         st.success(f"✅ Нет контактов без взаимодействия > {years_threshold} лет")
 
+elif scenario == "Q3: Путь до контакта":
+    st.header("🧭 Q3: Цепочка знакомств до контакта")
+    st.markdown("*Через кого выйти на человека — самая тёплая или самая короткая цепочка*")
+    
+    @st.cache_resource(max_entries=1)
+    def get_path_finder(data_version):
+        """Индекс рёбер + сила связей; пересобирается, когда меняется версия данных."""
+        edges = execute_query("""
+            SELECT edge_id, subject_id, object_id, relation_type, event_date, source_id
+            FROM edges
+        """)
+        strengths = execute_query("SELECT entity_id, relationship_strength FROM entities")
+        return PathFinder(GraphIndex.from_rows(edges or []), dict(strengths or []))
+    
+    results = execute_query("SELECT DISTINCT relation_type FROM edges ORDER BY relation_type")
+    relation_types = [row[0] for row in results] if results else []
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        target_contact = pick_contact("q3")
+        relations = st.multiselect(
+            "Типы связей:",
+            relation_types,
+            default=[r for r in ['co_attended'] if r in relation_types]
+        )
+    
+    with col2:
+        mode = st.radio("Цепочка:", ["Тёплая", "Кратчайшая"], horizontal=True)
+        max_depth = st.slider("Макс. рукопожатий:", 1, 8, 4)
+        k = st.slider("Вариантов:", 1, 5, 3)
+    
+    if target_contact is None:
+        st.info("Контакты не найдены")
+    elif st.button("Найти путь"):
+        results = execute_query("""
+            SELECT entity_id FROM identifiers 
+            WHERE identifier LIKE '%olga%' OR identifier LIKE '%rozet%'
+            LIMIT 1
+        """)
+        
+        if not results:
+            st.error("Профиль Ольги не найден")
+            st.stop()
+        
+        olga_id = results[0][0]
+        target_id, _ = target_contact
+        
+        finder = get_path_finder(_data_version())
+        chains = finder.k_paths(olga_id, target_id, k=k, relations=relations or None,
+                                max_depth=max_depth, weighted=(mode == "Тёплая"))
+        
+        if chains:
+            ids = {node for _, path in chains for node in path}
+            results = execute_query(ENTITY_LABELS, (sorted(ids),))
+            labels = dict(results) if results else {}
+            
+            for i, (cost, path) in enumerate(chains, 1):
+                col1, col2 = st.columns([4, 1])
+                col1.write(f"**{i}.** " + " → ".join(labels.get(node, str(node)) for node in path))
+                col2.metric("Рукопожатий" if mode == "Кратчайшая" else "Стоимость",
+                            f"{cost:.0f}" if mode == "Кратчайшая" else f"{cost:.1f}")
+        else:
+            st.info(f"ℹ️ Путь не найден (до {max_depth} рукопожатий).")
+
 elif scenario == "Q5: Самые связанные":
     st.header("🌟 Q5: Самые связанные контакты")
     
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     
     with col1:
         top_n = st.slider("Топ:", 5, 50, 10)
@@ -268,219 +460,192 @@ elif scenario == "Q5: Самые связанные":
             default=['active', 'directory']
         )
     
+    with col3:
+        metric = st.selectbox("Метрика:", list(centrality.METRICS))
+    
     # Debug info
-    st.info(f"🔄 Параметры: Топ={top_n}, Status={', '.join(status_filter)}")
+    st.info(f"🔄 Параметры: Топ={top_n}, Status={', '.join(status_filter)}, Метрика={metric}")
     
     if not status_filter:
         st.info("ℹ️ Выберите хотя бы один status")
         st.stop()
     
-    if db_type == 'postgresql':
-        query = """
-            SELECT 
-                e.label,
-                e.status,
-                e.relationship_strength,
-                COUNT(DISTINCT ed.edge_id) as connection_count
-            FROM entities e
-            JOIN edges ed ON (ed.subject_id = e.entity_id OR ed.object_id = e.entity_id)
-            WHERE 
-                e.type = 'Person'
-                AND ed.relation_type = 'co_attended'
-                AND e.status = ANY(%s)
-            GROUP BY e.entity_id, e.label, e.status, e.relationship_strength
-            ORDER BY connection_count DESC
-            LIMIT %s
-        """
-        results = execute_query(query, (status_filter, top_n))
-    else:  # sqlite
-        placeholders = ','.join('?' * len(status_filter))
-        query = f"""
-            SELECT 
-                e.label,
-                e.status,
-                e.relationship_strength,
-                COUNT(DISTINCT ed.edge_id) as connection_count
-            FROM entities e
-            JOIN edges ed ON (ed.subject_id = e.entity_id OR ed.object_id = e.entity_id)
-            WHERE 
-                e.type = 'Person'
-                AND ed.relation_type = 'co_attended'
-                AND e.status IN ({placeholders})
-            GROUP BY e.entity_id
-            ORDER BY connection_count DESC
-            LIMIT ?
-        """
-        results = execute_query(query, (*status_filter, top_n))
+    # Отрисовка только читает сохранённые оценки; пересчёт (PageRank, betweenness) —
+    # по кнопке, когда рёбра изменились (правки контактов его не требуют)
+    current = centrality.is_current(
+        conn.reader() if isinstance(conn, SQLiteConnections) else conn, db_type)
+    if not current and st.button("🔄 Пересчитать центральность"):
+        with st.spinner("Центральность…"):
+            report = run_write(lambda c: centrality.refresh(c, db_type))
+        if report:
+            query_cache.invalidate()  # entity_centrality не двигает версию данных
+            current = True
+    
+    state = execute_query(CENTRALITY_STATE)
+    if not state:
+        st.warning("⚠️ Центральность не посчитана: нажмите «Пересчитать» "
+                   "или python scripts/compute_centrality.py")
+        st.stop()
+    if not current:
+        st.caption("ℹ️ Рёбра изменились после расчёта: оценки могут отставать.")
+    
+    results = execute_query(MOST_CONNECTED[metric], ('Person', status_filter, top_n))
     
     if results:
-        st.markdown(f"**Топ-{top_n} по количеству связей:**")
+        st.markdown(f"**Топ-{top_n} по {metric}** ({state[0][0]} узлов, посчитано {state[0][1][:16]}):")
         
-        for i, (label, status, strength, count) in enumerate(results, 1):
-            col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
+        for i, (_, label, status, strength, degree, score) in enumerate(results, 1):
+            col1, col2, col3, col4, col5 = st.columns([3, 1, 1, 1, 1])
             col1.write(f"**{i}. {label}**")
-            col2.metric("Связей", count)
-            col3.metric("Strength", f"{strength:.3f}")
-            col4.write(status)
+            col2.metric("Связей", degree)
+            col3.metric(metric, f"{score:.4g}")
+            col4.metric("Strength", f"{strength or 0:.3f}")
+            col5.write(status)
     else:
         st.info("ℹ️ Нет данных для выбранных status.")
 
+elif scenario == "Q8: Кластеры":
+    st.header("🧩 Q8: Кластеры контактов")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        method = st.selectbox("Метод:", list(communities.METHODS))
+    
+    with col2:
+        min_size = st.slider("Мин. размер:", 2, 20, 3)
+    
+    # Новые рёбра → инкрементальный прогон от последнего (без них update ничего
+    # не пишет); первый запуск метода на этой БД — полный прогон
+    with st.spinner("Кластеризация…"):
+        report = run_write(lambda c: communities.update(c, db_type, method))
+    if report:
+        if report.get('touched') != 0:
+            query_cache.invalidate()  # community_runs не двигает версию данных
+        run_id = report['run_id']
+    else:
+        # Пересчёт не удался: последний сохранённый прогон, мимо кэша результатов
+        cur = open_cursor(LATEST_COMMUNITY_RUN, (method,))
+        row = cur.fetchone()
+        cur.close()
+        run_id = row[0] if row else None
+    if run_id is None:
+        st.warning("⚠️ Кластеры не посчитаны: python scripts/detect_communities.py")
+        st.stop()
+    
+    clusters = execute_query(COMMUNITIES, (run_id, min_size, 50))
+    if not clusters:
+        st.info(f"ℹ️ Нет кластеров от {min_size} человек.")
+        st.stop()
+    
+    st.markdown(f"**Кластеров: {len(clusters)}** (run #{run_id})")
+    for community_id, size in clusters:
+        with st.expander(f"Кластер {community_id + 1}: {size} чел."):
+            members = execute_query(COMMUNITY_MEMBERS, (run_id, community_id))
+            for label, strength in [(row[1], row[2]) for row in members or []]:
+                st.write(f"- {label}" + (f" ({strength:.3f})" if strength is not None else ""))
+
 elif scenario == "Q11: Кого представить?":
     st.header("🤝 Q11: Кого представить контакту?")
     st.markdown("*Рекомендация на основе общих связей*")
     
-    # Get all contacts
-    results = execute_query("""
-        SELECT label FROM entities 
-        WHERE type='Person' AND status IN ('active', 'cooling', 'directory')
-        ORDER BY label
-    """)
-    contacts = [row[0] for row in results] if results else []
-    
-    target_contact = st.selectbox("Выберите контакт:", contacts)
+    target_contact = pick_contact("q11", statuses=('active', 'cooling', 'directory'))
     
-    if st.button("Найти рекомендации"):
-        # Find target entity_id
-        if db_type == 'postgresql':
-            results = execute_query("SELECT entity_id FROM entities WHERE label = %s", (target_contact,))
-        else:
-            results = execute_query("SELECT entity_id FROM entities WHERE label = ?", (target_contact,))
-        
-        if not results:
-            st.error("Контакт не найден")
-            st.stop()
-        target_id = results[0][0]
-        
-        # Find Olga's entity_id
-        results = execute_query("""
-            SELECT entity_id FROM identifiers 
-            WHERE identifier LIKE '%olga%' OR identifier LIKE '%rozet%'
-            LIMIT 1
-        """)
+    if target_contact is None:
+        st.info("Контакты не найдены")
+    elif st.button("Найти рекомендации"):
+        target_id, target_label = target_contact
         
-        if not results:
-            st.error("Профиль Ольги не найден")
-            st.stop()
+        # Новые рёбра → пересчёт только их двухшагового окружения; иначе мгновенно
+        with st.spinner("Рекомендации…"):
+            report = run_write(lambda c: recommendations.refresh(c, db_type))
+        if report and report['mode'] != 'current':
+            query_cache.invalidate()  # recommendations не двигает версию данных
         
-        olga_id = results[0][0]
-        
-        # Find recommendations
-        if db_type == 'postgresql':
-            query = """
-                WITH target_connections AS (
-                    SELECT DISTINCT
-                        CASE 
-                            WHEN subject_id = %s THEN object_id
-                            ELSE subject_id
-                        END as connection_id
-                    FROM edges
-                    WHERE (subject_id = %s OR object_id = %s)
-                    AND relation_type = 'co_attended'
-                ),
-                olga_connections AS (
-                    SELECT DISTINCT
-                        CASE 
-                            WHEN subject_id = %s THEN object_id
-                            ELSE subject_id
-                        END as connection_id
-                    FROM edges
-                    WHERE (subject_id = %s OR object_id = %s)
-                    AND relation_type = 'co_attended'
-                )
-                SELECT 
-                    e.label,
-                    e.relationship_strength,
-                    e.status
-                FROM olga_connections oc
-                LEFT JOIN target_connections tc ON oc.connection_id = tc.connection_id
-                JOIN entities e ON e.entity_id = oc.connection_id
-                WHERE 
-                    tc.connection_id IS NULL
-                    AND e.type = 'Person'
-                    AND e.entity_id != %s
-                ORDER BY e.relationship_strength DESC
-                LIMIT 10
-            """
-            results = execute_query(query, (
-                target_id, target_id, target_id,
-                olga_id, olga_id, olga_id,
-                target_id
-            ))
-        else:  # sqlite
-            # Simplified query for SQLite without CTEs
-            query = """
-                SELECT DISTINCT
-                    e.label,
-                    e.relationship_strength,
-                    e.status
-                FROM edges e1
-                JOIN entities e ON (
-                    (e1.subject_id = e.entity_id OR e1.object_id = e.entity_id)
-                    AND e.type = 'Person'
-                )
-                WHERE 
-                    (e1.subject_id = ? OR e1.object_id = ?)
-                    AND e1.relation_type = 'co_attended'
-                    AND e.entity_id NOT IN (
-                        SELECT DISTINCT
-                            CASE 
-                                WHEN e2.subject_id = ? THEN e2.object_id
-                                ELSE e2.subject_id
-                            END
-                        FROM edges e2
-                        WHERE (e2.subject_id = ? OR e2.object_id = ?)
-                        AND e2.relation_type = 'co_attended'
-                    )
-                    AND e.entity_id != ?
-                ORDER BY e.relationship_strength DESC
-                LIMIT 10
-            """
-            results = execute_query(query, (
-                olga_id, olga_id,
-                target_id, target_id, target_id,
-                target_id
-            ))
+        # Precomputed top-k: one primary key range
+        results = execute_query(INTRODUCTIONS, (target_id, 10))
         
         if results:
-            st.success(f"**Рекомендации для {target_contact}:**")
+            st.success(f"**Рекомендации для {target_label}:**")
             
-            for i, (label, strength, status) in enumerate(results, 1):
-                col1, col2, col3 = st.columns([3, 1, 1])
+            for i, (_, label, strength, status, adamic_adar, _, common) in enumerate(results, 1):
+                col1, col2, col3, col4, col5 = st.columns([3, 1, 1, 1, 1])
                 col1.write(f"**{i}. {label}**")
-                col2.metric("Strength", f"{strength:.3f}")
-                col3.write(status)
+                col2.metric("Adamic-Adar", f"{adamic_adar:.2f}")
+                col3.metric("Общих", common)
+                col4.metric("Strength", f"{strength or 0:.3f}")
+                col5.write(status)
+        elif not execute_query(RECOMMENDATION_STATE):
+            st.warning("⚠️ Рекомендации не посчитаны: python scripts/recommend_introductions.py")
         else:
-            st.info(f"{target_contact} уже знает всех ваших контактов!")
+            st.info(f"ℹ️ У {target_label} нет кандидатов через общих знакомых.")
+
+elif scenario == "Окружение контакта":
+    st.header("🕸️ Окружение контакта")
+    st.markdown("*Эго-сеть: контакты в пределах N рукопожатий, хабы не раскрываются*")
+    
+    target_contact = pick_contact("ego")
+    results = execute_query("SELECT DISTINCT relation_type FROM edges ORDER BY relation_type")
+    relation_types = [row[0] for row in results] if results else []
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        depth = st.slider("Глубина:", 1, 3, neighborhood.DEPTH)
+        relations = st.multiselect("Типы связей:", relation_types)
+        min_confidence = st.slider("Мин. confidence:", 0.0, 1.0, 0.0, 0.05)
+    
+    with col2:
+        max_nodes = st.slider("Макс. контактов:", 10, 2000, neighborhood.MAX_NODES, 10)
+        max_degree = st.slider("Хаб от степени:", 10, 1000, neighborhood.HUB_DEGREE, 10)
+        since = st.date_input("Связи с:", value=None)
+    
+    if target_contact is None:
+        st.info("Контакты не найдены")
+    elif st.button("Построить окружение"):
+        target_id, target_label = target_contact
+        records = list(neighborhood.expand(
+            open_cursor, target_id, depth, relations or None,
+            min_confidence or None, (since.isoformat() if since else None, None),
+            max_nodes, max_degree
+        ))
+        nodes = [record for kind, record in records if kind == 'node']
+        edges = [record for kind, record in records if kind == 'edge']
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Контактов", len(nodes))
+        col2.metric("Связей", len(edges))
+        col3.metric("Хабов", sum(node['hub'] for node in nodes))
+        
+        st.dataframe(
+            [{'Контакт': node['label'], 'Глубина': node['depth'], 'Тип': node['type'],
+              'Status': node['status'], 'Степень': node['degree'],
+              'Хаб': '⭐' if node['hub'] else ''} for node in nodes],
+            use_container_width=True
+        )
+        
+        col1, col2 = st.columns(2)
+        for column, fmt, mime in ((col1, 'json', 'application/json'),
+                                  (col2, 'graphml', 'application/xml')):
+            buffer = io.StringIO()
+            neighborhood.write(buffer, iter(records), fmt, metadata={'center': target_label})
+            column.download_button(f"⬇️ {fmt.upper()}", buffer.getvalue(),
+                                   file_name=f"ego_network.{fmt}", mime=mime)
 
 elif scenario == "Обогащение: Tags & Notes":
     st.header("✏️ Обогащение контактов")
     st.markdown("*Добавить tags и notes вручную*")
     
-    # Get all contacts
-    results = execute_query("""
-        SELECT label FROM entities 
-        WHERE type='Person'
-        ORDER BY label
-    """)
-    contacts = [row[0] for row in results] if results else []
+    selected_contact = pick_contact("enrich")
     
-    if not contacts:
-        st.warning("⚠️ Нет контактов в базе.")
+    if selected_contact is None:
+        st.warning("⚠️ Контакты не найдены.")
         st.stop()
     
-    selected_contact = st.selectbox("Выберите контакт:", contacts)
+    selected_id, selected_label = selected_contact
     
     # Get current data
-    if db_type == 'postgresql':
-        results = execute_query("""
-            SELECT tags, notes, status, relationship_strength
-            FROM entities WHERE label = %s
-        """, (selected_contact,))
-    else:
-        results = execute_query("""
-            SELECT tags, notes, status, relationship_strength
-            FROM entities WHERE label = ?
-        """, (selected_contact,))
+    results = execute_query(ENRICHMENT, (selected_id,))
     
     if results:
         current_tags, current_notes, status, strength = results[0]
@@ -495,23 +660,46 @@ elif scenario == "Обогащение: Tags & Notes":
         new_notes = st.text_area("Notes:", value=current_notes or "", height=150)
         
         if st.button("💾 Сохранить"):
-            if db_type == 'postgresql':
-                execute_query("""
-                    UPDATE entities 
-                    SET tags = %s, notes = %s, updated_at = %s
-                    WHERE label = %s
-                """, (new_tags, new_notes, datetime.now().isoformat(), selected_contact))
-            else:
-                execute_query("""
-                    UPDATE entities 
-                    SET tags = ?, notes = ?, updated_at = ?
-                    WHERE label = ?
-                """, (new_tags, new_notes, datetime.now().isoformat(), selected_contact))
-            st.success(f"✅ Обновлено: {selected_contact}")
+            execute_query(SAVE_ENRICHMENT, (new_tags, new_notes, datetime.now().isoformat(),
+                                            selected_id))
+            st.success(f"✅ Обновлено: {selected_label}")
     else:
-        st.error(f"❌ Контакт '{selected_contact}' не найден")
+        st.error(f"❌ Контакт '{selected_label}' не найден")
+
+elif scenario == "Поиск: заметки и события":
+    st.header("🔍 Полнотекстовый поиск")
+    st.markdown("*Имена, tags, notes, события и контексты фактов*")
+    
+    text = st.text_input("Запрос:", "")
+    search_sql, search_params = text_search.search_query(text, db_type, limit=30)
+    
+    if search_sql:
+        results = execute_query(search_sql, search_params)
+        if results:
+            st.write(f"Найдено: **{len(results)}**")
+            for kind, item_id, title, snippet, score in results:
+                icon = "👤" if kind == 'entity' else "📄"
+                st.markdown(f"{icon} **{title or item_id}**  \n"
+                            f"{(snippet or '').replace('[', '**').replace(']', '**')}")
+        else:
+            st.info("Ничего не найдено")
 
 
+# Debug: query cache
+with st.sidebar.expander("🐞 Debug: кэш запросов"):
+    cache_info = query_cache.info()
+    col1, col2 = st.columns(2)
+    col1.metric("Hits", cache_info['hits'])
+    col2.metric("Misses", cache_info['misses'])
+    st.markdown(
+        f"- hit rate: {cache_info['hit_rate']:.0%}\n"
+        f"- записей: {cache_info['size']} / {cache_info['maxsize']}\n"
+        f"- без кэша: {cache_info['uncached']}\n"
+        f"- data version: `{_data_version()}`"
+    )
+    if st.button("Очистить кэш"):
+        query_cache.clear()
+
 # Footer
 st.markdown("---")
 st.markdown("*Граф деловых контактов • v2.1 • PostgreSQL + Supabase • Budget: $0*")